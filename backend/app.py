@@ -20,7 +20,7 @@ load_dotenv(dotenv_path=_env_file, override=True)
 from flask import Flask
 from flask_cors import CORS
 from models import db
-from config import Config
+from config import Config, build_engine_options, normalize_database_url
 from controllers.material_controller import material_bp, material_global_bp
 from controllers.reference_file_controller import reference_file_bp
 from controllers.settings_controller import settings_bp
@@ -60,8 +60,20 @@ def create_app():
     instance_dir = os.path.join(backend_dir, 'instance')
     os.makedirs(instance_dir, exist_ok=True)
     
-    db_path = os.path.join(instance_dir, 'database.db')
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    # Honor DATABASE_URL (e.g. PostgreSQL); otherwise use the SQLite file under instance/
+    database_url = os.getenv('DATABASE_URL')
+    if database_url:
+        app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(database_url)
+    else:
+        db_path = os.path.join(instance_dir, 'database.db')
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'],
+        app.config['MAX_TASK_WORKERS'],
+        max(app.config['MAX_IMAGE_WORKERS'], app.config['MAX_DESCRIPTION_WORKERS']),
+        pool_size=app.config['DB_POOL_SIZE'],
+        max_overflow=app.config['DB_MAX_OVERFLOW']
+    )
     
     # Ensure upload folder exists
     project_root = os.path.dirname(backend_dir)
@@ -114,11 +126,37 @@ def create_app():
         # Load settings from database and sync to app.config
         _load_settings_to_config(app)
 
+    _register_upload_gc(app)
+
     # Health check endpoint
     @app.route('/health')
     def health_check():
         return {'status': 'ok', 'message': 'Banana Slides API is running'}
     
+    # Runtime metrics endpoint
+    @app.route('/api/metrics', methods=['GET'])
+    def get_metrics():
+        """
+        运行时指标（进程内统计，重启后清零）
+        - http_pools: 百度 OCR / 图像修复等 Provider 的 HTTP 连接池统计
+        - baidu_payload_cache: 百度 API 图片编码缓存统计
+        - ocr_cache: OCR 结果缓存统计
+        - image_hedging: 图片生成对冲请求统计（对冲次数、胜出次数、节省时间、额外开销比例）
+        - upload_gc: 最近一次上传目录回收的汇总（尚未执行时为 null）
+        """
+        from services.ai_providers.http_pool import get_http_pool_stats
+        from services.ai_providers.baidu_payload import get_payload_cache_stats
+        from services.image_editability.ocr_cache import get_ocr_cache_stats
+        from services.hedging import get_hedging_stats
+        from services.upload_gc import get_upload_gc_stats
+        return {'data': {
+            'http_pools': get_http_pool_stats(),
+            'baidu_payload_cache': get_payload_cache_stats(),
+            'ocr_cache': get_ocr_cache_stats(),
+            'image_hedging': get_hedging_stats(),
+            'upload_gc': get_upload_gc_stats(),
+        }}
+    
     # Output language endpoint
     @app.route('/api/output-language', methods=['GET'])
     def get_output_language():
@@ -151,6 +189,38 @@ def create_app():
     return app
 
 
+def _register_upload_gc(app):
+    """
+    Register the `flask gc-uploads` command, and start the periodic upload GC
+    thread lazily on the first request so only serving processes run it
+    (never `flask db upgrade` or other CLI commands)
+    """
+    import json
+    import click
+    from services.upload_gc import (
+        UploadGCInProgressError, collect_upload_garbage, start_upload_gc_scheduler
+    )
+
+    @app.cli.command('gc-uploads')
+    @click.option('--apply', 'apply_changes', is_flag=True, help='Delete the files (default: dry-run report only)')
+    @click.option('--items/--no-items', default=True, help='Include every selected file in the report')
+    def gc_uploads(apply_changes, items):
+        """Garbage-collect unreferenced and expired files under UPLOAD_FOLDER."""
+        try:
+            report = collect_upload_garbage(dry_run=not apply_changes)
+        except UploadGCInProgressError as e:
+            raise click.ClickException(str(e))
+        click.echo(json.dumps(report.to_dict(include_items=items), ensure_ascii=False, indent=2))
+
+    if app.config.get('UPLOAD_GC_INTERVAL_HOURS', 0) > 0:
+        scheduler_started = []
+
+        @app.before_request
+        def _start_upload_gc_scheduler():
+            if not scheduler_started:
+                scheduler_started.append(start_upload_gc_scheduler(app))
+
+
 def _load_settings_to_config(app):
     """Load settings from database and apply to app.config on startup"""
     from models import Settings
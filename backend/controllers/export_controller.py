@@ -79,6 +79,7 @@ def export_pptx(project_id):
 
         # Generate PPTX file on disk
         ExportService.create_pptx_from_images(image_paths, output_file=output_path)
+        file_service.publish_file(output_path)
 
         # Build download URLs
         download_path = f"/files/{project_id}/exports/{filename}"
@@ -153,6 +154,7 @@ def export_pdf(project_id):
 
         # Generate PDF file on disk
         ExportService.create_pdf_from_images(image_paths, output_file=output_path)
+        file_service.publish_file(output_path)
 
         # Build download URLs
         download_path = f"/files/{project_id}/exports/{filename}"
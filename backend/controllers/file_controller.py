@@ -1,21 +1,190 @@
 """
 File Controller - handles static file serving
+
+All files go through _send_path, which sets a single cache policy:
+- Versioned / timestamped file names (<page_id>_v3.png, material_<ms>.png) and
+  MinerU extracts never change, so they are cached for a year as immutable.
+- Everything else (templates, exports that are overwritten in place) must be
+  revalidated; the strong ETag and Last-Modified make that a cheap 304.
+Range requests (large PPTX/PDF exports) and conditional GETs are handled by
+werkzeug. With FILE_SERVE_OFFLOAD the body is sent by the front web server
+(X-Accel-Redirect for nginx, X-Sendfile for Apache/lighttpd) instead of Python.
+With a remote storage backend (STORAGE_BACKEND=s3), files this replica does not
+have locally, or whose local copy another replica has since overwritten, are
+redirected to a presigned URL or streamed from the object store.
 """
-from flask import Blueprint, send_from_directory, current_app
-from utils import error_response, not_found
+from flask import Blueprint, send_file, current_app, request, redirect, stream_with_context
+from utils import error_response, not_found, bad_request
 from utils.path_utils import find_file_with_prefix
+from services.file_service import FileService
+from services.storage import fetch_local_copy, get_storage, is_local_copy_current
+from services.thumbnails import (
+    THUMBNAIL_FORMATS, ensure_thumbnail, is_immutable, select_width, supports_thumbnail
+)
+import logging
+import mimetypes
 import os
 from pathlib import Path
+from urllib.parse import quote
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 
+logger = logging.getLogger(__name__)
+
 file_bp = Blueprint('files', __name__, url_prefix='/files')
 
+# One year: the longest max-age browsers and CDNs honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _send_path(path, immutable=False, mimetype=None, vary_accept=False):
+    """
+    Send an existing file under UPLOAD_FOLDER with the cache policy applied.
+
+    Args:
+        path: Absolute file path (already validated)
+        immutable: Content never changes for this URL
+        mimetype: Explicit MIME type (guessed from the file name if None)
+        vary_accept: The representation was negotiated from the Accept header
+    """
+    offload = current_app.config['FILE_SERVE_OFFLOAD']
+    if offload == 'x-accel-redirect':
+        # nginx serves the file from an internal location aliased to UPLOAD_FOLDER
+        # and handles ETag, conditional and range requests itself
+        relative = os.path.relpath(path, current_app.config['UPLOAD_FOLDER']).replace(os.sep, '/')
+        response = current_app.response_class(
+            mimetype=mimetype or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        response.headers['X-Accel-Redirect'] = current_app.config['FILE_SERVE_ACCEL_PREFIX'] + quote(relative)
+    else:
+        # USE_X_SENDFILE (FILE_SERVE_OFFLOAD=x-sendfile) is applied by send_file
+        try:
+            response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+        except RequestedRangeNotSatisfiable as e:
+            return e.get_response()
+
+    if vary_accept:
+        response.vary.add('Accept')
+    if immutable:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def _send_thumbnail(source):
+    """
+    Serve a resized copy of an image when the request has ?w=<width>.
+
+    The width is rounded up to the nearest configured size so only a few
+    variants are cached per image. The format comes from ?format=webp|jpeg,
+    or from the Accept header (WebP when the browser supports it).
+
+    Returns:
+        A response, or None to serve the original file (no ?w=, not an image,
+        or the thumbnail could not be generated)
+    """
+    raw_width = request.args.get('w')
+    if raw_width is None or not supports_thumbnail(source):
+        return None
+
+    try:
+        width = int(raw_width)
+    except ValueError:
+        width = 0
+    if width <= 0:
+        return bad_request('w must be a positive integer')
+
+    fmt = request.args.get('format')
+    negotiated = fmt is None
+    if negotiated:
+        fmt = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+    elif fmt not in THUMBNAIL_FORMATS:
+        return bad_request(f"format must be one of: {', '.join(THUMBNAIL_FORMATS)}")
+
+    width = select_width(width, current_app.config['THUMBNAIL_WIDTHS'])
+    try:
+        thumb = ensure_thumbnail(source, width, fmt, current_app.config['THUMBNAIL_QUALITY'])
+    except Exception as e:
+        logger.warning(f"Failed to generate thumbnail for {source}: {e}")
+        return None
+
+    # Versioned file names never change content, so neither do their thumbnails
+    return _send_path(str(thumb), immutable=is_immutable(source.name),
+                      mimetype=THUMBNAIL_FORMATS[fmt][1], vary_accept=negotiated)
+
+
+def _send_remote(storage, key, immutable=False):
+    """
+    Send an object from remote storage: redirect to a presigned URL
+    (STORAGE_PRESIGN_REDIRECT) or stream it through this process.
+    """
+    if not storage.exists(key):
+        return not_found('File')
+
+    if current_app.config['STORAGE_PRESIGN_REDIRECT']:
+        url = storage.presign(key, current_app.config['STORAGE_PRESIGN_EXPIRES'])
+        if url:
+            response = redirect(url)
+            # The presigned URL expires, so the redirect itself is never cached
+            response.cache_control.no_store = True
+            return response
+
+    response = current_app.response_class(
+        stream_with_context(storage.stream(key)),
+        mimetype=mimetypes.guess_type(key)[0] or 'application/octet-stream'
+    )
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def _send_upload(*parts):
+    """
+    Send UPLOAD_FOLDER/<parts...> (or its ?w= thumbnail).
+
+    One stat instead of separate directory and file existence checks;
+    safe_join rejects path traversal in any part. Files missing (or stale)
+    locally are served from remote storage when one is configured.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    path = safe_join(upload_folder, *parts)
+    if path is None:
+        return not_found('File')
+
+    storage = get_storage()
+    if storage.is_local:
+        if not os.path.isfile(path):
+            return not_found('File')
+    else:
+        key = os.path.relpath(path, upload_folder).replace(os.sep, '/')
+        if not is_local_copy_current(storage, key, path):
+            if 'w' not in request.args or not supports_thumbnail(Path(path)):
+                return _send_remote(storage, key, immutable=is_immutable(parts[-1]))
+            # Thumbnails are generated from a local copy of the original
+            if not fetch_local_copy(storage, key, path):
+                return not_found('File')
+
+    thumbnail_response = _send_thumbnail(Path(path))
+    if thumbnail_response is not None:
+        return thumbnail_response
+
+    return _send_path(path, immutable=is_immutable(parts[-1]))
+
 
 @file_bp.route('/<project_id>/<file_type>/<filename>', methods=['GET'])
 def serve_file(project_id, file_type, filename):
     """
     GET /files/{project_id}/{type}/{filename} - Serve static files
-    
+
     Args:
         project_id: Project UUID
         file_type: 'template' or 'pages'
@@ -24,26 +193,9 @@ def serve_file(project_id, file_type, filename):
     try:
         if file_type not in ['template', 'pages', 'materials', 'exports']:
             return not_found('File')
-        
-        # Construct file path
-        file_dir = os.path.join(
-            current_app.config['UPLOAD_FOLDER'],
-            project_id,
-            file_type
-        )
-        
-        # Check if directory exists
-        if not os.path.exists(file_dir):
-            return not_found('File')
-        
-        # Check if file exists
-        file_path = os.path.join(file_dir, filename)
-        if not os.path.exists(file_path):
-            return not_found('File')
-        
-        # Serve file
-        return send_from_directory(file_dir, filename)
-    
+
+        return _send_upload(project_id, file_type, filename)
+
     except Exception as e:
         return error_response('SERVER_ERROR', str(e), 500)
 
@@ -52,31 +204,14 @@ def serve_file(project_id, file_type, filename):
 def serve_user_template(template_id, filename):
     """
     GET /files/user-templates/{template_id}/{filename} - Serve user template files
-    
+
     Args:
         template_id: Template UUID
         filename: File name
     """
     try:
-        # Construct file path
-        file_dir = os.path.join(
-            current_app.config['UPLOAD_FOLDER'],
-            'user-templates',
-            template_id
-        )
-        
-        # Check if directory exists
-        if not os.path.exists(file_dir):
-            return not_found('File')
-        
-        # Check if file exists
-        file_path = os.path.join(file_dir, filename)
-        if not os.path.exists(file_path):
-            return not_found('File')
-        
-        # Serve file
-        return send_from_directory(file_dir, filename)
-    
+        return _send_upload('user-templates', template_id, filename)
+
     except Exception as e:
         return error_response('SERVER_ERROR', str(e), 500)
 
@@ -85,30 +220,13 @@ def serve_user_template(template_id, filename):
 def serve_global_material(filename):
     """
     GET /files/materials/{filename} - Serve global material files (not bound to a project)
-    
+
     Args:
         filename: File name
     """
     try:
-        safe_filename = secure_filename(filename)
-        # Construct file path
-        file_dir = os.path.join(
-            current_app.config['UPLOAD_FOLDER'],
-            'materials'
-        )
-        
-        # Check if directory exists
-        if not os.path.exists(file_dir):
-            return not_found('File')
-        
-        # Check if file exists
-        file_path = os.path.join(file_dir, safe_filename)
-        if not os.path.exists(file_path):
-            return not_found('File')
-        
-        # Serve file
-        return send_from_directory(file_dir, safe_filename)
-    
+        return _send_upload('materials', secure_filename(filename))
+
     except Exception as e:
         return error_response('SERVER_ERROR', str(e), 500)
 
@@ -128,7 +246,7 @@ def serve_mineru_file(extract_id, filepath):
 
         # This prevents path traversal attacks
         resolved_root_dir = Path(root_dir).resolve()
-        
+
         try:
             # Check if the path is trying to escape the root directory
             resolved_full_path = full_path.resolve()
@@ -138,14 +256,17 @@ def serve_mineru_file(extract_id, filepath):
             # If we can't resolve the path at all, it's invalid
             return error_response('INVALID_PATH', 'Invalid file path', 403)
 
-        # Try to find file with prefix matching
+        # Try to find file with prefix matching (fetching the extract from remote storage if needed)
         matched_path = find_file_with_prefix(full_path)
-        
+        if matched_path is None and FileService(current_app.config['UPLOAD_FOLDER']).fetch_dir(
+                f"mineru_files/{extract_id}"):
+            matched_path = find_file_with_prefix(full_path)
+
         if matched_path is not None:
             # Additional security check for matched path
             try:
                 resolved_matched_path = matched_path.resolve(strict=True)
-                
+
                 # Verify the matched file is still within the root directory
                 if not str(resolved_matched_path).startswith(str(resolved_root_dir)):
                     return error_response('INVALID_PATH', 'Invalid file path', 403)
@@ -153,10 +274,10 @@ def serve_mineru_file(extract_id, filepath):
                 return not_found('File')
             except Exception:
                 return error_response('INVALID_PATH', 'Invalid file path', 403)
-            
-            return send_from_directory(str(matched_path.parent), matched_path.name)
+
+            # Each extraction has its own directory and is never modified
+            return _send_path(str(matched_path), immutable=True)
 
         return not_found('File')
     except Exception as e:
         return error_response('SERVER_ERROR', str(e), 500)
-
@@ -118,7 +118,7 @@ def _save_material_file(file, target_project_id: Optional[str]):
     filepath = materials_dir / unique_filename
     file.save(str(filepath))
 
-    relative_path = str(filepath.relative_to(file_service.upload_folder))
+    relative_path = file_service.publish_file(filepath)
     if target_project_id:
         image_url = file_service.get_file_url(target_project_id, 'materials', unique_filename)
     else:
@@ -4,7 +4,10 @@ Page Controller - handles page-related endpoints
 import logging
 from flask import Blueprint, request, current_app
 from models import db, Project, Page, PageImageVersion, Task
-from utils import success_response, error_response, not_found, bad_request
+from utils import (
+    success_response, error_response, not_found, bad_request, validate_page_status,
+    PAGE_BULK_FIELDS, bulk_insert_pages, bulk_update_pages, switch_current_image_version
+)
 from services import FileService, ProjectContext
 from services.ai_service_manager import get_ai_service
 from services.task_manager import task_manager, generate_single_page_image_task, edit_page_image_task
@@ -76,6 +79,156 @@ def create_page(project_id):
         return error_response('SERVER_ERROR', str(e), 500)
 
 
+@page_bp.route('/<project_id>/pages/batch', methods=['POST'])
+def create_pages_batch(project_id):
+    """
+    POST /api/projects/{project_id}/pages/batch - Add several pages in one transaction
+    
+    Request body:
+    {
+        "order_index": 2,  # optional, insert position (default: append)
+        "pages": [
+            {"part": "optional", "outline_content": {...}, "description_content": {...}},
+            ...
+        ]
+    }
+    """
+    try:
+        project = Project.query.get(project_id)
+        
+        if not project:
+            return not_found('Project')
+        
+        data = request.get_json()
+        pages_data = data.get('pages') if data else None
+        
+        if not isinstance(pages_data, list) or not pages_data:
+            return bad_request("pages must be a non-empty list")
+        if not all(isinstance(page_data, dict) for page_data in pages_data):
+            return bad_request("Each page must be an object")
+        
+        order_index = data.get('order_index')
+        if order_index is None:
+            order_index = db.session.query(
+                db.func.coalesce(db.func.max(Page.order_index) + 1, 0)
+            ).filter(Page.project_id == project_id).scalar()
+        elif not isinstance(order_index, int) or order_index < 0:
+            return bad_request("order_index must be a non-negative integer")
+        
+        # Make room for the new pages with one UPDATE
+        db.session.execute(
+            db.update(Page)
+            .where(Page.project_id == project_id, Page.order_index >= order_index)
+            .values(order_index=Page.order_index + len(pages_data)),
+            execution_options={'synchronize_session': False}
+        )
+        
+        page_ids = bulk_insert_pages(project_id, [
+            {
+                'part': page_data.get('part'),
+                'outline_content': page_data.get('outline_content'),
+                'description_content': page_data.get('description_content'),
+                'status': 'DESCRIPTION_GENERATED' if page_data.get('description_content') else 'DRAFT',
+            }
+            for page_data in pages_data
+        ], start_index=order_index)
+        
+        project.updated_at = datetime.utcnow()
+        db.session.commit()
+        
+        pages = Page.query.filter(Page.id.in_(page_ids)).order_by(Page.order_index).all()
+        return success_response({'pages': [page.to_dict() for page in pages]}, status_code=201)
+    
+    except Exception as e:
+        db.session.rollback()
+        return error_response('SERVER_ERROR', str(e), 500)
+
+
+def _invalid_page_field(name, value):
+    """Return an error message if a PUT /pages/batch field value is invalid, else None"""
+    if name == 'order_index':
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            return "order_index must be a non-negative integer"
+    elif name == 'part':
+        if value is not None and not isinstance(value, str):
+            return "part must be a string or null"
+    elif name in ('outline_content', 'description_content'):
+        if value is not None and not isinstance(value, dict):
+            return f"{name} must be an object or null"
+    elif name == 'status':
+        if not isinstance(value, str) or not validate_page_status(value):
+            return f"Invalid page status: {value}"
+    return None
+
+
+@page_bp.route('/<project_id>/pages/batch', methods=['PUT'])
+def update_pages_batch(project_id):
+    """
+    PUT /api/projects/{project_id}/pages/batch - Update several pages in one transaction
+    
+    Request body:
+    {
+        "pages": [
+            {"page_id": "...", "outline_content": {...}, "status": "..."},
+            ...
+        ]
+    }
+    Accepted fields: order_index, part, outline_content, description_content, status
+    """
+    try:
+        project = Project.query.get(project_id)
+        
+        if not project:
+            return not_found('Project')
+        
+        data = request.get_json()
+        pages_data = data.get('pages') if data else None
+        
+        if not isinstance(pages_data, list) or not pages_data:
+            return bad_request("pages must be a non-empty list")
+        
+        updates = []
+        for page_data in pages_data:
+            if not isinstance(page_data, dict) or not page_data.get('page_id'):
+                return bad_request("Each page must have a page_id")
+            fields = {key: value for key, value in page_data.items() if key != 'page_id'}
+            unknown = set(fields) - set(PAGE_BULK_FIELDS)
+            if unknown:
+                return bad_request(f"Unsupported fields: {', '.join(sorted(unknown))}")
+            if not fields:
+                return bad_request(f"No fields to update for page {page_data['page_id']}")
+            for name, value in fields.items():
+                error = _invalid_page_field(name, value)
+                if error:
+                    return bad_request(error)
+            updates.append({'id': page_data['page_id'], **fields})
+        
+        page_ids = [update['id'] for update in updates]
+        if len(set(page_ids)) != len(page_ids):
+            return bad_request("Duplicate page_id in pages")
+        order_indexes = [update['order_index'] for update in updates if 'order_index' in update]
+        if len(set(order_indexes)) != len(order_indexes):
+            return bad_request("Duplicate order_index in pages")
+        
+        found = db.session.query(db.func.count(Page.id)).filter(
+            Page.project_id == project_id,
+            Page.id.in_(page_ids)
+        ).scalar()
+        if found != len(page_ids):
+            return not_found('Page')
+        
+        bulk_update_pages(updates)
+        project.updated_at = datetime.utcnow()
+        db.session.commit()
+        
+        pages = Page.query.filter(Page.id.in_(page_ids)).order_by(Page.order_index).all()
+        return success_response({'pages': [page.to_dict() for page in pages]})
+    
+    except Exception as e:
+        db.session.rollback()
+        return error_response('SERVER_ERROR', str(e), 500)
+
+
 @page_bp.route('/<project_id>/pages/<page_id>', methods=['DELETE'])
 def delete_page(project_id, page_id):
     """
@@ -662,11 +815,8 @@ def set_current_image_version(project_id, page_id, version_id):
         if not version or version.page_id != page_id:
             return not_found('Image Version')
         
-        # Mark all versions as not current
-        PageImageVersion.query.filter_by(page_id=page_id).update({'is_current': False})
-        
-        # Set this version as current
-        version.is_current = True
+        # Switch the current version with a single UPDATE
+        switch_current_image_version(page_id, version_id)
         page.generated_image_path = version.image_path
         page.updated_at = datetime.utcnow()
         
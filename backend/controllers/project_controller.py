@@ -1,14 +1,15 @@
 """
 Project Controller - handles project-related endpoints
 """
+import base64
 import json
 import logging
 import traceback
 from datetime import datetime
 
 from flask import Blueprint, request, jsonify, current_app
-from sqlalchemy import desc
-from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, desc, or_
+from sqlalchemy.orm import joinedload, load_only, selectinload
 from werkzeug.exceptions import BadRequest
 
 from models import db, Project, Page, Task, ReferenceFile
@@ -20,8 +21,9 @@ from services.task_manager import (
     generate_images_task
 )
 from utils import (
-    success_response, error_response, not_found, bad_request,
-    parse_page_ids_from_body, get_filtered_pages
+    success_response, error_response, not_found, bad_request, invalid_status,
+    parse_page_ids_from_body, get_filtered_pages, get_page_summaries,
+    replace_project_pages, bulk_update_pages
 )
 
 logger = logging.getLogger(__name__)
@@ -114,41 +116,98 @@ def _reconstruct_outline_from_pages(pages: list) -> list:
     return outline
 
 
+PROJECT_LIST_FIELDS = {'details', 'pages'}
+
+
+def _encode_project_cursor(project: Project) -> str:
+    """Keyset cursor for list_projects: position of the last returned project"""
+    raw = json.dumps([project.updated_at.isoformat(), project.id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def _decode_project_cursor(cursor: str):
+    """Decode a cursor from _encode_project_cursor, raises ValueError if malformed"""
+    try:
+        updated_at, project_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(updated_at), str(project_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
 @project_bp.route('', methods=['GET'])
 def list_projects():
     """
     GET /api/projects - Get all projects (for history)
     
+    Returns a lightweight summary per project by default (page count, first
+    page title and image, timestamps), computed in SQL without loading page content.
+    
     Query params:
     - limit: number of projects to return (default: 50, max: 100)
-    - offset: offset for pagination (default: 0)
+    - cursor: next_cursor from the previous response (keyset pagination on updated_at)
+    - offset: offset for pagination (default: 0, ignored when cursor is given)
+    - fields: comma-separated extra fields
+        - details: all project columns (same as GET /api/projects/<id> without pages)
+        - pages: details plus every page with its content
     """
     try:
         # Parameter validation
         limit = request.args.get('limit', 50, type=int)
         offset = request.args.get('offset', 0, type=int)
+        cursor = request.args.get('cursor')
+        fields = {f.strip() for f in request.args.get('fields', '').split(',') if f.strip()}
+        
+        unknown_fields = fields - PROJECT_LIST_FIELDS
+        if unknown_fields:
+            return bad_request(f"Unknown fields: {', '.join(sorted(unknown_fields))}")
         
         # Enforce limits to prevent performance issues
         limit = min(max(1, limit), 100)  # Between 1-100
         offset = max(0, offset)  # Non-negative
         
+        query = Project.query.order_by(desc(Project.updated_at), desc(Project.id))
+        if cursor:
+            try:
+                cursor_updated_at, cursor_id = _decode_project_cursor(cursor)
+            except ValueError as e:
+                return bad_request(str(e))
+            query = query.filter(or_(
+                Project.updated_at < cursor_updated_at,
+                and_(Project.updated_at == cursor_updated_at, Project.id < cursor_id)
+            ))
+        elif offset:
+            query = query.offset(offset)
+        
+        if 'pages' in fields:
+            query = query.options(selectinload(Project.pages))
+        elif 'details' not in fields:
+            # Skip the potentially long outline/description text columns
+            query = query.options(load_only(
+                Project.id, Project.idea_prompt, Project.creation_type,
+                Project.status, Project.created_at, Project.updated_at
+            ))
+        
         # Fetch limit + 1 items to check for more pages efficiently
         # This avoids a second database query
-        projects_with_extra = Project.query\
-            .options(joinedload(Project.pages))\
-            .order_by(desc(Project.updated_at))\
-            .limit(limit + 1)\
-            .offset(offset)\
-            .all()
+        projects_with_extra = query.limit(limit + 1).all()
         
         # Check if there are more items beyond the current page
         has_more = len(projects_with_extra) > limit
         # Return only the requested limit
         projects = projects_with_extra[:limit]
         
+        summaries = get_page_summaries([project.id for project in projects])
+        items = []
+        for project in projects:
+            item = project.to_summary_dict(summaries.get(project.id))
+            if fields:
+                item.update(project.to_dict(include_pages='pages' in fields))
+            items.append(item)
+        
         return success_response({
-            'projects': [project.to_dict(include_pages=True) for project in projects],
+            'projects': items,
             'has_more': has_more,
+            'next_cursor': _encode_project_cursor(projects[-1]) if has_more else None,
             'limit': limit,
             'offset': offset
         })
@@ -402,34 +461,24 @@ def generate_outline(project_id):
         # Flatten outline to pages
         pages_data = ai_service.flatten_outline(outline)
         
-        # Delete existing pages (using ORM session to trigger cascades)
-        # Note: Cannot use bulk delete as it bypasses ORM cascades for PageImageVersion
-        old_pages = Page.query.filter_by(project_id=project_id).all()
-        for old_page in old_pages:
-            db.session.delete(old_page)
-        
-        # Create pages from outline
-        pages_list = []
-        for i, page_data in enumerate(pages_data):
-            page = Page(
-                project_id=project_id,
-                order_index=i,
-                part=page_data.get('part'),
-                status='DRAFT'
-            )
-            page.set_outline_content({
-                'title': page_data.get('title'),
-                'points': page_data.get('points', [])
-            })
-            
-            db.session.add(page)
-            pages_list.append(page)
+        # Replace existing pages (image versions included) in one transaction
+        replace_project_pages(project_id, [
+            {
+                'part': page_data.get('part'),
+                'outline_content': {
+                    'title': page_data.get('title'),
+                    'points': page_data.get('points', [])
+                },
+            }
+            for page_data in pages_data
+        ])
         
         # Update project status
         project.status = 'OUTLINE_GENERATED'
         project.updated_at = datetime.utcnow()
         
         db.session.commit()
+        pages_list = get_filtered_pages(project_id)
         
         logger.info(f"大纲生成完成: 项目 {project_id}, 创建了 {len(pages_list)} 个页面")
         
@@ -510,42 +559,30 @@ def generate_from_description(project_id):
             pages_data = pages_data[:min_count]
             page_descriptions = page_descriptions[:min_count]
         
-        # Step 4: Delete existing pages (using ORM session to trigger cascades)
-        old_pages = Page.query.filter_by(project_id=project_id).all()
-        for old_page in old_pages:
-            db.session.delete(old_page)
-        
-        # Step 5: Create pages with both outline and description
-        pages_list = []
-        for i, (page_data, page_desc) in enumerate(zip(pages_data, page_descriptions)):
-            page = Page(
-                project_id=project_id,
-                order_index=i,
-                part=page_data.get('part'),
-                status='DESCRIPTION_GENERATED'  # 直接设置为已生成描述
-            )
-            
-            # Set outline content
-            page.set_outline_content({
-                'title': page_data.get('title'),
-                'points': page_data.get('points', [])
-            })
-            
-            # Set description content
-            desc_content = {
-                "text": page_desc,
-                "generated_at": datetime.utcnow().isoformat()
+        # Step 4-5: Replace existing pages with pages that have both outline and description
+        generated_at = datetime.utcnow().isoformat()
+        replace_project_pages(project_id, [
+            {
+                'part': page_data.get('part'),
+                'status': 'DESCRIPTION_GENERATED',  # 直接设置为已生成描述
+                'outline_content': {
+                    'title': page_data.get('title'),
+                    'points': page_data.get('points', [])
+                },
+                'description_content': {
+                    "text": page_desc,
+                    "generated_at": generated_at
+                },
             }
-            page.set_description_content(desc_content)
-            
-            db.session.add(page)
-            pages_list.append(page)
+            for page_data, page_desc in zip(pages_data, page_descriptions)
+        ])
         
         # Update project status
         project.status = 'DESCRIPTIONS_GENERATED'
         project.updated_at = datetime.utcnow()
         
         db.session.commit()
+        pages_list = get_filtered_pages(project_id)
         
         logger.info(f"从描述生成完成: 项目 {project_id}, 创建了 {len(pages_list)} 个页面，已填充大纲和描述")
         
@@ -776,6 +813,49 @@ def get_task_status(project_id, task_id):
         return error_response('SERVER_ERROR', str(e), 500)
 
 
+@project_bp.route('/<project_id>/tasks/<task_id>/cancel', methods=['POST'])
+def cancel_task(project_id, task_id):
+    """
+    POST /api/projects/{project_id}/tasks/{task_id}/cancel - Cancel a pending or running task
+    
+    Queued tasks are cancelled immediately. Running tasks stop at their next
+    checkpoint (between pages / before each AI call) and switch to CANCELLED
+    shortly after; poll the task status to observe it.
+    """
+    try:
+        task = Task.query.get(task_id)
+        
+        if not task or task.project_id != project_id:
+            return not_found('Task')
+        
+        if task.status in ('COMPLETED', 'FAILED', 'CANCELLED'):
+            return invalid_status(f"Task is already {task.status}")
+        
+        still_running = task_manager.cancel_task(task_id)
+        if not still_running:
+            # Never started, or not owned by this process (e.g. after a restart).
+            # Conditional update: the worker may have finished since the status was read
+            cancelled = db.session.execute(
+                db.update(Task)
+                .where(Task.id == task_id, Task.status.in_(('PENDING', 'PROCESSING')))
+                .values(status='CANCELLED', completed_at=datetime.utcnow()),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+            db.session.commit()
+            db.session.refresh(task)
+            if not cancelled:
+                return invalid_status(f"Task is already {task.status}")
+        
+        result = task.to_dict()
+        result['cancel_requested'] = True
+        return success_response(result, status_code=202 if still_running else 200)
+    
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"cancel_task failed: {str(e)}", exc_info=True)
+        return error_response('SERVER_ERROR', str(e), 500)
+
+
 @project_bp.route('/<project_id>/refine/outline', methods=['POST'])
 def refine_outline(project_id):
     """
@@ -860,61 +940,51 @@ def refine_outline(project_id):
                 if old_page.status in ['DESCRIPTION_GENERATED', 'IMAGE_GENERATED']:
                     old_status_map[title] = old_page.status
         
-        # Delete existing pages (using ORM session to trigger cascades)
-        for old_page in old_pages:
-            db.session.delete(old_page)
-        
         # Create pages from refined outline
-        pages_list = []
-        has_descriptions = False
+        new_pages_data = []
         preserved_count = 0
         new_count = 0
         
-        for i, page_data in enumerate(pages_data):
-            page = Page(
-                project_id=project_id,
-                order_index=i,
-                part=page_data.get('part'),
-                status='DRAFT'
-            )
-            page.set_outline_content({
-                'title': page_data.get('title'),
-                'points': page_data.get('points', [])
-            })
+        for page_data in pages_data:
+            new_page = {
+                'part': page_data.get('part'),
+                'status': 'DRAFT',
+                'outline_content': {
+                    'title': page_data.get('title'),
+                    'points': page_data.get('points', [])
+                },
+            }
             
             # 尝试匹配并恢复已有的描述
             title = page_data.get('title')
             if title in descriptions_map:
-                # 恢复描述内容
-                page.description_content = descriptions_map[title]
-                # 恢复状态（如果有）
-                if title in old_status_map:
-                    page.status = old_status_map[title]
-                else:
-                    page.status = 'DESCRIPTION_GENERATED'
-                has_descriptions = True
+                # 恢复描述内容和状态（如果有）
+                new_page['description_content'] = descriptions_map[title]
+                new_page['status'] = old_status_map.get(title, 'DESCRIPTION_GENERATED')
                 preserved_count += 1
             else:
                 # 新页面或标题改变的页面，描述为空
                 # 这包括：新增的页面、合并的页面、标题改变的页面
-                page.status = 'DRAFT'
                 new_count += 1
             
-            db.session.add(page)
-            pages_list.append(page)
+            new_pages_data.append(new_page)
         
         logger.info(f"描述匹配完成: 保留了 {preserved_count} 个页面的描述, {new_count} 个页面需要重新生成描述")
         
+        # Replace existing pages in one transaction
+        replace_project_pages(project_id, new_pages_data)
+        
         # Update project status
         # 如果所有页面都有描述，保持 DESCRIPTION_GENERATED 状态
         # 否则降级为 OUTLINE_GENERATED
-        if has_descriptions and all(p.description_content for p in pages_list):
+        if new_pages_data and new_count == 0:
             project.status = 'DESCRIPTIONS_GENERATED'
         else:
             project.status = 'OUTLINE_GENERATED'
         project.updated_at = datetime.utcnow()
         
         db.session.commit()
+        pages_list = get_filtered_pages(project_id)
         
         logger.info(f"大纲修改完成: 项目 {project_id}, 创建了 {len(pages_list)} 个页面")
         
@@ -1025,20 +1095,26 @@ def refine_descriptions(project_id):
             
             return bad_request(error_msg)
         
-        # Update pages with refined descriptions
-        for page, refined_desc in zip(pages, refined_descriptions):
-            desc_content = {
-                "text": refined_desc,
-                "generated_at": datetime.utcnow().isoformat()
+        # Update pages with refined descriptions (one executemany)
+        generated_at = datetime.utcnow().isoformat()
+        bulk_update_pages([
+            {
+                'id': page.id,
+                'description_content': {
+                    "text": refined_desc,
+                    "generated_at": generated_at
+                },
+                'status': 'DESCRIPTION_GENERATED',
             }
-            page.set_description_content(desc_content)
-            page.status = 'DESCRIPTION_GENERATED'
+            for page, refined_desc in zip(pages, refined_descriptions)
+        ])
         
         # Update project status
         project.status = 'DESCRIPTIONS_GENERATED'
         project.updated_at = datetime.utcnow()
         
         db.session.commit()
+        pages = get_filtered_pages(project_id)
         
         logger.info(f"页面描述修改完成: 项目 {project_id}, 更新了 {len(pages)} 个页面")
         
@@ -16,6 +16,7 @@ import threading
 from models import db, ReferenceFile, Project
 from utils.response import success_response, error_response, bad_request, not_found
 from services.file_parser_service import FileParserService
+from services.file_service import FileService
 
 logger = logging.getLogger(__name__)
 
@@ -65,7 +66,8 @@ def _parse_file_async(file_id: str, file_path: str, filename: str, app):
                 openai_api_key=current_app.config.get('OPENAI_API_KEY', ''),
                 openai_api_base=current_app.config.get('OPENAI_API_BASE', ''),
                 image_caption_model=current_app.config['IMAGE_CAPTION_MODEL'],
-                provider_format=current_app.config.get('AI_PROVIDER_FORMAT', 'gemini')
+                provider_format=current_app.config.get('AI_PROVIDER_FORMAT', 'gemini'),
+                upload_folder=current_app.config['UPLOAD_FOLDER']
             )
             
             # Parse file
@@ -184,6 +186,7 @@ def upload_reference_file():
         # Save file
         file.save(str(file_path))
         file_size = os.path.getsize(file_path)
+        FileService(upload_folder).publish_file(file_path)
         
         # Create database record
         reference_file = ReferenceFile(
@@ -246,11 +249,9 @@ def delete_reference_file(file_id):
         
         # Delete file from disk
         try:
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            file_path = Path(upload_folder) / reference_file.file_path
-            if file_path.exists():
-                file_path.unlink()
-                logger.info(f"Deleted file from disk: {file_path}")
+            file_service = FileService(current_app.config['UPLOAD_FOLDER'])
+            if file_service.delete_file(reference_file.file_path):
+                logger.info(f"Deleted file: {reference_file.file_path}")
         except Exception as e:
             logger.warning(f"Failed to delete file from disk: {str(e)}")
         
@@ -335,8 +336,8 @@ def trigger_file_parse(file_id):
             db.session.commit()
         
         # 获取文件路径
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = Path(upload_folder) / reference_file.file_path
+        file_service = FileService(current_app.config['UPLOAD_FOLDER'])
+        file_path = Path(file_service.get_absolute_path(reference_file.file_path))
         
         if not file_path.exists():
             return error_response('FILE_NOT_FOUND', f'File not found: {file_path}', 404)
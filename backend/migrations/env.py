@@ -8,7 +8,11 @@ from sqlalchemy import engine_from_config, pool
 # Add the backend directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import create_app
+# Same .env as app.py (offline mode does not import the app)
+from dotenv import load_dotenv
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '..', '.env'), override=True)
+
+from config import Config, normalize_database_url
 from models import db
 
 # this is the Alembic Config object, which provides
@@ -23,20 +27,21 @@ if config.config_file_name is not None:
 target_metadata = db.metadata
 
 
-def get_url() -> str:
-    """Get database URL from Flask application config."""
-    app = create_app()
-    return app.config["SQLALCHEMY_DATABASE_URI"]
-
-
 def run_migrations_offline() -> None:
-    """Run migrations in 'offline' mode."""
-    url = get_url()
+    """
+    Run migrations in 'offline' mode.
+
+    Only the SQL dialect is needed here, so the URL comes straight from
+    DATABASE_URL without creating the app: emitting PostgreSQL DDL this way
+    does not require a driver or a running server.
+    """
+    url = normalize_database_url(os.getenv("DATABASE_URL", Config.SQLALCHEMY_DATABASE_URI))
     context.configure(
         url=url,
         target_metadata=target_metadata,
         literal_binds=True,
         compare_type=True,
+        render_as_batch=url.startswith("sqlite"),
     )
 
     with context.begin_transaction():
@@ -45,6 +50,8 @@ def run_migrations_offline() -> None:
 
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
+    # Imported lazily: importing app creates the app (and its engine)
+    from app import create_app
     app = create_app()
     connectable = engine_from_config(
         {"sqlalchemy.url": app.config["SQLALCHEMY_DATABASE_URI"]},
@@ -57,6 +64,8 @@ def run_migrations_online() -> None:
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            # SQLite cannot ALTER most column properties; autogenerate batch ops there
+            render_as_batch=connection.dialect.name == "sqlite",
         )
 
         with context.begin_transaction():
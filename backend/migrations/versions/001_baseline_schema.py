@@ -5,7 +5,7 @@ Revises:
 Create Date: 2025-12-17 22:00:00.000000
 
 """
-from alembic import op
+from alembic import context, op
 import sqlalchemy as sa
 from sqlalchemy import inspect
 
@@ -23,9 +23,8 @@ def upgrade() -> None:
     
     Idempotent: skips if 'projects' table already exists (old project).
     """
-    bind = op.get_bind()
-    inspector = inspect(bind)
-    if 'projects' in inspector.get_table_names():
+    # Offline (--sql) mode has no connection to inspect: emit DDL for a fresh database
+    if not context.is_offline_mode() and 'projects' in inspect(op.get_bind()).get_table_names():
         # Old project: tables already created by db.create_all(), skip
         return
     
@@ -5,7 +5,7 @@ Revises: 001_baseline
 Create Date: 2025-12-17 22:01:00.000000
 
 """
-from alembic import op
+from alembic import context, op
 import sqlalchemy as sa
 from sqlalchemy import inspect
 
@@ -23,9 +23,8 @@ def upgrade() -> None:
     
     Idempotent: skips if 'settings' table already exists.
     """
-    bind = op.get_bind()
-    inspector = inspect(bind)
-    if 'settings' in inspector.get_table_names():
+    # Offline (--sql) mode has no connection to inspect: emit DDL for a fresh database
+    if not context.is_offline_mode() and 'settings' in inspect(op.get_bind()).get_table_names():
         # Settings table already exists (created by db.create_all() in an intermediate version)
         return
     
@@ -5,7 +5,7 @@ Revises: 002_settings
 Create Date: 2025-12-17 22:02:00.000000
 
 """
-from alembic import op
+from alembic import context, op
 import sqlalchemy as sa
 from sqlalchemy import inspect
 
@@ -19,6 +19,8 @@ depends_on = None
 
 def _column_exists(table_name: str, column_name: str) -> bool:
     """检查列是否存在"""
+    if context.is_offline_mode():
+        return False
     bind = op.get_bind()
     inspector = inspect(bind)
     columns = [col['name'] for col in inspector.get_columns(table_name)]
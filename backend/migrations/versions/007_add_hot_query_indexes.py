@@ -0,0 +1,72 @@
+"""add indexes for hot queries
+
+Revision ID: 007_add_hot_query_indexes
+Revises: 006_add_export_settings
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = '007_add_hot_query_indexes'
+down_revision = '006_add_export_settings'
+branch_labels = None
+depends_on = None
+
+
+def _index_exists(table_name: str, index_name: str) -> bool:
+    """Check if index exists"""
+    if context.is_offline_mode():
+        return False
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return index_name in [index['name'] for index in inspector.get_indexes(table_name)]
+
+
+def upgrade() -> None:
+    """
+    Add composite indexes for the hot query paths:
+    - pages(project_id, order_index): get_filtered_pages / project page list
+    - projects(updated_at): list_projects ordering
+    - tasks(project_id, status): task lookups per project
+    - page_image_versions(page_id, version_number): MAX(version_number) per page
+      (replaces the single-column page_id index, which is its prefix)
+    - page_image_versions(page_id) WHERE is_current: current version lookup
+
+    Idempotent: checks each index before creating.
+    """
+    if not _index_exists('pages', 'ix_pages_project_id_order_index'):
+        op.create_index('ix_pages_project_id_order_index', 'pages', ['project_id', 'order_index'], unique=False)
+
+    if not _index_exists('projects', 'ix_projects_updated_at'):
+        op.create_index('ix_projects_updated_at', 'projects', ['updated_at'], unique=False)
+
+    if not _index_exists('tasks', 'ix_tasks_project_id_status'):
+        op.create_index('ix_tasks_project_id_status', 'tasks', ['project_id', 'status'], unique=False)
+
+    if not _index_exists('page_image_versions', 'ix_page_image_versions_page_id_version_number'):
+        op.create_index(
+            'ix_page_image_versions_page_id_version_number', 'page_image_versions',
+            ['page_id', 'version_number'], unique=False
+        )
+    if _index_exists('page_image_versions', 'ix_page_image_versions_page_id'):
+        op.drop_index('ix_page_image_versions_page_id', table_name='page_image_versions')
+
+    if not _index_exists('page_image_versions', 'ix_page_image_versions_current'):
+        op.create_index(
+            'ix_page_image_versions_current', 'page_image_versions', ['page_id'], unique=False,
+            sqlite_where=sa.text('is_current = 1'),
+            postgresql_where=sa.text('is_current')
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_page_image_versions_current', table_name='page_image_versions')
+    op.create_index('ix_page_image_versions_page_id', 'page_image_versions', ['page_id'], unique=False)
+    op.drop_index('ix_page_image_versions_page_id_version_number', table_name='page_image_versions')
+    op.drop_index('ix_tasks_project_id_status', table_name='tasks')
+    op.drop_index('ix_projects_updated_at', table_name='projects')
+    op.drop_index('ix_pages_project_id_order_index', table_name='pages')
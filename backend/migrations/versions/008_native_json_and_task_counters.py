@@ -0,0 +1,178 @@
+"""native JSON page content, task progress counters and task messages
+
+Revision ID: 008_native_json_task_counters
+Revises: 007_add_hot_query_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '008_native_json_task_counters'
+down_revision = '007_add_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+PAGE_JSON_COLUMNS = ('outline_content', 'description_content')
+# Keys of the old progress JSON that now have their own columns or table
+PROGRESS_KEYS = ('total', 'completed', 'failed', 'current_step', 'percent', 'messages')
+
+# PostgreSQL: text -> jsonb, NULL for values that are not valid JSON
+# (a plain ::jsonb cast aborts the whole upgrade on the first bad row)
+PG_TRY_JSONB = """
+    CREATE OR REPLACE FUNCTION pg_temp.try_jsonb(value text) RETURNS jsonb AS $$
+    BEGIN
+        RETURN value::jsonb;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql IMMUTABLE
+"""
+
+
+def _column_exists(table_name: str, column_name: str) -> bool:
+    """Check if column exists"""
+    if context.is_offline_mode():
+        return column_name in ('progress',) + PAGE_JSON_COLUMNS
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return column_name in [col['name'] for col in inspector.get_columns(table_name)]
+
+
+def _table_exists(table_name: str) -> bool:
+    """Check if table exists"""
+    if context.is_offline_mode():
+        return False
+    return table_name in inspect(op.get_bind()).get_table_names()
+
+
+def _json_type():
+    return sa.JSON(none_as_null=True).with_variant(postgresql.JSONB(none_as_null=True), 'postgresql')
+
+
+def _backfill_progress(dialect: str) -> None:
+    """Copy the old progress JSON into counter columns, result and task_messages"""
+    if dialect == 'postgresql':
+        valid = "jsonb_typeof(pg_temp.try_jsonb(progress)) = 'object'"
+        op.execute(f"""
+            UPDATE tasks SET
+                total = COALESCE((pg_temp.try_jsonb(progress)->>'total')::numeric::int, 0),
+                completed = COALESCE((pg_temp.try_jsonb(progress)->>'completed')::numeric::int, 0),
+                failed = COALESCE((pg_temp.try_jsonb(progress)->>'failed')::numeric::int, 0),
+                current_step = LEFT(pg_temp.try_jsonb(progress)->>'current_step', 500),
+                percent = (pg_temp.try_jsonb(progress)->>'percent')::numeric::int,
+                result = NULLIF(pg_temp.try_jsonb(progress) - ARRAY{list(PROGRESS_KEYS)}, '{{}}'::jsonb)
+            WHERE {valid}
+        """)
+        op.execute(f"""
+            INSERT INTO task_messages (task_id, message, created_at)
+            SELECT tasks.id, m.value, tasks.created_at
+            FROM tasks, jsonb_array_elements_text(pg_temp.try_jsonb(progress)->'messages') WITH ORDINALITY AS m(value, n)
+            WHERE {valid} AND jsonb_typeof(pg_temp.try_jsonb(progress)->'messages') = 'array'
+            ORDER BY tasks.id, m.n
+        """)
+    else:
+        valid = "progress IS NOT NULL AND json_valid(progress)"
+        removed = ', '.join(f"'$.{key}'" for key in PROGRESS_KEYS)
+        op.execute(f"""
+            UPDATE tasks SET
+                total = COALESCE(json_extract(progress, '$.total'), 0),
+                completed = COALESCE(json_extract(progress, '$.completed'), 0),
+                failed = COALESCE(json_extract(progress, '$.failed'), 0),
+                current_step = substr(json_extract(progress, '$.current_step'), 1, 500),
+                percent = json_extract(progress, '$.percent'),
+                result = NULLIF(json_remove(progress, {removed}), '{{}}')
+            WHERE {valid}
+        """)
+        op.execute(f"""
+            INSERT INTO task_messages (task_id, message, created_at)
+            SELECT tasks.id, m.value, tasks.created_at
+            FROM tasks, json_each(tasks.progress, '$.messages') AS m
+            WHERE {valid} AND json_type(progress, '$.messages') = 'array'
+            ORDER BY tasks.id, m.key
+        """)
+
+
+def upgrade() -> None:
+    """
+    - pages.outline_content / description_content: native JSON.
+      Values that are not valid JSON (unreadable before, shown as null) are
+      cleared on both databases; PostgreSQL then converts TEXT -> JSONB,
+      SQLite stores JSON as TEXT already.
+    - tasks.progress (JSON text rewritten on every update) is replaced by
+      total/completed/failed/current_step/percent columns, a `result` JSON
+      column for the remaining keys, and the append-only task_messages table.
+
+    Idempotent: checks columns and tables before changing them.
+    """
+    dialect = op.get_context().dialect.name
+    if dialect == 'postgresql':
+        op.execute(PG_TRY_JSONB)
+
+    for column in PAGE_JSON_COLUMNS:
+        if dialect == 'postgresql':
+            op.execute(f"UPDATE pages SET {column} = NULL "
+                       f"WHERE {column} IS NOT NULL AND pg_temp.try_jsonb({column}::text) IS NULL")
+            op.alter_column('pages', column, type_=postgresql.JSONB(), existing_nullable=True,
+                            postgresql_using=f'{column}::jsonb')
+        elif dialect == 'sqlite':
+            op.execute(f"UPDATE pages SET {column} = NULL WHERE {column} IS NOT NULL AND NOT json_valid({column})")
+
+    new_columns = [
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('failed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('current_step', sa.String(length=500), nullable=True),
+        sa.Column('percent', sa.Integer(), nullable=True),
+        sa.Column('result', _json_type(), nullable=True),
+    ]
+    for column in new_columns:
+        if not _column_exists('tasks', column.name):
+            op.add_column('tasks', column)
+
+    if not _table_exists('task_messages'):
+        op.create_table('task_messages',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('task_id', sa.String(length=36), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_task_messages_task_id_id', 'task_messages', ['task_id', 'id'], unique=False)
+
+    if _column_exists('tasks', 'progress'):
+        _backfill_progress(dialect)
+        with op.batch_alter_table('tasks') as batch_op:
+            batch_op.drop_column('progress')
+
+
+def downgrade() -> None:
+    """Restore tasks.progress (counters and result; messages are dropped) and TEXT page content"""
+    op.add_column('tasks', sa.Column('progress', sa.Text(), nullable=True))
+    dialect = op.get_context().dialect.name
+    if dialect == 'postgresql':
+        op.execute("""
+            UPDATE tasks SET progress = (COALESCE(result, '{}'::jsonb) || jsonb_build_object(
+                'total', total, 'completed', completed, 'failed', failed))::text
+        """)
+    else:
+        op.execute("""
+            UPDATE tasks SET progress = json_patch(COALESCE(result, '{}'), json_object(
+                'total', total, 'completed', completed, 'failed', failed))
+        """)
+
+    op.drop_index('ix_task_messages_task_id_id', table_name='task_messages')
+    op.drop_table('task_messages')
+    with op.batch_alter_table('tasks') as batch_op:
+        for column in ('result', 'percent', 'current_step', 'failed', 'completed', 'total'):
+            batch_op.drop_column(column)
+
+    if dialect == 'postgresql':
+        for column in PAGE_JSON_COLUMNS:
+            op.alter_column('pages', column, type_=sa.Text(), existing_nullable=True,
+                            postgresql_using=f'{column}::text')
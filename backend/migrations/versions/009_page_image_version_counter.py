@@ -0,0 +1,53 @@
+"""add pages.image_version_counter for atomic image version allocation
+
+Revision ID: 009_page_image_version_counter
+Revises: 008_native_json_task_counters
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = '009_page_image_version_counter'
+down_revision = '008_native_json_task_counters'
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(table_name: str, column_name: str) -> bool:
+    """Check if column exists"""
+    if context.is_offline_mode():
+        return False
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return column_name in [col['name'] for col in inspector.get_columns(table_name)]
+
+
+def upgrade() -> None:
+    """
+    Add pages.image_version_counter and initialise it to the highest existing
+    version number of each page, so new versions continue the sequence.
+
+    Idempotent: checks if column exists before adding.
+    """
+    if _column_exists('pages', 'image_version_counter'):
+        return
+
+    op.add_column('pages', sa.Column('image_version_counter', sa.Integer(),
+                                     nullable=False, server_default='0'))
+    op.execute("""
+        UPDATE pages SET image_version_counter = (
+            SELECT COALESCE(MAX(version_number), 0)
+            FROM page_image_versions
+            WHERE page_image_versions.page_id = pages.id
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Remove pages.image_version_counter"""
+    with op.batch_alter_table('pages') as batch_op:
+        batch_op.drop_column('image_version_counter')
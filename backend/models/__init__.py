@@ -1,29 +1,25 @@
 """Database models package"""
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB
 
-# 创建 SQLAlchemy 实例，配置 SQLite 连接选项
-db = SQLAlchemy(
-    engine_options={
-        'connect_args': {
-            'check_same_thread': False,  # 允许跨线程使用（仅SQLite）
-            'timeout': 30,  # 数据库锁定超时（秒）- SQLite特定
-        },
-        'pool_pre_ping': True,  # 连接前检查，确保连接有效
-        'pool_recycle': 3600,  # 1小时回收连接，释放文件句柄
-        'pool_size': 5,  # SQLite连接池不需要太大（建议5-10）
-        'max_overflow': 10,  # 溢出连接数（SQLite受文件锁限制，不宜过大）
-        'pool_timeout': 30,  # 获取连接的超时时间（秒）
-    }
-)
+# 创建 SQLAlchemy 实例；引擎参数（SQLite 跨线程/写锁等待、服务器数据库连接池）
+# 由 config.build_engine_options 按数据库类型生成并写入 SQLALCHEMY_ENGINE_OPTIONS。
+# 构造函数中的 engine_options 会与该配置合并，不能在这里放任何方言专用参数。
+db = SQLAlchemy()
+
+# JSON 列：PostgreSQL 使用 JSONB（二进制存储，由驱动解码），其他数据库使用 JSON（SQLite 中以 TEXT 存储）
+# 值在读取行时解码一次，之后访问不再重复解析；None 存为 SQL NULL
+JSONType = db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql')
 
 from .project import Project
 from .page import Page
 from .task import Task
+from .task_message import TaskMessage
 from .user_template import UserTemplate
 from .page_image_version import PageImageVersion
 from .material import Material
 from .reference_file import ReferenceFile
 from .settings import Settings
 
-__all__ = ['db', 'Project', 'Page', 'Task', 'UserTemplate', 'PageImageVersion', 'Material', 'ReferenceFile', 'Settings']
+__all__ = ['db', 'JSONType', 'Project', 'Page', 'Task', 'TaskMessage', 'UserTemplate', 'PageImageVersion', 'Material', 'ReferenceFile', 'Settings']
 
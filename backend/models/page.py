@@ -1,10 +1,10 @@
 """
 Page model
 """
+import copy
 import uuid
-import json
 from datetime import datetime
-from . import db
+from . import db, JSONType
 
 
 class Page(db.Model):
@@ -12,14 +12,19 @@ class Page(db.Model):
     Page model - represents a single PPT page/slide
     """
     __tablename__ = 'pages'
+    __table_args__ = (
+        db.Index('ix_pages_project_id_order_index', 'project_id', 'order_index'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     project_id = db.Column(db.String(36), db.ForeignKey('projects.id'), nullable=False)
     order_index = db.Column(db.Integer, nullable=False)
     part = db.Column(db.String(200), nullable=True)  # Optional section name
-    outline_content = db.Column(db.Text, nullable=True)  # JSON string
-    description_content = db.Column(db.Text, nullable=True)  # JSON string
+    outline_content = db.Column(JSONType, nullable=True)  # {"title": ..., "points": [...]}
+    description_content = db.Column(JSONType, nullable=True)  # {"text": ...} or {"text_content": [...]}
     generated_image_path = db.Column(db.String(500), nullable=True)
+    # Last allocated image version number (incremented atomically, never reused)
+    image_version_counter = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     status = db.Column(db.String(50), nullable=False, default='DRAFT')
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -31,36 +36,24 @@ class Page(db.Model):
                                      order_by='PageImageVersion.version_number.desc()')
     
     def get_outline_content(self):
-        """Parse outline_content from JSON string"""
-        if self.outline_content:
-            try:
-                return json.loads(self.outline_content)
-            except json.JSONDecodeError:
-                return None
-        return None
+        """
+        Outline content, decoded once when the row is loaded.
+        Returns a shallow copy so callers can add keys (e.g. 'part') without
+        changing the loaded value.
+        """
+        return copy.copy(self.outline_content) if self.outline_content else None
     
     def set_outline_content(self, data):
-        """Set outline_content as JSON string"""
-        if data:
-            self.outline_content = json.dumps(data, ensure_ascii=False)
-        else:
-            self.outline_content = None
+        """Set outline_content (stored as native JSON)"""
+        self.outline_content = data or None
     
     def get_description_content(self):
-        """Parse description_content from JSON string"""
-        if self.description_content:
-            try:
-                return json.loads(self.description_content)
-            except json.JSONDecodeError:
-                return None
-        return None
+        """Description content, decoded once when the row is loaded (shallow copy)"""
+        return copy.copy(self.description_content) if self.description_content else None
     
     def set_description_content(self, data):
-        """Set description_content as JSON string"""
-        if data:
-            self.description_content = json.dumps(data, ensure_ascii=False)
-        else:
-            self.description_content = None
+        """Set description_content (stored as native JSON)"""
+        self.description_content = data or None
     
     def to_dict(self, include_versions=False):
         """Convert to dictionary"""
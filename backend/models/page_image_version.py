@@ -11,9 +11,16 @@ class PageImageVersion(db.Model):
     Page Image Version model - represents a historical version of a page's generated image
     """
     __tablename__ = 'page_image_versions'
+    __table_args__ = (
+        # MAX(version_number) / version history per page
+        db.Index('ix_page_image_versions_page_id_version_number', 'page_id', 'version_number'),
+        # Current version lookup (partial index, one small entry per page)
+        db.Index('ix_page_image_versions_current', 'page_id',
+                 sqlite_where=db.text('is_current = 1'), postgresql_where=db.text('is_current')),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    page_id = db.Column(db.String(36), db.ForeignKey('pages.id'), nullable=False, index=True)
+    page_id = db.Column(db.String(36), db.ForeignKey('pages.id'), nullable=False)
     image_path = db.Column(db.String(500), nullable=False)
     version_number = db.Column(db.Integer, nullable=False)  # 版本号，从1开始递增
     is_current = db.Column(db.Boolean, nullable=False, default=False)  # 是否为当前使用的版本
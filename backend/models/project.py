@@ -25,7 +25,7 @@ class Project(db.Model):
     export_inpaint_method = db.Column(db.String(50), nullable=True, default='hybrid')  # 背景图获取方法: generative, baidu, hybrid
     status = db.Column(db.String(50), nullable=False, default='DRAFT')
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     # 使用 'select' 策略支持 eager loading，同时保持灵活性
@@ -38,14 +38,8 @@ class Project(db.Model):
     
     def to_dict(self, include_pages=False):
         """Convert to dictionary"""
-        # Format created_at and updated_at with UTC timezone indicator for proper frontend parsing
-        created_at_str = None
-        if self.created_at:
-            created_at_str = self.created_at.isoformat() + 'Z' if not self.created_at.tzinfo else self.created_at.isoformat()
-        
-        updated_at_str = None
-        if self.updated_at:
-            updated_at_str = self.updated_at.isoformat() + 'Z' if not self.updated_at.tzinfo else self.updated_at.isoformat()
+        created_at_str = _utc_isoformat(self.created_at)
+        updated_at_str = _utc_isoformat(self.updated_at)
         
         data = {
             'project_id': self.id,
@@ -69,6 +63,38 @@ class Project(db.Model):
         
         return data
     
+    def to_summary_dict(self, page_summary=None):
+        """
+        Convert to a lightweight dictionary for project lists
+        
+        Args:
+            page_summary: Page statistics from utils.get_page_summaries (None if the project has no pages)
+        """
+        data = {
+            'project_id': self.id,
+            'idea_prompt': self.idea_prompt,
+            'creation_type': self.creation_type,
+            'status': self.status,
+            'created_at': _utc_isoformat(self.created_at),
+            'updated_at': _utc_isoformat(self.updated_at),
+            'page_count': 0,
+            'pages_with_images': 0,
+            'pages_with_descriptions': 0,
+            'first_page_title': None,
+            'first_page_image_url': None,
+            'first_page_image_updated_at': None,
+        }
+        if page_summary:
+            data.update(page_summary)
+        return data
+    
     def __repr__(self):
         return f'<Project {self.id}: {self.status}>'
 
+
+def _utc_isoformat(value):
+    """Format a naive UTC datetime with a 'Z' suffix so the frontend parses it as UTC"""
+    if not value:
+        return None
+    return value.isoformat() + 'Z' if not value.tzinfo else value.isoformat()
+
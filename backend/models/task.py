@@ -2,54 +2,106 @@
 Task model for tracking async operations
 """
 import uuid
-import json
 from datetime import datetime
-from . import db
+from . import db, JSONType
+from .task_message import TaskMessage
 
 
 class Task(db.Model):
     """
     Task model - tracks asynchronous generation tasks
+
+    Progress is stored as structured columns so each update only writes the
+    counters that changed; log lines go to the append-only task_messages table.
     """
     __tablename__ = 'tasks'
-    
+    __table_args__ = (
+        db.Index('ix_tasks_project_id_status', 'project_id', 'status'),
+    )
+
+    # Progress keys stored in their own columns (everything else goes to `result`)
+    PROGRESS_COLUMNS = ('total', 'completed', 'failed', 'current_step', 'percent')
+    # Number of recent messages included in the progress dict
+    MESSAGE_LIMIT = 10
+
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     project_id = db.Column(db.String(36), db.ForeignKey('projects.id'), nullable=False)
     task_type = db.Column(db.String(50), nullable=False)  # GENERATE_DESCRIPTIONS|GENERATE_IMAGES
-    status = db.Column(db.String(50), nullable=False, default='PENDING')
-    progress = db.Column(db.Text, nullable=True)  # JSON string: {"total": 10, "completed": 5, "failed": 0}
+    status = db.Column(db.String(50), nullable=False, default='PENDING')  # PENDING|PROCESSING|COMPLETED|FAILED|CANCELLED
+    total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    completed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    failed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    current_step = db.Column(db.String(500), nullable=True)
+    percent = db.Column(db.Integer, nullable=True)  # Set by tasks that report percentage (exports)
+    result = db.Column(JSONType, nullable=True)  # Extra progress/result fields: download_url, material_id, ...
     error_message = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
-    
+
     # Relationships
     project = db.relationship('Project', back_populates='tasks')
-    
+    messages = db.relationship('TaskMessage', back_populates='task', lazy='dynamic',
+                               cascade='all, delete-orphan', order_by='TaskMessage.id')
+
     def get_progress(self):
-        """Parse progress from JSON string"""
-        if self.progress:
-            try:
-                return json.loads(self.progress)
-            except json.JSONDecodeError:
-                return {"total": 0, "completed": 0, "failed": 0}
-        return {"total": 0, "completed": 0, "failed": 0}
-    
+        """
+        Progress dict for the API (same shape as the former JSON progress column):
+        {"total", "completed", "failed", "current_step"?, "percent"?, "messages"?, **result}
+        """
+        progress = dict(self.result or {})
+        progress.update({
+            'total': self.total or 0,
+            'completed': self.completed or 0,
+            'failed': self.failed or 0,
+        })
+        if self.current_step is not None:
+            progress['current_step'] = self.current_step
+        if self.percent is not None:
+            progress['percent'] = self.percent
+        messages = self.get_messages()
+        if messages:
+            progress['messages'] = messages
+        return progress
+
     def set_progress(self, data):
-        """Set progress as JSON string"""
-        if data:
-            self.progress = json.dumps(data)
-        else:
-            self.progress = None
-    
-    def update_progress(self, completed=None, failed=None):
-        """Update progress incrementally"""
-        prog = self.get_progress()
+        """
+        Update progress from a dict.
+        Counter keys (total/completed/failed/current_step/percent) update their
+        columns; other keys are merged into `result`. Keys not given are kept.
+        """
+        extra = {}
+        for key, value in data.items():
+            if key in self.PROGRESS_COLUMNS:
+                setattr(self, key, value)
+            else:
+                extra[key] = value
+        if extra:
+            # Assign a new dict: JSON columns do not track in-place changes
+            self.result = {**(self.result or {}), **extra}
+
+    def update_progress(self, completed=None, failed=None, current_step=None, percent=None):
+        """Update progress counters (only the given columns are written)"""
         if completed is not None:
-            prog['completed'] = completed
+            self.completed = completed
         if failed is not None:
-            prog['failed'] = failed
-        self.set_progress(prog)
-    
+            self.failed = failed
+        if current_step is not None:
+            self.current_step = current_step
+        if percent is not None:
+            self.percent = percent
+
+    def add_message(self, message):
+        """Append a progress log line (INSERT only, earlier messages are never rewritten)"""
+        self.messages.append(TaskMessage(message=message))
+
+    def get_messages(self, limit=None):
+        """Most recent messages, oldest first"""
+        if self.id is None:
+            return []
+        limit = limit or self.MESSAGE_LIMIT
+        recent = self.messages.order_by(None).order_by(TaskMessage.id.desc()).limit(limit).all()
+        return [m.message for m in reversed(recent)]
+
     def to_dict(self):
         """Convert to dictionary"""
         return {
@@ -61,7 +113,6 @@ class Task(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
         }
-    
+
     def __repr__(self):
         return f'<Task {self.id}: {self.task_type} - {self.status}>'
-
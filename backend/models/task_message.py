@@ -0,0 +1,35 @@
+"""
+Task message model - append-only progress log lines of a task
+"""
+from datetime import datetime
+from . import db
+
+
+class TaskMessage(db.Model):
+    """
+    Task message model - one progress log line (e.g. "[版面分析] 已完成第 3/10 页")
+    """
+    __tablename__ = 'task_messages'
+    __table_args__ = (
+        # Latest messages per task (ORDER BY id DESC LIMIT n)
+        db.Index('ix_task_messages_task_id_id', 'task_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    task_id = db.Column(db.String(36), db.ForeignKey('tasks.id'), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Relationships
+    task = db.relationship('Task', back_populates='messages')
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'message': self.message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self):
+        return f'<TaskMessage {self.id}: {self.task_id}>'
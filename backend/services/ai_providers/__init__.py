@@ -31,12 +31,14 @@ from typing import Dict, Any
 
 from .text import TextProvider, GenAITextProvider, OpenAITextProvider
 from .image import ImageProvider, GenAIImageProvider, OpenAIImageProvider
+from .async_runner import AsyncRunner, get_async_runner
 
 logger = logging.getLogger(__name__)
 
 __all__ = [
     'TextProvider', 'GenAITextProvider', 'OpenAITextProvider',
     'ImageProvider', 'GenAIImageProvider', 'OpenAIImageProvider',
+    'AsyncRunner', 'get_async_runner',
     'get_text_provider', 'get_image_provider', 'get_provider_format'
 ]
 
@@ -0,0 +1,137 @@
+"""
+异步运行器 - 在后台线程的事件循环中执行 Provider 的异步方法
+
+任务函数本身是同步的（运行在 TaskManager 的线程池里），通过 AsyncRunner 把一批
+Provider 协程提交到同一个事件循环：一个 worker 可以同时挂起上百个请求，
+而不需要为每个请求占用一个线程（线程栈、Flask app context）。
+协程在提交方 contextvars 的副本中执行，任务绑定的取消令牌和时间预算同样生效。
+
+可编辑导出的百度高精度OCR预识别（BaiduAccurateOCRElementExtractor.prefetch）使用它并发识别所有页面。
+
+Example:
+    >>> runner = get_async_runner()
+    >>> results = runner.run_all(
+    ...     [provider.arecognize(path) for path in image_paths],
+    ...     concurrency=64
+    ... )
+    >>> for path, result in zip(image_paths, results):
+    ...     if isinstance(result, Exception):
+    ...         ...
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRunner:
+    """
+    后台事件循环（单线程，惰性启动）
+
+    线程安全：submit()/run()/run_all() 可以从任意线程调用。
+    """
+
+    def __init__(self, name: str = 'ai-async-runner'):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run_loop():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run_loop, name=self._name, daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+                logger.info(f"启动异步事件循环线程: {self._name}")
+            return self._loop
+
+    def submit(self, coro: Awaitable) -> Future:
+        """提交协程，返回 concurrent.futures.Future（可 cancel() 取消协程）"""
+        return asyncio.run_coroutine_threadsafe(
+            self._run_in_context(coro, contextvars.copy_context()), self._ensure_loop()
+        )
+    
+    @staticmethod
+    async def _run_in_context(coro: Awaitable, context: contextvars.Context) -> Any:
+        """在提交方上下文的副本中执行（Task 创建时复制当前上下文；外层取消会传递给内层）"""
+        return await context.run(asyncio.ensure_future, coro)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """执行单个协程并等待结果"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout=timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def run_all(
+        self,
+        coros: Iterable[Awaitable],
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> List[Any]:
+        """
+        并发执行一批协程，按输入顺序返回结果
+
+        Args:
+            coros: 协程列表
+            concurrency: 同时挂起的最大协程数（None 表示不限制）
+            timeout: 整批的超时时间（秒），超时后取消所有未完成的协程
+
+        Returns:
+            结果列表；失败的协程对应位置为异常对象（不会抛出）
+        """
+        return self.run(self._gather(list(coros), concurrency), timeout=timeout)
+
+    @staticmethod
+    async def _gather(coros: List[Awaitable], concurrency: Optional[int]) -> List[Any]:
+        if concurrency:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def bounded(coro):
+                async with semaphore:
+                    return await coro
+
+            coros = [bounded(coro) for coro in coros]
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+    def shutdown(self):
+        """停止事件循环（进程退出时调用，正常情况下不需要）"""
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                if not self._thread.is_alive():
+                    # 关闭后绑定在该事件循环上的异步HTTP客户端会被释放
+                    self._loop.close()
+                self._loop = None
+                self._thread = None
+
+
+_runner: Optional[AsyncRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_async_runner() -> AsyncRunner:
+    """获取进程级共享的异步运行器"""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = AsyncRunner()
+    return _runner
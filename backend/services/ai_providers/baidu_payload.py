@@ -0,0 +1,208 @@
+"""
+百度 API 图片载荷编码
+
+- 按 API 实际需要的分辨率缩放（OCR 默认最长边 BAIDU_OCR_MAX_SIDE），并返回缩放比例，
+  调用方用 rescale_coordinates() 把识别坐标映射回原图
+- 字节直接拼接请求体：JPEG bytes → base64 bytes → 表单/JSON body，不产生多份 str 拷贝
+- 按图片内容哈希缓存编码结果（LRU，按字节数限额），重复元素和重复导出不再重新编码
+"""
+import base64
+import hashlib
+import io
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlencode
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# 坐标字段（OCR 的 location / vertexes / 表格 cell_location 等）
+_COORDINATE_KEYS = {'left', 'top', 'width', 'height', 'x', 'y'}
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    """编码后的图片"""
+    base64_data: bytes               # base64 编码（ASCII bytes）
+    original_size: Tuple[int, int]   # 原图尺寸 (width, height)
+    encoded_size: Tuple[int, int]    # 编码时尺寸 (width, height)
+
+    @property
+    def scale(self) -> float:
+        """编码尺寸 / 原图尺寸"""
+        if not self.original_size[0]:
+            return 1.0
+        return self.encoded_size[0] / self.original_size[0]
+
+
+class _EncodingCache:
+    """按字节数限额的线程安全 LRU 缓存"""
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._items: "OrderedDict[Tuple, EncodedImage]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[EncodedImage]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def put(self, key: Tuple, item: EncodedImage):
+        item_size = len(item.base64_data)
+        if item_size > self._max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = item
+            self._size += item_size
+            while self._size > self._max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted.base64_data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._items),
+                'bytes': self._size,
+                'max_bytes': self._max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_cache: Optional[_EncodingCache] = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache() -> _EncodingCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from config import Config
+                _cache = _EncodingCache(Config.BAIDU_PAYLOAD_CACHE_MB * 1024 * 1024)
+    return _cache
+
+
+def get_payload_cache_stats() -> Dict[str, Any]:
+    """编码缓存统计"""
+    return _get_cache().stats()
+
+
+def _encode(img: Image.Image, max_side: int, quality: int) -> EncodedImage:
+    original_size = img.size
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    width, height = img.size
+    if max_side and max(width, height) > max_side:
+        ratio = max_side / max(width, height)
+        img = img.resize(
+            (max(1, round(width * ratio)), max(1, round(height * ratio))),
+            Image.Resampling.LANCZOS
+        )
+
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality)
+    return EncodedImage(
+        base64_data=base64.b64encode(buffer.getbuffer()),
+        original_size=original_size,
+        encoded_size=img.size,
+    )
+
+
+def encode_image_file(image_path: str, max_side: int, quality: int = 90) -> EncodedImage:
+    """
+    编码图片文件（按文件内容哈希缓存）
+
+    Args:
+        image_path: 图片路径
+        max_side: 编码后最长边上限（0 表示不缩放）
+        quality: JPEG 质量
+    """
+    with open(image_path, 'rb') as f:
+        raw = f.read()
+
+    key = (hashlib.sha1(raw).hexdigest(), max_side, quality)
+    cache = _get_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        logger.debug(f"图片编码缓存命中: {image_path}")
+        return cached
+
+    with Image.open(io.BytesIO(raw)) as img:
+        encoded = _encode(img, max_side, quality)
+    cache.put(key, encoded)
+    return encoded
+
+
+def encode_pil_image(image: Image.Image, max_side: int, quality: int = 90) -> EncodedImage:
+    """编码内存中的 PIL 图片（不缓存）"""
+    return _encode(image, max_side, quality)
+
+
+def build_form_body(encoded: EncodedImage, fields: Dict[str, Any]) -> bytes:
+    """
+    构建 application/x-www-form-urlencoded 请求体
+
+    base64 字符集中只有 '+', '/', '=' 需要转义，直接在 bytes 上替换，
+    避免 urllib.parse.quote 生成额外的 str 拷贝。
+    """
+    image_field = (
+        encoded.base64_data
+        .replace(b'+', b'%2B')
+        .replace(b'/', b'%2F')
+        .replace(b'=', b'%3D')
+    )
+    parts = [b'image=', image_field]
+    if fields:
+        parts.append(b'&')
+        parts.append(urlencode(fields).encode('ascii'))
+    return b''.join(parts)
+
+
+def build_json_body(encoded: EncodedImage, fields: Dict[str, Any]) -> bytes:
+    """构建 JSON 请求体 {"image": "<base64>", ...fields}"""
+    parts = [b'{"image":"', encoded.base64_data, b'"']
+    for key, value in fields.items():
+        parts.append(b',' + json.dumps(key).encode('utf-8') + b':')
+        parts.append(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+    parts.append(b'}')
+    return b''.join(parts)
+
+
+def rescale_coordinates(obj: Union[Dict, List, Any], factor: float) -> Any:
+    """
+    将 API 返回结果中的坐标字段（left/top/width/height/x/y）按 factor 缩放（原地修改）
+
+    Args:
+        obj: API 返回的 JSON 结构
+        factor: 缩放系数（原图尺寸 / 编码尺寸）
+    """
+    if factor == 1.0:
+        return obj
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key in _COORDINATE_KEYS and isinstance(value, (int, float)) and not isinstance(value, bool):
+                obj[key] = int(round(value * factor))
+            elif isinstance(value, (dict, list)):
+                rescale_coordinates(value, factor)
+    elif isinstance(obj, list):
+        for item in obj:
+            rescale_coordinates(item, factor)
+    return obj
@@ -0,0 +1,291 @@
+"""
+HTTP 连接池 - 供基于 REST 的 Provider（百度 OCR / 图像修复）复用连接
+
+每个 Provider 类型共享一个线程安全的 requests.Session，底层 urllib3 连接池保持
+keep-alive，避免每个元素一次新的 TLS 握手。连接池大小和超时可通过 config.py 配置，
+统计信息通过 get_http_pool_stats() 暴露给 /api/metrics。
+
+异步 Provider 方法使用 AsyncPooledHTTPClient（httpx.AsyncClient），同样按名称共享；
+httpx 异步客户端绑定事件循环，因此按事件循环（弱引用）缓存，事件循环关闭后随之释放。
+"""
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from typing import Dict, Any, Optional, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.cancellation import budget_timeout
+
+logger = logging.getLogger(__name__)
+
+
+class PooledHTTPSession:
+    """
+    带连接池和统计信息的 HTTP 会话
+
+    线程安全：requests.Session 在并发请求间共享 urllib3 连接池，
+    计数器更新由锁保护。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        pool_size: int = 16,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0
+    ):
+        """
+        Args:
+            name: 连接池名称（用于统计）
+            pool_size: 每个主机的最大连接数
+            connect_timeout: 建立连接超时（秒）
+            read_timeout: 读取响应超时（秒）
+        """
+        self.name = name
+        self.pool_size = pool_size
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False)
+        self._session = requests.Session()
+        self._session.mount('https://', self._adapter)
+        self._session.mount('http://', self._adapter)
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """发送 POST 请求（未指定 timeout 时使用连接池默认超时）"""
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        if 'timeout' not in kwargs:
+            # 读取超时不超过所属任务的剩余时间预算
+            connect_timeout, read_timeout = self.timeout
+            kwargs['timeout'] = (connect_timeout, budget_timeout(read_timeout))
+        start = time.monotonic()
+        try:
+            response = self._session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(time.monotonic() - start, error=True)
+            raise
+        self._record(time.monotonic() - start, error=False)
+        return response
+
+    def _record(self, latency: float, error: bool):
+        with self._lock:
+            self._requests += 1
+            if error:
+                self._errors += 1
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池统计：请求数、新建连接数、连接复用率、延迟"""
+        connections = 0
+        pooled_requests = 0
+        try:
+            for pool in list(self._adapter.poolmanager.pools._container.values()):
+                connections += getattr(pool, 'num_connections', 0)
+                pooled_requests += getattr(pool, 'num_requests', 0)
+        except Exception as e:
+            logger.debug(f"读取连接池统计失败: {e}")
+
+        with self._lock:
+            requests_count = self._requests
+            avg_latency = self._total_latency / requests_count if requests_count else 0.0
+            return {
+                'pool_size': self.pool_size,
+                'timeout': list(self.timeout),
+                'requests': requests_count,
+                'errors': self._errors,
+                'connections_opened': connections,
+                'connection_reuse_ratio': (
+                    round(1 - connections / pooled_requests, 3) if pooled_requests else 0.0
+                ),
+                'avg_latency_ms': round(avg_latency * 1000, 1),
+                'max_latency_ms': round(self._max_latency * 1000, 1),
+            }
+
+
+class AsyncPooledHTTPClient:
+    """
+    带连接池和统计信息的异步 HTTP 客户端（httpx.AsyncClient）
+
+    一个事件循环内可以同时挂起上百个请求，连接数由 pool_size 限制。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        pool_size: int = 16,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0
+    ):
+        self.name = name
+        self.pool_size = pool_size
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._in_flight = 0
+        self._max_in_flight = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        """发送 POST 请求（data 参数按 requests 习惯传 bytes 请求体）"""
+        return await self.request('POST', url, **kwargs)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if isinstance(kwargs.get('data'), (bytes, bytearray)):
+            kwargs['content'] = kwargs.pop('data')
+        if 'timeout' not in kwargs:
+            # 读取超时不超过所属任务的剩余时间预算
+            connect_timeout, read_timeout = self.timeout
+            kwargs['timeout'] = httpx.Timeout(budget_timeout(read_timeout), connect=connect_timeout)
+        with self._lock:
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+        start = time.monotonic()
+        error = True
+        try:
+            response = await self._client.request(method, url, **kwargs)
+            error = False
+            return response
+        finally:
+            # 取消（CancelledError）和任意异常都要结束计数，in_flight 不会累积
+            self._record(time.monotonic() - start, error=error)
+
+    def _record(self, latency: float, error: bool):
+        with self._lock:
+            self._in_flight -= 1
+            self._requests += 1
+            if error:
+                self._errors += 1
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests_count = self._requests
+            avg_latency = self._total_latency / requests_count if requests_count else 0.0
+            return {
+                'pool_size': self.pool_size,
+                'timeout': list(self.timeout),
+                'requests': requests_count,
+                'errors': self._errors,
+                'in_flight': self._in_flight,
+                'max_in_flight': self._max_in_flight,
+                'avg_latency_ms': round(avg_latency * 1000, 1),
+                'max_latency_ms': round(self._max_latency * 1000, 1),
+            }
+
+
+_pools: Dict[str, PooledHTTPSession] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pooled_session(
+    name: str,
+    pool_size: Optional[int] = None,
+    connect_timeout: Optional[float] = None,
+    read_timeout: Optional[float] = None
+) -> PooledHTTPSession:
+    """
+    获取指定名称的共享连接池（不存在则创建）
+
+    未指定的参数从 config.py 读取（BAIDU_HTTP_POOL_SIZE / BAIDU_HTTP_CONNECT_TIMEOUT /
+    BAIDU_HTTP_READ_TIMEOUT）。参数只在首次创建时生效。
+    """
+    pool = _pools.get(name)
+    if pool is not None:
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            from config import Config
+            pool = PooledHTTPSession(
+                name,
+                pool_size=pool_size or Config.BAIDU_HTTP_POOL_SIZE,
+                connect_timeout=connect_timeout or Config.BAIDU_HTTP_CONNECT_TIMEOUT,
+                read_timeout=read_timeout or Config.BAIDU_HTTP_READ_TIMEOUT,
+            )
+            _pools[name] = pool
+            logger.info(f"创建HTTP连接池 {name}: pool_size={pool.pool_size}, timeout={pool.timeout}")
+        return pool
+
+
+# 事件循环 -> {名称: 客户端}；事件循环被回收后条目自动删除
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncPooledHTTPClient]]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_http_client(name: str) -> AsyncPooledHTTPClient:
+    """
+    获取当前事件循环中指定名称的共享异步客户端（不存在则创建）
+
+    必须在事件循环中调用。连接池大小和超时从 config.py 读取（与同步连接池相同的配置）。
+    """
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        _evict_closed_loops()
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(name)
+        if client is None:
+            from config import Config
+            client = AsyncPooledHTTPClient(
+                name,
+                pool_size=Config.BAIDU_HTTP_POOL_SIZE,
+                connect_timeout=Config.BAIDU_HTTP_CONNECT_TIMEOUT,
+                read_timeout=Config.BAIDU_HTTP_READ_TIMEOUT,
+            )
+            clients[name] = client
+            logger.info(f"创建异步HTTP客户端 {name}: pool_size={client.pool_size}, timeout={client.timeout}")
+        return client
+
+
+def _evict_closed_loops():
+    """删除已关闭事件循环的客户端（连接随事件循环一起失效）"""
+    for loop in [loop for loop in _async_clients if loop.is_closed()]:
+        del _async_clients[loop]
+
+
+def get_http_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    所有共享连接池的统计信息
+
+    异步客户端以 "<name>:async" 为键；同一名称在多个事件循环中都有客户端时，
+    第二个起追加序号（"<name>:async:1"），不同事件循环的统计不合并。
+    """
+    with _pools_lock:
+        _evict_closed_loops()
+        pools = dict(_pools)
+        async_clients = [list(clients.items()) for clients in _async_clients.values()]
+    stats = {name: pool.stats() for name, pool in pools.items()}
+    for clients in async_clients:
+        for name, client in clients:
+            key = f"{name}:async"
+            index = 0
+            while key in stats:
+                index += 1
+                key = f"{name}:async:{index}"
+            stats[key] = client.stats()
+    return stats
@@ -1,11 +1,13 @@
 """Image generation providers"""
-from .base import ImageProvider
+from .base import ImageProvider, InpaintingProvider, MaskInpaintingProvider
 from .genai_provider import GenAIImageProvider
 from .openai_provider import OpenAIImageProvider
 from .baidu_inpainting_provider import BaiduInpaintingProvider, create_baidu_inpainting_provider
 
 __all__ = [
     'ImageProvider', 
+    'InpaintingProvider',
+    'MaskInpaintingProvider',
     'GenAIImageProvider', 
     'OpenAIImageProvider',
     'BaiduInpaintingProvider',
@@ -4,6 +4,7 @@
 
 API文档: https://ai.baidu.com/ai-doc/IMAGEPROCESS/Mk4i6o3w3
 """
+import asyncio
 import logging
 import base64
 import requests
@@ -13,10 +14,15 @@ from PIL import Image
 import io
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
+from services.ai_providers.http_pool import PooledHTTPSession, get_pooled_session, get_async_http_client
+from services.ai_providers.baidu_payload import encode_pil_image, build_json_body
+from services.ai_providers.image.base import InpaintingProvider
+from services.cancellation import stop_at_deadline
+
 logger = logging.getLogger(__name__)
 
 
-class BaiduInpaintingProvider:
+class BaiduInpaintingProvider(InpaintingProvider):
     """
     百度图像修复 Provider
     
@@ -28,17 +34,20 @@ class BaiduInpaintingProvider:
     - 快速响应，适合批量处理
     """
     
-    def __init__(self, api_key: str, api_secret: Optional[str] = None):
+    def __init__(self, api_key: str, api_secret: Optional[str] = None,
+                 http_session: Optional[PooledHTTPSession] = None):
         """
         初始化百度图像修复 Provider
         
         Args:
             api_key: 百度API Key（BCEv3格式：bce-v3/ALTAK-...）或Access Token
             api_secret: 可选，如果提供则用于BCEv3签名
+            http_session: 可选，HTTP连接池；默认使用该Provider类型共享的连接池
         """
         self.api_key = api_key
         self.api_secret = api_secret
         self.api_url = "https://aip.baidubce.com/rest/2.0/image-process/v1/inpainting"
+        self._http = http_session or get_pooled_session('baidu_inpainting')
         
         if api_key.startswith('bce-v3/'):
             logger.info("✅ 初始化百度图像修复 Provider (使用BCEv3 API Key)")
@@ -46,7 +55,7 @@ class BaiduInpaintingProvider:
             logger.info("✅ 初始化百度图像修复 Provider (使用Access Token)")
     
     @retry(
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(3) | stop_at_deadline,
         wait=wait_exponential(multiplier=0.5, min=1, max=5),
         retry=retry_if_exception_type((requests.exceptions.RequestException, Exception)),
         reraise=True
@@ -77,115 +86,162 @@ class BaiduInpaintingProvider:
         logger.info(f"🔧 开始百度图像修复，共 {len(rectangles)} 个区域")
         
         try:
-            # 转换图片为RGB模式
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            original_width, original_height = image.size
-            logger.info(f"📏 图片尺寸: {original_width}x{original_height}")
-            
-            # 检查并调整图片大小（最长边不超过5000px）
-            max_size = 5000
-            scale = 1.0
-            if original_width > max_size or original_height > max_size:
-                scale = min(max_size / original_width, max_size / original_height)
-                new_size = (int(original_width * scale), int(original_height * scale))
-                image = image.resize(new_size, Image.Resampling.LANCZOS)
-                logger.info(f"✂️ 压缩图片: {image.size}")
-                
-                # 同时缩放矩形区域
-                rectangles = [
-                    {
-                        'left': int(r['left'] * scale),
-                        'top': int(r['top'] * scale),
-                        'width': int(r['width'] * scale),
-                        'height': int(r['height'] * scale)
-                    }
-                    for r in rectangles
-                ]
-            
-            # 过滤掉无效的矩形（宽或高为0）
-            valid_rectangles = [
-                r for r in rectangles 
-                if r['width'] > 0 and r['height'] > 0
-            ]
-            
-            if not valid_rectangles:
+            request = self._prepare_request(image, rectangles)
+            if request is None:
                 logger.warning("过滤后没有有效的矩形区域，返回原图")
                 return image.copy()
-            
-            # 转为base64
-            buffer = io.BytesIO()
-            image.save(buffer, format='JPEG', quality=95)
-            image_bytes = buffer.getvalue()
-            image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-            
-            logger.info(f"📦 图片编码完成: {len(image_base64)} bytes, {len(valid_rectangles)} 个矩形区域")
-            
-            # 构建请求头
-            headers = {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-            }
-            
-            # 选择认证方式
-            if self.api_key.startswith('bce-v3/'):
-                headers['Authorization'] = f'Bearer {self.api_key}'
-                url = self.api_url
-                logger.info("🔐 使用BCEv3签名认证")
-            else:
-                url = f"{self.api_url}?access_token={self.api_key}"
-                logger.info("🔐 使用Access Token认证")
-            
-            # 构建请求体
-            request_body = {
-                'image': image_base64,
-                'rectangle': valid_rectangles
-            }
+            url, headers, request_body, scale = request
             
             logger.info("🌐 发送请求到百度图像修复API...")
-            response = requests.post(
+            response = self._http.post(
                 url, 
                 headers=headers, 
-                json=request_body, 
-                timeout=60
+                data=request_body
             )
             response.raise_for_status()
             
-            result = response.json()
-            
-            # 检查错误 - 抛出异常以触发 @retry 装饰器
-            if 'error_code' in result:
-                error_msg = result.get('error_msg', 'Unknown error')
-                error_code = result.get('error_code')
-                logger.error(f"❌ 百度API错误: [{error_code}] {error_msg}")
-                raise Exception(f"Baidu API error [{error_code}]: {error_msg}")
+            return self._parse_response(response.json(), scale, image.size)
             
-            # 解析结果
-            result_image_base64 = result.get('image')
-            if not result_image_base64:
-                logger.error("❌ 百度API返回结果中没有图片")
-                return None
-            
-            # 解码返回的图片
-            result_image_bytes = base64.b64decode(result_image_base64)
-            result_image = Image.open(io.BytesIO(result_image_bytes))
+        except Exception as e:
+            logger.error(f"❌ 百度图像修复失败: {str(e)}")
+            raise
+    
+    @retry(
+        stop=stop_after_attempt(3) | stop_at_deadline,
+        wait=wait_exponential(multiplier=0.5, min=1, max=5),
+        retry=retry_if_exception_type((requests.exceptions.RequestException, Exception)),
+        reraise=True
+    )
+    async def ainpaint(
+        self,
+        image: Image.Image,
+        rectangles: List[Dict[str, int]]
+    ) -> Optional[Image.Image]:
+        """inpaint() 的异步版本（httpx 异步连接池，参数和返回值相同）"""
+        if not rectangles:
+            logger.warning("没有提供矩形区域，返回原图")
+            return image.copy()
+        
+        logger.info(f"🔧 开始百度图像修复(async)，共 {len(rectangles)} 个区域")
+        
+        try:
+            # 编码和解码是CPU操作，放到线程中执行避免阻塞事件循环
+            request = await asyncio.to_thread(self._prepare_request, image, rectangles)
+            if request is None:
+                logger.warning("过滤后没有有效的矩形区域，返回原图")
+                return image.copy()
+            url, headers, request_body, scale = request
             
-            # 如果之前缩放过，恢复到原始尺寸
-            if scale < 1.0:
-                result_image = result_image.resize(
-                    (original_width, original_height), 
-                    Image.Resampling.LANCZOS
-                )
-                logger.info(f"📐 恢复图片尺寸: {result_image.size}")
+            response = await get_async_http_client('baidu_inpainting').post(
+                url,
+                headers=headers,
+                data=request_body
+            )
+            response.raise_for_status()
             
-            logger.info(f"✅ 百度图像修复完成!")
-            return result_image
+            return await asyncio.to_thread(self._parse_response, response.json(), scale, image.size)
             
         except Exception as e:
             logger.error(f"❌ 百度图像修复失败: {str(e)}")
             raise
     
+    def _prepare_request(
+        self,
+        image: Image.Image,
+        rectangles: List[Dict[str, int]]
+    ) -> Optional[Tuple[str, Dict[str, str], bytes, float]]:
+        """
+        编码图片并构建请求
+        
+        Returns:
+            (url, headers, body, scale)，没有有效矩形时返回None
+        """
+        original_width, original_height = image.size
+        logger.info(f"📏 图片尺寸: {original_width}x{original_height}")
+        
+        # 编码图片（最长边不超过5000px，RGB转换、缩放、JPEG和base64一次完成）
+        max_size = 5000
+        encoded = encode_pil_image(image, max_side=max_size, quality=95)
+        scale = encoded.scale
+        if scale < 1.0:
+            logger.info(f"✂️ 压缩图片: {encoded.encoded_size}")
+            
+            # 同时缩放矩形区域
+            rectangles = [
+                {
+                    'left': int(r['left'] * scale),
+                    'top': int(r['top'] * scale),
+                    'width': int(r['width'] * scale),
+                    'height': int(r['height'] * scale)
+                }
+                for r in rectangles
+            ]
+        
+        # 过滤掉无效的矩形（宽或高为0）
+        valid_rectangles = [
+            r for r in rectangles 
+            if r['width'] > 0 and r['height'] > 0
+        ]
+        
+        if not valid_rectangles:
+            return None
+        
+        logger.info(f"📦 图片编码完成: {len(encoded.base64_data)} bytes, {len(valid_rectangles)} 个矩形区域")
+        
+        # 构建请求头
+        headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+        }
+        
+        # 选择认证方式
+        if self.api_key.startswith('bce-v3/'):
+            headers['Authorization'] = f'Bearer {self.api_key}'
+            url = self.api_url
+            logger.info("🔐 使用BCEv3签名认证")
+        else:
+            url = f"{self.api_url}?access_token={self.api_key}"
+            logger.info("🔐 使用Access Token认证")
+        
+        # 构建请求体（直接拼接bytes，避免再复制一份base64字符串）
+        request_body = build_json_body(encoded, {'rectangle': valid_rectangles})
+        return url, headers, request_body, scale
+    
+    def _parse_response(
+        self,
+        result: Dict[str, Any],
+        scale: float,
+        original_size: Tuple[int, int]
+    ) -> Optional[Image.Image]:
+        """检查错误并解码修复后的图片（恢复到原始尺寸）"""
+        # 检查错误 - 抛出异常以触发 @retry 装饰器
+        if 'error_code' in result:
+            error_msg = result.get('error_msg', 'Unknown error')
+            error_code = result.get('error_code')
+            logger.error(f"❌ 百度API错误: [{error_code}] {error_msg}")
+            raise Exception(f"Baidu API error [{error_code}]: {error_msg}")
+        
+        # 解析结果
+        result_image_base64 = result.get('image')
+        if not result_image_base64:
+            logger.error("❌ 百度API返回结果中没有图片")
+            return None
+        
+        # 解码返回的图片
+        result_image_bytes = base64.b64decode(result_image_base64)
+        result_image = Image.open(io.BytesIO(result_image_bytes))
+        
+        # 如果之前缩放过，恢复到原始尺寸
+        if scale < 1.0:
+            result_image = result_image.resize(
+                original_size, 
+                Image.Resampling.LANCZOS
+            )
+            logger.info(f"📐 恢复图片尺寸: {result_image.size}")
+        
+        logger.info(f"✅ 百度图像修复完成!")
+        return result_image
+    
     def inpaint_bboxes(
         self,
         image: Image.Image,
@@ -1,13 +1,19 @@
 """
-Abstract base class for image generation providers
+Abstract base classes for image generation and inpainting providers
 """
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Optional, List
-from PIL import Image
+from typing import Dict, List, Optional
+from PIL import Image, ImageDraw
 
 
 class ImageProvider(ABC):
-    """Abstract base class for image generation"""
+    """
+    Abstract base class for image generation
+
+    agenerate_image defaults to running generate_image in a worker thread;
+    providers with a native asyncio client override it.
+    """
     
     @abstractmethod
     def generate_image(
@@ -30,3 +36,108 @@ class ImageProvider(ABC):
             Generated PIL Image object, or None if failed
         """
         pass
+
+    async def agenerate_image(
+        self,
+        prompt: str,
+        ref_images: Optional[List[Image.Image]] = None,
+        aspect_ratio: str = "16:9",
+        resolution: str = "2K"
+    ) -> Optional[Image.Image]:
+        """Async variant of generate_image"""
+        return await asyncio.to_thread(
+            self.generate_image, prompt, ref_images, aspect_ratio, resolution
+        )
+
+
+class InpaintingProvider(ABC):
+    """
+    Abstract base class for region inpainting
+
+    Implementations remove content inside rectangles and fill it from the
+    surrounding background.
+    """
+
+    @abstractmethod
+    def inpaint(
+        self,
+        image: Image.Image,
+        rectangles: List[Dict[str, int]]
+    ) -> Optional[Image.Image]:
+        """
+        Inpaint rectangular regions
+
+        Args:
+            image: Source image
+            rectangles: Regions as {left, top, width, height}
+
+        Returns:
+            Inpainted image, or None if failed
+        """
+        pass
+
+    async def ainpaint(
+        self,
+        image: Image.Image,
+        rectangles: List[Dict[str, int]]
+    ) -> Optional[Image.Image]:
+        """Async variant of inpaint"""
+        return await asyncio.to_thread(self.inpaint, image, rectangles)
+
+
+class MaskInpaintingProvider(InpaintingProvider):
+    """
+    Base class for providers that inpaint from a mask image
+
+    inpaint_image takes a mask (white = remove, black = keep); inpaint builds
+    that mask from rectangles. ainpaint_image defaults to running inpaint_image
+    in a worker thread, like the other async variants.
+    """
+
+    @abstractmethod
+    def inpaint_image(
+        self,
+        original_image: Image.Image,
+        mask_image: Image.Image,
+        inpaint_mode: str = "remove",
+        **kwargs
+    ) -> Optional[Image.Image]:
+        """
+        Inpaint the white regions of a mask
+
+        Args:
+            original_image: Source image
+            mask_image: Mask image (white = remove, black = keep)
+            inpaint_mode: Inpainting mode
+
+        Returns:
+            Inpainted image, or None if failed
+        """
+        pass
+
+    async def ainpaint_image(
+        self,
+        original_image: Image.Image,
+        mask_image: Image.Image,
+        inpaint_mode: str = "remove",
+        **kwargs
+    ) -> Optional[Image.Image]:
+        """Async variant of inpaint_image"""
+        return await asyncio.to_thread(
+            self.inpaint_image, original_image, mask_image, inpaint_mode, **kwargs
+        )
+
+    def inpaint(
+        self,
+        image: Image.Image,
+        rectangles: List[Dict[str, int]]
+    ) -> Optional[Image.Image]:
+        mask = Image.new('L', image.size, 0)
+        draw = ImageDraw.Draw(mask)
+        for rect in rectangles:
+            draw.rectangle(
+                [rect['left'], rect['top'],
+                 rect['left'] + rect['width'] - 1, rect['top'] + rect['height'] - 1],
+                fill=255
+            )
+        return self.inpaint_image(image, mask)
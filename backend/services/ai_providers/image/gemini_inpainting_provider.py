@@ -7,13 +7,14 @@ from typing import Optional
 from PIL import Image, ImageDraw
 import numpy as np
 from tenacity import retry, stop_after_attempt, wait_exponential
+from .base import MaskInpaintingProvider
 from .genai_provider import GenAIImageProvider
 from config import get_config
 
 logger = logging.getLogger(__name__)
 
 
-class GeminiInpaintingProvider:
+class GeminiInpaintingProvider(MaskInpaintingProvider):
     """Gemini Inpainting 消除服务（使用 Gemini 2.5 Flash）"""
     
     # DEFAULT_MODEL = "gemini-2.5-flash-image"
@@ -11,11 +11,12 @@ from io import BytesIO
 from typing import Optional
 from PIL import Image
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from .base import MaskInpaintingProvider
 
 logger = logging.getLogger(__name__)
 
 
-class VolcengineInpaintingProvider:
+class VolcengineInpaintingProvider(MaskInpaintingProvider):
     """火山引擎 Inpainting 消除服务（直接HTTP调用）"""
     
     API_URL = "https://visual.volcengineapi.com"
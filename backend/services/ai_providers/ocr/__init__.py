@@ -1,5 +1,7 @@
 """OCR相关的AI Provider"""
 
+from services.ai_providers.ocr.base import OCRProvider
+
 from services.ai_providers.ocr.baidu_table_ocr_provider import (
     BaiduTableOCRProvider,
     create_baidu_table_ocr_provider
@@ -10,6 +12,7 @@ from services.ai_providers.ocr.baidu_accurate_ocr_provider import (
 )
 
 __all__ = [
+    'OCRProvider',
     'BaiduTableOCRProvider',
     'create_baidu_table_ocr_provider',
     'BaiduAccurateOCRProvider',
@@ -4,15 +4,17 @@
 
 API文档: https://ai.baidu.com/ai-doc/OCR/1k3h7y3db
 """
+import asyncio
 import logging
-import base64
 import requests
-import urllib.parse
-from typing import Dict, List, Any, Optional, Literal
-from PIL import Image
-import io
+from typing import Dict, List, Any, Optional, Literal, Tuple
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
+from services.ai_providers.http_pool import PooledHTTPSession, get_pooled_session, get_async_http_client
+from services.ai_providers.baidu_payload import EncodedImage, encode_image_file, build_form_body, rescale_coordinates
+from services.ai_providers.ocr.base import OCRProvider
+from services.cancellation import stop_at_deadline
+
 logger = logging.getLogger(__name__)
 
 
@@ -46,7 +48,7 @@ LanguageType = Literal[
 ]
 
 
-class BaiduAccurateOCRProvider:
+class BaiduAccurateOCRProvider(OCRProvider):
     """
     百度高精度OCR Provider - 通用文字识别（高精度含位置版）
     
@@ -58,17 +60,24 @@ class BaiduAccurateOCRProvider:
     - 支持段落输出
     """
     
-    def __init__(self, api_key: str, api_secret: Optional[str] = None):
+    def __init__(self, api_key: str, api_secret: Optional[str] = None,
+                 http_session: Optional[PooledHTTPSession] = None):
         """
         初始化百度高精度OCR Provider
         
         Args:
             api_key: 百度API Key（BCEv3格式：bce-v3/ALTAK-...）或Access Token
             api_secret: 可选，如果提供则用于BCEv3签名
+            http_session: 可选，HTTP连接池；默认使用该Provider类型共享的连接池
         """
         self.api_key = api_key
         self.api_secret = api_secret
         self.api_url = "https://aip.baidubce.com/rest/2.0/ocr/v1/accurate"
+        self._http = http_session or get_pooled_session('baidu_accurate_ocr')
+        
+        from config import Config
+        self.max_side = Config.BAIDU_OCR_MAX_SIDE
+        self.jpeg_quality = Config.BAIDU_OCR_JPEG_QUALITY
         
         if api_key.startswith('bce-v3/'):
             logger.info("✅ 初始化百度高精度OCR Provider (使用BCEv3 API Key)")
@@ -76,7 +85,7 @@ class BaiduAccurateOCRProvider:
             logger.info("✅ 初始化百度高精度OCR Provider (使用Access Token)")
     
     @retry(
-        stop=stop_after_attempt(3),  # 最多重试3次
+        stop=stop_after_attempt(3) | stop_at_deadline,  # 最多重试3次，任务预算用完后不再重试
         wait=wait_exponential(multiplier=0.5, min=1, max=5),  # 指数避让: 1s, 2s, 4s
         retry=retry_if_exception_type((requests.exceptions.RequestException, Exception)),
         reraise=True
@@ -126,169 +135,211 @@ class BaiduAccurateOCRProvider:
         logger.info(f"🔍 开始高精度OCR识别: {image_path}")
         
         try:
-            # 读取图片并转为base64
-            original_width, original_height = 0, 0
-            with Image.open(image_path) as img:
-                # 获取原始图片尺寸
-                original_width, original_height = img.size
-                logger.info(f"📏 图片尺寸: {original_width}x{original_height}")
-                
-                # 转换为RGB模式
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # 压缩图片(如果太大) - 最长边不超过8192px，最短边至少15px
-                max_size = 8192
-                min_size = 15
-                width, height = img.size
-                
-                if width < min_size or height < min_size:
-                    logger.warning(f"⚠️ 图片太小: {width}x{height}, 最短边需要至少{min_size}px")
-                
-                if width > max_size or height > max_size:
-                    ratio = min(max_size / width, max_size / height)
-                    new_size = (int(width * ratio), int(height * ratio))
-                    img = img.resize(new_size, Image.Resampling.LANCZOS)
-                    logger.info(f"✂️ 压缩图片: {img.size}")
-                
-                # 转为base64
-                buffer = io.BytesIO()
-                img.save(buffer, format='JPEG', quality=95)
-                image_bytes = buffer.getvalue()
-                image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                
-                # URL encode
-                image_encoded = urllib.parse.quote(image_base64)
-                logger.info(f"📦 图片编码完成: base64={len(image_base64)} bytes")
-            
-            # 构建请求头
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'Accept': 'application/json',
-            }
-            
-            # 选择认证方式
-            if self.api_key.startswith('bce-v3/'):
-                # 使用BCEv3签名认证 (Authorization头部)
-                headers['Authorization'] = f'Bearer {self.api_key}'
-                url = self.api_url
-                logger.info("🔐 使用BCEv3签名认证")
-            else:
-                # 使用Access Token (URL参数)
-                url = f"{self.api_url}?access_token={self.api_key}"
-                logger.info("🔐 使用Access Token认证")
-            
-            # 构建表单数据
-            form_data = {
-                'image': image_encoded,
-                'language_type': language_type,
-                'recognize_granularity': recognize_granularity,
-                'detect_direction': 'true' if detect_direction else 'false',
-                'vertexes_location': 'true' if vertexes_location else 'false',
-                'paragraph': 'true' if paragraph else 'false',
-                'probability': 'true' if probability else 'false',
-                'multidirectional_recognize': 'true' if multidirectional_recognize else 'false',
-            }
-            
-            if recognize_granularity == 'small' and char_probability:
-                form_data['char_probability'] = 'true'
-            
-            if recognize_granularity == 'small' and eng_granularity:
-                form_data['eng_granularity'] = eng_granularity
-            
-            # 转换为URL编码的表单数据
-            data = '&'.join([f"{k}={v}" for k, v in form_data.items()])
+            url, headers, data, encoded = self._prepare_request(
+                image_path, language_type, recognize_granularity, detect_direction, vertexes_location,
+                paragraph, probability, char_probability, multidirectional_recognize, eng_granularity
+            )
             
             logger.info("🌐 发送请求到百度高精度OCR API...")
-            response = requests.post(url, headers=headers, data=data, timeout=60)
+            response = self._http.post(url, headers=headers, data=data)
             response.raise_for_status()
             
-            result = response.json()
+            return self._parse_response(response.json(), encoded)
             
-            # 检查错误
-            if 'error_code' in result:
-                error_msg = result.get('error_msg', 'Unknown error')
-                error_code = result.get('error_code')
-                logger.error(f"❌ 百度API错误: [{error_code}] {error_msg}")
-                raise Exception(f"Baidu API error [{error_code}]: {error_msg}")
-            
-            # 解析结果
-            log_id = result.get('log_id', '')
-            words_result_num = result.get('words_result_num', 0)
-            words_result = result.get('words_result', [])
-            direction = result.get('direction', None)
-            paragraphs_result_num = result.get('paragraphs_result_num', 0)
-            paragraphs_result = result.get('paragraphs_result', [])
-            
-            logger.info(f"✅ 高精度OCR识别成功! log_id={log_id}, 识别到 {words_result_num} 行文字")
-            
-            # 解析文字行信息
-            text_lines = []
-            for line in words_result:
-                line_info = {
-                    'text': line.get('words', ''),
-                    'location': line.get('location', {}),
-                    'bbox': self._location_to_bbox(line.get('location', {})),
-                }
-                
-                # 单字符结果
-                if 'chars' in line:
-                    line_info['chars'] = []
-                    for char in line['chars']:
-                        char_info = {
-                            'char': char.get('char', ''),
-                            'location': char.get('location', {}),
-                            'bbox': self._location_to_bbox(char.get('location', {})),
-                        }
-                        if 'char_prob' in char:
-                            char_info['probability'] = char['char_prob']
-                        line_info['chars'].append(char_info)
-                
-                # 置信度
-                if 'probability' in line:
-                    line_info['probability'] = line['probability']
-                
-                # 外接多边形顶点
-                if 'vertexes_location' in line:
-                    line_info['vertexes_location'] = line['vertexes_location']
-                
-                if 'finegrained_vertexes_location' in line:
-                    line_info['finegrained_vertexes_location'] = line['finegrained_vertexes_location']
-                
-                if 'min_finegrained_vertexes_location' in line:
-                    line_info['min_finegrained_vertexes_location'] = line['min_finegrained_vertexes_location']
-                
-                text_lines.append(line_info)
+        except Exception as e:
+            logger.error(f"❌ 高精度OCR识别失败: {str(e)}")
+            raise
+    
+    @retry(
+        stop=stop_after_attempt(3) | stop_at_deadline,  # 最多重试3次，任务预算用完后不再重试
+        wait=wait_exponential(multiplier=0.5, min=1, max=5),  # 指数避让: 1s, 2s, 4s
+        retry=retry_if_exception_type((requests.exceptions.RequestException, Exception)),
+        reraise=True
+    )
+    async def arecognize(
+        self,
+        image_path: str,
+        language_type: LanguageType = 'CHN_ENG',
+        recognize_granularity: Literal['big', 'small'] = 'big',
+        detect_direction: bool = False,
+        vertexes_location: bool = False,
+        paragraph: bool = False,
+        probability: bool = False,
+        char_probability: bool = False,
+        multidirectional_recognize: bool = False,
+        eng_granularity: Optional[Literal['word', 'letter']] = None,
+    ) -> Dict[str, Any]:
+        """recognize() 的异步版本（httpx 异步连接池，参数和返回值相同）"""
+        logger.info(f"🔍 开始高精度OCR识别(async): {image_path}")
+        
+        try:
+            # 图片编码是CPU操作，放到线程中执行避免阻塞事件循环
+            url, headers, data, encoded = await asyncio.to_thread(
+                self._prepare_request,
+                image_path, language_type, recognize_granularity, detect_direction, vertexes_location,
+                paragraph, probability, char_probability, multidirectional_recognize, eng_granularity
+            )
             
-            # 解析段落信息
-            paragraphs = []
-            if paragraphs_result:
-                for para in paragraphs_result:
-                    para_info = {
-                        'words_result_idx': para.get('words_result_idx', []),
-                    }
-                    if 'finegrained_vertexes_location' in para:
-                        para_info['finegrained_vertexes_location'] = para['finegrained_vertexes_location']
-                    if 'min_finegrained_vertexes_location' in para:
-                        para_info['min_finegrained_vertexes_location'] = para['min_finegrained_vertexes_location']
-                    paragraphs.append(para_info)
+            response = await get_async_http_client('baidu_accurate_ocr').post(url, headers=headers, data=data)
+            response.raise_for_status()
             
-            return {
-                'log_id': log_id,
-                'words_result_num': words_result_num,
-                'words_result': words_result,  # 原始结果
-                'text_lines': text_lines,  # 解析后的文字行
-                'direction': direction,
-                'paragraphs_result_num': paragraphs_result_num,
-                'paragraphs_result': paragraphs_result,  # 原始段落结果
-                'paragraphs': paragraphs,  # 解析后的段落
-                'image_size': (original_width, original_height),
-            }
+            return self._parse_response(response.json(), encoded)
             
         except Exception as e:
             logger.error(f"❌ 高精度OCR识别失败: {str(e)}")
             raise
     
+    def _prepare_request(
+        self,
+        image_path: str,
+        language_type: LanguageType = 'CHN_ENG',
+        recognize_granularity: Literal['big', 'small'] = 'big',
+        detect_direction: bool = False,
+        vertexes_location: bool = False,
+        paragraph: bool = False,
+        probability: bool = False,
+        char_probability: bool = False,
+        multidirectional_recognize: bool = False,
+        eng_granularity: Optional[Literal['word', 'letter']] = None,
+    ) -> Tuple[str, Dict[str, str], bytes, EncodedImage]:
+        """编码图片并构建请求 (url, headers, body, encoded)"""
+        # 读取图片并编码（按API需要的分辨率缩放，按内容哈希缓存）
+        encoded = encode_image_file(image_path, max_side=self.max_side, quality=self.jpeg_quality)
+        original_width, original_height = encoded.original_size
+        logger.info(f"📏 图片尺寸: {original_width}x{original_height}")
+
+        min_size = 15
+        if original_width < min_size or original_height < min_size:
+            logger.warning(f"⚠️ 图片太小: {original_width}x{original_height}, 最短边需要至少{min_size}px")
+
+        if encoded.encoded_size != encoded.original_size:
+            logger.info(f"✂️ 压缩图片: {encoded.encoded_size}")
+        logger.info(f"📦 图片编码完成: base64={len(encoded.base64_data)} bytes")
+
+        # 构建请求头
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Accept': 'application/json',
+        }
+
+        # 选择认证方式
+        if self.api_key.startswith('bce-v3/'):
+            # 使用BCEv3签名认证 (Authorization头部)
+            headers['Authorization'] = f'Bearer {self.api_key}'
+            url = self.api_url
+            logger.info("🔐 使用BCEv3签名认证")
+        else:
+            # 使用Access Token (URL参数)
+            url = f"{self.api_url}?access_token={self.api_key}"
+            logger.info("🔐 使用Access Token认证")
+
+        # 构建表单数据
+        form_data = {
+            'language_type': language_type,
+            'recognize_granularity': recognize_granularity,
+            'detect_direction': 'true' if detect_direction else 'false',
+            'vertexes_location': 'true' if vertexes_location else 'false',
+            'paragraph': 'true' if paragraph else 'false',
+            'probability': 'true' if probability else 'false',
+            'multidirectional_recognize': 'true' if multidirectional_recognize else 'false',
+        }
+
+        if recognize_granularity == 'small' and char_probability:
+            form_data['char_probability'] = 'true'
+
+        if recognize_granularity == 'small' and eng_granularity:
+            form_data['eng_granularity'] = eng_granularity
+
+        return url, headers, build_form_body(encoded, form_data), encoded
+    
+    def _parse_response(self, result: Dict[str, Any], encoded: EncodedImage) -> Dict[str, Any]:
+        """检查错误、坐标映射回原图并解析识别结果"""
+        original_width, original_height = encoded.original_size
+        
+        # 检查错误
+        if 'error_code' in result:
+            error_msg = result.get('error_msg', 'Unknown error')
+            error_code = result.get('error_code')
+            logger.error(f"❌ 百度API错误: [{error_code}] {error_msg}")
+            raise Exception(f"Baidu API error [{error_code}]: {error_msg}")
+
+        # 坐标映射回原图尺寸
+        if encoded.scale != 1.0:
+            rescale_coordinates(result, 1.0 / encoded.scale)
+
+        # 解析结果
+        log_id = result.get('log_id', '')
+        words_result_num = result.get('words_result_num', 0)
+        words_result = result.get('words_result', [])
+        direction = result.get('direction', None)
+        paragraphs_result_num = result.get('paragraphs_result_num', 0)
+        paragraphs_result = result.get('paragraphs_result', [])
+
+        logger.info(f"✅ 高精度OCR识别成功! log_id={log_id}, 识别到 {words_result_num} 行文字")
+
+        # 解析文字行信息
+        text_lines = []
+        for line in words_result:
+            line_info = {
+                'text': line.get('words', ''),
+                'location': line.get('location', {}),
+                'bbox': self._location_to_bbox(line.get('location', {})),
+            }
+
+            # 单字符结果
+            if 'chars' in line:
+                line_info['chars'] = []
+                for char in line['chars']:
+                    char_info = {
+                        'char': char.get('char', ''),
+                        'location': char.get('location', {}),
+                        'bbox': self._location_to_bbox(char.get('location', {})),
+                    }
+                    if 'char_prob' in char:
+                        char_info['probability'] = char['char_prob']
+                    line_info['chars'].append(char_info)
+
+            # 置信度
+            if 'probability' in line:
+                line_info['probability'] = line['probability']
+
+            # 外接多边形顶点
+            if 'vertexes_location' in line:
+                line_info['vertexes_location'] = line['vertexes_location']
+
+            if 'finegrained_vertexes_location' in line:
+                line_info['finegrained_vertexes_location'] = line['finegrained_vertexes_location']
+
+            if 'min_finegrained_vertexes_location' in line:
+                line_info['min_finegrained_vertexes_location'] = line['min_finegrained_vertexes_location']
+
+            text_lines.append(line_info)
+
+        # 解析段落信息
+        paragraphs = []
+        if paragraphs_result:
+            for para in paragraphs_result:
+                para_info = {
+                    'words_result_idx': para.get('words_result_idx', []),
+                }
+                if 'finegrained_vertexes_location' in para:
+                    para_info['finegrained_vertexes_location'] = para['finegrained_vertexes_location']
+                if 'min_finegrained_vertexes_location' in para:
+                    para_info['min_finegrained_vertexes_location'] = para['min_finegrained_vertexes_location']
+                paragraphs.append(para_info)
+
+        return {
+            'log_id': log_id,
+            'words_result_num': words_result_num,
+            'words_result': words_result,  # 原始结果
+            'text_lines': text_lines,  # 解析后的文字行
+            'direction': direction,
+            'paragraphs_result_num': paragraphs_result_num,
+            'paragraphs_result': paragraphs_result,  # 原始段落结果
+            'paragraphs': paragraphs,  # 解析后的段落
+            'image_size': (original_width, original_height),
+        }
+    
     def _location_to_bbox(self, location: Dict[str, int]) -> List[int]:
         """
         将location格式转换为bbox格式 [x0, y0, x1, y1]
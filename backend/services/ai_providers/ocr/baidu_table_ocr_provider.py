@@ -4,32 +4,41 @@
 
 API文档: https://ai.baidu.com/ai-doc/OCR/1k3h7y3db
 """
+import asyncio
 import logging
-import base64
 import requests
-import urllib.parse
-from typing import Dict, List, Any, Optional
-from PIL import Image
-import io
+from typing import Dict, List, Any, Optional, Tuple
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
+from services.ai_providers.http_pool import PooledHTTPSession, get_pooled_session, get_async_http_client
+from services.ai_providers.baidu_payload import EncodedImage, encode_image_file, build_form_body, rescale_coordinates
+from services.ai_providers.ocr.base import OCRProvider
+from services.cancellation import stop_at_deadline
+
 logger = logging.getLogger(__name__)
 
 
-class BaiduTableOCRProvider:
+class BaiduTableOCRProvider(OCRProvider):
     """百度表格OCR Provider - 支持BCEv3签名认证"""
     
-    def __init__(self, api_key: str, api_secret: Optional[str] = None):
+    def __init__(self, api_key: str, api_secret: Optional[str] = None,
+                 http_session: Optional[PooledHTTPSession] = None):
         """
         初始化百度表格OCR Provider
         
         Args:
             api_key: 百度API Key（BCEv3格式：bce-v3/ALTAK-...）或Access Token
             api_secret: 可选，如果提供则用于BCEv3签名
+            http_session: 可选，HTTP连接池；默认使用该Provider类型共享的连接池
         """
         self.api_key = api_key
         self.api_secret = api_secret
         self.api_url = "https://aip.baidubce.com/rest/2.0/ocr/v1/table"
+        self._http = http_session or get_pooled_session('baidu_table_ocr')
+        
+        from config import Config
+        self.max_side = Config.BAIDU_OCR_MAX_SIDE
+        self.jpeg_quality = Config.BAIDU_OCR_JPEG_QUALITY
         
         if api_key.startswith('bce-v3/'):
             logger.info("✅ 初始化百度表格OCR Provider (使用BCEv3 API Key)")
@@ -37,7 +46,7 @@ class BaiduTableOCRProvider:
             logger.info("✅ 初始化百度表格OCR Provider (使用Access Token)")
     
     @retry(
-        stop=stop_after_attempt(3),  # 最多重试3次
+        stop=stop_after_attempt(3) | stop_at_deadline,  # 最多重试3次，任务预算用完后不再重试
         wait=wait_exponential(multiplier=0.5, min=1, max=5),  # 指数避让: 1s, 2s, 4s
         retry=retry_if_exception_type((requests.exceptions.RequestException, Exception)),
         reraise=True
@@ -67,142 +76,178 @@ class BaiduTableOCRProvider:
         logger.info(f"🔍 开始识别表格图片: {image_path}")
         
         try:
-            # 读取图片并转为base64
-            original_width, original_height = 0, 0
-            with Image.open(image_path) as img:
-                # 获取原始图片尺寸
-                original_width, original_height = img.size
-                logger.info(f"📏 图片尺寸: {original_width}x{original_height}")
-                
-                # 转换为RGB模式
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # 压缩图片(如果太大) - 最长边不超过8192px，最短边至少15px
-                max_size = 8192
-                min_size = 15
-                width, height = img.size
-                
-                if width < min_size or height < min_size:
-                    logger.warning(f"⚠️ 图片太小: {width}x{height}, 最短边需要至少{min_size}px")
-                
-                if width > max_size or height > max_size:
-                    ratio = min(max_size / width, max_size / height)
-                    new_size = (int(width * ratio), int(height * ratio))
-                    img = img.resize(new_size, Image.Resampling.LANCZOS)
-                    logger.info(f"✂️ 压缩图片: {img.size}")
-                
-                # 转为base64
-                buffer = io.BytesIO()
-                img.save(buffer, format='JPEG', quality=95)
-                image_bytes = buffer.getvalue()
-                image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                
-                # URL encode
-                image_encoded = urllib.parse.quote(image_base64)
-                logger.info(f"📦 图片编码完成: base64={len(image_base64)} bytes, urlencode={len(image_encoded)} bytes")
-            
-            # 构建请求头
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'Accept': 'application/json',
-            }
-            
-            # 选择认证方式
-            if self.api_key.startswith('bce-v3/'):
-                # 使用BCEv3签名认证 (Authorization头部)
-                headers['Authorization'] = f'Bearer {self.api_key}'
-                url = self.api_url
-                logger.info(f"🔐 使用BCEv3签名认证")
-            else:
-                # 使用Access Token (URL参数)
-                url = f"{self.api_url}?access_token={self.api_key}"
-                logger.info(f"🔐 使用Access Token认证")
-            
-            # 构建表单数据
-            data = f"image={image_encoded}&cell_contents={'true' if cell_contents else 'false'}&return_excel={'true' if return_excel else 'false'}"
+            url, headers, data, encoded = self._prepare_request(image_path, cell_contents, return_excel)
             
             logger.info(f"🌐 发送请求到百度表格OCR API...")
-            response = requests.post(url, headers=headers, data=data, timeout=60)
+            response = self._http.post(url, headers=headers, data=data)
             response.raise_for_status()
             
-            result = response.json()
-            
-            # 检查错误
-            if 'error_code' in result:
-                error_msg = result.get('error_msg', 'Unknown error')
-                error_code = result.get('error_code')
-                logger.error(f"❌ 百度API错误: [{error_code}] {error_msg}")
-                raise Exception(f"Baidu API error [{error_code}]: {error_msg}")
-            
-            # 解析结果
-            log_id = result.get('log_id', '')
-            table_num = result.get('table_num', 0)
-            tables_result = result.get('tables_result', [])
-            excel_file = result.get('excel_file', None)
+            return self._parse_response(response.json(), encoded)
             
-            logger.info(f"✅ 表格识别成功! log_id={log_id}, 识别到 {table_num} 个表格")
+        except Exception as e:
+            logger.error(f"❌ 表格识别失败: {str(e)}")
+            raise
+    
+    @retry(
+        stop=stop_after_attempt(3) | stop_at_deadline,  # 最多重试3次，任务预算用完后不再重试
+        wait=wait_exponential(multiplier=0.5, min=1, max=5),  # 指数避让: 1s, 2s, 4s
+        retry=retry_if_exception_type((requests.exceptions.RequestException, Exception)),
+        reraise=True
+    )
+    async def arecognize_table(
+        self,
+        image_path: str,
+        cell_contents: bool = True,  # 默认开启，获取单元格文字位置
+        return_excel: bool = False
+    ) -> Dict[str, Any]:
+        """recognize_table() 的异步版本（httpx 异步连接池，参数和返回值相同）"""
+        logger.info(f"🔍 开始识别表格图片(async): {image_path}")
+        
+        try:
+            # 图片编码是CPU操作，放到线程中执行避免阻塞事件循环
+            url, headers, data, encoded = await asyncio.to_thread(
+                self._prepare_request, image_path, cell_contents, return_excel
+            )
             
-            # 解析单元格信息(扁平化)
-            cells = []
-            for table_idx, table in enumerate(tables_result):
-                table_location = table.get('table_location', [])
-                header = table.get('header', [])
-                body = table.get('body', [])
-                footer = table.get('footer', [])
-                
-                logger.info(f"  表格 {table_idx + 1}: header={len(header)}, body={len(body)}, footer={len(footer)}")
-                
-                # 解析表头
-                for idx, header_cell in enumerate(header):
-                    cell_info = {
-                        'table_idx': table_idx,
-                        'section': 'header',
-                        'section_idx': idx,
-                        'text': header_cell.get('words', ''),
-                        'bbox': self._location_to_bbox(header_cell.get('location', [])),
-                    }
-                    cells.append(cell_info)
-                
-                # 解析表体
-                for cell in body:
-                    cell_info = {
-                        'table_idx': table_idx,
-                        'section': 'body',
-                        'row_start': cell.get('row_start', 0),
-                        'row_end': cell.get('row_end', 0),
-                        'col_start': cell.get('col_start', 0),
-                        'col_end': cell.get('col_end', 0),
-                        'text': cell.get('words', ''),
-                        'bbox': self._location_to_bbox(cell.get('cell_location', [])),
-                        'contents': cell.get('contents', []),  # 单元格内文字分行信息
-                    }
-                    cells.append(cell_info)
-                
-                # 解析表尾
-                for idx, footer_cell in enumerate(footer):
-                    cell_info = {
-                        'table_idx': table_idx,
-                        'section': 'footer',
-                        'section_idx': idx,
-                        'text': footer_cell.get('words', ''),
-                        'bbox': self._location_to_bbox(footer_cell.get('location', [])),
-                    }
-                    cells.append(cell_info)
+            response = await get_async_http_client('baidu_table_ocr').post(url, headers=headers, data=data)
+            response.raise_for_status()
             
-            return {
-                'log_id': log_id,
-                'table_num': table_num,
-                'tables_result': tables_result,
-                'cells': cells,
-                'image_size': (original_width, original_height),
-                'excel_file': excel_file,
-            }
+            return self._parse_response(response.json(), encoded)
             
         except Exception as e:
             logger.error(f"❌ 表格识别失败: {str(e)}")
             raise
     
+    def recognize(self, image_path: str, **options) -> Dict[str, Any]:
+        """OCRProvider 接口，等同于 recognize_table()"""
+        return self.recognize_table(image_path, **options)
+    
+    async def arecognize(self, image_path: str, **options) -> Dict[str, Any]:
+        """OCRProvider 接口，等同于 arecognize_table()"""
+        return await self.arecognize_table(image_path, **options)
+    
+    def _prepare_request(
+        self,
+        image_path: str,
+        cell_contents: bool,
+        return_excel: bool
+    ) -> Tuple[str, Dict[str, str], bytes, EncodedImage]:
+        """编码图片并构建请求 (url, headers, body, encoded)"""
+        # 读取图片并编码（按API需要的分辨率缩放，按内容哈希缓存）
+        encoded = encode_image_file(image_path, max_side=self.max_side, quality=self.jpeg_quality)
+        original_width, original_height = encoded.original_size
+        logger.info(f"📏 图片尺寸: {original_width}x{original_height}")
+        
+        min_size = 15
+        if original_width < min_size or original_height < min_size:
+            logger.warning(f"⚠️ 图片太小: {original_width}x{original_height}, 最短边需要至少{min_size}px")
+        
+        if encoded.encoded_size != encoded.original_size:
+            logger.info(f"✂️ 压缩图片: {encoded.encoded_size}")
+        logger.info(f"📦 图片编码完成: base64={len(encoded.base64_data)} bytes")
+        
+        # 构建请求头
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Accept': 'application/json',
+        }
+        
+        # 选择认证方式
+        if self.api_key.startswith('bce-v3/'):
+            # 使用BCEv3签名认证 (Authorization头部)
+            headers['Authorization'] = f'Bearer {self.api_key}'
+            url = self.api_url
+            logger.info(f"🔐 使用BCEv3签名认证")
+        else:
+            # 使用Access Token (URL参数)
+            url = f"{self.api_url}?access_token={self.api_key}"
+            logger.info(f"🔐 使用Access Token认证")
+        
+        data = build_form_body(encoded, {
+            'cell_contents': 'true' if cell_contents else 'false',
+            'return_excel': 'true' if return_excel else 'false',
+        })
+        return url, headers, data, encoded
+    
+    def _parse_response(self, result: Dict[str, Any], encoded: EncodedImage) -> Dict[str, Any]:
+        """检查错误、坐标映射回原图并解析单元格"""
+        original_width, original_height = encoded.original_size
+        
+        # 检查错误
+        if 'error_code' in result:
+            error_msg = result.get('error_msg', 'Unknown error')
+            error_code = result.get('error_code')
+            logger.error(f"❌ 百度API错误: [{error_code}] {error_msg}")
+            raise Exception(f"Baidu API error [{error_code}]: {error_msg}")
+        
+        # 坐标映射回原图尺寸
+        if encoded.scale != 1.0:
+            rescale_coordinates(result, 1.0 / encoded.scale)
+        
+        # 解析结果
+        log_id = result.get('log_id', '')
+        table_num = result.get('table_num', 0)
+        tables_result = result.get('tables_result', [])
+        excel_file = result.get('excel_file', None)
+        
+        logger.info(f"✅ 表格识别成功! log_id={log_id}, 识别到 {table_num} 个表格")
+        
+        # 解析单元格信息(扁平化)
+        cells = []
+        for table_idx, table in enumerate(tables_result):
+            table_location = table.get('table_location', [])
+            header = table.get('header', [])
+            body = table.get('body', [])
+            footer = table.get('footer', [])
+        
+            logger.info(f"  表格 {table_idx + 1}: header={len(header)}, body={len(body)}, footer={len(footer)}")
+        
+            # 解析表头
+            for idx, header_cell in enumerate(header):
+                cell_info = {
+                    'table_idx': table_idx,
+                    'section': 'header',
+                    'section_idx': idx,
+                    'text': header_cell.get('words', ''),
+                    'bbox': self._location_to_bbox(header_cell.get('location', [])),
+                }
+                cells.append(cell_info)
+        
+            # 解析表体
+            for cell in body:
+                cell_info = {
+                    'table_idx': table_idx,
+                    'section': 'body',
+                    'row_start': cell.get('row_start', 0),
+                    'row_end': cell.get('row_end', 0),
+                    'col_start': cell.get('col_start', 0),
+                    'col_end': cell.get('col_end', 0),
+                    'text': cell.get('words', ''),
+                    'bbox': self._location_to_bbox(cell.get('cell_location', [])),
+                    'contents': cell.get('contents', []),  # 单元格内文字分行信息
+                }
+                cells.append(cell_info)
+        
+            # 解析表尾
+            for idx, footer_cell in enumerate(footer):
+                cell_info = {
+                    'table_idx': table_idx,
+                    'section': 'footer',
+                    'section_idx': idx,
+                    'text': footer_cell.get('words', ''),
+                    'bbox': self._location_to_bbox(footer_cell.get('location', [])),
+                }
+                cells.append(cell_info)
+        
+        return {
+            'log_id': log_id,
+            'table_num': table_num,
+            'tables_result': tables_result,
+            'cells': cells,
+            'image_size': (original_width, original_height),
+            'excel_file': excel_file,
+        }
+    
     def _location_to_bbox(self, location: List[Dict[str, int]]) -> List[int]:
         """
         将四个角点坐标转换为bbox格式 [x0, y0, x1, y1]
@@ -0,0 +1,33 @@
+"""
+OCR Provider 抽象基类
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+
+class OCRProvider(ABC):
+    """
+    OCR Provider 抽象基类
+
+    子类实现同步的 recognize()；arecognize() 默认在线程中执行 recognize()，
+    支持异步HTTP的子类应覆盖为原生协程实现。
+    """
+
+    @abstractmethod
+    def recognize(self, image_path: str, **options) -> Dict[str, Any]:
+        """
+        识别图片
+
+        Args:
+            image_path: 图片路径
+            **options: Provider 相关的识别参数
+
+        Returns:
+            识别结果字典
+        """
+        pass
+
+    async def arecognize(self, image_path: str, **options) -> Dict[str, Any]:
+        """recognize() 的异步版本"""
+        return await asyncio.to_thread(self.recognize, image_path, **options)
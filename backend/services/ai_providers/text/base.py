@@ -1,11 +1,17 @@
 """
 Abstract base class for text generation providers
 """
+import asyncio
 from abc import ABC, abstractmethod
 
 
 class TextProvider(ABC):
-    """Abstract base class for text generation"""
+    """
+    Abstract base class for text generation
+
+    Async variants (``agenerate_*``) default to running the blocking method in
+    a worker thread; providers with a native asyncio client override them.
+    """
     
     @abstractmethod
     def generate_text(self, prompt: str, thinking_budget: int = 1000) -> str:
@@ -20,3 +26,7 @@ class TextProvider(ABC):
             Generated text content
         """
         pass
+
+    async def agenerate_text(self, prompt: str, thinking_budget: int = 1000) -> str:
+        """Async variant of generate_text"""
+        return await asyncio.to_thread(self.generate_text, prompt, thinking_budget)
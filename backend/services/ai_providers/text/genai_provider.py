@@ -5,19 +5,67 @@ Supports two modes:
 - Google AI Studio: Uses API key authentication
 - Vertex AI: Uses GCP service account authentication
 """
+import asyncio
+import hashlib
 import logging
+import mimetypes
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
 from google import genai
 from google.genai import types
 from tenacity import retry, stop_after_attempt, wait_exponential
 from .base import TextProvider
 from config import get_config
+from services.cancellation import budget_timeout, remaining_time, stop_at_deadline
 
 logger = logging.getLogger(__name__)
 
 
+class _ImageHandleCache:
+    """
+    Content-addressed cache of image parts ready to pass to generate_content.
+
+    Entries are either Files API references (uploaded once) or inline byte
+    parts (serialized once). Bounded by entry count and TTL.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl: float = 1800):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, types.Part]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[types.Part]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < time.monotonic():
+                self._items.pop(key, None)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: str, part: types.Part):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self._ttl, part)
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_entries:
+                self._items.popitem(last=False)
+
+
 class GenAITextProvider(TextProvider):
     """Text generation using Google GenAI SDK (supports both AI Studio and Vertex AI)"""
 
+    # Consecutive Files API upload failures before uploads pause, and for how long (seconds)
+    FILES_API_FAILURE_THRESHOLD = 3
+    FILES_API_COOLDOWN = 300
+
     def __init__(
         self,
         api_key: str = None,
@@ -62,9 +110,92 @@ class GenAITextProvider(TextProvider):
             )
 
         self.model = model
+
+        # The Files API is only available in AI Studio mode
+        config = get_config()
+        self._files_api_enabled = config.GENAI_FILE_UPLOAD_ENABLED and not vertexai
+        self._files_api_failures = 0
+        self._files_api_paused_until = 0.0
+        self._image_handles = _ImageHandleCache(ttl=config.GENAI_IMAGE_HANDLE_TTL)
+        self._image_handle_locks: dict = {}
+        self._image_handle_locks_guard = threading.Lock()
+
+    def _get_image_part(self, image_path: str) -> types.Part:
+        """
+        Get a reusable content part for an image file
+
+        The same image (by content hash) is uploaded to the Files API once and
+        referenced by URI afterwards. If uploads are disabled, the inline bytes
+        part is cached instead so the image is only read and encoded once.
+        A failed upload falls back to inline bytes for that call only; after
+        FILES_API_FAILURE_THRESHOLD consecutive failures uploads pause for
+        FILES_API_COOLDOWN seconds.
+        """
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        key = hashlib.sha1(data).hexdigest()
+
+        part = self._image_handles.get(key)
+        if part is not None:
+            return part
+
+        # Serialize concurrent first uses of the same image
+        with self._image_handle_locks_guard:
+            lock = self._image_handle_locks.setdefault(key, threading.Lock())
+        with lock:
+            part = self._image_handles.get(key)
+            if part is not None:
+                return part
+
+            mime_type = mimetypes.guess_type(image_path)[0] or 'image/png'
+            cacheable = True
+            if self._files_api_enabled:
+                # Inline parts are not cached while uploads are available, so the image gets a handle later
+                cacheable = False
+                if time.monotonic() >= self._files_api_paused_until:
+                    try:
+                        uploaded = self.client.files.upload(
+                            file=image_path,
+                            config=types.UploadFileConfig(mime_type=mime_type)
+                        )
+                        part = types.Part.from_uri(
+                            file_uri=uploaded.uri,
+                            mime_type=uploaded.mime_type or mime_type
+                        )
+                        cacheable = True
+                        self._files_api_failures = 0
+                        logger.debug(f"Uploaded image {image_path} as {uploaded.name}")
+                    except Exception as e:
+                        self._files_api_failures += 1
+                        if self._files_api_failures >= self.FILES_API_FAILURE_THRESHOLD:
+                            self._files_api_paused_until = time.monotonic() + self.FILES_API_COOLDOWN
+                            self._files_api_failures = 0
+                            logger.warning(
+                                f"Files API upload failed {self.FILES_API_FAILURE_THRESHOLD} times in a row, "
+                                f"using inline images for {self.FILES_API_COOLDOWN}s: {e}"
+                            )
+                        else:
+                            logger.warning(f"Files API upload failed, sending this image inline: {e}")
+
+            if part is None:
+                part = types.Part.from_bytes(data=data, mime_type=mime_type)
+
+            if cacheable:
+                self._image_handles.put(key, part)
+
+        with self._image_handle_locks_guard:
+            self._image_handle_locks.pop(key, None)
+        return part
+
+    @staticmethod
+    def _request_http_options() -> Optional[types.HttpOptions]:
+        """Per-request timeout capped by the current task's remaining time budget"""
+        if remaining_time() is None:
+            return None
+        return types.HttpOptions(timeout=int(budget_timeout(get_config().GENAI_TIMEOUT) * 1000))
     
     @retry(
-        stop=stop_after_attempt(get_config().GENAI_MAX_RETRIES + 1),
+        stop=stop_after_attempt(get_config().GENAI_MAX_RETRIES + 1) | stop_at_deadline,
         wait=wait_exponential(multiplier=1, min=2, max=10)
     )
     def generate_text(self, prompt: str, thinking_budget: int = 1000) -> str:
@@ -83,12 +214,13 @@ class GenAITextProvider(TextProvider):
             contents=prompt,
             config=types.GenerateContentConfig(
                 thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
+                http_options=self._request_http_options(),
             ),
         )
         return response.text
     
     @retry(
-        stop=stop_after_attempt(get_config().GENAI_MAX_RETRIES + 1),
+        stop=stop_after_attempt(get_config().GENAI_MAX_RETRIES + 1) | stop_at_deadline,
         wait=wait_exponential(multiplier=1, min=2, max=10)
     )
     def generate_with_image(self, prompt: str, image_path: str, thinking_budget: int = 1000) -> str:
@@ -103,19 +235,50 @@ class GenAITextProvider(TextProvider):
         Returns:
             Generated text
         """
-        from PIL import Image
-        
-        # 加载图片
-        img = Image.open(image_path)
-        
-        # 构建多模态内容
-        contents = [img, prompt]
+        # 同一张图片只上传/编码一次，之后按句柄引用
+        contents = [self._get_image_part(image_path), prompt]
         
         response = self.client.models.generate_content(
             model=self.model,
             contents=contents,
             config=types.GenerateContentConfig(
                 thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
+                http_options=self._request_http_options(),
             ),
         )
-        return response.text
\ No newline at end of file
+        return response.text
+
+    @retry(
+        stop=stop_after_attempt(get_config().GENAI_MAX_RETRIES + 1) | stop_at_deadline,
+        wait=wait_exponential(multiplier=1, min=2, max=10)
+    )
+    async def agenerate_text(self, prompt: str, thinking_budget: int = 1000) -> str:
+        """Async variant of generate_text using the SDK's native asyncio client"""
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
+                http_options=self._request_http_options(),
+            ),
+        )
+        return response.text
+
+    @retry(
+        stop=stop_after_attempt(get_config().GENAI_MAX_RETRIES + 1) | stop_at_deadline,
+        wait=wait_exponential(multiplier=1, min=2, max=10)
+    )
+    async def agenerate_with_image(self, prompt: str, image_path: str, thinking_budget: int = 1000) -> str:
+        """Async variant of generate_with_image"""
+        # The first use of an image reads/uploads it synchronously; keep that off the event loop
+        image_part = await asyncio.to_thread(self._get_image_part, image_path)
+
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=[image_part, prompt],
+            config=types.GenerateContentConfig(
+                thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
+                http_options=self._request_http_options(),
+            ),
+        )
+        return response.text
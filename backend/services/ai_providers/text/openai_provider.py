@@ -2,9 +2,10 @@
 OpenAI SDK implementation for text generation
 """
 import logging
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from .base import TextProvider
 from config import get_config
+from services.cancellation import budget_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +29,7 @@ class OpenAITextProvider(TextProvider):
             max_retries=get_config().OPENAI_MAX_RETRIES  # set max retries from config
         )
         self.model = model
+        self._async_client = None
     
     def generate_text(self, prompt: str, thinking_budget: int = 1000) -> str:
         """
@@ -44,6 +46,29 @@ class OpenAITextProvider(TextProvider):
             model=self.model,
             messages=[
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            timeout=budget_timeout(get_config().OPENAI_TIMEOUT)
         )
         return response.choices[0].message.content
+    
+    async def agenerate_text(self, prompt: str, thinking_budget: int = 1000) -> str:
+        """Async variant of generate_text using AsyncOpenAI"""
+        response = await self._get_async_client().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            timeout=budget_timeout(get_config().OPENAI_TIMEOUT)
+        )
+        return response.choices[0].message.content
+    
+    def _get_async_client(self) -> AsyncOpenAI:
+        """Lazily create the AsyncOpenAI client (shares settings with the sync client)"""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=self.client.api_key,
+                base_url=self.client.base_url,
+                timeout=get_config().OPENAI_TIMEOUT,
+                max_retries=get_config().OPENAI_MAX_RETRIES
+            )
+        return self._async_client
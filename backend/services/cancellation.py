@@ -0,0 +1,210 @@
+"""
+任务协作式取消与时间预算
+
+后台任务（TaskManager 线程池中的任务函数）持有一个 CancellationToken，
+在页面之间、每次调用 AI Provider 之前、递归处理子元素时检查取消状态。
+一旦取消，检查点抛出 TaskCancelledError，嵌套线程池不再等待正在执行的请求，
+直接释放 worker 给下一个任务；任务状态标记为 CANCELLED。
+
+令牌还可以带一个截止时间（deadline）。任务函数用 bind_cancel_token() 绑定令牌后，
+同一线程以及 cancellable_executor 中的子线程都能通过 budget_timeout() 得到
+“不超过剩余预算”的请求超时，Provider 的重试也会在截止时间后停止（stop_at_deadline）；
+剩余时间不足时，调用方通过 is_time_short() 选择降级（跳过生成式画质提升、
+使用原图作为背景等），保证任务在有限时间内结束。
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+
+class TaskCancelledError(Exception):
+    """任务已被取消"""
+
+    def __init__(self, task_id: Optional[str] = None):
+        self.task_id = task_id
+        super().__init__(f"Task {task_id} was cancelled" if task_id else "Task was cancelled")
+
+
+class DeadlineExceededError(TimeoutError):
+    """任务时间预算已用完"""
+
+    def __init__(self, task_id: Optional[str] = None):
+        self.task_id = task_id
+        super().__init__(f"Task {task_id} exceeded its deadline" if task_id else "Task exceeded its deadline")
+
+
+class CancellationToken:
+    """
+    取消令牌（线程安全）
+
+    Example:
+        >>> token = CancellationToken(task_id)
+        >>> for page in pages:
+        ...     token.raise_if_cancelled()
+        ...     provider.generate_image(...)
+    """
+
+    def __init__(self, task_id: Optional[str] = None, deadline: Optional[float] = None):
+        """
+        Args:
+            task_id: 任务ID（用于日志和异常信息）
+            deadline: 截止时间（time.monotonic() 时间戳），None 表示不限时
+        """
+        self.task_id = task_id
+        self.deadline = deadline
+        self._event = threading.Event()
+
+    def start_budget(self, seconds: Optional[float]):
+        """从现在开始计算时间预算（seconds 为空或 <=0 表示不限时）"""
+        self.deadline = time.monotonic() + seconds if seconds and seconds > 0 else None
+
+    def remaining(self) -> Optional[float]:
+        """剩余时间（秒），不限时返回 None"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def cancel(self):
+        """请求取消"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """检查点：已取消时抛出 TaskCancelledError"""
+        if self._event.is_set():
+            raise TaskCancelledError(self.task_id)
+
+
+def check_cancelled(cancel_token: Optional[CancellationToken]):
+    """检查点（token 为 None 时不检查）"""
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+
+_current_token: contextvars.ContextVar[Optional[CancellationToken]] = contextvars.ContextVar(
+    'current_cancel_token', default=None
+)
+
+
+def current_cancel_token() -> Optional[CancellationToken]:
+    """当前上下文绑定的令牌（未绑定时为 None）"""
+    return _current_token.get()
+
+
+@contextmanager
+def bind_cancel_token(cancel_token: Optional[CancellationToken]):
+    """在当前上下文中绑定令牌，cancellable_executor 的子线程会继承"""
+    reset = _current_token.set(cancel_token)
+    try:
+        yield cancel_token
+    finally:
+        _current_token.reset(reset)
+
+
+def remaining_time() -> Optional[float]:
+    """当前任务的剩余时间（秒），未绑定令牌或不限时返回 None"""
+    token = _current_token.get()
+    return token.remaining() if token is not None else None
+
+
+def budget_timeout(timeout: float, minimum: float = 1.0) -> float:
+    """
+    单次请求的超时：不超过当前任务剩余预算
+
+    Args:
+        timeout: 默认超时（秒）
+        minimum: 最小超时（秒），避免剩余时间很少时超时为0
+
+    Raises:
+        DeadlineExceededError: 预算已用完（不再发起新的请求）
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        token = _current_token.get()
+        raise DeadlineExceededError(token.task_id if token else None)
+    return max(minimum, min(timeout, remaining))
+
+
+def is_time_short(reserve: Optional[float] = None) -> bool:
+    """
+    剩余时间是否不足（调用方据此选择降级路径）
+
+    Args:
+        reserve: 预留时间（秒），默认 Config.TASK_DEGRADE_RESERVE_SECONDS
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return False
+    if reserve is None:
+        from config import Config
+        reserve = Config.TASK_DEGRADE_RESERVE_SECONDS
+    return remaining < reserve
+
+
+def stop_at_deadline(retry_state) -> bool:
+    """tenacity stop 条件：任务预算用完后不再重试（与 stop_after_attempt 用 | 组合）"""
+    remaining = remaining_time()
+    return remaining is not None and remaining <= 0
+
+
+def as_completed_or_cancelled(
+    futures: Iterable[Future],
+    cancel_token: Optional[CancellationToken],
+    poll_interval: float = 0.5
+) -> Iterator[Future]:
+    """
+    与 as_completed 相同，但等待期间每 poll_interval 秒检查一次取消状态
+
+    正在执行的请求可能持续数分钟，as_completed 会一直阻塞；
+    这里取消后最多 poll_interval 秒就抛出 TaskCancelledError。
+    """
+    pending = set(futures)
+    if cancel_token is None:
+        poll_interval = None
+    while pending:
+        check_cancelled(cancel_token)
+        done, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+        yield from done
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    提交任务时复制调用方的 contextvars（绑定的令牌和时间预算随之传递到子线程）
+
+    任务内部的嵌套线程池都应使用它代替 ThreadPoolExecutor，
+    否则子线程中 remaining_time() 为 None，budget_timeout / stop_at_deadline / is_time_short 不生效。
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
+
+
+@contextmanager
+def cancellable_executor(max_workers: int):
+    """
+    线程池上下文管理器
+
+    正常结束或普通异常时与 `with ThreadPoolExecutor()` 相同（等待所有任务）；
+    任务被取消时丢弃排队中的任务、不等待正在执行的任务，立即返回。
+    子线程继承提交方绑定的令牌（bind_cancel_token）。
+    """
+    executor = ContextThreadPoolExecutor(max_workers=max_workers)
+    try:
+        yield executor
+    except TaskCancelledError:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    except BaseException:
+        executor.shutdown(wait=True)
+        raise
+    else:
+        executor.shutdown(wait=True)
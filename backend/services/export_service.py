@@ -578,7 +578,8 @@ class ExportService:
         Returns:
             字典，key为element_id，value为TextStyleResult
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from concurrent.futures import as_completed
+        from services.cancellation import ContextThreadPoolExecutor
 
         if not text_items or not text_attribute_extractor:
             return {}
@@ -599,7 +600,7 @@ class ExportService:
                 logger.warning(f"提取文字样式失败 [{element_id}]: {e}")
                 return element_id, None
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = {executor.submit(extract_single, item): item[0] for item in text_items}
 
             for future in as_completed(futures):
@@ -675,7 +676,8 @@ class ExportService:
         Returns:
             字典，key为element_id，value为TextStyleResult
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from concurrent.futures import as_completed
+        from services.cancellation import ContextThreadPoolExecutor
 
         if not editable_images or not text_attribute_extractor:
             return {}
@@ -729,7 +731,7 @@ class ExportService:
                 return {}
 
         # 并发处理所有页面
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with ContextThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = {
                 executor.submit(process_single_page, img, idx): idx
                 for idx, img in enumerate(editable_images)
@@ -755,7 +757,9 @@ class ExportService:
     def _batch_extract_text_styles_hybrid(
         editable_images: List,  # List[EditableImage]
         text_attribute_extractor,
-        max_workers: int = 8
+        max_workers: int = 8,
+        color_batch_size: Optional[int] = None,
+        cancel_token=None
     ) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
         """
         【混合策略】结合全局识别和单个裁剪识别的优势
@@ -765,19 +769,26 @@ class ExportService:
           因为这些属性需要看整体布局和上下文才能判断准确
         - 单个裁剪识别：获取 font_color
           因为颜色需要精确看局部像素才能识别准确
+          提取器支持 extract_batch_contact_sheet 时，每 color_batch_size 个裁剪图拼成一张图
+          一次识别，拼图中解析失败的元素回退到逐个识别
 
         Args:
             editable_images: EditableImage列表，每个对应一张PPT页面
             text_attribute_extractor: 文本属性提取器
             max_workers: 并发数
+            color_batch_size: 拼图批量识别的批大小（默认 Config.TEXT_STYLE_COLOR_BATCH_SIZE，<=1 表示逐个识别）
+            cancel_token: 可选，任务取消令牌；每次调用提取器之前检查，取消时抛出 TaskCancelledError
 
         Returns:
             (results, failed_extractions):
             - results: 字典，key为element_id，value为TextStyleResult（合并后的结果）
             - failed_extractions: 失败列表，每项为 (element_id, error_reason)
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from services.cancellation import (
+            TaskCancelledError, as_completed_or_cancelled, cancellable_executor, check_cancelled
+        )
         from services.image_editability.text_attribute_extractors import TextStyleResult
+        from services.image_editability.helpers import compute_perceptual_hash
 
         if not editable_images or not text_attribute_extractor:
             return {}, []
@@ -818,7 +829,21 @@ class ExportService:
                 }
 
         if not all_text_items:
-            return {}
+            return {}, []
+
+        # 跨页去重：裁剪图感知哈希相同且文字相同的元素（页眉、页脚等）只做一次单个识别
+        local_groups = {}  # {(phash, text): [element_id, ...]}
+        local_items = []   # 每组的代表元素
+        for item in all_text_items:
+            element_id, image_path, text_content = item
+            phash = compute_perceptual_hash(image_path)
+            key = (phash, text_content) if phash else (None, element_id)
+            if key not in local_groups:
+                local_groups[key] = []
+                local_items.append((key, item))
+            local_groups[key].append(element_id)
+        if len(local_items) < len(all_text_items):
+            logger.info(f"  跨页去重: {len(all_text_items)} 个文本元素合并为 {len(local_items)} 组")
 
         # Step 2: 并行执行两种识别
         global_results = {}  # 全局识别结果
@@ -826,6 +851,7 @@ class ExportService:
 
         def extract_global_for_page(page_idx, page_data):
             """全局识别单页"""
+            check_cancelled(cancel_token)
             try:
                 results = text_attribute_extractor.extract_batch_with_full_image(
                     full_image=page_data['image_path'],
@@ -842,6 +868,7 @@ class ExportService:
         def extract_local_single(item):
             """单个裁剪识别"""
             element_id, image_path, text_content = item
+            check_cancelled(cancel_token)
             try:
                 style = text_attribute_extractor.extract(
                     image=image_path,
@@ -856,10 +883,47 @@ class ExportService:
                 logger.warning(f"单个识别失败 [{element_id}]: {e}")
                 return element_id, None, str(e)
 
+        if color_batch_size is None:
+            from config import Config
+            color_batch_size = Config.TEXT_STYLE_COLOR_BATCH_SIZE
+        use_contact_sheet = (
+            color_batch_size > 1
+            and len(local_items) > 1
+            and hasattr(text_attribute_extractor, 'extract_batch_contact_sheet')
+        )
+
+        def extract_local_chunk(chunk):
+            """拼图批量识别一组元素，未识别的元素回退到逐个识别"""
+            batch_results = {}
+            check_cancelled(cancel_token)
+            if use_contact_sheet and len(chunk) > 1:
+                try:
+                    batch_results = text_attribute_extractor.extract_batch_contact_sheet(
+                        [item for _, item in chunk]
+                    )
+                except Exception as e:
+                    logger.warning(f"拼图批量识别失败，回退到逐个识别: {e}")
+
+            chunk_results = []
+            for key, item in chunk:
+                style = batch_results.get(item[0])
+                if style is not None:
+                    chunk_results.append((key, style, None))
+                else:
+                    _, style, error = extract_local_single(item)
+                    chunk_results.append((key, style, error))
+            return chunk_results
+
+        chunk_size = color_batch_size if use_contact_sheet else 1
+        local_chunks = [local_items[i:i + chunk_size] for i in range(0, len(local_items), chunk_size)]
+
         # 并发执行全局识别和单个裁剪识别
-        logger.info(f"  并发执行: 全局识别 {len(page_text_elements)} 页 + 单个识别 {len(all_text_items)} 个元素...")
+        logger.info(
+            f"  并发执行: 全局识别 {len(page_text_elements)} 页 + 单个识别 {len(local_items)} 个元素"
+            f"（{len(local_chunks)} 次调用）..."
+        )
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with cancellable_executor(max_workers) as executor:
             # 提交全局识别任务
             global_futures = {
                 executor.submit(extract_global_for_page, idx, data): ('global', idx)
@@ -868,31 +932,38 @@ class ExportService:
 
             # 提交单个裁剪识别任务
             local_futures = {
-                executor.submit(extract_local_single, item): ('local', item[0])
-                for item in all_text_items
+                executor.submit(extract_local_chunk, chunk): ('local', chunk)
+                for chunk in local_chunks
             }
 
             # 收集全局识别结果
-            for future in as_completed(global_futures):
+            for future in as_completed_or_cancelled(global_futures, cancel_token):
                 task_type, page_idx = global_futures[future]
                 try:
                     _, page_results = future.result()
                     global_results.update(page_results)
+                except TaskCancelledError:
+                    raise
                 except Exception as e:
                     logger.error(f"全局识别任务失败: {e}")
 
             # 收集单个裁剪识别结果
-            for future in as_completed(local_futures):
-                task_type, element_id = local_futures[future]
+            for future in as_completed_or_cancelled(local_futures, cancel_token):
+                task_type, chunk = local_futures[future]
                 try:
-                    elem_id, style, error = future.result()
-                    if style is not None:
-                        local_results[elem_id] = style
-                    if error:
-                        failed_extractions.append((elem_id, error))
+                    chunk_results = future.result()
+                except TaskCancelledError:
+                    raise
                 except Exception as e:
                     logger.error(f"单个识别任务失败: {e}")
-                    failed_extractions.append((element_id, str(e)))
+                    chunk_results = [(key, None, str(e)) for key, _ in chunk]
+                # 结果分发给组内所有元素
+                for key, style, error in chunk_results:
+                    for elem_id in local_groups[key]:
+                        if style is not None:
+                            local_results[elem_id] = style
+                        if error:
+                            failed_extractions.append((elem_id, error))
 
         # Step 3: 合并结果
         # 优先使用全局识别的布局属性，使用单个识别的颜色属性
@@ -943,7 +1014,8 @@ class ExportService:
         text_attribute_extractor = None,  # 可选：文字属性提取器，用于提取颜色、粗体、斜体等样式
         progress_callback = None,  # 可选：进度回调函数 (step, message, percent) -> None
         export_extractor_method: str = 'hybrid',  # 组件提取方法: mineru, hybrid
-        export_inpaint_method: str = 'hybrid'  # 背景修复方法: generative, baidu, hybrid
+        export_inpaint_method: str = 'hybrid',  # 背景修复方法: generative, baidu, hybrid
+        cancel_token = None  # 可选：任务取消令牌（services.cancellation.CancellationToken）
     ) -> Tuple[Optional[bytes], ExportWarnings]:
         """
         使用递归图片可编辑化服务创建可编辑PPTX
@@ -968,6 +1040,7 @@ class ExportService:
                 可通过 TextAttributeExtractorFactory.create_caption_model_extractor() 创建
             export_extractor_method: 组件提取方法 ('mineru' 或 'hybrid'，默认 'hybrid')
             export_inpaint_method: 背景修复方法 ('generative', 'baidu', 'hybrid'，默认 'hybrid')
+            cancel_token: 任务取消令牌（可选），取消后在下一个检查点抛出 TaskCancelledError
 
         Returns:
             (pptx_bytes, warnings): 元组，包含 PPTX 字节流和警告信息
@@ -975,6 +1048,9 @@ class ExportService:
             - warnings: ExportWarnings 对象，包含所有警告信息
         """
         from services.image_editability import ServiceConfig, ImageEditabilityService
+        from services.cancellation import (
+            as_completed_or_cancelled, cancellable_executor, check_cancelled, is_time_short, remaining_time
+        )
         from utils.pptx_builder import PPTXBuilder
 
         # 初始化警告收集器
@@ -1008,22 +1084,25 @@ class ExportService:
                 extractor_method=export_extractor_method,
                 inpaint_method=export_inpaint_method
             )
-            editability_service = ImageEditabilityService(config)
+            editability_service = ImageEditabilityService(config, cancel_token=cancel_token)
 
             # 2. 并发处理所有页面，生成EditableImage结构
             report_progress("版面分析", f"开始分析 {total_pages} 张图片（并发数: {max_workers}）...", 5)
-            from concurrent.futures import ThreadPoolExecutor, as_completed
+
+            # 所有页面打包为一个MinerU批量任务，避免每页一次上传和轮询
+            editability_service.prefetch_images(image_paths)
+            check_cancelled(cancel_token)
 
             editable_images = []
             completed_count = 0
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            with cancellable_executor(max_workers) as executor:
                 futures = {
                     executor.submit(editability_service.make_image_editable, img_path): idx
                     for idx, img_path in enumerate(image_paths)
                 }
 
                 results = [None] * len(image_paths)
-                for future in as_completed(futures):
+                for future in as_completed_or_cancelled(futures, cancel_token):
                     idx = futures[future]
                     try:
                         results[idx] = future.result()
@@ -1037,10 +1116,22 @@ class ExportService:
 
                 editable_images = results
 
+            dedup_stats = editability_service.get_dedup_stats()
+            if dedup_stats['reused']:
+                logger.info(f"跨页元素去重: {dedup_stats['computed']} 个元素实际分析, {dedup_stats['reused']} 个复用结果")
+
+            if is_time_short():
+                warnings.add_warning("导出时间预算不足，部分元素未递归分析或未做画质提升")
+
         # 2.5. 使用混合策略提取所有文本元素的样式（如果提供了提取器）
         # 混合策略：全局识别（粗体/斜体/下划线/对齐）+ 单个裁剪识别（颜色）
         text_styles_cache = {}
-        if text_attribute_extractor:
+        remaining = remaining_time()
+        if text_attribute_extractor and remaining is not None and remaining <= 0:
+            # 降级：时间预算已用完，文本使用默认样式
+            logger.warning("导出时间预算已用完，跳过文本样式提取")
+            warnings.add_warning("导出时间预算已用完，文本使用默认样式")
+        elif text_attribute_extractor:
             report_progress("样式提取", "开始提取文本样式（混合策略）...", 45)
 
             # 统计文本元素数量
@@ -1054,7 +1145,8 @@ class ExportService:
                 text_styles_cache, failed_extractions = ExportService._batch_extract_text_styles_hybrid(
                     editable_images=editable_images,
                     text_attribute_extractor=text_attribute_extractor,
-                    max_workers=max_workers * 2
+                    max_workers=max_workers * 2,
+                    cancel_token=cancel_token
                 )
 
                 # 记录样式提取失败的元素（详细）
@@ -1069,6 +1161,7 @@ class ExportService:
 
                 report_progress("样式提取", f"✓ 完成 {extracted_count}/{total_text_count} 个文本样式提取（{failed_count} 个失败）", 70)
 
+        check_cancelled(cancel_token)
         report_progress("构建PPTX", "开始构建可编辑PPTX文件...", 75)
 
         # 4. 创建PPTX构建器
@@ -4,18 +4,246 @@ File Parser Service - handles file parsing using MinerU service and image captio
 import os
 import re
 import time
+import random
 import logging
 import zipfile
 import io
 import base64
+import tempfile
+import threading
 import requests
-from typing import Optional, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from typing import Optional, List, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed, Future
 from PIL import Image
 from markitdown import MarkItDown
 
+from services.cancellation import remaining_time
+
 logger = logging.getLogger(__name__)
 
+# Result ZIPs are streamed to a spooled temp file; small archives stay in memory,
+# large ones roll over to disk instead of being held as one bytes object.
+_ZIP_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+_ZIP_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+# Connection pool size for the MinerU session (shared by all parsing threads)
+_MINERU_POOL_MAXSIZE = 16
+
+# Image references in markdown / content_list.json / layout.json
+_IMAGE_REF_PATTERN = re.compile(r"[\w\-.]+\.(?:jpg|jpeg|png|gif|webp|bmp)", re.IGNORECASE)
+
+
+# Adaptive polling: fast first polls, exponential growth, capped, with jitter
+_POLL_INITIAL_DELAY = 0.5
+_POLL_BACKOFF_FACTOR = 1.6
+_POLL_MAX_DELAY = 10.0
+_POLL_JITTER = 0.2
+
+
+def next_poll_delay(attempt: int,
+                    initial: float = _POLL_INITIAL_DELAY,
+                    factor: float = _POLL_BACKOFF_FACTOR,
+                    max_delay: float = _POLL_MAX_DELAY,
+                    jitter: float = _POLL_JITTER) -> float:
+    """
+    Delay before the next status poll of a MinerU batch
+    
+    Args:
+        attempt: Number of polls already made (0 for the first wait)
+        initial: Delay before the first re-poll, in seconds
+        factor: Exponential growth factor per attempt
+        max_delay: Upper bound for the un-jittered delay
+        jitter: Relative random spread (0.2 means +/-20%)
+    """
+    delay = min(max_delay, initial * (factor ** max(0, attempt)))
+    if jitter:
+        delay *= 1 + random.uniform(-jitter, jitter)
+    return max(0.0, delay)
+
+
+class _PollEntry:
+    """A MinerU batch tracked by the poller"""
+    
+    __slots__ = ('batch_id', 'result_url', 'headers', 'session', 'deadline',
+                 'max_wait_time', 'attempt', 'next_poll_at', 'in_flight', 'future')
+    
+    def __init__(self, batch_id: str, result_url: str, headers: Dict[str, str],
+                 session: requests.Session, max_wait_time: float):
+        now = time.monotonic()
+        self.batch_id = batch_id
+        self.result_url = result_url
+        self.headers = headers
+        self.session = session
+        self.max_wait_time = max_wait_time
+        self.deadline = now + max_wait_time
+        self.attempt = 0
+        self.next_poll_at = now
+        self.in_flight = False
+        self.future: Future = Future()
+
+
+class MinerUBatchPoller:
+    """
+    Tracks many outstanding MinerU batches from a single scheduler thread
+    
+    Each batch is re-polled on its own adaptive schedule (see next_poll_delay), so
+    concurrent parses do not each hold a thread sleeping in a fixed-interval loop,
+    and finished batches are picked up as soon as their next poll fires. Due status
+    calls run on a small worker pool, so one slow call does not hold up the others.
+    
+    track() returns a Future resolved with (extract_result, error_message), where
+    extract_result is the first entry of data.extract_result when the batch is done.
+    """
+    
+    def __init__(self, request_timeout: float = 10, max_workers: int = 4):
+        self._request_timeout = request_timeout
+        self._entries: Dict[str, _PollEntry] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._workers = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='mineru-batch-poll')
+    
+    def track(self, batch_id: str, result_url: str, headers: Dict[str, str],
+              session: requests.Session, max_wait_time: float = 600) -> Future:
+        """Start tracking a batch; returns the Future for its final state"""
+        with self._cond:
+            existing = self._entries.get(batch_id)
+            if existing is not None:
+                return existing.future
+            entry = _PollEntry(batch_id, result_url, headers, session, max_wait_time)
+            self._entries[batch_id] = entry
+            self._ensure_thread()
+            self._cond.notify()
+            return entry.future
+    
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._entries)
+    
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name='mineru-batch-poller', daemon=True
+            )
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._entries:
+                    self._cond.wait()
+                now = time.monotonic()
+                idle = [e for e in self._entries.values() if not e.in_flight]
+                due = [e for e in idle if e.next_poll_at <= now]
+                if not due:
+                    # With every batch in flight, wait for a poll to come back
+                    wake_at = min((e.next_poll_at for e in idle), default=None)
+                    self._cond.wait(timeout=None if wake_at is None else max(0.0, wake_at - now))
+                    continue
+                for entry in due:
+                    entry.in_flight = True
+            
+            for entry in due:
+                self._workers.submit(self._poll_in_worker, entry)
+    
+    def _poll_in_worker(self, entry: _PollEntry):
+        try:
+            self._poll_once(entry)
+        finally:
+            with self._cond:
+                entry.in_flight = False
+                self._cond.notify()
+    
+    def _finish(self, entry: _PollEntry, extract_result: Optional[dict], error: Optional[str]):
+        with self._cond:
+            self._entries.pop(entry.batch_id, None)
+        if not entry.future.done():
+            entry.future.set_result((extract_result, error))
+    
+    def _reschedule(self, entry: _PollEntry):
+        entry.next_poll_at = time.monotonic() + next_poll_delay(entry.attempt)
+        entry.attempt += 1
+    
+    def _poll_once(self, entry: _PollEntry):
+        if time.monotonic() > entry.deadline:
+            error_msg = f"Parsing timeout after {entry.max_wait_time} seconds"
+            logger.error(error_msg)
+            self._finish(entry, None, error_msg)
+            return
+        
+        try:
+            response = entry.session.get(entry.result_url, headers=entry.headers,
+                                         timeout=self._request_timeout)
+            response.raise_for_status()
+            task_info = response.json()
+            
+            if task_info.get("code") != 0:
+                error_msg = f"Failed to query task status: {task_info.get('msg')}"
+                logger.error(error_msg)
+                self._finish(entry, None, error_msg)
+                return
+            
+            extract_result = task_info["data"]["extract_result"][0]
+            task_status = extract_result["state"]
+            
+            if task_status == "done":
+                logger.info(f"File parsing completed! (batch {entry.batch_id}, {entry.attempt + 1} polls)")
+                self._finish(entry, extract_result, None)
+            elif task_status == "failed":
+                err_msg = extract_result.get("err_msg", "Unknown error")
+                error_msg = f"File parsing failed: {err_msg}"
+                logger.error(error_msg)
+                self._finish(entry, None, error_msg)
+            else:
+                logger.debug(f"Batch {entry.batch_id} status: {task_status}, waiting...")
+                self._reschedule(entry)
+        
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Network error while polling result: {str(e)}, retrying...")
+            self._reschedule(entry)
+        except Exception as e:
+            error_msg = f"Unexpected response while polling result: {str(e)}"
+            logger.error(error_msg)
+            self._finish(entry, None, error_msg)
+
+
+_batch_poller: Optional[MinerUBatchPoller] = None
+_batch_poller_lock = threading.Lock()
+
+
+def get_mineru_batch_poller() -> MinerUBatchPoller:
+    """Process-wide poller shared by all FileParserService instances"""
+    global _batch_poller
+    if _batch_poller is None:
+        with _batch_poller_lock:
+            if _batch_poller is None:
+                _batch_poller = MinerUBatchPoller()
+    return _batch_poller
+
+
+def _is_metadata_member(name: str) -> bool:
+    """Whether a ZIP member is one of the files consumers of a MinerU result read"""
+    basename = os.path.basename(name)
+    return (
+        basename.lower().endswith('.md')
+        or basename == 'layout.json'
+        or basename.endswith('_content_list.json')
+    )
+
+
+def _safe_extract_member(z: zipfile.ZipFile, info: zipfile.ZipInfo, target_dir) -> bool:
+    """Extract a single member, refusing paths that escape target_dir"""
+    from pathlib import Path
+    
+    root = Path(target_dir).resolve()
+    destination = (root / info.filename).resolve()
+    if root != destination and root not in destination.parents:
+        logger.warning(f"Skipping ZIP member outside extraction dir: {info.filename}")
+        return False
+    z.extract(info, root)
+    return True
+
 
 def _get_ai_provider_format(provider_format: str = None) -> str:
     """Get the configured AI provider format
@@ -55,7 +283,8 @@ class FileParserService:
                  openai_api_key: str = "", openai_api_base: str = "",
                  image_caption_model: str = "gemini-3-flash-preview",
                  provider_format: str = None,
-                 mineru_model_version: str = "vlm"):
+                 mineru_model_version: str = "vlm",
+                 upload_folder: Optional[str] = None):
         """
         Initialize the file parser service
         
@@ -69,12 +298,14 @@ class FileParserService:
             image_caption_model: Model to use for image captioning
             provider_format: AI provider format ('gemini' or 'openai'). If not provided, reads from environment variable.
             mineru_model_version: MinerU model version ('vlm' or 'pipeline'). Default is 'vlm'.
+            upload_folder: Upload folder for extracted files (default: UPLOAD_FOLDER from app config)
         """
         self.mineru_token = mineru_token
         self.mineru_api_base = mineru_api_base
         self.mineru_model_version = mineru_model_version
         self.get_upload_url_api = f"{mineru_api_base}/api/v4/file-urls/batch"
         self.get_result_api_template = f"{mineru_api_base}/api/v4/extract-results/batch/{{}}"
+        self._upload_folder = upload_folder
         
         # Store config for lazy initialization
         self._google_api_key = google_api_key
@@ -87,6 +318,32 @@ class FileParserService:
         self._gemini_client = None
         self._openai_client = None
         self._provider_format = _get_ai_provider_format(provider_format)
+        
+        # Pooled HTTP session for MinerU calls, created lazily
+        self._session = None
+        self._session_lock = threading.Lock()
+    
+    def _get_upload_folder(self) -> str:
+        """Upload folder: the one given to the constructor, else UPLOAD_FOLDER from config"""
+        if self._upload_folder:
+            return self._upload_folder
+        from flask import current_app, has_app_context
+        if has_app_context():
+            return current_app.config['UPLOAD_FOLDER']
+        from config import Config
+        return Config.UPLOAD_FOLDER
+    
+    def _get_session(self) -> requests.Session:
+        """Lazily create a keep-alive session shared by all MinerU requests"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=_MINERU_POOL_MAXSIZE)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
     
     def _get_gemini_client(self):
         """Lazily initialize Gemini client"""
@@ -288,7 +545,7 @@ class FileParserService:
         }
         
         try:
-            response = requests.post(
+            response = self._get_session().post(
                 self.get_upload_url_api,
                 headers=headers,
                 json=upload_data,
@@ -315,7 +572,7 @@ class FileParserService:
         """Upload file to MinerU"""
         try:
             with open(file_path, 'rb') as f:
-                response = requests.put(
+                response = self._get_session().put(
                     upload_url,
                     data=f,
                     headers={"Authorization": None},  # Remove auth for upload
@@ -336,105 +593,90 @@ class FileParserService:
     def _poll_result(self, batch_id: str, max_wait_time: int = 600) -> tuple[Optional[str], Optional[str], Optional[str]]:
         """Poll for parsing result
         
+        Polling is delegated to the shared MinerUBatchPoller, which re-polls with
+        adaptive backoff; this call only waits for the batch's final state.
+        
         Returns:
             Tuple of (markdown_content, extract_id, error_message)
         """
+        extract_result, error = self.track_batch(batch_id, max_wait_time).result()
+        if error:
+            return None, None, error
+        
+        # Download and extract markdown
+        return self._download_markdown(extract_result["full_zip_url"])
+    
+    def track_batch(self, batch_id: str, max_wait_time: int = 600) -> Future:
+        """
+        Register a batch with the shared poller without blocking
+        
+        Returns:
+            Future resolved with (extract_result, error_message)
+        """
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.mineru_token}"
         }
-        
         result_url = self.get_result_api_template.format(batch_id)
-        start_time = time.time()
-        
-        while True:
-            if time.time() - start_time > max_wait_time:
-                error_msg = f"Parsing timeout after {max_wait_time} seconds"
-                logger.error(error_msg)
-                return None, None, error_msg
-            
-            try:
-                response = requests.get(result_url, headers=headers, timeout=30)
-                response.raise_for_status()
-                task_info = response.json()
-                
-                if task_info.get("code") != 0:
-                    error_msg = f"Failed to query task status: {task_info.get('msg')}"
-                    logger.error(error_msg)
-                    return None, None, error_msg
-                
-                task_status = task_info["data"]["extract_result"][0]["state"]
-                
-                if task_status == "done":
-                    logger.info("File parsing completed!")
-                    full_zip_url = task_info["data"]["extract_result"][0]["full_zip_url"]
-                    # Download and extract markdown
-                    return self._download_markdown(full_zip_url)
-                elif task_status == "failed":
-                    err_msg = task_info["data"]["extract_result"][0].get("err_msg", "Unknown error")
-                    error_msg = f"File parsing failed: {err_msg}"
-                    logger.error(error_msg)
-                    return None, None, error_msg
-                else:
-                    logger.debug(f"Current task status: {task_status}, waiting...")
-                    time.sleep(2)  # Wait 2 seconds before next poll
-                    
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Network error while polling result: {str(e)}, retrying...")
-                time.sleep(2)
+        # Never wait past the calling task's time budget
+        remaining = remaining_time()
+        if remaining is not None:
+            max_wait_time = max(1.0, min(max_wait_time, remaining))
+        return get_mineru_batch_poller().track(
+            batch_id, result_url, headers, self._get_session(), max_wait_time
+        )
     
     def _download_markdown(self, zip_url: str) -> tuple[Optional[str], Optional[str], Optional[str]]:
         """Download and extract markdown from result zip, save images to local server
         
+        The archive is streamed in chunks to a spooled temp file and only the members
+        consumers need are extracted: the markdown, layout.json, *_content_list.json
+        and the images those files reference.
+        
         Returns:
             Tuple of (markdown_content, extract_id, error_message)
         """
         try:
-            response = requests.get(zip_url, timeout=60)
-            response.raise_for_status()
-            
             # Generate unique directory name for this extraction
             import uuid
             extract_id = str(uuid.uuid4())[:8]
             
-            # Get upload folder from Flask config (we'll need to pass this)
-            # For now, use a hardcoded path relative to project root
-            import os
-            from pathlib import Path
-            
-            # Navigate to project root (assuming this file is in backend/services/)
-            current_file = Path(__file__).resolve()
-            backend_dir = current_file.parent.parent
-            project_root = backend_dir.parent
+            # Create directory for mineru extracts (served by /files/mineru/<extract_id>/)
+            from services.file_service import FileService
+            file_service = FileService(self._get_upload_folder())
+            mineru_storage = file_service.upload_folder / 'mineru_files' / extract_id
+            
+            with tempfile.SpooledTemporaryFile(max_size=_ZIP_SPOOL_MAX_SIZE) as spool:
+                with self._get_session().get(zip_url, timeout=60, stream=True) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=_ZIP_DOWNLOAD_CHUNK_SIZE):
+                        if chunk:
+                            spool.write(chunk)
+                spool.seek(0)
+                
+                mineru_storage.mkdir(parents=True, exist_ok=True)
+                logger.info(f"Extracting ZIP to: {mineru_storage}")
+                
+                with zipfile.ZipFile(spool) as z:
+                    markdown_file_path, extracted = self._extract_needed_members(z, mineru_storage)
+                    logger.info(f"Extracted {extracted} of {len(z.infolist())} files from ZIP")
             
-            # Create directory for mineru extracts
-            mineru_storage = project_root / 'uploads' / 'mineru_files' / extract_id
-            mineru_storage.mkdir(parents=True, exist_ok=True)
+            if not markdown_file_path:
+                error_msg = "No markdown file found in result zip"
+                logger.error(error_msg)
+                return None, None, error_msg
             
-            logger.info(f"Extracting ZIP to: {mineru_storage}")
+            # Share the extract with other replicas (remote storage backend only)
+            file_service.publish_dir(mineru_storage)
             
-            markdown_content = None
-            markdown_file_path = None
+            with open(mineru_storage / markdown_file_path, 'r', encoding='utf-8') as f:
+                markdown_content = f.read()
+            logger.info(f"Found markdown file: {markdown_file_path}")
             
-            with zipfile.ZipFile(io.BytesIO(response.content)) as z:
-                # Extract all files
-                z.extractall(mineru_storage)
-                logger.info(f"Extracted {len(z.namelist())} files from ZIP")
-                
-                # Find markdown file (usually full.md or similar)
-                for name in z.namelist():
-                    if name.endswith('.md') or name.endswith('.MD'):
-                        markdown_file_path = name
-                        md_full_path = mineru_storage / name
-                        with open(md_full_path, 'r', encoding='utf-8') as f:
-                            markdown_content = f.read()
-                        logger.info(f"Found markdown file: {name}")
-                        break
-                
-                if not markdown_content:
-                    error_msg = "No markdown file found in result zip"
-                    logger.error(error_msg)
-                    return None, None, error_msg
+            if not markdown_content:
+                error_msg = "No markdown file found in result zip"
+                logger.error(error_msg)
+                return None, None, error_msg
             
             # Replace relative image paths with local server URLs
             markdown_content = self._replace_image_paths(
@@ -458,6 +700,46 @@ class FileParserService:
             logger.error(error_msg)
             return None, None, error_msg
     
+    def _extract_needed_members(self, z: zipfile.ZipFile, target_dir) -> tuple[Optional[str], int]:
+        """
+        Extract the markdown, layout/content_list JSON and referenced images from a result ZIP
+        
+        Args:
+            z: Opened result archive
+            target_dir: Directory to extract into
+            
+        Returns:
+            Tuple of (markdown_member_name, extracted_member_count)
+        """
+        markdown_file_path = None
+        referenced_images = set()
+        extracted = 0
+        
+        members = [info for info in z.infolist() if not info.is_dir()]
+        
+        # Metadata first, so image references can be collected from its content
+        for info in members:
+            if not _is_metadata_member(info.filename):
+                continue
+            if not _safe_extract_member(z, info, target_dir):
+                continue
+            extracted += 1
+            if markdown_file_path is None and info.filename.lower().endswith('.md'):
+                markdown_file_path = info.filename
+            with z.open(info) as f:
+                text = f.read().decode('utf-8', errors='ignore')
+            referenced_images.update(m.lower() for m in _IMAGE_REF_PATTERN.findall(text))
+        
+        for info in members:
+            if _is_metadata_member(info.filename):
+                continue
+            if os.path.basename(info.filename).lower() not in referenced_images:
+                continue
+            if _safe_extract_member(z, info, target_dir):
+                extracted += 1
+        
+        return markdown_file_path, extracted
+    
     def _replace_image_paths(self, markdown_content: str, markdown_file_path: str, extract_id: str) -> str:
         """Replace relative image paths in markdown with local server URLs"""
         import os
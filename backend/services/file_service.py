@@ -1,23 +1,97 @@
 """
 File Service - handles all file operations
+
+Files are written to UPLOAD_FOLDER first. With a remote storage backend
+(STORAGE_BACKEND=s3) they are then published to the object store, and files
+missing from the local folder are fetched from it on demand, so replicas
+share artifacts while path-based code keeps working on local files. Files
+with fixed names (templates, exports) are overwritten in place, so their
+local copies are revalidated against the object's ETag before use.
 """
+import mimetypes
 import os
 import uuid
 from pathlib import Path
 from typing import Optional
+from flask import current_app, has_app_context
 from werkzeug.utils import secure_filename
 from PIL import Image
 from models import Project
 from models import db
+from .storage import Storage, fetch_local_copy, get_storage, record_local_copy
+from .thumbnails import THUMBNAIL_DIRNAME, generate_thumbnails, remove_thumbnails
 
 
 class FileService:
     """Service for file management"""
     
-    def __init__(self, upload_folder: str):
-        """Initialize file service"""
+    def __init__(self, upload_folder: str, storage: Optional[Storage] = None):
+        """
+        Initialize file service
+        
+        Args:
+            upload_folder: Local upload folder (working copy / cache for remote storage)
+            storage: Storage backend (default: configured by STORAGE_BACKEND)
+        """
         self.upload_folder = Path(upload_folder)
         self.upload_folder.mkdir(exist_ok=True, parents=True)
+        self.storage = storage if storage is not None else get_storage(self.upload_folder)
+        # Remote backend to publish to / fetch from (None when files live in upload_folder)
+        self._remote = None if self.storage.is_local else self.storage
+    
+    def _key(self, path: Path) -> str:
+        """Storage key (relative path from upload folder) of a local file"""
+        return Path(path).relative_to(self.upload_folder).as_posix()
+    
+    def publish_file(self, path) -> str:
+        """
+        Publish a file written under the upload folder to the storage backend
+        (no-op for local storage)
+        
+        Args:
+            path: Absolute path of the file
+        
+        Returns:
+            Relative file path from upload folder
+        """
+        key = self._key(path)
+        if self._remote:
+            self._remote.put_file(key, path, content_type=mimetypes.guess_type(str(path))[0])
+            record_local_copy(self._remote, key, path)
+        return key
+    
+    def publish_dir(self, directory) -> int:
+        """Publish all files under a directory (thumbnail caches excluded); returns the count"""
+        if not self._remote:
+            return 0
+        count = 0
+        for path in Path(directory).rglob('*'):
+            if path.is_file() and THUMBNAIL_DIRNAME not in path.relative_to(directory).parts:
+                self.publish_file(path)
+                count += 1
+        return count
+    
+    def fetch_dir(self, relative_dir: str) -> int:
+        """Download files under relative_dir that are missing locally; returns the count"""
+        if not self._remote:
+            return 0
+        count = 0
+        for key in self._remote.list(relative_dir.rstrip('/') + '/'):
+            local_path = self.upload_folder / key
+            if not local_path.exists() and self._remote.download(key, local_path):
+                count += 1
+        return count
+    
+    def delete_dir(self, relative_dir: str) -> bool:
+        """Delete a directory under the upload folder (and its remote objects)"""
+        import shutil
+        directory = self.upload_folder / relative_dir.replace('\\', '/').strip('/')
+        deleted = directory.is_dir()
+        if deleted:
+            shutil.rmtree(directory)
+        if self._remote:
+            deleted = self._remote.delete_prefix(self._key(directory) + '/') > 0 or deleted
+        return deleted
     
     def _get_project_dir(self, project_id: str) -> Path:
         """Get project directory"""
@@ -71,7 +145,7 @@ class FileService:
         file.save(str(filepath))
         
         # Return relative path
-        return filepath.relative_to(self.upload_folder).as_posix()
+        return self.publish_file(filepath)
     
     def save_generated_image(self, image: Image.Image, project_id: str, 
                            page_id: str, image_format: str = 'PNG', 
@@ -108,9 +182,16 @@ class FileService:
         # Save image - format is determined by file extension or explicitly specified
         # Some PIL Image objects may not support format parameter, so we use extension
         image.save(str(filepath))
+        relative_path = self.publish_file(filepath)
+        
+        # Pre-generate preview thumbnails (failures are logged; they are generated on first request instead)
+        config = current_app.config if has_app_context() else {}
+        if config.get('THUMBNAIL_PREGENERATE'):
+            generate_thumbnails(filepath, config['THUMBNAIL_WIDTHS'], 'webp',
+                                config['THUMBNAIL_QUALITY'], image=image)
         
         # Return relative path
-        return filepath.relative_to(self.upload_folder).as_posix()
+        return relative_path
 
     def save_material_image(self, image: Image.Image, project_id: Optional[str],
                             image_format: str = 'PNG') -> str:
@@ -146,7 +227,7 @@ class FileService:
         image.save(str(filepath))
 
         # Return relative path
-        return filepath.relative_to(self.upload_folder).as_posix()
+        return self.publish_file(filepath)
     
     def delete_page_image_version(self, image_path: str) -> bool:
         """
@@ -158,11 +239,27 @@ class FileService:
         Returns:
             True if deleted successfully
         """
-        filepath = self.upload_folder / image_path.replace('\\', '/')
+        return self.delete_file(image_path)
+    
+    def delete_file(self, relative_path: str) -> bool:
+        """
+        Delete a file (its thumbnails and its remote copy included)
+        
+        Args:
+            relative_path: Relative path from upload folder
+        
+        Returns:
+            True if deleted successfully
+        """
+        filepath = self.upload_folder / relative_path.replace('\\', '/')
+        deleted = False
         if filepath.exists() and filepath.is_file():
             filepath.unlink()
-            return True
-        return False
+            remove_thumbnails(filepath)
+            deleted = True
+        if self._remote:
+            deleted = self._remote.delete(self._key(filepath)) or deleted
+        return deleted
     
     def get_file_url(self, project_id: Optional[str], file_type: str, filename: str) -> str:
         """
@@ -184,6 +281,7 @@ class FileService:
     def get_absolute_path(self, relative_path: str) -> str:
         """
         Get absolute file path from relative path
+        (downloaded from remote storage first if it is missing or stale locally)
         
         Args:
             relative_path: Relative path from upload folder
@@ -191,7 +289,10 @@ class FileService:
         Returns:
             Absolute file path
         """
-        return str(self.upload_folder / relative_path.replace('\\', '/'))
+        filepath = self.upload_folder / relative_path.replace('\\', '/')
+        if self._remote:
+            fetch_local_copy(self._remote, self._key(filepath), filepath)
+        return str(filepath)
     
     def delete_template(self, project_id: str) -> bool:
         """
@@ -209,6 +310,8 @@ class FileService:
         for file in template_dir.iterdir():
             if file.is_file():
                 file.unlink()
+        if self._remote:
+            self._remote.delete_prefix(f"{project_id}/template/")
         
         return True
     
@@ -229,6 +332,10 @@ class FileService:
         for file in pages_dir.glob(f"{page_id}.*"):
             if file.is_file():
                 file.unlink()
+                remove_thumbnails(file)
+        if self._remote:
+            for key in self._remote.list(f"{project_id}/pages/{page_id}."):
+                self._remote.delete(key)
         
         return True
     
@@ -247,13 +354,17 @@ class FileService:
         
         if project_dir.exists():
             shutil.rmtree(project_dir)
+        if self._remote:
+            self._remote.delete_prefix(f"{project_id}/")
         
         return True
     
     def file_exists(self, relative_path: str) -> bool:
-        """Check if file exists"""
+        """Check if file exists (locally or in remote storage)"""
         filepath = self.upload_folder / relative_path.replace('\\', '/')
-        return filepath.exists() and filepath.is_file()
+        if filepath.exists() and filepath.is_file():
+            return True
+        return bool(self._remote) and self._remote.exists(self._key(filepath))
     
     def get_template_path(self, project_id: str) -> Optional[str]:
         """
@@ -270,8 +381,8 @@ class FileService:
         db.session.expire_all()
         project = Project.query.get(project_id)
         if project and project.template_image_path:
-            # template_image_path 是相对路径，需要转换为绝对路径
-            template_path = self.upload_folder / project.template_image_path
+            # template_image_path 是相对路径，需要转换为绝对路径（远程存储时按需下载）
+            template_path = Path(self.get_absolute_path(project.template_image_path))
             if template_path.exists() and template_path.is_file():
                 return str(template_path)
         
@@ -320,7 +431,7 @@ class FileService:
         file.save(str(filepath))
         
         # Return relative path
-        return filepath.relative_to(self.upload_folder).as_posix()
+        return self.publish_file(filepath)
     
     def delete_user_template(self, template_id: str) -> bool:
         """
@@ -338,6 +449,8 @@ class FileService:
         
         if template_dir.exists():
             shutil.rmtree(template_dir)
+        if self._remote:
+            self._remote.delete_prefix(f"user-templates/{template_id}/")
         
         return True
     
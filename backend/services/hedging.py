@@ -0,0 +1,221 @@
+"""
+对冲请求（hedged requests）- 削减批量图片生成的长尾延迟
+
+同一批页面的生成请求耗时分布相近，但少数请求会因为上游排队等原因慢得多，
+整个任务的完成时间由最慢的页面决定。某个请求的等待时间超过同批已完成请求的
+pNN 耗时后，再发起一个相同的请求，取先成功的结果。
+
+额外请求有成本（图片生成按次计费），每个任务的对冲次数有上限；
+落败的请求无法中途终止，仍计入额外开销。统计信息用于评估
+“尾延迟降低”与“额外开销”之间的取舍（/api/metrics 的 image_hedging）。
+"""
+import contextvars
+import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from .cancellation import CancellationToken, check_cancelled, remaining_time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """最近秩百分位数（sorted_values 需已排序）"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+_totals = {'tasks': 0, 'requests': 0, 'hedges_launched': 0, 'hedge_wins': 0, 'saved_seconds': 0.0}
+_totals_lock = threading.Lock()
+
+
+def _add_totals(**deltas):
+    with _totals_lock:
+        for key, value in deltas.items():
+            _totals[key] += value
+
+
+def get_hedging_stats() -> Dict[str, Any]:
+    """进程内所有任务的对冲统计"""
+    with _totals_lock:
+        totals = dict(_totals)
+    totals['saved_seconds'] = round(totals['saved_seconds'], 2)
+    totals['extra_cost_ratio'] = (
+        round(totals['hedges_launched'] / totals['requests'], 3) if totals['requests'] else 0.0
+    )
+    return totals
+
+
+class RequestHedger:
+    """
+    一个任务内的对冲执行器（线程安全）
+
+    请求在自己的线程池中执行（提交时复制调用方的 contextvars，
+    Flask app context、取消令牌和时间预算随之传递）。
+
+    Example:
+        >>> with RequestHedger(max_workers=8, max_extra_requests=2, cancel_token=token) as hedger:
+        ...     image = hedger.call(lambda: ai_service.generate_image(prompt, ...))
+        >>> hedger.stats()
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_extra_requests: int,
+        percentile: float = 0.9,
+        min_samples: int = 3,
+        cancel_token: Optional[CancellationToken] = None,
+        poll_interval: float = 0.5
+    ):
+        """
+        Args:
+            max_workers: 同时调用 call() 的最大线程数（主请求并发数）
+            max_extra_requests: 本任务最多发起的对冲请求数（额外开销上限）
+            percentile: 触发对冲的耗时百分位（0-1），超过同批已完成请求的该百分位耗时即对冲
+            min_samples: 至少有多少个已完成请求后才开始对冲
+            cancel_token: 取消令牌，等待期间每 poll_interval 秒检查一次
+            poll_interval: 检查间隔（秒）
+        """
+        self.max_extra_requests = max(0, int(max_extra_requests))
+        self.percentile = percentile
+        self.min_samples = max(1, int(min_samples))
+        self._cancel_token = cancel_token
+        self._poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers) + self.max_extra_requests,
+            thread_name_prefix='hedged-request'
+        )
+        self._lock = threading.Lock()
+        self._samples: List[float] = []    # 单个请求的成功耗时（计算对冲阈值）
+        self._latencies: List[float] = []  # 每次 call() 的实际等待时间
+        self.requests = 0
+        self.hedges_launched = 0
+        self.hedge_wins = 0
+        self.saved_seconds = 0.0
+        _add_totals(tasks=1)
+
+    def __enter__(self) -> 'RequestHedger':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def threshold(self) -> Optional[float]:
+        """当前对冲阈值（秒），样本不足时返回 None"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        return _percentile(samples, self.percentile)
+
+    def _timed(self, fn: Callable[[], T]) -> T:
+        start = time.monotonic()
+        result = fn()
+        with self._lock:
+            self._samples.append(time.monotonic() - start)
+        return result
+
+    def _submit(self, fn: Callable[[], T]) -> Future:
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, self._timed, fn)
+
+    def _reserve_hedge(self, elapsed: float) -> bool:
+        """是否发起对冲请求（超过阈值、预算未用完且未达到额外开销上限）"""
+        threshold = self.threshold()
+        if threshold is None or elapsed < threshold:
+            return False
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            return False
+        with self._lock:
+            if self.hedges_launched >= self.max_extra_requests:
+                return False
+            self.hedges_launched += 1
+        _add_totals(hedges_launched=1)
+        logger.info(f"请求耗时 {elapsed:.1f}s 超过 p{int(self.percentile * 100)} 阈值 {threshold:.1f}s，发起对冲请求")
+        return True
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """
+        执行请求，超过阈值时发起一个相同的对冲请求，返回先成功的结果
+
+        Raises:
+            TaskCancelledError: 等待期间任务被取消
+            所有请求都失败时抛出第一个失败请求的异常
+        """
+        start = time.monotonic()
+        with self._lock:
+            self.requests += 1
+        _add_totals(requests=1)
+
+        primary = self._submit(fn)
+        hedge: Optional[Future] = None
+        pending = {primary}
+        error: Optional[BaseException] = None
+
+        while pending:
+            check_cancelled(self._cancel_token)
+            done, pending = wait(pending, timeout=self._poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return self._finish(start, future, primary, hedge)
+                error = error or future.exception()
+            if hedge is None and primary in pending and self._reserve_hedge(time.monotonic() - start):
+                hedge = self._submit(fn)
+                pending.add(hedge)
+
+        with self._lock:
+            self._latencies.append(time.monotonic() - start)
+        raise error
+
+    def _finish(self, start: float, winner: Future, primary: Future, hedge: Optional[Future]) -> Any:
+        waited = time.monotonic() - start
+        with self._lock:
+            self._latencies.append(waited)
+            if winner is hedge:
+                self.hedge_wins += 1
+        if winner is hedge:
+            _add_totals(hedge_wins=1)
+            # 主请求稍后完成时，记录对冲节省的时间
+            primary.add_done_callback(lambda f: self._on_primary_done(f, start, waited))
+        return winner.result()
+
+    def _on_primary_done(self, future: Future, start: float, waited: float):
+        if future.cancelled() or future.exception() is not None:
+            return
+        saved = max(0.0, time.monotonic() - start - waited)
+        with self._lock:
+            self.saved_seconds += saved
+        _add_totals(saved_seconds=saved)
+
+    def stats(self) -> Dict[str, Any]:
+        """本任务的对冲统计（耗时为每次 call() 的实际等待时间）"""
+        threshold = self.threshold()
+        with self._lock:
+            latencies = sorted(self._latencies)
+            requests = self.requests
+            stats = {
+                'requests': requests,
+                'hedges_launched': self.hedges_launched,
+                'hedge_wins': self.hedge_wins,
+                'max_extra_requests': self.max_extra_requests,
+                'extra_cost_ratio': round(self.hedges_launched / requests, 3) if requests else 0.0,
+                'saved_seconds': round(self.saved_seconds, 2),
+            }
+        stats['threshold_seconds'] = round(threshold, 2) if threshold is not None else None
+        for name, fraction in (('p50_seconds', 0.5), ('p90_seconds', 0.9), ('max_seconds', 1.0)):
+            value = _percentile(latencies, fraction)
+            stats[name] = round(value, 2) if value is not None else None
+        return stats
+
+    def shutdown(self):
+        """释放线程池（不等待落败的请求）"""
+        self._executor.shutdown(wait=False)
@@ -51,6 +51,12 @@ from .extractors import (
     ExtractorRegistry
 )
 
+# OCR结果缓存
+from .ocr_cache import OCRResultCache, get_ocr_cache
+
+# 跨页元素去重
+from .element_dedup import ElementDeduplicator
+
 # 混合提取器
 from .hybrid_extractor import (
     HybridElementExtractor,
@@ -73,6 +79,7 @@ from .text_attribute_extractors import (
     TextStyleResult,
     TextAttributeExtractor,
     CaptionModelTextAttributeExtractor,
+    LocalColorTextAttributeExtractor,
     TextAttributeExtractorRegistry
 )
 
@@ -100,6 +107,11 @@ __all__ = [
     'BaiduOCRElementExtractor',
     'BaiduAccurateOCRElementExtractor',
     'ExtractorRegistry',
+    # OCR结果缓存
+    'OCRResultCache',
+    'get_ocr_cache',
+    # 跨页元素去重
+    'ElementDeduplicator',
     # 混合提取器
     'HybridElementExtractor',
     'BBoxUtils',
@@ -115,6 +127,7 @@ __all__ = [
     'TextStyleResult',
     'TextAttributeExtractor',
     'CaptionModelTextAttributeExtractor',
+    'LocalColorTextAttributeExtractor',
     'TextAttributeExtractorRegistry',
     # 工厂和配置
     'ExtractorFactory',
@@ -0,0 +1,142 @@
+"""
+跨页元素去重 - 同一次导出中重复出现的元素（页眉、Logo、页脚）只处理一次
+
+生成的幻灯片通常每页都有相同的页眉/Logo/页脚。按元素裁剪图的感知哈希分组，
+每组只执行一次递归分析（提取 + 重绘），其余元素复用结果并映射到自己的位置。
+"""
+import logging
+import threading
+import uuid
+from concurrent.futures import Future
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .data_models import BBox, EditableElement
+from .helpers import compute_perceptual_hash
+
+logger = logging.getLogger(__name__)
+
+
+class ElementDeduplicator:
+    """
+    按签名执行一次的结果共享器（线程安全）
+
+    同一签名第一次调用 run_once() 时执行计算，并发或后续调用等待并复用同一结果。
+    生命周期与一次导出相同（由 ImageEditabilityService 实例持有）。
+    """
+
+    def __init__(self):
+        self._groups: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.reused = 0
+
+    @staticmethod
+    def signature(
+        element: EditableElement,
+        depth: int,
+        image_path: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        元素签名：裁剪图感知哈希 + 元素类型 + 深度 + 文字内容
+
+        Args:
+            element: 元素（默认使用 element.image_path 裁剪图）
+            depth: 元素所在的递归深度
+            image_path: 覆盖裁剪图路径
+
+        Returns:
+            签名字符串，无法计算时返回None（不参与去重）
+        """
+        path = image_path or element.image_path
+        if not path:
+            return None
+        phash = compute_perceptual_hash(path)
+        if phash is None:
+            return None
+        return f"{element.element_type}|{depth}|{phash}|{element.content or ''}"
+
+    def run_once(self, key: Optional[str], func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        同一签名只执行一次 func
+
+        Args:
+            key: 签名，None表示不去重直接执行
+            func: 无参计算函数
+
+        Returns:
+            (result, reused)：reused为True表示复用了其他元素的结果
+
+        Raises:
+            func 抛出的异常（同组元素共享同一异常）
+        """
+        if key is None:
+            return func(), False
+
+        with self._lock:
+            future = self._groups.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._groups[key] = future
+
+        if not owner:
+            result = future.result()
+            with self._lock:
+                self.reused += 1
+            return result, True
+
+        try:
+            result = func()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        with self._lock:
+            self.computed += 1
+        return result, False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'groups': len(self._groups), 'computed': self.computed, 'reused': self.reused}
+
+
+def _remap_bbox(bbox: BBox, source: BBox, target: BBox) -> BBox:
+    """将 source 区域内的全局bbox仿射映射到 target 区域"""
+    scale_x = target.width / source.width if source.width else 1.0
+    scale_y = target.height / source.height if source.height else 1.0
+    return BBox(
+        x0=target.x0 + (bbox.x0 - source.x0) * scale_x,
+        y0=target.y0 + (bbox.y0 - source.y0) * scale_y,
+        x1=target.x0 + (bbox.x1 - source.x0) * scale_x,
+        y1=target.y0 + (bbox.y1 - source.y0) * scale_y
+    )
+
+
+def clone_elements_to(
+    elements: List[EditableElement],
+    source_bbox: BBox,
+    target_bbox: BBox
+) -> List[EditableElement]:
+    """
+    复制一组子元素（递归），重新分配 element_id 并把全局坐标映射到新位置
+
+    局部坐标（bbox）、裁剪图和重绘背景保持不变，只有 bbox_global 随父元素位置变化。
+    element_id 必须唯一（文字样式结果按 element_id 索引）。
+
+    Args:
+        elements: 典型元素的子元素列表
+        source_bbox: 典型元素的全局bbox
+        target_bbox: 复用结果的元素的全局bbox
+    """
+    image_id = str(uuid.uuid4())[:8]
+    cloned = []
+    for idx, element in enumerate(elements):
+        cloned.append(replace(
+            element,
+            element_id=f"{image_id}_{idx}",
+            bbox_global=_remap_bbox(element.bbox_global, source_bbox, target_bbox),
+            children=clone_elements_to(element.children, source_bbox, target_bbox),
+            metadata=dict(element.metadata)
+        ))
+    return cloned
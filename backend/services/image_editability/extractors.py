@@ -12,15 +12,53 @@ import os
 import json
 import logging
 import tempfile
+import threading
 import uuid
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional, Tuple, Type
 from pathlib import Path
 from PIL import Image
 
+from .ocr_cache import OCRResultCache
+
 logger = logging.getLogger(__name__)
 
 
+def _recognize_with_cache(
+    ocr_cache: Optional[OCRResultCache],
+    provider_name: str,
+    provider: Any,
+    recognize_func,
+    image_path: str,
+    cached_fields: Tuple[str, ...],
+    **options
+) -> Dict[str, Any]:
+    """
+    调用OCR识别，按 (图片内容哈希, 识别参数, Provider) 读写缓存
+    
+    只缓存提取器用到的字段（cached_fields），命中时不发起网络请求。
+    """
+    if ocr_cache is None:
+        return recognize_func(image_path, **options)
+    
+    cache_key = ocr_cache.make_key(
+        image_path,
+        provider_name,
+        max_side=getattr(provider, 'max_side', None),
+        **options
+    )
+    cached = ocr_cache.get(cache_key)
+    if cached is not None:
+        logger.debug(f"OCR缓存命中: {image_path}")
+        if cached.get('image_size'):
+            cached = {**cached, 'image_size': tuple(cached['image_size'])}
+        return cached
+    
+    result = recognize_func(image_path, **options)
+    ocr_cache.put(cache_key, {field: result.get(field) for field in cached_fields})
+    return result
+
+
 class ExtractionContext:
     """提取上下文 - 提取器可能需要的额外信息"""
     
@@ -106,6 +144,19 @@ class ElementExtractor(ABC):
             是否支持该类型
         """
         pass
+    
+    def prefetch(self, image_paths: List[str], **kwargs) -> None:
+        """
+        批量预处理多张图像（可选）
+        
+        支持批量的实现可以在这里一次性处理多张图像并缓存结果，
+        之后对这些图像调用 extract() 时直接使用缓存。默认不做任何事。
+        
+        Args:
+            image_paths: 图像文件路径列表
+            **kwargs: 其他由具体实现自定义的参数（如 depth）
+        """
+        return None
 
 
 class MinerUElementExtractor(ElementExtractor):
@@ -114,8 +165,16 @@ class MinerUElementExtractor(ElementExtractor):
     
     从MinerU的解析结果中提取文本、图片、表格等元素
     自包含：自己处理PDF转换、MinerU解析、结果提取
+    
+    批量模式：prefetch() 将多张图片打包成一个多页PDF提交一次MinerU任务，
+    之后 extract() 按页从 layout.json 的 pdf_info 中取回对应结果。
     """
     
+    # 单个批量PDF的最大页数（MinerU单文件页数有限制）
+    MAX_BATCH_PAGES = 50
+    # 多个批量PDF并行提交的最大数量
+    MAX_PARALLEL_BATCHES = 4
+    
     def __init__(self, parser_service, upload_folder: Path):
         """
         初始化MinerU提取器
@@ -126,6 +185,9 @@ class MinerUElementExtractor(ElementExtractor):
         """
         self._parser_service = parser_service
         self._upload_folder = upload_folder
+        # 批量解析结果：图片绝对路径 -> (MinerU结果目录, 页索引)
+        self._batch_results: Dict[str, Tuple[str, int]] = {}
+        self._batch_lock = threading.Lock()
     
     def supports_type(self, element_type: Optional[str]) -> bool:
         """MinerU支持所有通用类型（除了特殊的表格单元格）"""
@@ -149,9 +211,14 @@ class MinerUElementExtractor(ElementExtractor):
         img = Image.open(image_path)
         image_size = img.size  # (width, height)
         
-        # 1. 检查缓存
-        cached_dir = self._find_cache(image_path)
-        if cached_dir:
+        # 1. 检查批量结果和缓存
+        page_index = 0
+        batch_hit = self._get_batch_result(image_path)
+        cached_dir = None if batch_hit else self._find_cache(image_path)
+        if batch_hit:
+            mineru_result_dir, page_index = batch_hit
+            logger.info(f"{'  ' * depth}使用MinerU批量结果（第 {page_index + 1} 页）")
+        elif cached_dir:
             logger.info(f"{'  ' * depth}使用MinerU缓存")
             mineru_result_dir = cached_dir
         else:
@@ -164,17 +231,66 @@ class MinerUElementExtractor(ElementExtractor):
         elements = self._extract_from_result(
             mineru_result_dir=mineru_result_dir,
             target_image_size=image_size,
-            depth=depth
+            depth=depth,
+            page_index=page_index
         )
         
         # 4. 返回结果（带上下文）
         context = ExtractionContext(
             result_dir=mineru_result_dir,
-            metadata={'source': 'mineru', 'image_size': image_size}
+            metadata={'source': 'mineru', 'image_size': image_size, 'page_index': page_index}
         )
         
         return ExtractionResult(elements=elements, context=context)
     
+    def prefetch(self, image_paths: List[str], **kwargs) -> None:
+        """
+        批量解析多张图片：打包成多页PDF，一次MinerU任务处理多页
+        
+        失败的批次不会记录结果，对应图片在 extract() 时回退到单张解析。
+        
+        支持的kwargs:
+        - depth: int, 递归深度（用于日志）
+        """
+        depth = kwargs.get('depth', 0)
+        indent = '  ' * depth
+        
+        pending = []
+        seen = set()
+        for path in image_paths:
+            key = os.path.abspath(path)
+            if key in seen or self._get_batch_result(key):
+                continue
+            seen.add(key)
+            pending.append(key)
+        
+        if len(pending) < 2:
+            return
+        
+        chunks = [
+            pending[i:i + self.MAX_BATCH_PAGES]
+            for i in range(0, len(pending), self.MAX_BATCH_PAGES)
+        ]
+        logger.info(f"{indent}MinerU批量解析: {len(pending)} 张图片，{len(chunks)} 个批次")
+        
+        from services.cancellation import ContextThreadPoolExecutor
+        
+        def run_chunk(chunk):
+            mineru_result_dir = self._parse_image_batch(chunk, depth)
+            if not mineru_result_dir:
+                return
+            with self._batch_lock:
+                for page_index, path in enumerate(chunk):
+                    self._batch_results[path] = (mineru_result_dir, page_index)
+        
+        with ContextThreadPoolExecutor(max_workers=min(self.MAX_PARALLEL_BATCHES, len(chunks))) as executor:
+            list(executor.map(run_chunk, chunks))
+    
+    def _get_batch_result(self, image_path: str) -> Optional[Tuple[str, int]]:
+        """查找批量解析得到的 (结果目录, 页索引)"""
+        with self._batch_lock:
+            return self._batch_results.get(os.path.abspath(image_path))
+    
     def _find_cache(self, image_path: str) -> Optional[str]:
         """查找缓存的MinerU结果"""
         try:
@@ -198,6 +314,10 @@ class MinerUElementExtractor(ElementExtractor):
     
     def _parse_image(self, image_path: str, depth: int) -> Optional[str]:
         """解析图片，返回MinerU结果目录"""
+        return self._parse_image_batch([image_path], depth)
+    
+    def _parse_image_batch(self, image_paths: List[str], depth: int) -> Optional[str]:
+        """将图片按顺序打包为一个PDF（每张一页）并解析，返回MinerU结果目录"""
         from services.export_service import ExportService
         
         # 转换为PDF
@@ -205,7 +325,7 @@ class MinerUElementExtractor(ElementExtractor):
             pdf_path = tmp_pdf.name
         
         try:
-            ExportService.create_pdf_from_images([image_path], output_file=pdf_path)
+            ExportService.create_pdf_from_images(image_paths, output_file=pdf_path)
             
             # 调用MinerU解析
             image_id = str(uuid.uuid4())[:8]
@@ -231,9 +351,10 @@ class MinerUElementExtractor(ElementExtractor):
         self,
         mineru_result_dir: str,
         target_image_size: Tuple[int, int],
-        depth: int
+        depth: int,
+        page_index: int = 0
     ) -> List[Dict[str, Any]]:
-        """从MinerU结果目录中提取元素"""
+        """从MinerU结果目录中提取元素（page_index 指定多页结果中的页）"""
         elements = []
         
         try:
@@ -257,7 +378,10 @@ class MinerUElementExtractor(ElementExtractor):
             if 'pdf_info' not in layout_data or not layout_data['pdf_info']:
                 return []
             
-            page_info = layout_data['pdf_info'][0]
+            page_info = self._find_page_info(layout_data['pdf_info'], page_index)
+            if page_info is None:
+                logger.warning(f"layout.json中没有第 {page_index + 1} 页")
+                return []
             source_page_size = page_info.get('page_size', target_image_size)
             
             # 计算缩放比例
@@ -434,6 +558,17 @@ class MinerUElementExtractor(ElementExtractor):
         return elements
 
 
+    @staticmethod
+    def _find_page_info(pdf_info: List[Dict[str, Any]], page_index: int) -> Optional[Dict[str, Any]]:
+        """按 page_idx 查找页信息，缺少 page_idx 时按列表位置"""
+        for info in pdf_info:
+            if info.get('page_idx') == page_index:
+                return info
+        if 0 <= page_index < len(pdf_info):
+            return pdf_info[page_index]
+        return None
+
+
 class BaiduOCRElementExtractor(ElementExtractor):
     """
     基于百度OCR的元素提取器
@@ -442,14 +577,16 @@ class BaiduOCRElementExtractor(ElementExtractor):
     自包含：自己处理OCR调用和单元格提取
     """
     
-    def __init__(self, baidu_table_ocr_provider):
+    def __init__(self, baidu_table_ocr_provider, ocr_cache: Optional[OCRResultCache] = None):
         """
         初始化百度OCR提取器
         
         Args:
             baidu_table_ocr_provider: 百度表格OCR Provider实例
+            ocr_cache: OCR结果缓存（可选），命中时不调用远程OCR
         """
         self._ocr_provider = baidu_table_ocr_provider
+        self._ocr_cache = ocr_cache
     
     def supports_type(self, element_type: Optional[str]) -> bool:
         """百度OCR主要支持表格类型"""
@@ -474,9 +611,14 @@ class BaiduOCRElementExtractor(ElementExtractor):
         elements = []
         
         try:
-            # 调用百度OCR识别表格
-            ocr_result = self._ocr_provider.recognize_table(
+            # 调用百度OCR识别表格（优先使用缓存）
+            ocr_result = _recognize_with_cache(
+                self._ocr_cache,
+                'baidu_table_ocr',
+                self._ocr_provider,
+                self._ocr_provider.recognize_table,
                 image_path,
+                cached_fields=('cells', 'image_size'),
                 cell_contents=True
             )
             
@@ -644,19 +786,84 @@ class BaiduAccurateOCRElementExtractor(ElementExtractor):
     支持多语种、高精度识别，返回文字位置信息
     """
     
-    def __init__(self, baidu_accurate_ocr_provider):
+    def __init__(self, baidu_accurate_ocr_provider, ocr_cache: Optional[OCRResultCache] = None):
         """
         初始化百度高精度OCR提取器
         
         Args:
             baidu_accurate_ocr_provider: 百度高精度OCR Provider实例
+            ocr_cache: OCR结果缓存（可选），命中时不调用远程OCR
         """
         self._ocr_provider = baidu_accurate_ocr_provider
+        self._ocr_cache = ocr_cache
+        # 无缓存时 prefetch() 的结果: (图片绝对路径, 识别参数) -> OCR结果（extract() 取用一次）
+        self._prefetched: Dict[Tuple, Dict[str, Any]] = {}
+        self._prefetch_lock = threading.Lock()
     
     def supports_type(self, element_type: Optional[str]) -> bool:
         """百度高精度OCR主要支持文字类型"""
         return element_type in ['text', 'title', 'paragraph', None]
     
+    @staticmethod
+    def _ocr_options(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """extract()/prefetch() 共用的识别参数"""
+        return {
+            'language_type': kwargs.get('language_type', 'CHN_ENG'),
+            'recognize_granularity': kwargs.get('recognize_granularity', 'big'),
+            'detect_direction': kwargs.get('detect_direction', False),
+            'paragraph': kwargs.get('paragraph', False),
+            'probability': True,  # 获取置信度
+        }
+    
+    def _cache_key(self, image_path: str, options: Dict[str, Any]) -> str:
+        return self._ocr_cache.make_key(
+            image_path, 'baidu_accurate_ocr', max_side=getattr(self._ocr_provider, 'max_side', None), **options
+        )
+    
+    def prefetch(self, image_paths: List[str], **kwargs) -> None:
+        """
+        并发预识别多张图片：所有请求作为协程提交到共享事件循环（异步连接池），
+        不为每张图片占用一个线程。结果写入OCR缓存（无缓存时保存在内存中），
+        之后 extract() 直接使用；失败的图片由 extract() 逐张重新识别。
+        """
+        from config import Config
+        from services.ai_providers.async_runner import get_async_runner
+        from services.cancellation import remaining_time
+        
+        depth = kwargs.get('depth', 0)
+        options = self._ocr_options(kwargs)
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            return
+        
+        pending = []
+        for path in dict.fromkeys(os.path.abspath(p) for p in image_paths):
+            if self._ocr_cache is not None and self._ocr_cache.get(self._cache_key(path, options)) is not None:
+                continue
+            pending.append(path)
+        if not pending:
+            return
+        
+        logger.info(f"{'  ' * depth}百度高精度OCR并发预识别: {len(pending)} 张图片")
+        results = get_async_runner().run_all(
+            [self._ocr_provider.arecognize(path, **options) for path in pending],
+            concurrency=Config.BAIDU_HTTP_POOL_SIZE,
+            timeout=remaining,
+        )
+        
+        option_key = tuple(sorted(options.items()))
+        for path, result in zip(pending, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"{'  ' * depth}预识别失败，稍后逐张识别 {path}: {result}")
+            elif self._ocr_cache is not None:
+                self._ocr_cache.put(
+                    self._cache_key(path, options),
+                    {field: result.get(field) for field in ('text_lines', 'image_size', 'direction')}
+                )
+            else:
+                with self._prefetch_lock:
+                    self._prefetched[(path, option_key)] = result
+    
     def extract(
         self,
         image_path: str,
@@ -674,23 +881,26 @@ class BaiduAccurateOCRElementExtractor(ElementExtractor):
         - paragraph: bool, 是否输出段落信息
         """
         depth = kwargs.get('depth', 0)
-        language_type = kwargs.get('language_type', 'CHN_ENG')
-        recognize_granularity = kwargs.get('recognize_granularity', 'big')
-        detect_direction = kwargs.get('detect_direction', False)
-        paragraph = kwargs.get('paragraph', False)
+        options = self._ocr_options(kwargs)
         
         elements = []
         
         try:
-            # 调用百度高精度OCR识别
-            ocr_result = self._ocr_provider.recognize(
-                image_path,
-                language_type=language_type,
-                recognize_granularity=recognize_granularity,
-                detect_direction=detect_direction,
-                paragraph=paragraph,
-                probability=True,  # 获取置信度
-            )
+            # 调用百度高精度OCR识别（优先使用预识别结果和缓存）
+            with self._prefetch_lock:
+                ocr_result = self._prefetched.pop(
+                    (os.path.abspath(image_path), tuple(sorted(options.items()))), None
+                )
+            if ocr_result is None:
+                ocr_result = _recognize_with_cache(
+                    self._ocr_cache,
+                    'baidu_accurate_ocr',
+                    self._ocr_provider,
+                    self._ocr_provider.recognize,
+                    image_path,
+                    cached_fields=('text_lines', 'image_size', 'direction'),
+                    **options
+                )
             
             text_lines = ocr_result.get('text_lines', [])
             image_size = ocr_result.get('image_size', (0, 0))
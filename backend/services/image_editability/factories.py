@@ -7,6 +7,7 @@ from pathlib import Path
 
 from .extractors import ElementExtractor, MinerUElementExtractor, BaiduOCRElementExtractor, BaiduAccurateOCRElementExtractor, ExtractorRegistry
 from .hybrid_extractor import HybridElementExtractor, create_hybrid_extractor
+from .ocr_cache import OCRResultCache, get_ocr_cache
 from .inpaint_providers import (
     InpaintProvider, 
     DefaultInpaintProvider, 
@@ -18,6 +19,7 @@ from .inpaint_providers import (
 from .text_attribute_extractors import (
     TextAttributeExtractor,
     CaptionModelTextAttributeExtractor,
+    LocalColorTextAttributeExtractor,
     TextAttributeExtractorRegistry,
     TextStyleResult
 )
@@ -56,12 +58,12 @@ class ExtractorFactory:
                 from services.ai_providers.ocr import create_baidu_table_ocr_provider
                 baidu_provider = create_baidu_table_ocr_provider()
                 if baidu_provider:
-                    extractors.append(BaiduOCRElementExtractor(baidu_provider))
+                    extractors.append(BaiduOCRElementExtractor(baidu_provider, get_ocr_cache(upload_folder)))
                     logger.info("✅ 百度表格OCR提取器已启用")
             except Exception as e:
                 logger.warning(f"无法初始化百度表格OCR: {e}")
         else:
-            extractors.append(BaiduOCRElementExtractor(baidu_table_ocr_provider))
+            extractors.append(BaiduOCRElementExtractor(baidu_table_ocr_provider, get_ocr_cache(upload_folder)))
             logger.info("✅ 百度表格OCR提取器已启用")
         
         # 2. MinerU提取器（默认通用提取器）
@@ -104,12 +106,12 @@ class ExtractorFactory:
                 from services.ai_providers.ocr import create_baidu_table_ocr_provider
                 baidu_provider = create_baidu_table_ocr_provider()
                 if baidu_provider:
-                    baidu_ocr_extractor = BaiduOCRElementExtractor(baidu_provider)
+                    baidu_ocr_extractor = BaiduOCRElementExtractor(baidu_provider, get_ocr_cache(upload_folder))
                     logger.info("✅ 百度表格OCR提取器已创建")
             except Exception as e:
                 logger.warning(f"无法初始化百度表格OCR: {e}")
         else:
-            baidu_ocr_extractor = BaiduOCRElementExtractor(baidu_table_ocr_provider)
+            baidu_ocr_extractor = BaiduOCRElementExtractor(baidu_table_ocr_provider, get_ocr_cache(upload_folder))
             logger.info("✅ 百度表格OCR提取器已创建")
         
         # 尝试创建百度高精度OCR提取器
@@ -118,7 +120,9 @@ class ExtractorFactory:
             from services.ai_providers.ocr import create_baidu_accurate_ocr_provider
             baidu_accurate_provider = create_baidu_accurate_ocr_provider()
             if baidu_accurate_provider:
-                baidu_accurate_ocr_extractor = BaiduAccurateOCRElementExtractor(baidu_accurate_provider)
+                baidu_accurate_ocr_extractor = BaiduAccurateOCRElementExtractor(
+                    baidu_accurate_provider, get_ocr_cache(upload_folder)
+                )
                 logger.info("✅ 百度高精度OCR提取器已创建")
         except Exception as e:
             logger.warning(f"无法初始化百度高精度OCR: {e}")
@@ -132,13 +136,15 @@ class ExtractorFactory:
     
     @staticmethod
     def create_baidu_accurate_ocr_extractor(
-        baidu_accurate_ocr_provider: Optional[Any] = None
+        baidu_accurate_ocr_provider: Optional[Any] = None,
+        ocr_cache: Optional[OCRResultCache] = None
     ) -> Optional[BaiduAccurateOCRElementExtractor]:
         """
         创建百度高精度OCR提取器
         
         Args:
             baidu_accurate_ocr_provider: 百度高精度OCR Provider实例（可选，自动创建）
+            ocr_cache: OCR结果缓存（可选）
         
         Returns:
             BaiduAccurateOCRElementExtractor实例，如果不可用则返回None
@@ -154,7 +160,7 @@ class ExtractorFactory:
         if baidu_accurate_ocr_provider is None:
             return None
         
-        return BaiduAccurateOCRElementExtractor(baidu_accurate_ocr_provider)
+        return BaiduAccurateOCRElementExtractor(baidu_accurate_ocr_provider, ocr_cache)
     
     @staticmethod
     def create_hybrid_extractor(
@@ -192,7 +198,8 @@ class ExtractorFactory:
         
         # 创建百度高精度OCR提取器
         baidu_ocr_extractor = ExtractorFactory.create_baidu_accurate_ocr_extractor(
-            baidu_accurate_ocr_provider
+            baidu_accurate_ocr_provider,
+            ocr_cache=get_ocr_cache(upload_folder)
         )
         
         if baidu_ocr_extractor is None:
@@ -256,13 +263,13 @@ class ExtractorFactory:
                 baidu_provider = create_baidu_table_ocr_provider()
                 if baidu_provider:
                     from .extractors import BaiduOCRElementExtractor
-                    baidu_table_ocr_extractor = BaiduOCRElementExtractor(baidu_provider)
+                    baidu_table_ocr_extractor = BaiduOCRElementExtractor(baidu_provider, get_ocr_cache(upload_folder))
                     logger.info("✅ 百度表格OCR提取器已创建")
             except Exception as e:
                 logger.warning(f"无法初始化百度表格OCR: {e}")
         else:
             from .extractors import BaiduOCRElementExtractor
-            baidu_table_ocr_extractor = BaiduOCRElementExtractor(baidu_table_ocr_provider)
+            baidu_table_ocr_extractor = BaiduOCRElementExtractor(baidu_table_ocr_provider, get_ocr_cache(upload_folder))
             logger.info("✅ 百度表格OCR提取器已创建")
         
         # 创建注册表
@@ -581,7 +588,8 @@ class ServiceConfig:
         # 创建MinerU解析服务
         parser_service = FileParserService(
             mineru_token=mineru_token,
-            mineru_api_base=mineru_api_base
+            mineru_api_base=mineru_api_base,
+            upload_folder=str(upload_path)
         )
         
         # 创建提取器注册表
@@ -703,10 +711,38 @@ class TextAttributeExtractorFactory:
         logger.info("创建CaptionModelTextAttributeExtractor")
         return CaptionModelTextAttributeExtractor(ai_service, prompt_template)
     
+    @staticmethod
+    def create_local_color_extractor(
+        fallback_extractor: Optional[TextAttributeExtractor] = None,
+        min_confidence: Optional[float] = None
+    ) -> TextAttributeExtractor:
+        """
+        创建本地像素颜色估计提取器
+        
+        单色文字直接从裁剪图像素估计颜色，低置信度或多颜色时才调用 fallback_extractor。
+        
+        Args:
+            fallback_extractor: 回退提取器（通常为 create_caption_model_extractor() 的结果）
+            min_confidence: 本地结果最低置信度（默认 Config.TEXT_STYLE_LOCAL_COLOR_MIN_CONFIDENCE）
+        
+        Returns:
+            LocalColorTextAttributeExtractor实例
+        """
+        if min_confidence is None:
+            from config import Config
+            min_confidence = Config.TEXT_STYLE_LOCAL_COLOR_MIN_CONFIDENCE
+        
+        logger.info(f"创建LocalColorTextAttributeExtractor (min_confidence={min_confidence})")
+        return LocalColorTextAttributeExtractor(
+            fallback_extractor=fallback_extractor,
+            min_confidence=min_confidence
+        )
+    
     @staticmethod
     def create_text_attribute_registry(
         caption_extractor: Optional[TextAttributeExtractor] = None,
-        ai_service: Optional[Any] = None
+        ai_service: Optional[Any] = None,
+        use_local_color: bool = False
     ) -> TextAttributeExtractorRegistry:
         """
         创建文字属性提取器注册表
@@ -716,6 +752,7 @@ class TextAttributeExtractorFactory:
         Args:
             caption_extractor: Caption Model提取器（可选，自动创建）
             ai_service: AIService实例（可选，用于自动创建提取器）
+            use_local_color: 文本类型是否先用本地像素估计颜色（低置信度时回退到caption_extractor）
         
         Returns:
             配置好的TextAttributeExtractorRegistry实例
@@ -736,9 +773,14 @@ class TextAttributeExtractorFactory:
         registry.register_default(caption_extractor)
         
         # 注册文本类型
+        text_extractor = caption_extractor
+        if use_local_color:
+            text_extractor = TextAttributeExtractorFactory.create_local_color_extractor(
+                fallback_extractor=caption_extractor
+            )
         registry.register_types(
             ['text', 'title', 'paragraph', 'heading', 'table_cell'],
-            caption_extractor
+            text_extractor
         )
         
         logger.info("创建TextAttributeExtractorRegistry")
@@ -5,7 +5,7 @@
 """
 import logging
 import tempfile
-from typing import List
+from typing import List, Optional
 from PIL import Image
 
 from .data_models import EditableElement, BBox
@@ -103,3 +103,34 @@ def should_recurse_into_element(
         return False
     
     return True
+
+
+def compute_perceptual_hash(image_path: str, hash_size: int = 16) -> Optional[str]:
+    """
+    计算图片的感知哈希（dHash，附带原始尺寸）
+    
+    用于识别跨页重复的元素裁剪图（页眉、Logo、页脚等）。
+    重新编码、轻微压缩噪声不影响结果；尺寸不同的图片哈希一定不同。
+    
+    Args:
+        image_path: 图片路径
+        hash_size: 哈希边长（hash_size * hash_size 位）
+    
+    Returns:
+        形如 "{width}x{height}:{hex}" 的字符串，无法读取图片时返回None
+    """
+    try:
+        with Image.open(image_path) as img:
+            width, height = img.size
+            gray = img.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+            pixels = list(gray.getdata())
+    except Exception as e:
+        logger.debug(f"计算感知哈希失败 {image_path}: {e}")
+        return None
+    
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{width}x{height}:{bits:0{hash_size * hash_size // 4}x}"
@@ -10,9 +10,10 @@
 """
 import logging
 from typing import Dict, Any, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 from PIL import Image
 
+from services.cancellation import ContextThreadPoolExecutor
 from .extractors import (
     ElementExtractor, 
     ExtractionResult, 
@@ -192,6 +193,19 @@ class HybridElementExtractor(ElementExtractor):
         """混合提取器支持所有类型"""
         return True
     
+    def prefetch(self, image_paths: List[str], **kwargs) -> None:
+        """MinerU批量解析与百度OCR并发预识别同时进行"""
+        with ContextThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(self._mineru_extractor.prefetch, image_paths, **kwargs),
+                executor.submit(self._baidu_ocr_extractor.prefetch, image_paths, **kwargs),
+            ]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning(f"批量预解析失败，回退到逐张解析: {e}")
+    
     def extract(
         self,
         image_path: str,
@@ -233,7 +247,7 @@ class HybridElementExtractor(ElementExtractor):
         def run_baidu_ocr():
             return self._baidu_ocr_extractor.extract(image_path, element_type, **kwargs)
         
-        with ThreadPoolExecutor(max_workers=2) as executor:
+        with ContextThreadPoolExecutor(max_workers=2) as executor:
             future_mineru = executor.submit(run_mineru)
             future_baidu = executor.submit(run_baidu_ocr)
             
@@ -17,6 +17,7 @@ from typing import List, Optional, Dict
 from PIL import Image
 
 from utils.mask_utils import create_mask_from_bboxes
+from services.cancellation import is_time_short
 
 logger = logging.getLogger(__name__)
 
@@ -323,6 +324,10 @@ class HybridInpaintProvider(InpaintProvider):
         """
         expand_pixels = kwargs.get('expand_pixels', 2)
         enhance_quality = kwargs.get('enhance_quality', self._enhance_quality)
+        if enhance_quality and is_time_short():
+            # 降级：任务剩余时间不足时只做百度修复
+            logger.warning("HybridInpaintProvider: 任务剩余时间不足，跳过生成式画质提升")
+            enhance_quality = False
         
         try:
             # Step 1: 百度图像修复 - 精确去除文字
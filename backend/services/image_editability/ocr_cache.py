@@ -0,0 +1,205 @@
+"""
+OCR结果缓存 - 按 (图片内容哈希, 识别参数, Provider) 缓存解析后的OCR结果
+
+模板化的幻灯片（页眉、页脚、Logo）和重复导出会反复识别相同的图片，
+命中缓存时直接返回 text_lines / cells，不再发起网络请求。
+
+两级存储：
+- 内存 LRU（进程内，最近使用的条目）
+- 磁盘 JSON（<upload_folder>/ocr_cache/，跨进程/重启保留），按修改时间做 LRU 淘汰
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OCRResultCache:
+    """
+    持久化OCR结果缓存（线程安全）
+
+    Example:
+        >>> cache = OCRResultCache(Path('uploads/ocr_cache'), max_entries=10000)
+        >>> key = cache.make_key('crop.png', 'baidu_accurate_ocr', language_type='CHN_ENG')
+        >>> result = cache.get(key)
+        >>> if result is None:
+        ...     result = provider.recognize('crop.png')
+        ...     cache.put(key, result)
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path],
+        max_entries: int = 20000,
+        memory_entries: int = 512
+    ):
+        """
+        Args:
+            cache_dir: 磁盘缓存目录，None表示只使用内存缓存
+            max_entries: 磁盘缓存最大条目数，超出后淘汰最久未使用的条目
+            memory_entries: 内存LRU条目数
+        """
+        self._cache_dir = Path(cache_dir) if cache_dir else None
+        self._max_entries = max_entries
+        self._memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_count: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+        if self._cache_dir:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(image_path: str, provider: str, **options) -> str:
+        """
+        生成缓存键
+
+        Args:
+            image_path: 图片路径（按文件内容哈希，与路径无关）
+            provider: Provider名称
+            **options: 影响识别结果的参数（如 language_type、recognize_granularity）
+        """
+        digest = hashlib.sha256()
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        option_str = json.dumps(options, sort_keys=True, default=str)
+        return hashlib.sha256(
+            f"{provider}|{digest.hexdigest()}|{option_str}".encode('utf-8')
+        ).hexdigest()
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        if not self._cache_dir:
+            return None
+        return self._cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，未命中返回None"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+
+        path = self._disk_path(key)
+        if path is not None and path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    value = json.load(f)
+                os.utime(path)  # 更新访问时间，用于LRU淘汰
+                with self._lock:
+                    self._remember(key, value)
+                    self.hits += 1
+                return value
+            except Exception as e:
+                logger.debug(f"读取OCR缓存失败 {path}: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """写入缓存"""
+        with self._lock:
+            self._remember(key, value)
+
+        path = self._disk_path(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            is_new = not path.exists()
+            tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            if is_new:
+                self._on_disk_insert()
+        except Exception as e:
+            logger.warning(f"写入OCR缓存失败: {e}")
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+    def _on_disk_insert(self):
+        with self._lock:
+            if self._disk_count is None:
+                self._disk_count = sum(1 for _ in self._cache_dir.glob('*/*.json'))
+            else:
+                self._disk_count += 1
+            over_limit = self._disk_count > self._max_entries
+        if over_limit:
+            self._evict()
+
+    def _evict(self):
+        """淘汰最久未使用的条目，降到上限的90%"""
+        files = []
+        for path in self._cache_dir.glob('*/*.json'):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        target = int(self._max_entries * 0.9)
+        files.sort()
+        removed = 0
+        for _, path in files[:max(0, len(files) - target)]:
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._disk_count = len(files) - removed
+        logger.info(f"OCR缓存淘汰 {removed} 个条目")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'memory_entries': len(self._memory),
+                'disk_entries': self._disk_count,
+                'max_entries': self._max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_caches: Dict[str, OCRResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_ocr_cache(upload_folder: Path) -> Optional[OCRResultCache]:
+    """
+    获取 <upload_folder>/ocr_cache 的进程级共享缓存
+
+    OCR_CACHE_ENABLED=false 时返回None（不缓存）。
+    """
+    from config import Config
+    if not Config.OCR_CACHE_ENABLED:
+        return None
+
+    cache_dir = str(Path(upload_folder) / 'ocr_cache')
+    with _caches_lock:
+        cache = _caches.get(cache_dir)
+        if cache is None:
+            cache = OCRResultCache(Path(cache_dir), max_entries=Config.OCR_CACHE_MAX_ENTRIES)
+            _caches[cache_dir] = cache
+        return cache
+
+
+def get_ocr_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """所有OCR缓存的统计信息"""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {cache_dir: cache.stats() for cache_dir, cache in caches.items()}
@@ -17,7 +17,12 @@ from .coordinate_mapper import CoordinateMapper
 from .extractors import ElementExtractor, ExtractionResult
 from .inpaint_providers import InpaintProvider
 from .factories import ServiceConfig
+from .element_dedup import ElementDeduplicator, clone_elements_to
 from .helpers import collect_bboxes_from_elements, should_recurse_into_element, crop_element_from_image
+from services.cancellation import (
+    CancellationToken, TaskCancelledError, as_completed_or_cancelled, cancellable_executor, check_cancelled,
+    is_time_short, remaining_time
+)
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +34,13 @@ class ImageEditabilityService:
     线程安全的无状态服务，可并行调用 make_image_editable()
     完全依赖抽象接口，不知道任何具体实现细节
     
+    唯一的可变状态是跨页元素去重表：同一个服务实例处理的多张图片中，
+    相同的子元素（页眉、Logo等）只递归分析一次。建议每次导出创建一个实例。
+    
+    传入 cancel_token 时，在提取、重绘和递归子元素之前检查取消状态，
+    取消后抛出 TaskCancelledError。所属任务有时间预算时（bind_cancel_token），
+    剩余时间不足则不再递归子元素，预算用完则不再重绘（使用原图作为背景）。
+    
     Example:
         >>> config = ServiceConfig.from_defaults(mineru_token="xxx")
         >>> service = ImageEditabilityService(config)
@@ -44,12 +56,13 @@ class ImageEditabilityService:
         ...     results = [f.result() for f in futures]
     """
     
-    def __init__(self, config: ServiceConfig):
+    def __init__(self, config: ServiceConfig, cancel_token: Optional[CancellationToken] = None):
         """
         初始化服务
         
         Args:
             config: ServiceConfig配置对象，包含所有依赖
+            cancel_token: 可选，所属任务的取消令牌
         """
         # 只读配置，线程安全
         self._upload_folder = config.upload_folder
@@ -59,6 +72,8 @@ class ImageEditabilityService:
         self._min_image_size = config.min_image_size
         self._min_image_area = config.min_image_area
         self._max_child_coverage_ratio = 0.85
+        self._deduplicator = ElementDeduplicator()
+        self._cancel_token = cancel_token
         
         extractors = self._extractor_registry.get_all_extractors()
         inpaint_providers = self._inpaint_registry.get_all_providers()
@@ -68,6 +83,10 @@ class ImageEditabilityService:
             f"max_depth={self._max_depth}"
         )
     
+    def get_dedup_stats(self) -> dict:
+        """跨页元素去重统计：分组数、实际处理数、复用数"""
+        return self._deduplicator.stats()
+    
     def make_image_editable(
         self,
         image_path: str,
@@ -117,6 +136,7 @@ class ImageEditabilityService:
             root_image_path = image_path
         
         # 2. 提取元素
+        check_cancelled(self._cancel_token)
         extraction_result = self._extract_elements(
             image_path=image_path,
             element_type=element_type,
@@ -140,6 +160,7 @@ class ImageEditabilityService:
         # 3. 生成clean background（根据元素类型选择重绘方法）
         clean_background = None
         if self._inpaint_registry and elements:
+            check_cancelled(self._cancel_token)
             clean_background = self._generate_clean_background(
                 image_path=image_path,
                 elements=elements,
@@ -179,6 +200,30 @@ class ImageEditabilityService:
         logger.info(f"{'  ' * depth}[{image_id}] 处理完成")
         return editable_image
     
+    def prefetch_images(
+        self,
+        image_paths: List[str],
+        element_type: Optional[str] = None,
+        depth: int = 0
+    ) -> None:
+        """
+        批量预解析多张图片（如MinerU多页PDF），之后 make_image_editable() 直接使用结果
+        
+        失败不影响后续处理，提取器会回退到逐张解析。
+        
+        Args:
+            image_paths: 图片路径列表
+            element_type: 元素类型，用于选择提取器
+            depth: 递归深度（用于日志）
+        """
+        if len(image_paths) < 2:
+            return
+        try:
+            extractor = self._select_extractor(element_type)
+            extractor.prefetch(image_paths, depth=depth)
+        except Exception as e:
+            logger.warning(f"{'  ' * depth}批量预解析失败，回退到逐张解析: {e}")
+    
     def _extract_elements(
         self,
         image_path: str,
@@ -317,6 +362,11 @@ class ImageEditabilityService:
             logger.warning(f"{'  ' * depth}未找到重绘方法，跳过")
             return None
         
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            logger.warning(f"{'  ' * depth}任务时间预算已用完，跳过重绘（使用原图作为背景）")
+            return None
+        
         try:
             bboxes = collect_bboxes_from_elements(elements)
             img = Image.open(image_path)
@@ -412,46 +462,80 @@ class ImageEditabilityService:
         if not elements_to_process:
             return
         
-        # 并行处理多个子元素
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        check_cancelled(self._cancel_token)
+        if is_time_short():
+            logger.warning(f"{'  ' * depth}任务剩余时间不足，跳过 {len(elements_to_process)} 个子元素的递归分析")
+            return
         
-        def process_single_element(element):
-            """处理单个子元素"""
+        # 先裁剪出所有子图，按元素类型批量预解析
+        child_image_paths = {}
+        crop_errors = {}
+        for element in elements_to_process:
             try:
-                # 从当前图片裁剪出子区域
-                child_image_path = crop_element_from_image(
+                child_image_paths[element.element_id] = crop_element_from_image(
                     source_image_path=current_image_path,
                     bbox=element.bbox
                 )
-                
-                child_editable = self.make_image_editable(
-                    image_path=child_image_path,
-                    depth=depth + 1,
-                    parent_id=image_id,
-                    parent_bbox=element.bbox_global,
-                    root_image_size=root_image_size,
-                    element_type=element.element_type,
-                    root_image_path=root_image_path
+            except Exception as e:
+                crop_errors[element.element_id] = e
+        
+        paths_by_type = {}
+        for element in elements_to_process:
+            if element.element_id in child_image_paths:
+                paths_by_type.setdefault(element.element_type, []).append(
+                    child_image_paths[element.element_id]
+                )
+        for child_type, paths in paths_by_type.items():
+            self.prefetch_images(paths, element_type=child_type, depth=depth + 1)
+        
+        def process_single_element(element):
+            """处理单个子元素（相同的元素只处理一次，其余复用结果）"""
+            if element.element_id in crop_errors:
+                return element, None, None, crop_errors[element.element_id]
+            child_image_path = child_image_paths[element.element_id]
+            try:
+                signature = self._deduplicator.signature(
+                    element, depth=depth + 1, image_path=element.image_path or child_image_path
+                )
+                (child_editable, source_bbox), reused = self._deduplicator.run_once(
+                    signature,
+                    lambda: (
+                        self.make_image_editable(
+                            image_path=child_image_path,
+                            depth=depth + 1,
+                            parent_id=image_id,
+                            parent_bbox=element.bbox_global,
+                            root_image_size=root_image_size,
+                            element_type=element.element_type,
+                            root_image_path=root_image_path
+                        ),
+                        element.bbox_global
+                    )
                 )
                 
-                return element, child_editable, None
+                children = child_editable.elements
+                if reused:
+                    children = clone_elements_to(children, source_bbox, element.bbox_global)
+                return element, child_editable, children, None
             
+            except TaskCancelledError:
+                raise
             except Exception as e:
-                return element, None, e
+                return element, None, None, e
         
         logger.info(f"{'  ' * depth}  并行处理 {len(elements_to_process)} 个子元素...")
         
-        # 使用线程池并行处理
+        # 使用线程池并行处理（取消时不等待正在执行的子元素）
         max_workers = min(8, len(elements_to_process))  # 限制并发数
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with cancellable_executor(max_workers) as executor:
             futures = {executor.submit(process_single_element, elem): elem for elem in elements_to_process}
             
-            for future in as_completed(futures):
-                element, child_editable, error = future.result()
+            for future in as_completed_or_cancelled(futures, self._cancel_token):
+                element, child_editable, children, error = future.result()
                 
                 if error:
                     logger.error(f"{'  ' * depth}  ✗ {element.element_id} 失败: {error}")
                 else:
-                    element.children = child_editable.elements
+                    element.children = children
                     element.inpainted_background_path = child_editable.clean_background
-                    logger.info(f"{'  ' * depth}  ✓ {element.element_id} 完成: {len(child_editable.elements)} 个子元素")
+                    logger.info(f"{'  ' * depth}  ✓ {element.element_id} 完成: {len(children)} 个子元素")
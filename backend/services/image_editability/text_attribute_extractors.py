@@ -5,9 +5,11 @@
 - TextStyleResult: 文字样式数据结构
 - TextAttributeExtractor: 提取器抽象接口
 - CaptionModelTextAttributeExtractor: 基于Caption Model的默认实现
+- LocalColorTextAttributeExtractor: 基于像素聚类的本地颜色估计（低置信度时回退到模型）
 - TextAttributeExtractorRegistry: 提取器注册表
 """
 import logging
+import threading
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field, asdict
 from typing import Dict, Any, List, Optional, Tuple, Union
@@ -426,6 +428,46 @@ class CaptionModelTextAttributeExtractor(TextAttributeExtractor):
             logger.error(f"解析结果失败: {e}")
             return TextStyleResult(confidence=0.0, metadata={'error': str(e)})
     
+    # 全图批量识别单次请求的元素描述 token 预算（估算值，含预期输出）
+    BATCH_TOKEN_BUDGET = 6000
+    # 每个元素预期输出的 token 数
+    BATCH_OUTPUT_TOKENS_PER_ELEMENT = 60
+    # 分块请求的最大并发数
+    BATCH_MAX_PARALLEL_CHUNKS = 4
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """粗略估算 token 数：CJK 字符约1个token，其他字符约4个一个token"""
+        cjk = sum(1 for ch in text if '\u2e80' <= ch <= '\u9fff' or '\uac00' <= ch <= '\ud7af')
+        return cjk + (len(text) - cjk + 3) // 4
+    
+    @classmethod
+    def _split_by_token_budget(
+        cls,
+        elements: List[Dict[str, Any]],
+        token_budget: int
+    ) -> List[List[Dict[str, Any]]]:
+        """按估算 token 数将元素列表切分为若干块（保持原顺序）"""
+        import json
+        
+        chunks = []
+        current = []
+        current_tokens = 0
+        for elem in elements:
+            elem_tokens = (
+                cls._estimate_tokens(json.dumps(elem, ensure_ascii=False))
+                + cls.BATCH_OUTPUT_TOKENS_PER_ELEMENT
+            )
+            if current and current_tokens + elem_tokens > token_budget:
+                chunks.append(current)
+                current = []
+                current_tokens = 0
+            current.append(elem)
+            current_tokens += elem_tokens
+        if current:
+            chunks.append(current)
+        return chunks
+    
     def extract_batch_with_full_image(
         self,
         full_image: Union[str, Image.Image],
@@ -437,6 +479,9 @@ class CaptionModelTextAttributeExtractor(TextAttributeExtractor):
         
         优势：模型可以看到全局上下文，提高分析准确性
         
+        文本元素很多的页面按估算 token 数切分为多块，每块单独请求（共用同一张图片文件），
+        并行执行后合并结果，避免 prompt 过长或输出 JSON 被截断。
+        
         Args:
             full_image: 完整的页面图片，可以是文件路径或PIL Image对象
             text_elements: 文本元素列表，每个元素包含：
@@ -445,15 +490,17 @@ class CaptionModelTextAttributeExtractor(TextAttributeExtractor):
                 - content: 文字内容
             **kwargs:
                 - thinking_budget: int, 思考预算，默认1000
+                - token_budget: int, 单次请求的元素 token 预算，默认 BATCH_TOKEN_BUDGET
         
         Returns:
             字典，key为element_id，value为TextStyleResult
         """
-        import json
+        import os
         import tempfile
-        from services.prompts import get_batch_text_attribute_extraction_prompt
+        from services.cancellation import ContextThreadPoolExecutor
         
         thinking_budget = kwargs.get('thinking_budget', 1000)
+        token_budget = kwargs.get('token_budget', self.BATCH_TOKEN_BUDGET)
         
         if not text_elements:
             return {}
@@ -461,69 +508,92 @@ class CaptionModelTextAttributeExtractor(TextAttributeExtractor):
         try:
             # 准备图片
             if isinstance(full_image, str):
-                pil_image = Image.open(full_image)
                 tmp_path = full_image  # 如果已经是路径，直接使用
                 need_cleanup = False
             else:
-                pil_image = full_image
                 # 保存临时图片文件
                 with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
                     tmp_path = tmp_file.name
-                    pil_image.save(tmp_path)
+                    full_image.save(tmp_path)
                 need_cleanup = True
             
-            # 构建文本元素的 JSON 描述
-            elements_for_prompt = []
-            for elem in text_elements:
-                elements_for_prompt.append({
+            # 构建文本元素的描述
+            elements_for_prompt = [
+                {
                     'element_id': elem['element_id'],
                     'bbox': elem['bbox'],
                     'content': elem['content']
-                })
-            
-            text_elements_json = json.dumps(elements_for_prompt, ensure_ascii=False, indent=2)
-            
-            # 构建 prompt
-            prompt = get_batch_text_attribute_extraction_prompt(text_elements_json)
+                }
+                for elem in text_elements
+            ]
+            chunks = self._split_by_token_budget(elements_for_prompt, token_budget)
             
-            # 调用 ai_service.generate_json_with_image（带重试机制）
             try:
-                result = self.ai_service.generate_json_with_image(
-                    prompt=prompt,
-                    image_path=tmp_path,
-                    thinking_budget=thinking_budget
-                )
+                if len(chunks) == 1:
+                    return self._extract_batch_chunk(tmp_path, chunks[0], text_elements, thinking_budget)
                 
-                # 确保结果是列表
-                if isinstance(result, list):
-                    result_list = result
-                elif isinstance(result, dict):
-                    # 如果返回的是字典，尝试获取列表
-                    result_list = result.get('results', [result])
-                else:
-                    result_list = []
-                
-                # 解析结果
-                return self._parse_batch_result(result_list, text_elements)
-            
-            except ValueError as e:
-                logger.warning(f"text_provider不支持图片输入: {e}")
-                return {}
+                logger.info(f"全图批量识别: {len(text_elements)} 个元素按 token 预算切分为 {len(chunks)} 块并行请求")
+                results = {}
+                with ContextThreadPoolExecutor(max_workers=min(self.BATCH_MAX_PARALLEL_CHUNKS, len(chunks))) as executor:
+                    futures = [
+                        executor.submit(self._extract_batch_chunk, tmp_path, chunk, chunk, thinking_budget)
+                        for chunk in chunks
+                    ]
+                    for future in futures:
+                        results.update(future.result())
+                logger.info(f"全图批量识别合并完成: 成功 {len(results)}/{len(text_elements)} 个元素")
+                return results
             
-            except Exception as e:
-                logger.error(f"批量提取JSON生成失败（已重试3次）: {e}")
-                return {}
-                
             finally:
-                if need_cleanup:
-                    import os
-                    if os.path.exists(tmp_path):
-                        os.remove(tmp_path)
+                if need_cleanup and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
         
         except Exception as e:
             logger.error(f"批量提取文字属性失败: {e}", exc_info=True)
             return {}
     
+    def _extract_batch_chunk(
+        self,
+        image_path: str,
+        elements_for_prompt: List[Dict[str, Any]],
+        original_elements: List[Dict[str, Any]],
+        thinking_budget: int
+    ) -> Dict[str, TextStyleResult]:
+        """全图批量识别的单次请求"""
+        import json
+        from services.prompts import get_batch_text_attribute_extraction_prompt
+        
+        text_elements_json = json.dumps(elements_for_prompt, ensure_ascii=False, indent=2)
+        
+        # 构建 prompt
+        prompt = get_batch_text_attribute_extraction_prompt(text_elements_json)
+        
+        # 调用 ai_service.generate_json_with_image（带重试机制）
+        try:
+            result = self.ai_service.generate_json_with_image(
+                prompt=prompt,
+                image_path=image_path,
+                thinking_budget=thinking_budget
+            )
+        except ValueError as e:
+            logger.warning(f"text_provider不支持图片输入: {e}")
+            return {}
+        except Exception as e:
+            logger.error(f"批量提取JSON生成失败（已重试3次）: {e}")
+            return {}
+        
+        # 确保结果是列表
+        if isinstance(result, list):
+            result_list = result
+        elif isinstance(result, dict):
+            # 如果返回的是字典，尝试获取列表
+            result_list = result.get('results', [result])
+        else:
+            result_list = []
+        
+        # 解析结果
+        return self._parse_batch_result(result_list, original_elements)
+    
     def _parse_batch_result(
         self,
         result_list: List[Dict[str, Any]],
@@ -584,6 +654,380 @@ class CaptionModelTextAttributeExtractor(TextAttributeExtractor):
         logger.info(f"批量解析完成: 成功 {len(results)}/{len(original_elements)} 个元素")
         return results
 
+    # 拼图布局参数
+    CONTACT_SHEET_LABEL_WIDTH = 64
+    CONTACT_SHEET_MAX_TILE_HEIGHT = 120
+    CONTACT_SHEET_MAX_TILE_WIDTH = 1400
+    CONTACT_SHEET_GAP = 8
+    
+    @classmethod
+    def _build_contact_sheet(cls, images: List[Image.Image]) -> Image.Image:
+        """
+        将多个文字裁剪图纵向拼成一张编号拼图
+        
+        每块左侧为编号标签 [n]，块之间为灰色分隔线。过高/过宽的裁剪图按比例缩小。
+        """
+        from PIL import ImageDraw
+        
+        tiles = []
+        for img in images:
+            img = img.convert('RGB')
+            scale = min(
+                1.0,
+                cls.CONTACT_SHEET_MAX_TILE_HEIGHT / max(1, img.height),
+                cls.CONTACT_SHEET_MAX_TILE_WIDTH / max(1, img.width)
+            )
+            if scale < 1.0:
+                img = img.resize(
+                    (max(1, int(img.width * scale)), max(1, int(img.height * scale))),
+                    Image.Resampling.LANCZOS
+                )
+            tiles.append(img)
+        
+        gap = cls.CONTACT_SHEET_GAP
+        label_width = cls.CONTACT_SHEET_LABEL_WIDTH
+        width = label_width + max(tile.width for tile in tiles) + gap
+        height = sum(max(tile.height, 24) + gap for tile in tiles) + gap
+        
+        sheet = Image.new('RGB', (width, height), (255, 255, 255))
+        draw = ImageDraw.Draw(sheet)
+        y = gap
+        for idx, tile in enumerate(tiles):
+            row_height = max(tile.height, 24)
+            draw.text((6, y + row_height // 2 - 6), f"[{idx}]", fill=(120, 120, 120))
+            sheet.paste(tile, (label_width, y))
+            y += row_height + gap
+            draw.line([(0, y - gap // 2), (width, y - gap // 2)], fill=(160, 160, 160), width=1)
+        return sheet
+    
+    def extract_batch_contact_sheet(
+        self,
+        items: List[Tuple[str, Union[str, Image.Image], Optional[str]]],
+        **kwargs
+    ) -> Dict[str, TextStyleResult]:
+        """
+        将多个文字裁剪图拼成一张图，一次模型调用识别所有区域的文字和颜色
+        
+        与 extract() 的结果一致（colored_segments + font_color_rgb），但调用次数从
+        len(items) 次降为 1 次。解析失败或缺失的元素不出现在返回结果中，由调用方回退到逐个识别。
+        
+        Args:
+            items: 列表，每项为 (element_id, image, text_content)
+            **kwargs:
+                - thinking_budget: int, 思考预算，默认500
+        
+        Returns:
+            字典，key为element_id，value为TextStyleResult
+        """
+        import json
+        import os
+        import tempfile
+        from services.prompts import get_contact_sheet_text_color_prompt
+        
+        thinking_budget = kwargs.get('thinking_budget', 500)
+        if not items:
+            return {}
+        
+        images = []
+        for _, image, _ in items:
+            if isinstance(image, str):
+                # 读入内存后立即关闭文件，密集页面不会累积打开的文件句柄
+                with Image.open(image) as opened:
+                    image = opened.convert('RGB')
+            images.append(image)
+        sheet = self._build_contact_sheet(images)
+        
+        tiles_json = json.dumps(
+            [{'id': idx, 'content': text or ''} for idx, (_, _, text) in enumerate(items)],
+            ensure_ascii=False
+        )
+        prompt = get_contact_sheet_text_color_prompt(tiles_json)
+        
+        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
+            tmp_path = tmp_file.name
+            sheet.save(tmp_path)
+        
+        try:
+            result = self.ai_service.generate_json_with_image(
+                prompt=prompt,
+                image_path=tmp_path,
+                thinking_budget=thinking_budget
+            )
+        except Exception as e:
+            logger.warning(f"拼图批量识别失败（{len(items)} 个元素）: {e}")
+            return {}
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        
+        if isinstance(result, dict):
+            result = result.get('results', [])
+        if not isinstance(result, list):
+            return {}
+        
+        results = {}
+        for entry in result:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                idx = int(entry.get('id'))
+            except (TypeError, ValueError):
+                continue
+            if not 0 <= idx < len(items) or not entry.get('colored_segments'):
+                continue
+            style = self._parse_result(entry)
+            if style.confidence <= 0:
+                continue
+            style.metadata['source'] = 'caption_model_contact_sheet'
+            results[items[idx][0]] = style
+        
+        logger.info(f"拼图批量识别完成: 成功 {len(results)}/{len(items)} 个元素")
+        return results
+
+
+class LocalColorTextAttributeExtractor(TextAttributeExtractor):
+    """
+    基于像素聚类的本地文字颜色估计
+    
+    单色文字的颜色就在裁剪图像素里，不需要调用模型：
+    1. 裁剪图边缘像素的中位数作为背景色
+    2. 对像素做 k-means 聚类（k=3，背景/文字/抗锯齿过渡）
+    3. 离背景最远的一批前景像素的中位数作为文字颜色
+    
+    对比度低、背景不纯或检测到多种前景色时置信度降低，
+    低于 min_confidence 或为多颜色时交给 fallback_extractor（通常是Caption Model）。
+    全图批量识别（粗体/斜体/对齐等布局属性）直接委托给 fallback_extractor。
+    """
+    
+    # 前景与背景的最小色差（RGB欧氏距离）
+    MIN_CONTRAST = 40.0
+    # 两个前景簇的最小色差，超过且不在背景-文字连线上（抗锯齿）视为多颜色
+    MULTI_COLOR_DISTANCE = 60.0
+    
+    def __init__(
+        self,
+        fallback_extractor: Optional[TextAttributeExtractor] = None,
+        min_confidence: float = 0.75,
+        max_pixels: int = 40000
+    ):
+        """
+        Args:
+            fallback_extractor: 低置信度/多颜色时使用的提取器（可选）
+            min_confidence: 本地结果的最低置信度
+            max_pixels: 参与聚类的最大像素数（超出时均匀采样）
+        """
+        self.fallback_extractor = fallback_extractor
+        self.min_confidence = min_confidence
+        self.max_pixels = max_pixels
+        # 计数器会被导出线程池中的多个线程同时更新
+        self._stats_lock = threading.Lock()
+        self.local_count = 0
+        self.escalated_count = 0
+    
+    def supports_batch(self) -> bool:
+        return False
+    
+    def _count(self, local: int = 0, escalated: int = 0):
+        with self._stats_lock:
+            self.local_count += local
+            self.escalated_count += escalated
+    
+    def stats(self) -> Dict[str, int]:
+        """本地解决 / 交给模型的元素数"""
+        with self._stats_lock:
+            return {'local': self.local_count, 'escalated': self.escalated_count}
+    
+    @staticmethod
+    def _kmeans(pixels, centers, iterations: int = 8):
+        """简单的 k-means（centers 为初始中心）"""
+        import numpy as np
+        
+        labels = np.zeros(len(pixels), dtype=np.int64)
+        for _ in range(iterations):
+            distances = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+            labels = distances.argmin(axis=1)
+            for k in range(len(centers)):
+                members = pixels[labels == k]
+                if len(members):
+                    centers[k] = members.mean(axis=0)
+        return centers, labels
+    
+    def estimate_color(self, image: Image.Image) -> Dict[str, Any]:
+        """
+        估计文字颜色和背景色
+        
+        Returns:
+            字典：font_color_rgb, background_rgb, confidence, multi_color
+        """
+        import numpy as np
+        
+        arr = np.asarray(image.convert('RGB'), dtype=np.float32)
+        height, width = arr.shape[:2]
+        if height < 3 or width < 3:
+            return {'font_color_rgb': (0, 0, 0), 'background_rgb': (255, 255, 255),
+                    'confidence': 0.0, 'multi_color': False}
+        
+        # 背景：边缘像素中位数
+        border = np.concatenate([arr[0], arr[-1], arr[:, 0], arr[:, -1]])
+        background = np.median(border, axis=0)
+        border_purity = float((np.linalg.norm(border - background, axis=1) < self.MIN_CONTRAST).mean())
+        
+        pixels = arr.reshape(-1, 3)
+        if len(pixels) > self.max_pixels:
+            pixels = pixels[::int(np.ceil(len(pixels) / self.max_pixels))]
+        
+        bg_distance = np.linalg.norm(pixels - background, axis=1)
+        farthest = pixels[bg_distance.argmax()]
+        centers = np.stack([background, farthest, (background + farthest) / 2])
+        centers, labels = self._kmeans(pixels, centers.copy())
+        
+        center_distance = np.linalg.norm(centers - background, axis=1)
+        counts = np.bincount(labels, minlength=len(centers))
+        fg_clusters = [
+            k for k in range(len(centers))
+            if center_distance[k] >= self.MIN_CONTRAST and counts[k] >= max(3, 0.005 * len(pixels))
+        ]
+        
+        if not fg_clusters:
+            return {'font_color_rgb': tuple(int(v) for v in farthest), 'background_rgb': tuple(int(v) for v in background),
+                    'confidence': 0.1, 'multi_color': False}
+        
+        # 主前景簇：像素最多的簇；取其中离背景最远的30%像素的中位数（排除抗锯齿边缘）
+        primary = max(fg_clusters, key=lambda k: counts[k])
+        members = pixels[labels == primary]
+        member_distance = np.linalg.norm(members - background, axis=1)
+        core = members[member_distance >= np.percentile(member_distance, 70)]
+        font_color = np.median(core, axis=0)
+        
+        # 多颜色检测：另一个前景簇与主色差异大，且不在背景→文字色的连线上
+        multi_color = False
+        axis = font_color - background
+        axis_length = float(np.linalg.norm(axis))
+        for k in fg_clusters:
+            if k == primary or counts[k] < 0.15 * counts[primary]:
+                continue
+            if np.linalg.norm(centers[k] - font_color) < self.MULTI_COLOR_DISTANCE:
+                continue
+            offset = centers[k] - background
+            t = float(offset @ axis) / (axis_length ** 2) if axis_length else 0.0
+            residual = float(np.linalg.norm(offset - t * axis))
+            if not (0.0 < t < 1.0 and residual < self.MIN_CONTRAST):
+                multi_color = True
+        
+        contrast = float(np.linalg.norm(font_color - background))
+        fg_share = sum(counts[k] for k in fg_clusters) / len(pixels)
+        confidence = min(1.0, contrast / 160.0) * border_purity
+        if not 0.01 <= fg_share <= 0.6:
+            confidence *= 0.6
+        if multi_color:
+            confidence = min(confidence, 0.5)
+        
+        return {
+            'font_color_rgb': tuple(int(round(v)) for v in font_color),
+            'background_rgb': tuple(int(round(v)) for v in background),
+            'confidence': round(confidence, 3),
+            'multi_color': multi_color,
+        }
+    
+    def _estimate(self, image: Union[str, Image.Image], bbox: Optional[List[float]] = None) -> Dict[str, Any]:
+        if isinstance(image, str):
+            with Image.open(image) as opened:
+                return self._estimate(opened, bbox)
+        if bbox:
+            image = image.crop(tuple(int(v) for v in bbox))
+        return self.estimate_color(image)
+    
+    def _local_result(self, estimate: Dict[str, Any]) -> TextStyleResult:
+        return TextStyleResult(
+            font_color_rgb=estimate['font_color_rgb'],
+            confidence=estimate['confidence'],
+            metadata={
+                'source': 'local_color',
+                'background_rgb': estimate['background_rgb'],
+                'multi_color': estimate['multi_color'],
+            }
+        )
+    
+    def _should_escalate(self, estimate: Dict[str, Any]) -> bool:
+        return estimate['multi_color'] or estimate['confidence'] < self.min_confidence
+    
+    def extract(
+        self,
+        image: Union[str, Image.Image],
+        text_content: Optional[str] = None,
+        **kwargs
+    ) -> TextStyleResult:
+        """
+        本地估计文字颜色，置信度不足或多颜色时回退到 fallback_extractor
+        
+        Args:
+            image: 文字区域的图像（或整页图像 + bbox）
+            text_content: 文字内容（回退时传给 fallback_extractor）
+            **kwargs:
+                - bbox: [x0, y0, x1, y1]，image 为整页图像时的文字区域（OCR bbox）
+        """
+        try:
+            estimate = self._estimate(image, kwargs.get('bbox'))
+        except Exception as e:
+            logger.warning(f"本地颜色估计失败: {e}")
+            estimate = None
+        
+        if estimate is not None and not self._should_escalate(estimate):
+            self._count(local=1)
+            return self._local_result(estimate)
+        
+        if self.fallback_extractor is None:
+            if estimate is None:
+                return TextStyleResult(confidence=0.0, metadata={'source': 'local_color'})
+            return self._local_result(estimate)
+        
+        self._count(escalated=1)
+        kwargs.pop('bbox', None)
+        return self.fallback_extractor.extract(image, text_content, **kwargs)
+    
+    def extract_batch_contact_sheet(
+        self,
+        items: List[Tuple[str, Union[str, Image.Image], Optional[str]]],
+        **kwargs
+    ) -> Dict[str, TextStyleResult]:
+        """
+        批量识别：本地估计有把握的元素直接返回，其余交给 fallback_extractor 拼图识别
+        
+        fallback_extractor 不支持拼图识别时，其余元素不出现在结果中，由调用方逐个识别。
+        """
+        results = {}
+        uncertain = []
+        for item in items:
+            element_id, image, _ = item
+            try:
+                estimate = self._estimate(image)
+            except Exception as e:
+                logger.warning(f"本地颜色估计失败 [{element_id}]: {e}")
+                estimate = None
+            if estimate is not None and not self._should_escalate(estimate):
+                self._count(local=1)
+                results[element_id] = self._local_result(estimate)
+            else:
+                uncertain.append(item)
+        
+        if uncertain and hasattr(self.fallback_extractor, 'extract_batch_contact_sheet'):
+            self._count(escalated=len(uncertain))
+            results.update(self.fallback_extractor.extract_batch_contact_sheet(uncertain, **kwargs))
+        
+        logger.info(f"本地颜色估计: {len(items) - len(uncertain)}/{len(items)} 个元素无需调用模型")
+        return results
+    
+    def extract_batch_with_full_image(
+        self,
+        full_image: Union[str, Image.Image],
+        text_elements: List[Dict[str, Any]],
+        **kwargs
+    ) -> Dict[str, TextStyleResult]:
+        """布局属性（粗体/斜体/对齐）需要模型看全图，委托给 fallback_extractor"""
+        if not hasattr(self.fallback_extractor, 'extract_batch_with_full_image'):
+            return {}
+        return self.fallback_extractor.extract_batch_with_full_image(full_image, text_elements, **kwargs)
+
 
 class TextAttributeExtractorRegistry:
     """
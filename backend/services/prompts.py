@@ -868,6 +868,48 @@ def get_batch_text_attribute_extraction_prompt(text_elements_json: str) -> str:
     return prompt
 
 
+def get_contact_sheet_text_color_prompt(tiles_json: str) -> str:
+    """
+    生成拼图批量文字颜色识别的 prompt
+    
+    多个文字区域裁剪图纵向拼成一张图，每块左侧标有编号 [n]，
+    让模型一次性识别所有区域的文字和颜色。
+    
+    Args:
+        tiles_json: 拼图块列表的 JSON 字符串，每项包含：
+            - id: 拼图块编号（与图中标注一致）
+            - content: OCR 识别的文字内容（参考）
+    
+    Returns:
+        格式化后的 prompt 字符串
+    """
+    prompt = f"""这张图片由多个文字区域纵向拼接而成，每个区域左侧标有编号 [n]，区域之间用灰色分隔线隔开。
+
+各区域的 OCR 文字内容（仅供参考，以图片为准）：
+
+```json
+{tiles_json}
+```
+
+请逐个区域精确识别：
+1. **文字内容** - 输出你实际看到的文字符号，精确保留空格
+2. **颜色** - 每个字/词的实际颜色，一行文字可能有多种颜色，按颜色分割成片段
+3. **公式** - 如果片段是数学公式，设置 is_latex=true 并用 LaTeX 格式输出
+
+相同颜色的相邻普通文字应合并为一个片段。不要输出编号标签本身。
+
+只返回JSON数组，每个区域一项，不要包含任何其他文字。
+示例输出：
+```json
+[
+    {{"id": 0, "colored_segments": [{{"text": "标题文字", "color": "#26397A"}}]}},
+    {{"id": 1, "colored_segments": [{{"text": "普通", "color": "#000000"}}, {{"text": "强调", "color": "#FF0000"}}]}}
+]
+```
+"""
+    return prompt
+
+
 def get_quality_enhancement_prompt(inpainted_regions: list = None) -> str:
     """
     生成画质提升的 prompt
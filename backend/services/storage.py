@@ -0,0 +1,428 @@
+"""
+文件存储后端 - 本地磁盘与 S3 兼容对象存储（AWS S3 / MinIO / Cloudflare R2 等）
+
+对象以相对 UPLOAD_FOLDER 的路径作为 key（如 <project_id>/pages/<page_id>_v3.png），
+与数据库中保存的相对路径和 /files/ URL 一一对应。
+
+- local（默认）：文件就在 UPLOAD_FOLDER 中，行为与之前一致
+- s3：对象存储是所有后端副本共享的数据源；UPLOAD_FOLDER 只是本副本的工作目录/缓存。
+  FileService 写入本地后上传（publish），本地不存在时按需从对象存储下载（fetch），
+  因此依赖本地路径的代码（PIL、python-pptx、导出）无需改动，多个无状态副本可以共享产物。
+  固定文件名的文件（模板、导出）会被原地覆盖，本地副本使用前按对象的 ETag 重新校验。
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+from flask import current_app, has_app_context
+from werkzeug.security import safe_join
+
+from .thumbnails import is_immutable
+
+logger = logging.getLogger(__name__)
+
+# stream() 默认分块大小
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# 本副本中可变文件的本地副本对应的对象 ETag（绝对路径 -> ETag），超出上限时淘汰最久未用的记录
+LOCAL_ETAG_CACHE_SIZE = 4096
+
+_s3_storage_lock = threading.Lock()
+_local_etags: "OrderedDict[str, str]" = OrderedDict()
+_local_etags_lock = threading.Lock()
+
+
+class Storage(ABC):
+    """存储后端接口，key 为使用 / 分隔的相对路径"""
+
+    # 文件是否直接保存在 UPLOAD_FOLDER 中（无需上传/下载）
+    is_local = False
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        """写入对象（覆盖已有对象）"""
+        pass
+
+    @abstractmethod
+    def put_file(self, key: str, path: Union[str, Path], content_type: Optional[str] = None) -> None:
+        """上传本地文件为对象"""
+        pass
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        """读取对象内容，不存在时抛出 FileNotFoundError"""
+        pass
+
+    @abstractmethod
+    def stream(self, key: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """分块读取对象内容，不存在时抛出 FileNotFoundError"""
+        pass
+
+    @abstractmethod
+    def download(self, key: str, path: Union[str, Path]) -> bool:
+        """下载对象到本地路径（原子替换），对象不存在时返回 False"""
+        pass
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """对象是否存在"""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """删除对象，返回是否删除了已存在的对象（对象存储可能无法区分，返回 True）"""
+        pass
+
+    @abstractmethod
+    def list(self, prefix: str) -> List[str]:
+        """列出以 prefix 开头的所有 key"""
+        pass
+
+    def delete_prefix(self, prefix: str) -> int:
+        """删除以 prefix 开头的所有对象，返回删除数量"""
+        keys = self.list(prefix)
+        for key in keys:
+            self.delete(key)
+        return len(keys)
+
+    def presign(self, key: str, expires_in: int = 3600) -> Optional[str]:
+        """生成有时效的直接下载 URL；不支持时返回 None（由 /files 接口提供）"""
+        return None
+
+    def etag(self, key: str) -> Optional[str]:
+        """对象当前内容的标识（内容变化时改变），对象不存在或不支持时返回 None"""
+        return None
+
+
+def _atomic_copy(source: Union[str, Path], target: Path) -> None:
+    """复制文件：先写临时文件再 os.replace，读者不会看到写了一半的文件"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix='.tmp-', suffix=target.suffix)
+    os.close(fd)
+    try:
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _same_file(a: Union[str, Path], b: Union[str, Path]) -> bool:
+    return os.path.abspath(a) == os.path.abspath(b)
+
+
+class LocalStorage(Storage):
+    """本地磁盘存储：key 对应 root 下的文件"""
+
+    is_local = True
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        """key 对应的本地路径；拒绝越出 root 的 key"""
+        path = safe_join(str(self.root), key)
+        if path is None:
+            raise ValueError(f"Invalid storage key: {key}")
+        return Path(path)
+
+    def put(self, key, data, content_type=None):
+        target = self.path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix='.tmp-', suffix=target.suffix)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def put_file(self, key, path, content_type=None):
+        target = self.path(key)
+        if not _same_file(path, target):
+            _atomic_copy(path, target)
+
+    def get(self, key):
+        return self.path(key).read_bytes()
+
+    def stream(self, key, chunk_size=STREAM_CHUNK_SIZE):
+        with open(self.path(key), 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def download(self, key, path):
+        source = self.path(key)
+        if not source.is_file():
+            return False
+        if not _same_file(source, path):
+            _atomic_copy(source, Path(path))
+        return True
+
+    def exists(self, key):
+        try:
+            return self.path(key).is_file()
+        except ValueError:
+            return False
+
+    def delete(self, key):
+        path = self.path(key)
+        if path.is_file():
+            path.unlink()
+            return True
+        return False
+
+    def list(self, prefix):
+        base = self.path(prefix.rsplit('/', 1)[0]) if '/' in prefix else self.root
+        if not base.is_dir():
+            return []
+        keys = []
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                key = Path(dirpath, filename).relative_to(self.root).as_posix()
+                if key.startswith(prefix):
+                    keys.append(key)
+        return sorted(keys)
+
+
+def _is_not_found(error: Exception) -> bool:
+    """botocore ClientError 是否表示对象不存在（不直接依赖 botocore）"""
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+    return code in ('404', 'NoSuchKey', 'NotFound')
+
+
+class S3Storage(Storage):
+    """
+    S3 兼容对象存储（需要安装 boto3；MinIO 等通过 endpoint_url 指定）
+
+    Args:
+        bucket: 存储桶
+        prefix: key 前缀（多个部署共用一个桶时区分），如 'banana-slides/'
+        endpoint_url: S3 兼容服务地址，AWS S3 留空
+        region / access_key_id / secret_access_key: 留空时使用 boto3 默认凭证链
+        client: 已创建的 S3 客户端（测试或自定义配置时传入）
+    """
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key_id: Optional[str] = None,
+                 secret_access_key: Optional[str] = None, client=None):
+        if not bucket:
+            raise ValueError("S3_BUCKET is required for the s3 storage backend")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self._client = client
+        self._client_kwargs = {
+            'endpoint_url': endpoint_url or None,
+            'region_name': region or None,
+            'aws_access_key_id': access_key_id or None,
+            'aws_secret_access_key': secret_access_key or None,
+        }
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """S3 客户端（首次使用时创建；boto3 客户端是线程安全的，所有线程共享）"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    try:
+                        import boto3
+                    except ImportError as e:
+                        raise RuntimeError("STORAGE_BACKEND=s3 需要安装 boto3（pip install boto3）") from e
+                    self._client = boto3.client('s3', **self._client_kwargs)
+        return self._client
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key.lstrip('/')
+
+    def put(self, key, data, content_type=None):
+        extra = {'ContentType': content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, **extra)
+
+    def put_file(self, key, path, content_type=None):
+        # upload_file 对大文件自动使用分片上传
+        extra = {'ExtraArgs': {'ContentType': content_type}} if content_type else {}
+        self.client.upload_file(str(path), self.bucket, self._key(key), **extra)
+
+    def _get_body(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+        except Exception as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+    def get(self, key):
+        body = self._get_body(key)
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def stream(self, key, chunk_size=STREAM_CHUNK_SIZE):
+        body = self._get_body(key)
+        try:
+            while True:
+                chunk = body.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    def download(self, key, path):
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix='.tmp-', suffix=target.suffix)
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, self._key(key), tmp_path)
+            os.replace(tmp_path, target)
+            return True
+        except Exception as e:
+            if _is_not_found(e):
+                return False
+            raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def etag(self, key):
+        head = self._head(key)
+        return head.get('ETag') if head is not None else None
+
+    def _head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return True
+
+    def list(self, prefix):
+        keys = []
+        kwargs = {'Bucket': self.bucket, 'Prefix': self._key(prefix)}
+        while True:
+            response = self.client.list_objects_v2(**kwargs)
+            keys.extend(item['Key'][len(self.prefix):] for item in response.get('Contents', []))
+            if not response.get('IsTruncated'):
+                return keys
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+    def delete_prefix(self, prefix):
+        keys = self.list(prefix)
+        # DeleteObjects 每次最多 1000 个
+        for start in range(0, len(keys), 1000):
+            batch = keys[start:start + 1000]
+            self.client.delete_objects(Bucket=self.bucket, Delete={
+                'Objects': [{'Key': self._key(key)} for key in batch], 'Quiet': True
+            })
+        return len(keys)
+
+    def presign(self, key, expires_in=3600):
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': self._key(key)}, ExpiresIn=expires_in
+        )
+
+
+def _remember_etag(path: Path, etag: str) -> None:
+    with _local_etags_lock:
+        _local_etags[str(path)] = etag
+        _local_etags.move_to_end(str(path))
+        while len(_local_etags) > LOCAL_ETAG_CACHE_SIZE:
+            _local_etags.popitem(last=False)
+
+
+def is_local_copy_current(storage: Storage, key: str, path: Union[str, Path]) -> bool:
+    """
+    本地文件是否是对象 key 的最新副本
+
+    带版本号/时间戳的文件内容不会改变，存在即为最新；固定文件名的文件可能已被其他副本
+    覆盖，只有本副本记录的 ETag 与对象当前 ETag 一致时才是最新（进程重启后重新下载一次）。
+    """
+    path = Path(path).absolute()
+    if not path.is_file():
+        return False
+    if storage.is_local or is_immutable(path.name):
+        return True
+    etag = storage.etag(key)
+    with _local_etags_lock:
+        return etag is not None and _local_etags.get(str(path)) == etag
+
+
+def fetch_local_copy(storage: Storage, key: str, path: Union[str, Path]) -> bool:
+    """
+    确保 path 是对象 key 的最新本地副本（过期或缺失时下载），返回本地文件是否存在
+
+    对象不存在时保留已有的本地文件（如刚写入、尚未上传的文件）。
+    """
+    path = Path(path).absolute()
+    if is_local_copy_current(storage, key, path):
+        return True
+    etag = None if is_immutable(path.name) else storage.etag(key)
+    if storage.download(key, path):
+        if etag is not None:
+            _remember_etag(path, etag)
+        return True
+    return path.is_file()
+
+
+def record_local_copy(storage: Storage, key: str, path: Union[str, Path]) -> None:
+    """上传本地文件后记录对象的 ETag，本副本之后无需重新下载自己写入的文件"""
+    path = Path(path).absolute()
+    if storage.is_local or is_immutable(path.name):
+        return
+    etag = storage.etag(key)
+    if etag is not None:
+        _remember_etag(path, etag)
+
+
+def get_storage(upload_folder: Optional[Union[str, Path]] = None) -> Storage:
+    """
+    按 STORAGE_BACKEND 配置返回存储后端
+
+    local 模式返回以 upload_folder（默认 UPLOAD_FOLDER）为根的 LocalStorage；
+    s3 模式在应用内共享一个 S3Storage（保存在 app.extensions['storage']）。
+    没有应用上下文时使用本地存储。
+    """
+    from config import Config
+
+    if has_app_context() and current_app.config.get('STORAGE_BACKEND', 'local') == 's3':
+        storage = current_app.extensions.get('storage')
+        if storage is None:
+            with _s3_storage_lock:
+                storage = current_app.extensions.get('storage')
+                if storage is None:
+                    config = current_app.config
+                    storage = S3Storage(
+                        bucket=config.get('S3_BUCKET', ''),
+                        prefix=config.get('S3_PREFIX', ''),
+                        endpoint_url=config.get('S3_ENDPOINT_URL'),
+                        region=config.get('S3_REGION'),
+                        access_key_id=config.get('S3_ACCESS_KEY_ID'),
+                        secret_access_key=config.get('S3_SECRET_ACCESS_KEY'),
+                    )
+                    current_app.extensions['storage'] = storage
+        return storage
+
+    if upload_folder is None:
+        upload_folder = current_app.config['UPLOAD_FOLDER'] if has_app_context() else Config.UPLOAD_FOLDER
+    return LocalStorage(upload_folder)
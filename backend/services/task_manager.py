@@ -3,14 +3,23 @@ Task Manager - handles background tasks using ThreadPoolExecutor
 No need for Celery or Redis, uses in-memory task tracking
 """
 import logging
+import math
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from typing import Callable, List, Dict, Any
 from datetime import datetime
-from sqlalchemy import func
 from models import db, Task, Page, Material, PageImageVersion
-from utils import get_filtered_pages
+from utils import (
+    get_filtered_pages, bulk_update_pages, allocate_image_version, switch_current_image_version
+)
 from pathlib import Path
+from config import Config
+from services.cancellation import (
+    CancellationToken, DeadlineExceededError, TaskCancelledError,
+    as_completed_or_cancelled, bind_cancel_token, cancellable_executor
+)
+from services.hedging import RequestHedger
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +31,15 @@ class TaskManager:
         """Initialize task manager"""
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
         self.active_tasks = {}  # task_id -> Future
+        self.cancel_tokens = {}  # task_id -> CancellationToken
         self.lock = threading.Lock()
     
     def submit_task(self, task_id: str, func: Callable, *args, **kwargs):
         """Submit a background task"""
+        # Register the token before the task can start so it always finds it
+        with self.lock:
+            self.cancel_tokens[task_id] = CancellationToken(task_id)
+        
         future = self.executor.submit(func, task_id, *args, **kwargs)
         
         with self.lock:
@@ -37,6 +51,9 @@ class TaskManager:
     def _task_done_callback(self, task_id: str, future):
         """Handle task completion and log any exceptions"""
         try:
+            if future.cancelled():
+                logger.info(f"Task {task_id} was cancelled before it started")
+                return
             # Check if task raised an exception
             exception = future.exception()
             if exception:
@@ -51,19 +68,62 @@ class TaskManager:
         with self.lock:
             if task_id in self.active_tasks:
                 del self.active_tasks[task_id]
+            self.cancel_tokens.pop(task_id, None)
     
     def is_task_active(self, task_id: str) -> bool:
         """Check if task is still running"""
         with self.lock:
             return task_id in self.active_tasks
     
+    def get_cancel_token(self, task_id: str) -> CancellationToken:
+        """Get the cancellation token of a task (a fresh one if the task is not managed here)"""
+        with self.lock:
+            token = self.cancel_tokens.get(task_id)
+        return token or CancellationToken(task_id)
+    
+    def cancel_task(self, task_id: str) -> bool:
+        """
+        Request cancellation of a task
+        
+        A queued task is removed from the queue; a running task stops at its
+        next checkpoint (between pages / before each provider call) and marks
+        itself CANCELLED.
+        
+        Returns:
+            True if the task is still running and will mark itself CANCELLED,
+            False if it never started or is not managed by this process
+        """
+        with self.lock:
+            token = self.cancel_tokens.get(task_id)
+            future = self.active_tasks.get(task_id)
+        if token:
+            token.cancel()
+        if future is None:
+            return False
+        if future.cancel():
+            logger.info(f"Task {task_id} cancelled before it started")
+            return False
+        logger.info(f"Task {task_id} cancellation requested")
+        return True
+    
     def shutdown(self):
         """Shutdown the executor"""
         self.executor.shutdown(wait=True)
 
 
 # Global task manager instance
-task_manager = TaskManager(max_workers=4)
+task_manager = TaskManager(max_workers=Config.MAX_TASK_WORKERS)
+
+
+def _mark_task_cancelled(task_id: str):
+    """Mark a task CANCELLED (must be called inside the task's app context)"""
+    db.session.rollback()
+    task = Task.query.get(task_id)
+    if task:
+        task.status = 'CANCELLED'
+        task.completed_at = datetime.utcnow()
+        db.session.commit()
+    logger.info(f"Task {task_id} CANCELLED")
 
 
 def save_image_with_version(image, project_id: str, page_id: str, file_service, 
@@ -83,18 +143,17 @@ def save_image_with_version(image, project_id: str, page_id: str, file_service,
         tuple: (image_path, version_number) - 图片路径和版本号
     
     这个函数会：
-    1. 计算下一个版本号（使用 MAX 查询确保安全）
-    2. 标记所有旧版本为非当前版本
-    3. 保存图片到最终位置
-    4. 创建新版本记录
-    5. 如果提供了 page_obj，更新页面状态和图片路径
+    1. 原子分配下一个版本号（pages.image_version_counter 自增，UPDATE ... RETURNING）并立即提交
+    2. 保存图片到最终位置（不持有事务和行锁）
+    3. 创建新版本记录，并用单条 UPDATE 切换当前版本
+    4. 如果提供了 page_obj，更新页面状态和图片路径
+    同一页面并发生成时版本号也不会重复；分配后未保存成功的版本号不会复用
     """
-    # 使用 MAX 查询确保版本号安全（即使有版本被删除也不会重复）
-    max_version = db.session.query(func.max(PageImageVersion.version_number)).filter_by(page_id=page_id).scalar() or 0
-    next_version = max_version + 1
-    
-    # 批量更新：标记所有旧版本为非当前版本（使用单条 SQL 更高效）
-    PageImageVersion.query.filter_by(page_id=page_id).update({'is_current': False})
+    next_version = allocate_image_version(page_id)
+    if next_version is None:
+        raise ValueError(f"Page {page_id} not found")
+    # 立即提交释放页面行锁（SQLite 为写锁），编码/保存图片期间不阻塞其他写入
+    db.session.commit()
     
     # 保存图片到最终位置（使用版本号）
     image_path = file_service.save_generated_image(
@@ -103,14 +162,16 @@ def save_image_with_version(image, project_id: str, page_id: str, file_service,
         image_format=image_format
     )
     
-    # 创建新版本记录
+    # 创建新版本记录，再切换为当前版本（单条 SQL）
     new_version = PageImageVersion(
         page_id=page_id,
         image_path=image_path,
         version_number=next_version,
-        is_current=True
+        is_current=False
     )
     db.session.add(new_version)
+    db.session.flush()
+    switch_current_image_version(page_id, new_version.id)
     
     # 如果提供了 page_obj，更新页面状态和图片路径
     if page_obj:
@@ -222,31 +283,51 @@ def generate_descriptions_task(task_id: str, project_id: str, ai_service,
                     for i, (page, page_data) in enumerate(zip(pages, pages_data), 1)
                 ]
                 
+                # Finished pages are buffered and written together with the task
+                # progress in one transaction at most every PAGE_WRITE_BATCH_INTERVAL
+                # (also while waiting on a slow page, so finished ones show up in time)
+                write_interval = app.config.get('PAGE_WRITE_BATCH_INTERVAL', 1.0)
+                pending_updates = []
+                last_flush = time.monotonic()
+                
+                def flush_updates():
+                    bulk_update_pages(pending_updates)
+                    task = Task.query.get(task_id)
+                    if task:
+                        task.update_progress(completed=completed, failed=failed)
+                    db.session.commit()
+                    pending_updates.clear()
+                    logger.info(f"Description Progress: {completed}/{len(pages)} pages completed")
+                
                 # Process results as they complete
-                for future in as_completed(futures):
-                    page_id, desc_content, error = future.result()
+                not_done = set(futures)
+                while not_done:
+                    timeout = None
+                    if pending_updates:
+                        timeout = max(0.0, write_interval - (time.monotonic() - last_flush))
+                    done, not_done = wait(not_done, timeout=timeout, return_when=FIRST_COMPLETED)
                     
-                    db.session.expire_all()
-                    
-                    # Update page in database
-                    page = Page.query.get(page_id)
-                    if page:
+                    for future in done:
+                        page_id, desc_content, error = future.result()
+                        
                         if error:
-                            page.status = 'FAILED'
+                            pending_updates.append({'id': page_id, 'status': 'FAILED'})
                             failed += 1
                         else:
-                            page.set_description_content(desc_content)
-                            page.status = 'DESCRIPTION_GENERATED'
+                            pending_updates.append({
+                                'id': page_id,
+                                'description_content': desc_content,
+                                'status': 'DESCRIPTION_GENERATED',
+                            })
                             completed += 1
-                        
-                        db.session.commit()
                     
-                    # Update task progress
-                    task = Task.query.get(task_id)
-                    if task:
-                        task.update_progress(completed=completed, failed=failed)
-                        db.session.commit()
-                        logger.info(f"Description Progress: {completed}/{len(pages)} pages completed")
+                    if pending_updates and time.monotonic() - last_flush >= write_interval:
+                        flush_updates()
+                        last_flush = time.monotonic()
+                
+                if pending_updates:
+                    flush_updates()
+                db.session.expire_all()
             
             # Mark task as completed
             task = Task.query.get(task_id)
@@ -265,7 +346,8 @@ def generate_descriptions_task(task_id: str, project_id: str, ai_service,
                 logger.info(f"Project {project_id} status updated to DESCRIPTIONS_GENERATED")
         
         except Exception as e:
-            # Mark task as failed
+            # Mark task as failed (discard the failed transaction first)
+            db.session.rollback()
             task = Task.query.get(task_id)
             if task:
                 task.status = 'FAILED'
@@ -290,11 +372,27 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
     Args:
         language: Output language (zh, en, ja, auto)
         page_ids: Optional list of page IDs to generate (if not provided, generates all pages)
+    
+    Cancellation is checked before each page starts and right before the image
+    provider call; on cancel, queued pages are dropped and in-flight pages are
+    no longer waited for.
+    
+    The task runs under a time budget (TASK_DEADLINE_GENERATE_IMAGES): provider
+    timeouts shrink to the remaining budget, and pages that have not started
+    when it runs out are marked FAILED instead of being generated.
+    
+    With IMAGE_HEDGING_ENABLED, a page whose provider call outlasts the pNN
+    latency of already finished pages gets one duplicate request and keeps
+    whichever finishes first (capped per task); the hedging stats are stored
+    in the task progress.
     """
     if app is None:
         raise ValueError("Flask app instance must be provided")
     
-    with app.app_context():
+    cancel_token = task_manager.get_cancel_token(task_id)
+    cancel_token.start_budget(app.config.get('TASK_DEADLINE_GENERATE_IMAGES'))
+    
+    with app.app_context(), bind_cancel_token(cancel_token):
         try:
             # Update task status to PROCESSING
             task = Task.query.get(task_id)
@@ -323,6 +421,16 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
             completed = 0
             failed = 0
             
+            hedger = None
+            if app.config.get('IMAGE_HEDGING_ENABLED') and len(pages) > 1:
+                hedger = RequestHedger(
+                    max_workers,
+                    max_extra_requests=math.ceil(len(pages) * app.config.get('IMAGE_HEDGE_MAX_EXTRA_RATIO', 0.2)),
+                    percentile=app.config.get('IMAGE_HEDGE_PERCENTILE', 0.9),
+                    min_samples=app.config.get('IMAGE_HEDGE_MIN_SAMPLES', 3),
+                    cancel_token=cancel_token
+                )
+            
             def generate_single_image(page_id, page_data, page_index):
                 """
                 Generate image for a single page
@@ -330,7 +438,12 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
                 """
                 # 关键修复：在子线程中也需要应用上下文
                 with app.app_context():
+                    previous_status = None
                     try:
+                        cancel_token.raise_if_cancelled()
+                        remaining = cancel_token.remaining()
+                        if remaining is not None and remaining <= 0:
+                            raise DeadlineExceededError(task_id)
                         logger.debug(f"Starting image generation for page {page_id}, index {page_index}")
                         # Get page from database in this thread
                         page_obj = Page.query.get(page_id)
@@ -338,6 +451,7 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
                             raise ValueError(f"Page {page_id} not found")
                         
                         # Update page status
+                        previous_status = page_obj.status
                         page_obj.status = 'GENERATING'
                         db.session.commit()
                         logger.debug(f"Page {page_id} status updated to GENERATING")
@@ -388,12 +502,15 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
                         )
                         logger.debug(f"Generated image prompt for page {page_id}")
                         
-                        # Generate image
+                        # Generate image (last checkpoint before the paid call)
+                        cancel_token.raise_if_cancelled()
                         logger.info(f"🎨 Calling AI service to generate image for page {page_index}/{len(pages)}...")
-                        image = ai_service.generate_image(
-                            prompt, page_ref_image_path, aspect_ratio, resolution,
-                            additional_ref_images=page_additional_ref_images if page_additional_ref_images else None
-                        )
+                        def request_image():
+                            return ai_service.generate_image(
+                                prompt, page_ref_image_path, aspect_ratio, resolution,
+                                additional_ref_images=page_additional_ref_images if page_additional_ref_images else None
+                            )
+                        image = hedger.call(request_image) if hedger else request_image()
                         logger.info(f"✅ Image generated successfully for page {page_index}")
                         
                         if not image:
@@ -406,50 +523,79 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
                         )
                         
                         return (page_id, image_path, None)
+                    
+                    except TaskCancelledError:
+                        # 未调用生成接口就取消：恢复页面原状态
+                        if previous_status is not None:
+                            db.session.rollback()
+                            page_obj = Page.query.get(page_id)
+                            if page_obj:
+                                page_obj.status = previous_status
+                                db.session.commit()
+                        raise
                         
                     except Exception as e:
                         import traceback
                         error_detail = traceback.format_exc()
                         logger.error(f"Failed to generate image for page {page_id}: {error_detail}")
+                        # 任务取消后主线程不再读取结果，在这里直接标记失败，避免页面停留在 GENERATING
+                        if previous_status is not None:
+                            try:
+                                db.session.rollback()
+                                page_obj = Page.query.get(page_id)
+                                if page_obj and page_obj.status == 'GENERATING':
+                                    page_obj.status = 'FAILED'
+                                    db.session.commit()
+                            except Exception:
+                                db.session.rollback()
+                                logger.warning(f"Failed to mark page {page_id} FAILED", exc_info=True)
                         return (page_id, None, str(e))
             
             # Use ThreadPoolExecutor for parallel generation
             # 关键：提前提取 page.id，不要传递 ORM 对象到子线程
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [
-                    executor.submit(generate_single_image, page.id, page_data, i)
-                    for i, (page, page_data) in enumerate(zip(pages, pages_data), 1)
-                ]
+            try:
+                with cancellable_executor(max_workers) as executor:
+                    futures = [
+                        executor.submit(generate_single_image, page.id, page_data, i)
+                        for i, (page, page_data) in enumerate(zip(pages, pages_data), 1)
+                    ]
                 
-                # Process results as they complete
-                for future in as_completed(futures):
-                    page_id, image_path, error = future.result()
+                    # Process results as they complete (raises TaskCancelledError on cancel)
+                    for future in as_completed_or_cancelled(futures, cancel_token):
+                        page_id, image_path, error = future.result()
                     
-                    db.session.expire_all()
+                        db.session.expire_all()
                     
-                    # Update page in database (主要是为了更新失败状态)
-                    page = Page.query.get(page_id)
-                    if page:
-                        if error:
-                            page.status = 'FAILED'
-                            failed += 1
-                            db.session.commit()
-                        else:
-                            # 图片已在子线程中保存并创建版本记录，这里只需要更新计数
-                            completed += 1
-                            # 刷新页面对象以获取最新状态
-                            db.session.refresh(page)
+                        # Update page in database (主要是为了更新失败状态)
+                        page = Page.query.get(page_id)
+                        if page:
+                            if error:
+                                page.status = 'FAILED'
+                                failed += 1
+                                db.session.commit()
+                            else:
+                                # 图片已在子线程中保存并创建版本记录，这里只需要更新计数
+                                completed += 1
+                                # 刷新页面对象以获取最新状态
+                                db.session.refresh(page)
                     
-                    # Update task progress
-                    task = Task.query.get(task_id)
-                    if task:
-                        task.update_progress(completed=completed, failed=failed)
-                        db.session.commit()
-                        logger.info(f"Image Progress: {completed}/{len(pages)} pages completed")
+                        # Update task progress
+                        task = Task.query.get(task_id)
+                        if task:
+                            task.update_progress(completed=completed, failed=failed)
+                            db.session.commit()
+                            logger.info(f"Image Progress: {completed}/{len(pages)} pages completed")
+            finally:
+                if hedger:
+                    hedger.shutdown()
             
             # Mark task as completed
             task = Task.query.get(task_id)
             if task:
+                if hedger:
+                    hedging_stats = hedger.stats()
+                    task.set_progress({'hedging': hedging_stats})
+                    logger.info(f"Task {task_id} hedging stats: {hedging_stats}")
                 task.status = 'COMPLETED'
                 task.completed_at = datetime.utcnow()
                 db.session.commit()
@@ -463,6 +609,16 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
                 db.session.commit()
                 logger.info(f"Project {project_id} status updated to COMPLETED")
         
+        except TaskCancelledError:
+            _mark_task_cancelled(task_id)
+            # The controller set GENERATING_IMAGES when starting the task; go back
+            # to the state image generation can be started from again
+            from models import Project
+            project = Project.query.get(project_id)
+            if project and project.status == 'GENERATING_IMAGES':
+                project.status = 'DESCRIPTIONS_GENERATED'
+                db.session.commit()
+        
         except Exception as e:
             # Mark task as failed
             task = Task.query.get(task_id)
@@ -842,7 +998,11 @@ def export_editable_pptx_with_recursive_analysis_task(
     if app is None:
         raise ValueError("Flask app instance must be provided")
     
-    with app.app_context():
+    cancel_token = task_manager.get_cancel_token(task_id)
+    # 时间预算：传递到每次 Provider 调用，剩余时间不足时降级，保证导出在有限时间内完成
+    cancel_token.start_budget(app.config.get('TASK_DEADLINE_EXPORT'))
+    
+    with app.app_context(), bind_cancel_token(cancel_token):
         import os
         from datetime import datetime
         from PIL import Image
@@ -874,44 +1034,25 @@ def export_editable_pptx_with_recursive_analysis_task(
             
             logger.info(f"找到 {len(image_paths)} 张图片")
             
-            # 初始化任务进度（包含消息日志）
+            # 初始化任务进度（消息日志写入 task_messages 表）
             task = Task.query.get(task_id)
             task.set_progress({
                 "total": 100,  # 使用百分比
                 "completed": 0,
                 "failed": 0,
                 "current_step": "准备中...",
-                "percent": 0,
-                "messages": ["🚀 开始导出可编辑PPTX..."]  # 消息日志
+                "percent": 0
             })
+            task.add_message("🚀 开始导出可编辑PPTX...")
             db.session.commit()
             
-            # 进度回调函数 - 更新数据库中的进度
-            progress_messages = ["🚀 开始导出可编辑PPTX..."]
-            max_messages = 10  # 最多保留最近10条消息
-            
             def progress_callback(step: str, message: str, percent: int):
-                """更新任务进度到数据库"""
-                nonlocal progress_messages
+                """更新任务进度到数据库（只更新计数列并追加一条消息，不重写整个进度）"""
                 try:
-                    # 添加新消息到日志
-                    new_message = f"[{step}] {message}"
-                    progress_messages.append(new_message)
-                    # 只保留最近的消息
-                    if len(progress_messages) > max_messages:
-                        progress_messages = progress_messages[-max_messages:]
-                    
-                    # 更新数据库
                     task = Task.query.get(task_id)
                     if task:
-                        task.set_progress({
-                            "total": 100,
-                            "completed": percent,
-                            "failed": 0,
-                            "current_step": message,
-                            "percent": percent,
-                            "messages": progress_messages.copy()
-                        })
+                        task.update_progress(completed=percent, current_step=message, percent=percent)
+                        task.add_message(f"[{step}] {message}")
                         db.session.commit()
                 except Exception as e:
                     logger.warning(f"更新进度失败: {e}")
@@ -929,7 +1070,7 @@ def export_editable_pptx_with_recursive_analysis_task(
                 filename += '.pptx'
             
             output_path = os.path.join(exports_dir, filename)
-            if os.path.exists(output_path):
+            if file_service.file_exists(f"{project_id}/exports/{filename}"):
                 base_name = filename.rsplit('.', 1)[0]
                 timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
                 filename = f"{base_name}_{timestamp}.pptx"
@@ -948,6 +1089,11 @@ def export_editable_pptx_with_recursive_analysis_task(
             # Step 2: 创建文字属性提取器
             from services.image_editability import TextAttributeExtractorFactory
             text_attribute_extractor = TextAttributeExtractorFactory.create_caption_model_extractor()
+            if app.config.get('TEXT_STYLE_LOCAL_COLOR', True):
+                # 单色文字本地估计颜色，低置信度或多颜色时才调用模型
+                text_attribute_extractor = TextAttributeExtractorFactory.create_local_color_extractor(
+                    fallback_extractor=text_attribute_extractor
+                )
             progress_callback("准备", "文字属性提取器已初始化", 5)
             
             # Step 3: 调用导出方法（使用项目的导出设置）
@@ -964,35 +1110,36 @@ def export_editable_pptx_with_recursive_analysis_task(
                 text_attribute_extractor=text_attribute_extractor,
                 progress_callback=progress_callback,
                 export_extractor_method=export_extractor_method,
-                export_inpaint_method=export_inpaint_method
+                export_inpaint_method=export_inpaint_method,
+                cancel_token=cancel_token
             )
             
             logger.info(f"✓ 可编辑PPTX已创建: {output_path}")
+            file_service.publish_file(output_path)
             
             # Step 4: 标记任务完成
             download_path = f"/files/{project_id}/exports/{filename}"
             
-            # 添加完成消息
-            progress_messages.append("✅ 导出完成！")
-            
-            # 添加警告信息（如果有）
+            # 警告信息（如果有）
             warning_messages = []
             if export_warnings and export_warnings.has_warnings():
                 warning_messages = export_warnings.to_summary()
-                progress_messages.extend(warning_messages)
                 logger.warning(f"导出有 {len(warning_messages)} 条警告")
             
             task = Task.query.get(task_id)
             if task:
                 task.status = 'COMPLETED'
                 task.completed_at = datetime.utcnow()
+                # 添加完成消息和警告
+                task.add_message("✅ 导出完成！")
+                for warning_message in warning_messages:
+                    task.add_message(warning_message)
                 task.set_progress({
                     "total": 100,
                     "completed": 100,
                     "failed": 0,
                     "current_step": "✓ 导出完成",
                     "percent": 100,
-                    "messages": progress_messages,
                     "download_url": download_path,
                     "filename": filename,
                     "method": "recursive_analysis",
@@ -1003,6 +1150,9 @@ def export_editable_pptx_with_recursive_analysis_task(
                 db.session.commit()
                 logger.info(f"✓ 任务 {task_id} 完成 - 递归分析导出成功（深度={max_depth}）")
         
+        except TaskCancelledError:
+            _mark_task_cancelled(task_id)
+        
         except Exception as e:
             import traceback
             error_detail = traceback.format_exc()
@@ -1053,7 +1203,10 @@ def export_editable_pptx_img2slides_task(
     if app is None:
         raise ValueError("Flask app instance must be provided")
 
-    with app.app_context():
+    cancel_token = task_manager.get_cancel_token(task_id)
+    cancel_token.start_budget(app.config.get('TASK_DEADLINE_EXPORT'))
+
+    with app.app_context(), bind_cancel_token(cancel_token):
         import os
         import time
         from datetime import datetime
@@ -1086,6 +1239,7 @@ def export_editable_pptx_img2slides_task(
                 """分析单张图片"""
                 last_error = None
                 for attempt in range(1, max_attempts + 1):
+                    cancel_token.raise_if_cancelled()
                     try:
                         structure = analyze_image(
                             image_path=Path(path),
@@ -1099,6 +1253,10 @@ def export_editable_pptx_img2slides_task(
                         return idx, structure, None
                     except Exception as e:
                         last_error = e
+                        remaining = cancel_token.remaining()
+                        if remaining is not None and remaining <= 0:
+                            # 时间预算已用完，不再重试
+                            break
                         if attempt < max_attempts:
                             logger.warning(
                                 f"图片 {idx} 分析失败 (attempt {attempt}/{max_attempts}): {e}"
@@ -1110,13 +1268,13 @@ def export_editable_pptx_img2slides_task(
                 f"开始并行分析 {len(image_paths)} 张图片 (max_workers={max_workers}, attempts={max_attempts})"
             )
 
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            with cancellable_executor(max_workers) as executor:
                 futures = {
                     executor.submit(analyze_single, i, p): i
                     for i, p in enumerate(image_paths)
                 }
 
-                for future in as_completed(futures):
+                for future in as_completed_or_cancelled(futures, cancel_token):
                     idx, structure, error = future.result()
 
                     if error:
@@ -1130,12 +1288,10 @@ def export_editable_pptx_img2slides_task(
                     # 更新进度
                     task = Task.query.get(task_id)
                     if task:
-                        task.set_progress({
-                            "total": len(image_paths),
-                            "completed": completed,
-                            "failed": failed,
-                            "current_step": f"分析幻灯片 {completed + failed}/{len(image_paths)}"
-                        })
+                        task.update_progress(
+                            completed=completed, failed=failed,
+                            current_step=f"分析幻灯片 {completed + failed}/{len(image_paths)}"
+                        )
                         db.session.commit()
 
             # 检查是否有失败
@@ -1152,12 +1308,7 @@ def export_editable_pptx_img2slides_task(
             # 更新进度：生成 PPTX
             task = Task.query.get(task_id)
             if task:
-                task.set_progress({
-                    "total": len(image_paths),
-                    "completed": completed,
-                    "failed": failed,
-                    "current_step": "生成可编辑 PPTX..."
-                })
+                task.update_progress(current_step="生成可编辑 PPTX...")
                 db.session.commit()
 
             # 准备输出路径
@@ -1170,14 +1321,17 @@ def export_editable_pptx_img2slides_task(
 
             output_path = os.path.join(exports_dir, filename)
 
-            # 处理文件名冲突
-            if os.path.exists(output_path):
+            # 处理文件名冲突（远程存储中已有的同名文件也算）
+            from services.file_service import FileService
+            file_service = FileService(uploads_folder)
+            if file_service.file_exists(f"{project_id}/exports/{filename}"):
                 base_name = filename.rsplit('.', 1)[0]
                 timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
                 filename = f"{base_name}_{timestamp}.pptx"
                 output_path = os.path.join(exports_dir, filename)
 
             # 生成 PPTX
+            cancel_token.raise_if_cancelled()
             logger.info(f"生成可编辑 PPTX: {output_path}")
 
             generate_pptx(
@@ -1186,6 +1340,7 @@ def export_editable_pptx_img2slides_task(
                 source_images=[Path(p) for p in valid_image_paths],
                 crop_padding=crop_padding
             )
+            file_service.publish_file(output_path)
 
             # 构建下载 URL
             download_path = f"/files/{project_id}/exports/{filename}"
@@ -1207,6 +1362,9 @@ def export_editable_pptx_img2slides_task(
                 db.session.commit()
                 logger.info(f"✓ 任务 {task_id} 完成 - img2slides 导出成功 ({completed} 成功, {failed} 失败)")
 
+        except TaskCancelledError:
+            _mark_task_cancelled(task_id)
+
         except Exception as e:
             import traceback
             error_detail = traceback.format_exc()
@@ -0,0 +1,168 @@
+"""
+图片缩略图 - 按宽度档位生成 WebP/JPEG 缩略图，供预览和历史列表使用
+
+缩略图放在原图所在目录的 thumbs/ 子目录，文件名包含原图文件名（含版本号）和宽度：
+    <project>/pages/<page_id>_v3.png -> <project>/pages/thumbs/<page_id>_v3.png_w640.webp
+
+页面图片按版本号命名，内容不会改变，对应的缩略图和 URL 可以长期缓存（immutable）；
+固定文件名的原图（如 template.png）被覆盖时，按修改时间判断缩略图是否过期并重新生成。
+"""
+import glob
+import logging
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIRNAME = 'thumbs'
+# 格式名 -> (PIL 格式, MIME 类型)
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+# 支持生成缩略图的原图扩展名
+SOURCE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp'}
+# 带版本号（_v3）或毫秒时间戳（_1700000000000）的文件名：内容永不改变
+IMMUTABLE_FILENAME_RE = re.compile(r'_(v\d+|\d{13})\.\w+$')
+
+# 同一缩略图只生成一次（并发请求等待先到者生成完成）；按路径哈希分段加锁，避免锁字典无限增长
+_locks = [threading.Lock() for _ in range(64)]
+
+
+def _lock_for(path: Path) -> threading.Lock:
+    return _locks[zlib.crc32(str(path).encode('utf-8')) % len(_locks)]
+
+
+def select_width(requested: int, widths: List[int]) -> int:
+    """选择不小于请求宽度的最小档位（超过最大档位时使用最大档位），限制缓存文件的数量；widths 需升序"""
+    for width in widths:
+        if width >= requested:
+            return width
+    return widths[-1]
+
+
+def is_immutable(filename: str) -> bool:
+    """文件名带版本号或时间戳时，内容不会改变，可以长期缓存"""
+    return bool(IMMUTABLE_FILENAME_RE.search(filename))
+
+
+def supports_thumbnail(source: Path) -> bool:
+    return source.suffix.lower() in SOURCE_EXTENSIONS
+
+
+def thumbnail_path(source: Path, width: int, fmt: str) -> Path:
+    """缩略图路径（与原图同目录的 thumbs/ 子目录）"""
+    return source.parent / THUMBNAIL_DIRNAME / f"{source.name}_w{width}.{fmt}"
+
+
+def _is_fresh(thumb: Path, source: Path) -> bool:
+    try:
+        return thumb.stat().st_mtime >= source.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def _resize(image: Image.Image, width: int) -> Image.Image:
+    """按宽度等比缩小（不放大）"""
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+
+
+def _write(image: Image.Image, thumb: Path, fmt: str, quality: int):
+    """写入临时文件后原子替换，并发读取时不会读到写了一半的文件"""
+    pil_format = THUMBNAIL_FORMATS[fmt][0]
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # JPEG 不支持透明通道，合成到白色背景
+            rgba = image.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+    elif pil_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+
+    thumb.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = thumb.with_name(f".{thumb.name}.{threading.get_ident()}.tmp")
+    try:
+        options = {'method': 4} if pil_format == 'WEBP' else {'optimize': True}
+        image.save(tmp_path, format=pil_format, quality=quality, **options)
+        os.replace(tmp_path, thumb)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def ensure_thumbnail(source: Path, width: int, fmt: str = 'webp', quality: int = 80) -> Path:
+    """
+    返回缩略图路径，不存在或已过期时生成
+
+    Args:
+        source: 原图绝对路径
+        width: 缩略图宽度（应为配置的档位之一）
+        fmt: 'webp' 或 'jpeg'
+        quality: 编码质量（1-100）
+    """
+    thumb = thumbnail_path(source, width, fmt)
+    if _is_fresh(thumb, source):
+        return thumb
+    with _lock_for(thumb):
+        if not _is_fresh(thumb, source):
+            with Image.open(source) as image:
+                image.load()
+                _write(_resize(image, width), thumb, fmt, quality)
+    return thumb
+
+
+def generate_thumbnails(source: Path, widths: Iterable[int], fmt: str = 'webp', quality: int = 80,
+                        image: Optional[Image.Image] = None) -> List[Path]:
+    """
+    一次生成所有档位的缩略图（保存生成图片时调用），失败只记录日志
+
+    从大到小依次缩放，每一档基于上一档结果，避免重复处理原始的 2K/4K 图片。
+
+    Args:
+        source: 原图绝对路径
+        widths: 宽度档位
+        fmt: 'webp' 或 'jpeg'
+        quality: 编码质量
+        image: 已加载的原图（可选，避免重新解码）
+    """
+    generated = []
+    try:
+        if image is None:
+            with Image.open(source) as opened:
+                opened.load()
+                image = opened.copy()
+        current = image
+        for width in sorted(set(widths), reverse=True):
+            current = _resize(current, width)
+            thumb = thumbnail_path(source, width, fmt)
+            with _lock_for(thumb):
+                _write(current, thumb, fmt, quality)
+            generated.append(thumb)
+    except Exception as e:
+        logger.warning(f"生成缩略图失败 {source}: {e}")
+    return generated
+
+
+def remove_thumbnails(source: Path) -> int:
+    """删除原图对应的所有缩略图，返回删除数量"""
+    thumbs_dir = source.parent / THUMBNAIL_DIRNAME
+    if not thumbs_dir.is_dir():
+        return 0
+    removed = 0
+    for thumb in thumbs_dir.glob(f"{glob.escape(source.name)}_w*"):
+        if thumb.is_file():
+            thumb.unlink()
+            removed += 1
+    return removed
@@ -0,0 +1,480 @@
+"""
+上传目录垃圾回收 - 按数据库引用和保留期限清理 UPLOAD_FOLDER，超出配额时按 LRU 淘汰可再生成的文件
+
+回收对象（只删除超过最短保留时间 UPLOAD_GC_MIN_AGE_HOURS 的文件，避免删除写入中/尚未提交数据库的文件）：
+- 已删除项目的目录；页面图片、素材、用户模板、参考文件中没有任何数据库记录引用的文件
+- 原图已不存在的缩略图（thumbs/）
+- 超过保留期限的导出文件（exports/）、可编辑导出的中间文件（editable_images/）和临时目录（tmp*）
+- 没有被参考文件/页面/项目内容引用、且超过保留期限的 MinerU 解析结果（mineru_files/）
+- 可选：每个页面只保留当前版本和最近 N 个历史版本（UPLOAD_GC_KEEP_PAGE_VERSIONS）
+
+ocr_cache/ 自带 LRU 淘汰，不在此处理。远程存储（STORAGE_BACKEND=s3）模式下，
+删除已发布的文件时同时删除对象存储中的副本。
+
+dry_run=True 时只生成报告，不删除任何内容。同一上传目录同时只有一个回收在执行
+（<UPLOAD_FOLDER>/.upload_gc.lock 跨进程文件锁，多个 worker / CLI 不会互相竞争）。
+"""
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .thumbnails import THUMBNAIL_DIRNAME
+
+logger = logging.getLogger(__name__)
+
+# 项目目录名（uuid4）
+_PROJECT_DIR_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+# 文本内容中引用的 MinerU 解析结果
+_MINERU_REF_RE = re.compile(r'/files/mineru/([^/\s)"\'\\]+)/')
+# tempfile.mkdtemp(dir=UPLOAD_FOLDER) 创建的临时目录
+_TEMP_DIR_PREFIX = 'tmp'
+# 缩略图文件名: <原图文件名>_w<宽度>.<格式>
+_THUMBNAIL_NAME_RE = re.compile(r'^(?P<source>.+)_w\d+\.\w+$')
+
+# 超出配额时可以淘汰的类别（都可以重新生成），按最后修改时间从旧到新淘汰
+EVICTABLE_CATEGORIES = ('exports', 'editable_images', 'mineru_files')
+
+# 跨进程锁文件（位于上传目录顶层，回收时跳过顶层文件）
+LOCK_FILENAME = '.upload_gc.lock'
+
+_last_report: Optional[dict] = None
+_scheduler_lock = threading.Lock()
+_scheduler_thread: Optional[threading.Thread] = None
+
+
+class UploadGCInProgressError(RuntimeError):
+    """另一个进程正在回收同一上传目录"""
+
+
+@contextmanager
+def _exclusive_lock(upload_folder: Path):
+    """非阻塞地获取上传目录的回收锁，已被其他进程持有时抛出 UploadGCInProgressError"""
+    upload_folder.mkdir(parents=True, exist_ok=True)
+    with open(upload_folder / LOCK_FILENAME, 'a+b') as lock_file:
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as e:
+            raise UploadGCInProgressError(f"Upload GC already running for {upload_folder}") from e
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@dataclass
+class GCPolicy:
+    """回收策略（默认值与 Config 中的 UPLOAD_GC_* 一致）"""
+    min_age_hours: float = 1
+    temp_retention_hours: float = 24
+    export_retention_days: float = 7
+    cache_retention_days: float = 3
+    keep_page_versions: int = 0  # 0 表示保留全部历史版本
+    quota_mb: float = 0  # 0 表示不限制
+
+    @classmethod
+    def from_config(cls, config) -> 'GCPolicy':
+        return cls(
+            min_age_hours=config.get('UPLOAD_GC_MIN_AGE_HOURS', cls.min_age_hours),
+            temp_retention_hours=config.get('UPLOAD_GC_TEMP_RETENTION_HOURS', cls.temp_retention_hours),
+            export_retention_days=config.get('UPLOAD_GC_EXPORT_RETENTION_DAYS', cls.export_retention_days),
+            cache_retention_days=config.get('UPLOAD_GC_CACHE_RETENTION_DAYS', cls.cache_retention_days),
+            keep_page_versions=config.get('UPLOAD_GC_KEEP_PAGE_VERSIONS', cls.keep_page_versions),
+            quota_mb=config.get('UPLOAD_QUOTA_MB', cls.quota_mb),
+        )
+
+
+@dataclass
+class GCItem:
+    """一个待回收的文件或目录"""
+    path: str  # 相对 UPLOAD_FOLDER 的路径
+    category: str  # pages / thumbnails / exports / materials / ... / projects
+    reason: str  # orphan / expired / deleted_project / old_version / unreferenced / quota
+    size: int
+    mtime: float
+    is_dir: bool = False
+    version_id: Optional[str] = None  # 历史版本记录（old_version）
+
+
+@dataclass
+class GCReport:
+    """回收报告"""
+    dry_run: bool
+    policy: GCPolicy
+    scanned_bytes: int = 0
+    items: List[GCItem] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    duration_seconds: float = 0
+
+    @property
+    def freed_bytes(self) -> int:
+        return sum(item.size for item in self.items)
+
+    @property
+    def remaining_bytes(self) -> int:
+        return self.scanned_bytes - self.freed_bytes
+
+    @property
+    def over_quota(self) -> bool:
+        return bool(self.policy.quota_mb) and self.remaining_bytes > self.policy.quota_mb * 1024 * 1024
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """按 类别/原因 汇总数量和字节数"""
+        summary: Dict[str, Dict[str, int]] = {}
+        for item in self.items:
+            entry = summary.setdefault(f"{item.category}/{item.reason}", {'count': 0, 'bytes': 0})
+            entry['count'] += 1
+            entry['bytes'] += item.size
+        return summary
+
+    def to_dict(self, include_items: bool = True) -> dict:
+        data = {
+            'dry_run': self.dry_run,
+            'policy': asdict(self.policy),
+            'scanned_bytes': self.scanned_bytes,
+            'freed_bytes': self.freed_bytes,
+            'remaining_bytes': self.remaining_bytes,
+            'over_quota': self.over_quota,
+            'deleted_versions': sum(1 for item in self.items if item.version_id),
+            'summary': self.summary(),
+            'errors': self.errors,
+            'started_at': self.started_at,
+            'duration_seconds': round(self.duration_seconds, 3),
+        }
+        if include_items:
+            data['items'] = [asdict(item) for item in self.items]
+        return data
+
+
+def _normalize(path: Optional[str]) -> Optional[str]:
+    return path.replace('\\', '/').lstrip('/') if path else None
+
+
+def _tree_stats(path: Path):
+    """目录（或文件）的总大小和最新修改时间（目录按其中最新的文件计算，空目录按目录本身）"""
+    if path.is_file():
+        stat = path.stat()
+        return stat.st_size, stat.st_mtime
+    size, mtime = 0, None
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                stat = os.stat(os.path.join(dirpath, filename))
+            except OSError:
+                continue
+            size += stat.st_size
+            mtime = stat.st_mtime if mtime is None else max(mtime, stat.st_mtime)
+    return size, path.stat().st_mtime if mtime is None else mtime
+
+
+def _iter_files(directory: Path) -> Iterable[Path]:
+    if directory.is_dir():
+        for entry in directory.iterdir():
+            if entry.is_file():
+                yield entry
+
+
+class UploadGarbageCollector:
+    """
+    上传目录垃圾回收器（需要应用上下文，用于查询数据库引用）
+
+    Args:
+        upload_folder: 上传目录
+        policy: 回收策略
+        now: 当前时间戳（测试用）
+    """
+
+    def __init__(self, upload_folder: str, policy: GCPolicy, now: Optional[float] = None):
+        self.upload_folder = Path(upload_folder)
+        self.policy = policy
+        self.now = now if now is not None else time.time()
+
+    # ------------------------------------------------------------------ 引用
+
+    def _load_references(self):
+        """从数据库加载被引用的文件、项目 ID 和 MinerU 解析结果"""
+        from models import db, Project, Page, PageImageVersion, Material, UserTemplate, ReferenceFile
+
+        self.project_ids: Set[str] = {row[0] for row in db.session.query(Project.id)}
+        self.user_template_ids: Set[str] = {row[0] for row in db.session.query(UserTemplate.id)}
+
+        live: Set[str] = set()
+        for query in (
+            db.session.query(PageImageVersion.image_path),
+            db.session.query(Page.generated_image_path),
+            db.session.query(Project.template_image_path),
+            db.session.query(Material.relative_path),
+            db.session.query(UserTemplate.file_path),
+            db.session.query(ReferenceFile.file_path),
+        ):
+            live.update(_normalize(row[0]) for row in query if row[0])
+        self.live_files = live
+
+        # MinerU 图片链接会被复制到参考文件解析结果、页面大纲/描述和项目输入文本中
+        mineru_refs: Set[str] = set()
+        text_queries = (
+            db.session.query(ReferenceFile.markdown_content),
+            db.session.query(Page.outline_content, Page.description_content),
+            db.session.query(Project.idea_prompt, Project.outline_text,
+                             Project.description_text, Project.extra_requirements),
+        )
+        for query in text_queries:
+            for row in query.yield_per(200):
+                for value in row:
+                    if value:
+                        mineru_refs.update(_MINERU_REF_RE.findall(str(value)))
+        self.mineru_refs = mineru_refs
+
+    def _old_versions(self) -> Dict[str, str]:
+        """超出保留数量的历史版本: image_path -> version_id（当前版本始终保留）"""
+        if self.policy.keep_page_versions <= 0:
+            return {}
+        from sqlalchemy import func
+        from models import db, PageImageVersion
+
+        ranked = db.session.query(
+            PageImageVersion.id,
+            PageImageVersion.image_path,
+            func.row_number().over(
+                partition_by=PageImageVersion.page_id,
+                order_by=PageImageVersion.version_number.desc()
+            ).label('position'),
+        ).filter(PageImageVersion.is_current.is_(False)).subquery()
+        rows = db.session.query(ranked.c.id, ranked.c.image_path).filter(
+            ranked.c.position > self.policy.keep_page_versions
+        )
+        return {_normalize(image_path): version_id for version_id, image_path in rows}
+
+    # ------------------------------------------------------------------ 扫描
+
+    def _older_than(self, mtime: float, seconds: float) -> bool:
+        return self.now - mtime >= max(seconds, self.policy.min_age_hours * 3600)
+
+    def _add(self, path: Path, category: str, reason: str, version_id: Optional[str] = None):
+        size, mtime = _tree_stats(path)
+        if not self._older_than(mtime, 0):
+            return
+        self.report.items.append(GCItem(
+            path=path.relative_to(self.upload_folder).as_posix(), category=category, reason=reason,
+            size=size, mtime=mtime, is_dir=path.is_dir(), version_id=version_id
+        ))
+
+    def _scan_unreferenced_files(self, directory: Path, category: str):
+        for path in _iter_files(directory):
+            if path.relative_to(self.upload_folder).as_posix() not in self.live_files:
+                self._add(path, category, 'orphan')
+
+    def _scan_thumbnails(self, directory: Path, removed: Set[str]):
+        """原图不存在（或本次将被删除）的缩略图"""
+        for path in _iter_files(directory / THUMBNAIL_DIRNAME):
+            match = _THUMBNAIL_NAME_RE.match(path.name)
+            source = directory / match.group('source') if match else None
+            if source is None or not source.is_file() or \
+                    source.relative_to(self.upload_folder).as_posix() in removed:
+                self._add(path, 'thumbnails', 'orphan')
+
+    def _scan_project(self, project_dir: Path, old_versions: Dict[str, str]):
+        pages_dir = project_dir / 'pages'
+        for path in _iter_files(pages_dir):
+            key = path.relative_to(self.upload_folder).as_posix()
+            if key in old_versions:
+                self._add(path, 'pages', 'old_version', version_id=old_versions[key])
+            elif key not in self.live_files:
+                self._add(path, 'pages', 'orphan')
+        removed = {item.path for item in self.report.items}
+        self._scan_thumbnails(pages_dir, removed)
+
+        self._scan_unreferenced_files(project_dir / 'materials', 'materials')
+
+        export_seconds = self.policy.export_retention_days * 86400
+        for path in _iter_files(project_dir / 'exports'):
+            if self._older_than(path.stat().st_mtime, export_seconds):
+                self._add(path, 'exports', 'expired')
+
+    def _scan(self):
+        old_versions = self._old_versions()
+        cache_seconds = self.policy.cache_retention_days * 86400
+
+        for entry in sorted(self.upload_folder.iterdir()):
+            name = entry.name
+            if entry.is_file():
+                continue
+            if name in self.project_ids:
+                self._scan_project(entry, old_versions)
+            elif _PROJECT_DIR_RE.match(name):
+                self._add(entry, 'projects', 'deleted_project')
+            elif name == 'materials':
+                self._scan_unreferenced_files(entry, 'materials')
+            elif name == 'reference_files':
+                self._scan_unreferenced_files(entry, 'reference_files')
+            elif name == 'user-templates':
+                for template_dir in entry.iterdir():
+                    if not template_dir.is_dir():
+                        continue
+                    if template_dir.name not in self.user_template_ids:
+                        self._add(template_dir, 'user-templates', 'orphan')
+                    else:
+                        self._scan_unreferenced_files(template_dir, 'user-templates')
+            elif name == 'mineru_files':
+                for extract_dir in entry.iterdir():
+                    if extract_dir.is_dir() and extract_dir.name not in self.mineru_refs and \
+                            self._older_than(_tree_stats(extract_dir)[1], cache_seconds):
+                        self._add(extract_dir, 'mineru_files', 'unreferenced')
+            elif name == 'editable_images':
+                for image_dir in entry.iterdir():
+                    if self._older_than(_tree_stats(image_dir)[1], cache_seconds):
+                        self._add(image_dir, 'editable_images', 'expired')
+            elif name.startswith(_TEMP_DIR_PREFIX) and \
+                    self._older_than(_tree_stats(entry)[1], self.policy.temp_retention_hours * 3600):
+                self._add(entry, 'temp', 'expired')
+
+    def _evictable(self) -> List[Path]:
+        """超出配额时可淘汰的文件/目录（未被上面的规则选中的）"""
+        selected = {item.path for item in self.report.items}
+        candidates = []
+        for project_id in self.project_ids:
+            candidates.extend(_iter_files(self.upload_folder / project_id / 'exports'))
+        for name in ('editable_images', 'mineru_files'):
+            directory = self.upload_folder / name
+            if directory.is_dir():
+                candidates.extend(p for p in directory.iterdir() if p.is_dir())
+        return [p for p in candidates if p.relative_to(self.upload_folder).as_posix() not in selected]
+
+    def _apply_quota(self):
+        if not self.report.over_quota:
+            return
+        quota_bytes = self.policy.quota_mb * 1024 * 1024
+        entries = []
+        for path in self._evictable():
+            size, mtime = _tree_stats(path)
+            entries.append((mtime, size, path))
+        for mtime, size, path in sorted(entries, key=lambda e: e[0]):
+            if self.report.remaining_bytes <= quota_bytes:
+                break
+            category = path.relative_to(self.upload_folder).parts
+            category = 'exports' if len(category) == 3 else category[0]
+            self._add(path, category, 'quota')
+        if self.report.over_quota:
+            logger.warning(
+                f"上传目录超出配额: {self.report.remaining_bytes / 1024 / 1024:.1f}MB > {self.policy.quota_mb}MB，"
+                f"可淘汰的文件已全部选中"
+            )
+
+    # ------------------------------------------------------------------ 执行
+
+    def _delete(self, file_service):
+        from models import db, PageImageVersion
+
+        version_ids = [item.version_id for item in self.report.items if item.version_id]
+        if version_ids:
+            # 先删除版本记录，再删除文件（文件删除失败只留下孤儿文件，下次回收）
+            PageImageVersion.query.filter(PageImageVersion.id.in_(version_ids)).delete(synchronize_session=False)
+            db.session.commit()
+
+        for item in self.report.items:
+            try:
+                if item.category == 'projects':
+                    file_service.delete_project_files(item.path)
+                elif item.is_dir:
+                    file_service.delete_dir(item.path)
+                else:
+                    file_service.delete_file(item.path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                self.report.errors.append(f"{item.path}: {e}")
+                logger.warning(f"回收失败 {item.path}: {e}")
+
+    def run(self, dry_run: bool = True) -> GCReport:
+        """扫描并（非 dry_run 时）删除，返回报告"""
+        from .file_service import FileService
+
+        self.report = GCReport(dry_run=dry_run, policy=self.policy)
+        if not self.upload_folder.is_dir():
+            return self.report
+        started = time.monotonic()
+        self.report.scanned_bytes = _tree_stats(self.upload_folder)[0]
+        self._load_references()
+        self._scan()
+        self._apply_quota()
+        if not dry_run:
+            self._delete(FileService(str(self.upload_folder)))
+        self.report.duration_seconds = time.monotonic() - started
+        return self.report
+
+
+def collect_upload_garbage(dry_run: bool = True, policy: Optional[GCPolicy] = None) -> GCReport:
+    """
+    按当前应用配置回收 UPLOAD_FOLDER（需要应用上下文）
+
+    Raises:
+        UploadGCInProgressError: 其他进程正在回收同一目录
+    """
+    global _last_report
+    from flask import current_app
+
+    policy = policy or GCPolicy.from_config(current_app.config)
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    with _exclusive_lock(Path(upload_folder)):
+        report = UploadGarbageCollector(upload_folder, policy).run(dry_run=dry_run)
+    _last_report = report.to_dict(include_items=False)
+    logger.info(
+        f"上传目录回收{'（dry-run）' if dry_run else ''}: 扫描 {report.scanned_bytes / 1024 / 1024:.1f}MB，"
+        f"{'可' if dry_run else '已'}释放 {report.freed_bytes / 1024 / 1024:.1f}MB（{len(report.items)} 项）"
+    )
+    return report
+
+
+def get_upload_gc_stats() -> Optional[dict]:
+    """最近一次回收的汇总（用于 /api/metrics）"""
+    return _last_report
+
+
+def start_upload_gc_scheduler(app) -> bool:
+    """
+    启动后台定时回收线程（每个进程最多一个，UPLOAD_GC_INTERVAL_HOURS<=0 时不启动）
+
+    由提供服务的进程在处理第一个请求时调用（flask CLI 命令不会启动）；
+    多个 worker 各自启动时由跨进程文件锁保证同一时间只有一个在回收。
+    第一次回收在一个间隔之后执行，不影响启动速度。
+    """
+    global _scheduler_thread
+    interval = app.config.get('UPLOAD_GC_INTERVAL_HOURS', 0) * 3600
+    if interval <= 0:
+        return False
+    with _scheduler_lock:
+        if _scheduler_thread is not None and _scheduler_thread.is_alive():
+            return True
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    with app.app_context():
+                        collect_upload_garbage(dry_run=app.config.get('UPLOAD_GC_DRY_RUN', True))
+                except UploadGCInProgressError:
+                    logger.info("另一个进程正在回收上传目录，跳过本次回收")
+                except Exception as e:
+                    logger.error(f"上传目录回收失败: {e}", exc_info=True)
+
+        _scheduler_thread = threading.Thread(target=run, name='upload-gc', daemon=True)
+        _scheduler_thread.start()
+    return True
@@ -0,0 +1,277 @@
+"""
+AI Provider单元测试
+
+使用假的客户端验证Provider的本地逻辑，不访问外部API
+"""
+
+from types import SimpleNamespace
+
+from PIL import Image
+
+
+class _FakeGenAIClient:
+    """记录上传和生成调用的假GenAI客户端"""
+
+    def __init__(self, upload_error=None, failures=None):
+        self.uploads = []
+        self.upload_attempts = 0
+        self.contents = []
+        self._upload_error = upload_error
+        self._failures = failures  # 前 N 次上传失败（None 表示一直失败）
+        self.files = SimpleNamespace(upload=self._upload)
+        self.models = SimpleNamespace(generate_content=self._generate_content)
+
+    def _upload(self, file, config=None):
+        self.upload_attempts += 1
+        if self._upload_error and (self._failures is None or self.upload_attempts <= self._failures):
+            raise self._upload_error
+        self.uploads.append(file)
+        return SimpleNamespace(
+            name=f'files/{len(self.uploads)}',
+            uri=f'https://files.example/{len(self.uploads)}',
+            mime_type='image/png'
+        )
+
+    def _generate_content(self, model, contents, config=None):
+        self.contents.append(contents)
+        return SimpleNamespace(text='ok')
+
+
+class TestGenAIImageHandles:
+    """多模态请求复用图片上传句柄测试"""
+
+    def _provider(self, client):
+        from services.ai_providers.text.genai_provider import GenAITextProvider
+
+        provider = GenAITextProvider(api_key='test-key')
+        provider.client = client
+        return provider
+
+    def test_same_image_uploaded_once(self, tmp_path):
+        """同一张图片多次请求只上传一次，之后按URI引用"""
+        image_path = tmp_path / 'page.png'
+        Image.new('RGB', (32, 32), 'white').save(image_path)
+        client = _FakeGenAIClient()
+        provider = self._provider(client)
+
+        for _ in range(3):
+            assert provider.generate_with_image('描述', str(image_path)) == 'ok'
+
+        assert len(client.uploads) == 1
+        parts = [contents[0] for contents in client.contents]
+        assert all(part.file_data.file_uri == 'https://files.example/1' for part in parts)
+
+    def test_transient_upload_failure_only_affects_that_call(self, tmp_path):
+        """单次上传失败只让本次请求使用内联图片，下次请求重新上传并复用句柄"""
+        image_path = tmp_path / 'page.png'
+        Image.new('RGB', (32, 32), 'white').save(image_path)
+        client = _FakeGenAIClient(upload_error=RuntimeError('files api unavailable'), failures=1)
+        provider = self._provider(client)
+
+        for prompt in ('a', 'b', 'c'):
+            provider.generate_with_image(prompt, str(image_path))
+
+        first, second, third = (contents[0] for contents in client.contents)
+        assert first.inline_data.data == image_path.read_bytes()
+        assert second.file_data.file_uri == third.file_data.file_uri == 'https://files.example/1'
+
+    def test_repeated_upload_failures_pause_uploads(self, tmp_path):
+        """连续多次上传失败后暂停上传（使用内联图片），冷却时间过后重新尝试"""
+        image_path = tmp_path / 'page.png'
+        Image.new('RGB', (32, 32), 'white').save(image_path)
+        client = _FakeGenAIClient(upload_error=RuntimeError('files api unavailable'))
+        provider = self._provider(client)
+        threshold = provider.FILES_API_FAILURE_THRESHOLD
+
+        for i in range(threshold + 2):
+            provider.generate_with_image(str(i), str(image_path))
+        assert client.upload_attempts == threshold
+        assert all(contents[0].inline_data is not None for contents in client.contents)
+
+        provider._files_api_paused_until = 0.0  # 冷却时间已过
+        provider.generate_with_image('retry', str(image_path))
+        assert client.upload_attempts == threshold + 1
+
+
+class _FakeAsyncResponse:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+class TestAsyncProviders:
+    """异步Provider接口与共享事件循环测试"""
+
+    def test_run_all_bounds_concurrency_and_captures_errors(self):
+        """run_all 按输入顺序返回结果，失败项返回异常对象，并发数不超过上限"""
+        import asyncio
+        from services.ai_providers.async_runner import AsyncRunner
+
+        state = {'active': 0, 'peak': 0}
+
+        async def job(i):
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            await asyncio.sleep(0.01)
+            state['active'] -= 1
+            if i == 3:
+                raise ValueError('boom')
+            return i * 2
+
+        runner = AsyncRunner(name='test-async-runner')
+        try:
+            results = runner.run_all([job(i) for i in range(10)], concurrency=4)
+        finally:
+            runner.shutdown()
+
+        assert isinstance(results[3], ValueError)
+        assert [r for i, r in enumerate(results) if i != 3] == [i * 2 for i in range(10) if i != 3]
+        assert state['peak'] == 4
+
+    def test_mask_inpainting_providers_have_async_variants(self, monkeypatch):
+        """火山引擎/Gemini 掩码消除Provider实现统一接口，inpaint 和异步方法都转到 inpaint_image"""
+        import asyncio
+        from PIL import Image
+        from services.ai_providers.image import InpaintingProvider
+        from services.ai_providers.image.volcengine_inpainting_provider import VolcengineInpaintingProvider
+
+        provider = VolcengineInpaintingProvider('ak', 'sk')
+        calls = []
+
+        def fake_inpaint_image(original_image, mask_image, inpaint_mode="remove", **kwargs):
+            calls.append((mask_image.getbbox(), kwargs))
+            return original_image
+
+        monkeypatch.setattr(provider, 'inpaint_image', fake_inpaint_image)
+        image = Image.new('RGB', (40, 20))
+
+        assert isinstance(provider, InpaintingProvider)
+        assert provider.inpaint(image, [{'left': 2, 'top': 3, 'width': 10, 'height': 5}]) is image
+        assert asyncio.run(provider.ainpaint(image, [{'left': 0, 'top': 0, 'width': 4, 'height': 4}])) is image
+        assert asyncio.run(provider.ainpaint_image(image, Image.new('L', (40, 20)), crop_box=(0, 0, 1, 1))) is image
+        assert calls == [((2, 3, 12, 8), {}), ((0, 0, 4, 4), {}), (None, {'crop_box': (0, 0, 1, 1)})]
+
+    def test_default_async_falls_back_to_thread(self):
+        """未实现原生异步的Provider在线程中执行同步方法"""
+        import asyncio
+        import threading
+        from services.ai_providers.text.base import TextProvider
+
+        class _SyncProvider(TextProvider):
+            def generate_text(self, prompt, thinking_budget=1000):
+                return f"{prompt}@{threading.current_thread().name}"
+
+        result = asyncio.run(_SyncProvider().agenerate_text('hi'))
+        assert result.startswith('hi@')
+        assert not result.endswith(threading.main_thread().name)
+
+    def test_baidu_ocr_async_matches_sync_parsing(self, tmp_path, monkeypatch):
+        """百度高精度OCR的异步识别与同步识别解析结果一致"""
+        import asyncio
+        from services.ai_providers.ocr import baidu_accurate_ocr_provider as module
+
+        image_path = tmp_path / 'crop.png'
+        Image.new('RGB', (120, 40), 'white').save(image_path)
+        payload = {
+            'log_id': 1,
+            'words_result_num': 1,
+            'words_result': [{'words': '标题', 'location': {'left': 2, 'top': 3, 'width': 50, 'height': 20}}],
+        }
+        requests_seen = []
+
+        class _FakeAsyncClient:
+            async def post(self, url, headers=None, data=None):
+                requests_seen.append(data)
+                return _FakeAsyncResponse(dict(payload))
+
+        class _FakeSession:
+            def post(self, url, headers=None, data=None):
+                requests_seen.append(data)
+                return _FakeAsyncResponse(dict(payload))
+
+        monkeypatch.setattr(module, 'get_async_http_client', lambda name: _FakeAsyncClient())
+        provider = module.BaiduAccurateOCRProvider('token', http_session=_FakeSession())
+
+        sync_result = provider.recognize(str(image_path))
+        async_result = asyncio.run(provider.arecognize(str(image_path)))
+
+        assert requests_seen[0] == requests_seen[1]
+        assert async_result['text_lines'] == sync_result['text_lines']
+        assert async_result['text_lines'][0]['bbox'] == [2, 3, 52, 23]
+
+    def test_async_client_releases_in_flight_on_cancel(self):
+        """请求被取消或抛出任意异常时 in_flight 计数也会归还"""
+        import asyncio
+        import pytest
+        from services.ai_providers.http_pool import AsyncPooledHTTPClient
+
+        class _StubClient:
+            def __init__(self, error):
+                self.error = error
+
+            async def request(self, method, url, **kwargs):
+                raise self.error
+
+        client = AsyncPooledHTTPClient('test_async')
+        for error in (asyncio.CancelledError(), RuntimeError('boom')):
+            client._client = _StubClient(error)
+            with pytest.raises(type(error)):
+                asyncio.run(client.post('http://example.invalid', data=b'x'))
+
+        stats = client.stats()
+        assert stats['in_flight'] == 0 and stats['requests'] == 2 and stats['errors'] == 2
+
+    def test_async_clients_dropped_with_closed_loops(self):
+        """异步客户端按事件循环缓存，事件循环关闭后不再保留（也不会被新的事件循环复用）"""
+        import asyncio
+        from services.ai_providers import http_pool
+
+        async def get_client():
+            return http_pool.get_async_http_client('test_loop_scoped')
+
+        first = asyncio.run(get_client())
+        second = asyncio.run(get_client())
+
+        assert first is not second
+        stats = http_pool.get_http_pool_stats()
+        assert not any(key.startswith('test_loop_scoped') for key in stats)
+
+    def test_ocr_prefetch_runs_on_async_runner_within_budget(self, tmp_path):
+        """OCR预识别通过异步运行器并发执行，协程中可见任务截止时间，extract() 直接使用预识别结果"""
+        import pytest
+        from services.cancellation import CancellationToken, bind_cancel_token, remaining_time
+        from services.image_editability.extractors import BaiduAccurateOCRElementExtractor
+
+        paths = []
+        for i in range(3):
+            path = tmp_path / f'page{i}.png'
+            Image.new('RGB', (40, 20), 'white').save(path)
+            paths.append(str(path))
+        budgets = []
+
+        class _StubOCRProvider:
+            async def arecognize(self, image_path, **options):
+                budgets.append(remaining_time())
+                return {
+                    'text_lines': [{'text': image_path[-9:], 'bbox': [0, 0, 10, 10]}],
+                    'image_size': (40, 20),
+                    'direction': None,
+                }
+
+            def recognize(self, image_path, **options):
+                pytest.fail('预识别过的图片不应再同步识别')
+
+        extractor = BaiduAccurateOCRElementExtractor(_StubOCRProvider())
+        token = CancellationToken('ocr-prefetch')
+        token.start_budget(30)
+        with bind_cancel_token(token):
+            extractor.prefetch(paths)
+
+        assert len(budgets) == 3 and all(budget is not None and 25 < budget <= 30 for budget in budgets)
+        result = extractor.extract(paths[1])
+        assert [element['content'] for element in result.elements] == ['page1.png']
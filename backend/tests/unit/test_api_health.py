@@ -26,3 +26,28 @@ class TestHealthEndpoint:
         assert 'status' in data
         assert 'message' in data
 
+
+
+@pytest.fixture
+def test_pool():
+    """注册临时连接池，测试结束后从全局注册表移除，避免出现在后续测试的指标中"""
+    from services.ai_providers import http_pool
+    pool = http_pool.get_pooled_session('test_pool', pool_size=2)
+    yield pool
+    with http_pool._pools_lock:
+        http_pool._pools.pop('test_pool', None)
+    pool._session.close()
+
+
+class TestMetricsEndpoint:
+    """运行时指标端点测试"""
+    
+    def test_metrics_include_http_pools(self, client, test_pool):
+        """测试指标包含Provider连接池统计"""
+        
+        response = client.get('/api/metrics')
+        
+        assert response.status_code == 200
+        pools = response.get_json()['data']['http_pools']
+        assert pools['test_pool']['pool_size'] == 2
+        assert pools['test_pool']['requests'] == 0
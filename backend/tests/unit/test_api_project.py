@@ -119,6 +119,435 @@ class TestProjectDelete:
     def test_delete_project_not_found(self, client):
         """测试删除不存在的项目"""
         response = client.delete('/api/projects/non-existent-id')
+
+        assert response.status_code == 404
+
+
+class TestProjectList:
+    """项目列表（摘要、游标分页、fields）测试"""
+
+    def _create_projects(self, count):
+        from datetime import datetime, timedelta
+        from models import db, Project, Page
+
+        base = datetime(2025, 1, 1)
+        ids = []
+        for i in range(count):
+            project = Project(idea_prompt=f'项目{i}', status='DRAFT', updated_at=base + timedelta(minutes=i))
+            db.session.add(project)
+            db.session.flush()
+            for order_index in (1, 0):
+                page = Page(project_id=project.id, order_index=order_index, status='DRAFT')
+                page.set_outline_content({'title': f'第{order_index}页', 'points': ['要点']})
+                if order_index == 1:
+                    page.generated_image_path = f'{project.id}/pages/cover.png'
+                db.session.add(page)
+            ids.append(project.id)
+        db.session.commit()
+        return ids[::-1]  # updated_at 倒序
+
+    def test_summary_without_pages(self, client):
+        """默认返回摘要，不包含页面内容"""
+        self._create_projects(1)
+
+        data = assert_success_response(client.get('/api/projects'))
+        project = data['data']['projects'][0]
+
+        assert 'pages' not in project and 'outline_text' not in project
+        assert project['page_count'] == 2
+        assert project['pages_with_images'] == 1
+        assert project['first_page_title'] == '第0页'
+        assert project['first_page_image_url'].endswith('/pages/cover.png')
+
+    def test_cursor_pagination(self, client):
+        """游标分页按 updated_at 倒序遍历所有项目，不重复不遗漏"""
+        expected = self._create_projects(5)
+
+        seen, cursor = [], None
+        while True:
+            url = '/api/projects?limit=2' + (f'&cursor={cursor}' if cursor else '')
+            data = assert_success_response(client.get(url))['data']
+            seen += [p['project_id'] for p in data['projects']]
+            cursor = data['next_cursor']
+            if not data['has_more']:
+                break
+
+        assert seen == expected
+
+    def test_fields_opt_in(self, client):
+        """fields=pages 返回完整项目和页面，未知字段返回400"""
+        self._create_projects(1)
+
+        data = assert_success_response(client.get('/api/projects?fields=pages'))
+        project = data['data']['projects'][0]
+        assert [p['order_index'] for p in project['pages']] == [0, 1]
+        assert project['page_count'] == 2
+
+        assert client.get('/api/projects?fields=everything').status_code == 400
+
+
+
+class TestTaskCancel:
+    """任务取消测试"""
+    
+    def _create_task(self, project_id, status):
+        from models import db, Task
+        task = Task(project_id=project_id, task_type='GENERATE_IMAGES', status=status)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+    
+    def test_cancel_unmanaged_task(self, client, sample_project):
+        """不在本进程运行的任务直接标记为CANCELLED"""
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        task_id = self._create_task(project_id, 'PROCESSING')
+        
+        response = client.post(f'/api/projects/{project_id}/tasks/{task_id}/cancel')
+        
+        data = assert_success_response(response)
+        assert data['data']['status'] == 'CANCELLED'
+    
+    def test_cancel_finished_task_rejected(self, client, sample_project):
+        """已完成的任务不能取消"""
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        task_id = self._create_task(project_id, 'COMPLETED')
+        
+        response = client.post(f'/api/projects/{project_id}/tasks/{task_id}/cancel')
+        
+        assert_error_response(response, 400)
+
+    def test_cancel_does_not_overwrite_task_finished_meanwhile(self, client, sample_project, monkeypatch):
+        """读取状态后任务刚好完成时不覆盖为CANCELLED"""
+        from models import db, Task
+        from services.task_manager import task_manager
+
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        task_id = self._create_task(project_id, 'PROCESSING')
+
+        def finish_then_report_not_running(task_id):
+            db.session.execute(db.update(Task).where(Task.id == task_id).values(status='COMPLETED'))
+            db.session.commit()
+            return False
+
+        monkeypatch.setattr(task_manager, 'cancel_task', finish_then_report_not_running)
+        response = client.post(f'/api/projects/{project_id}/tasks/{task_id}/cancel')
+
+        assert_error_response(response, 400)
+        db.session.expire_all()
+        assert db.session.get(Task, task_id).status == 'COMPLETED'
+
+    def test_running_task_stops_at_checkpoint(self, client, sample_project):
+        """运行中的任务在下一个检查点停止，不等待正在执行的子任务"""
+        import threading
+        import time
+        from services.cancellation import TaskCancelledError, as_completed_or_cancelled, cancellable_executor
+        from services.task_manager import task_manager
+        
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        task_id = self._create_task(project_id, 'PROCESSING')
+        started = threading.Event()
+        release = threading.Event()
+        outcome = {}
+        
+        def slow_task(task_id):
+            cancel_token = task_manager.get_cancel_token(task_id)
+            try:
+                with cancellable_executor(2) as executor:
+                    futures = [executor.submit(release.wait, 30)]
+                    started.set()
+                    for _ in as_completed_or_cancelled(futures, cancel_token, poll_interval=0.05):
+                        pass
+            except TaskCancelledError:
+                outcome['cancelled_at'] = time.monotonic()
         
+        task_manager.submit_task(task_id, slow_task)
+        assert started.wait(5)
+        requested_at = time.monotonic()
+        
+        response = client.post(f'/api/projects/{project_id}/tasks/{task_id}/cancel')
+        
+        assert response.status_code == 202
+        deadline = time.monotonic() + 5
+        while task_manager.is_task_active(task_id) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        assert outcome['cancelled_at'] - requested_at < 2
+
+    def test_cancel_image_task_while_page_running(self, client, app, sample_project):
+        """取消图片生成任务时恢复项目状态，取消后才失败的页面标记为FAILED"""
+        import threading
+        import time
+        from models import db, Page, Project, Task
+        from services.task_manager import generate_images_task, task_manager
+
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        page = Page(project_id=project_id, order_index=0, status='DESCRIPTION_GENERATED')
+        page.set_outline_content({'title': 'A'})
+        page.set_description_content({'text': '描述'})
+        db.session.add(page)
+        db.session.get(Project, project_id).status = 'GENERATING_IMAGES'
+        db.session.commit()
+        page_id = page.id
+        task_id = self._create_task(project_id, 'PENDING')
+        started = threading.Event()
+        release = threading.Event()
+
+        class _FakeAIService:
+            def flatten_outline(self, outline):
+                return [{'title': 'A'}]
+
+            def extract_image_urls_from_markdown(self, text):
+                return []
+
+            def generate_image_prompt(self, *args, **kwargs):
+                return 'prompt'
+
+            def generate_image(self, *args, **kwargs):
+                started.set()
+                release.wait(5)
+                raise RuntimeError('provider failed')
+
+        task_manager.submit_task(task_id, generate_images_task, project_id, _FakeAIService(), None,
+                                 [{'title': 'A'}], use_template=False, max_workers=1, app=app)
+        assert started.wait(5)
+        assert client.post(f'/api/projects/{project_id}/tasks/{task_id}/cancel').status_code == 202
+        deadline = time.monotonic() + 5
+        while task_manager.is_task_active(task_id) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        db.session.expire_all()
+        assert db.session.get(Task, task_id).status == 'CANCELLED'
+        assert db.session.get(Project, project_id).status == 'DESCRIPTIONS_GENERATED'
+        assert db.session.get(Page, page_id).status == 'GENERATING'
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            db.session.expire_all()
+            if db.session.get(Page, page_id).status == 'FAILED':
+                break
+            time.sleep(0.02)
+        assert db.session.get(Page, page_id).status == 'FAILED'
+
+
+class TestTaskProgress:
+    """任务进度（计数列 + 追加式消息表）测试"""
+
+    def test_progress_shape(self, client, sample_project):
+        """API 返回的 progress 结构与原 JSON 列一致，只返回最近的消息"""
+        from models import db, Task
+
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        task = Task(project_id=project_id, task_type='EXPORT_EDITABLE_PPTX', status='PROCESSING')
+        task.set_progress({'total': 100, 'completed': 0, 'failed': 0, 'percent': 0})
+        db.session.add(task)
+        db.session.commit()
+
+        for i in range(Task.MESSAGE_LIMIT + 2):
+            task.update_progress(completed=i, percent=i, current_step=f'步骤{i}')
+            task.add_message(f'消息{i}')
+            db.session.commit()
+        task.set_progress({'download_url': '/files/x.pptx'})
+        db.session.commit()
+
+        data = assert_success_response(client.get(f'/api/projects/{project_id}/tasks/{task.id}'))
+        progress = data['data']['progress']
+
+        last = Task.MESSAGE_LIMIT + 1
+        assert progress['completed'] == last and progress['percent'] == last
+        assert progress['current_step'] == f'步骤{last}'
+        assert progress['download_url'] == '/files/x.pptx'
+        assert progress['messages'] == [f'消息{i}' for i in range(2, last + 1)]
+
+
+class TestPageBatch:
+    """批量页面创建/更新（单事务）测试"""
+
+    def test_batch_create_and_update(self, client, sample_project):
+        """批量插入到指定位置后其余页面顺延，批量更新只改动给定字段"""
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        url = f'/api/projects/{project_id}/pages/batch'
+
+        response = client.post(url, json={'pages': [
+            {'outline_content': {'title': f'页{i}', 'points': []}} for i in range(3)
+        ]})
+        created = assert_success_response(response, 201)['data']['pages']
+        assert [p['order_index'] for p in created] == [0, 1, 2]
+
+        response = client.post(url, json={'order_index': 1, 'pages': [
+            {'outline_content': {'title': '插入页', 'points': []}, 'description_content': {'text': '描述'}}
+        ]})
+        inserted = assert_success_response(response, 201)['data']['pages'][0]
+        assert inserted['order_index'] == 1 and inserted['status'] == 'DESCRIPTION_GENERATED'
+
+        response = client.put(url, json={'pages': [
+            {'page_id': created[0]['page_id'], 'status': 'FAILED'},
+            {'page_id': created[2]['page_id'], 'description_content': {'text': '新描述'}},
+        ]})
+        updated = {p['page_id']: p for p in assert_success_response(response)['data']['pages']}
+        assert updated[created[0]['page_id']]['status'] == 'FAILED'
+        assert updated[created[2]['page_id']]['description_content'] == {'text': '新描述'}
+        assert updated[created[2]['page_id']]['outline_content']['title'] == '页2'
+
+        project = assert_success_response(client.get(f'/api/projects/{project_id}'))['data']
+        assert [p['outline_content']['title'] for p in project['pages']] == ['页0', '插入页', '页1', '页2']
+
+    def test_batch_update_rejects_invalid(self, client, sample_project):
+        """不属于项目的页面、不支持的字段返回错误且不做任何修改"""
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        url = f'/api/projects/{project_id}/pages/batch'
+        page = assert_success_response(
+            client.post(url, json={'pages': [{'outline_content': {'title': 'A'}}]}), 201
+        )['data']['pages'][0]
+
+        response = client.put(url, json={'pages': [
+            {'page_id': page['page_id'], 'status': 'FAILED'},
+            {'page_id': 'missing', 'status': 'FAILED'},
+        ]})
         assert response.status_code == 404
+        response = client.put(url, json={'pages': [{'page_id': page['page_id'], 'project_id': 'x'}]})
+        assert response.status_code == 400
+
+        project = assert_success_response(client.get(f'/api/projects/{project_id}'))['data']
+        assert project['pages'][0]['status'] == 'DRAFT'
+
+    def test_batch_update_validates_field_values(self, client, sample_project):
+        """批量更新校验字段类型：order_index 为不重复的非负整数，内容为对象或 null，状态取自页面状态集合"""
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        url = f'/api/projects/{project_id}/pages/batch'
+        pages = assert_success_response(client.post(url, json={'pages': [
+            {'outline_content': {'title': 'A'}}, {'outline_content': {'title': 'B'}}
+        ]}), 201)['data']['pages']
+        first, second = pages[0]['page_id'], pages[1]['page_id']
+
+        for fields in ({'status': 'DONE'}, {'order_index': -1}, {'order_index': '1'}, {'order_index': True},
+                       {'outline_content': 'text'}, {'description_content': ['x']}, {'part': 3}):
+            response = client.put(url, json={'pages': [{'page_id': first, **fields}]})
+            assert_error_response(response, 400)
+        response = client.put(url, json={'pages': [
+            {'page_id': first, 'order_index': 1}, {'page_id': second, 'order_index': 1}
+        ]})
+        assert_error_response(response, 400)
+
+        response = client.put(url, json={'pages': [
+            {'page_id': first, 'order_index': 1, 'description_content': None, 'status': 'FAILED'},
+            {'page_id': second, 'order_index': 0},
+        ]})
+        updated = assert_success_response(response)['data']['pages']
+        assert [(p['page_id'], p['status']) for p in updated] == [(second, 'DRAFT'), (first, 'FAILED')]
+
+    def test_description_task_flushes_while_waiting_and_skips_deleted(self, client, app, sample_project, monkeypatch):
+        """描述生成：慢页面未完成时已完成的页面按间隔写入；生成期间被删除的页面跳过，任务正常完成"""
+        import threading
+        import time
+        from models import db, Page, Task
+        from services import ai_service_manager
+        from services.task_manager import generate_descriptions_task
+
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        pages = assert_success_response(client.post(f'/api/projects/{project_id}/pages/batch', json={'pages': [
+            {'outline_content': {'title': title}} for title in ('快', '删除', '慢')
+        ]}), 201)['data']['pages']
+        fast_id, deleted_id, slow_id = (p['page_id'] for p in pages)
+        release = threading.Event()
+
+        class _StubAIService:
+            def flatten_outline(self, outline):
+                return outline
+
+            def generate_page_description(self, project_context, outline, page_outline, page_index, language=None):
+                if page_outline['title'] == '删除':
+                    db.session.execute(db.delete(Page).where(Page.id == deleted_id))
+                    db.session.commit()
+                elif page_outline['title'] == '慢':
+                    release.wait(10)
+                return f"描述-{page_outline['title']}"
+
+        monkeypatch.setattr(ai_service_manager, 'get_ai_service', lambda: _StubAIService())
+        monkeypatch.setitem(app.config, 'PAGE_WRITE_BATCH_INTERVAL', 0.05)
+        task = Task(project_id=project_id, task_type='GENERATE_DESCRIPTIONS', status='PENDING')
+        db.session.add(task)
+        db.session.commit()
+        task_id = task.id
+
+        outline = [{'title': '快'}, {'title': '删除'}, {'title': '慢'}]
+        worker = threading.Thread(target=generate_descriptions_task, args=(
+            task_id, project_id, _StubAIService(), None, outline
+        ), kwargs={'max_workers': 3, 'app': app})
+        worker.start()
+        try:
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                db.session.expire_all()
+                if db.session.get(Page, fast_id).status == 'DESCRIPTION_GENERATED':
+                    break
+                time.sleep(0.02)
+            assert db.session.get(Page, fast_id).status == 'DESCRIPTION_GENERATED'
+            assert db.session.get(Page, slow_id).status == 'DRAFT'
+        finally:
+            release.set()
+            worker.join(10)
+
+        db.session.expire_all()
+        assert db.session.get(Task, task_id).status == 'COMPLETED'
+        assert db.session.get(Page, deleted_id) is None
+        assert db.session.get(Page, slow_id).description_content['text'] == '描述-慢'
+
+
+class TestImageVersions:
+    """图片版本号原子分配与当前版本切换测试"""
+
+    def test_version_allocation_and_switch(self, client, app, sample_project):
+        """版本号由页面计数器分配（删除后不复用），切换后只有一个当前版本"""
+        from PIL import Image
+        from models import db, PageImageVersion
+        from services.file_service import FileService
+        from services.task_manager import save_image_with_version
+
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        page = assert_success_response(client.post(
+            f'/api/projects/{project_id}/pages/batch', json={'pages': [{'outline_content': {'title': 'A'}}]}
+        ), 201)['data']['pages'][0]
+        page_id = page['page_id']
+
+        file_service = FileService(app.config['UPLOAD_FOLDER'])
+        image = Image.new('RGB', (64, 36))
+        assert save_image_with_version(image, project_id, page_id, file_service)[1] == 1
+        assert save_image_with_version(image, project_id, page_id, file_service)[1] == 2
+        PageImageVersion.query.filter_by(page_id=page_id, version_number=2).delete()
+        db.session.commit()
+        assert save_image_with_version(image, project_id, page_id, file_service)[1] == 3
+
+        versions = assert_success_response(
+            client.get(f'/api/projects/{project_id}/pages/{page_id}/image-versions')
+        )['data']['versions']
+        assert [(v['version_number'], v['is_current']) for v in versions] == [(3, True), (1, False)]
 
+        response = client.post(
+            f"/api/projects/{project_id}/pages/{page_id}/image-versions/{versions[1]['version_id']}/set-current"
+        )
+        data = assert_success_response(response)['data']
+        assert [(v['version_number'], v['is_current']) for v in data['image_versions']] == [(3, False), (1, True)]
+        assert data['generated_image_url'].endswith(f'{page_id}_v1.png')
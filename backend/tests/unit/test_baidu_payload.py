@@ -0,0 +1,83 @@
+"""
+百度API图片载荷编码单元测试
+"""
+
+import base64
+import json
+from urllib.parse import parse_qs
+
+from PIL import Image
+
+from services.ai_providers.baidu_payload import (
+    encode_image_file,
+    build_form_body,
+    build_json_body,
+    rescale_coordinates,
+)
+
+
+class TestBaiduPayload:
+    """图片编码、请求体和坐标映射测试"""
+
+    def test_downscale_and_scale_factor(self, tmp_path):
+        """超过最长边上限时缩放，并记录缩放比例"""
+        path = tmp_path / 'big.png'
+        Image.new('RGB', (4000, 2000), (10, 20, 30)).save(path)
+
+        encoded = encode_image_file(str(path), max_side=1000)
+
+        assert encoded.original_size == (4000, 2000)
+        assert encoded.encoded_size == (1000, 500)
+        assert encoded.scale == 0.25
+
+    def test_encoding_cached_by_content(self, tmp_path):
+        """相同内容的图片复用编码结果"""
+        a = tmp_path / 'a.png'
+        b = tmp_path / 'b.png'
+        Image.new('RGB', (64, 64), (200, 0, 0)).save(a)
+        Image.new('RGB', (64, 64), (200, 0, 0)).save(b)
+
+        assert encode_image_file(str(a), max_side=1000) is encode_image_file(str(b), max_side=1000)
+
+    def test_form_body_round_trip(self, tmp_path):
+        """表单请求体可被标准解析器还原"""
+        path = tmp_path / 'img.png'
+        Image.new('RGB', (32, 32), (0, 128, 255)).save(path)
+        encoded = encode_image_file(str(path), max_side=0)
+
+        body = build_form_body(encoded, {'language_type': 'CHN_ENG', 'paragraph': 'false'})
+        parsed = parse_qs(body.decode('ascii'))
+
+        assert parsed['image'][0].encode('ascii') == encoded.base64_data
+        assert parsed['language_type'] == ['CHN_ENG']
+        base64.b64decode(parsed['image'][0])
+
+    def test_json_body(self, tmp_path):
+        """JSON请求体包含图片和其他字段"""
+        path = tmp_path / 'img.png'
+        Image.new('RGB', (16, 16)).save(path)
+        encoded = encode_image_file(str(path), max_side=0)
+
+        body = json.loads(build_json_body(encoded, {'rectangle': [{'left': 1, 'top': 2, 'width': 3, 'height': 4}]}))
+
+        assert body['image'] == encoded.base64_data.decode('ascii')
+        assert body['rectangle'][0]['height'] == 4
+
+    def test_rescale_coordinates(self):
+        """识别结果坐标映射回原图"""
+        result = {
+            'words_result': [{
+                'words': 'x',
+                'location': {'left': 10, 'top': 20, 'width': 30, 'height': 40},
+                'chars': [{'char': 'x', 'location': {'left': 1, 'top': 1, 'width': 2, 'height': 2}}],
+            }],
+            'tables_result': [{'body': [{'cell_location': [{'x': 5, 'y': 6}]}]}],
+            'words_result_num': 1,
+        }
+
+        rescale_coordinates(result, 2.0)
+
+        assert result['words_result'][0]['location'] == {'left': 20, 'top': 40, 'width': 60, 'height': 80}
+        assert result['words_result'][0]['chars'][0]['location']['width'] == 4
+        assert result['tables_result'][0]['body'][0]['cell_location'][0] == {'x': 10, 'y': 12}
+        assert result['words_result_num'] == 1
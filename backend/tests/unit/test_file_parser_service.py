@@ -0,0 +1,170 @@
+"""
+文件解析服务单元测试
+
+覆盖MinerU结果ZIP的选择性解压等纯本地逻辑，不访问网络
+"""
+
+import io
+import threading
+import zipfile
+
+from services.file_parser_service import FileParserService
+
+
+def _build_result_zip() -> io.BytesIO:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as z:
+        z.writestr('full.md', '# 标题\n\n![](images/abc123.jpg)\n')
+        z.writestr('layout.json', '{"pdf_info": [{"image_path": "def456.jpg"}]}')
+        z.writestr('demo_content_list.json', '[]')
+        z.writestr('demo_origin.pdf', b'%PDF-1.4')
+        z.writestr('images/abc123.jpg', b'a')
+        z.writestr('images/def456.jpg', b'b')
+        z.writestr('images/unused.jpg', b'c')
+        z.writestr('../escape.md', 'x')
+    buf.seek(0)
+    return buf
+
+
+class TestSelectiveExtraction:
+    """MinerU结果选择性解压测试"""
+
+    def test_only_needed_members_extracted(self, tmp_path):
+        """只解压markdown、layout/content_list和被引用的图片"""
+        service = FileParserService(mineru_token='test-token')
+        with zipfile.ZipFile(_build_result_zip()) as z:
+            markdown_path, extracted = service._extract_needed_members(z, tmp_path)
+
+        assert markdown_path == 'full.md'
+        assert extracted == 5
+        assert (tmp_path / 'layout.json').exists()
+        assert (tmp_path / 'demo_content_list.json').exists()
+        assert (tmp_path / 'images' / 'abc123.jpg').exists()
+        assert (tmp_path / 'images' / 'def456.jpg').exists()
+        assert not (tmp_path / 'images' / 'unused.jpg').exists()
+        assert not (tmp_path / 'demo_origin.pdf').exists()
+
+    def test_path_traversal_member_skipped(self, tmp_path):
+        """越界路径的成员不会被解压"""
+        target = tmp_path / 'extract'
+        target.mkdir()
+        service = FileParserService(mineru_token='test-token')
+        with zipfile.ZipFile(_build_result_zip()) as z:
+            service._extract_needed_members(z, target)
+
+        assert not (tmp_path / 'escape.md').exists()
+
+    def test_session_is_shared(self):
+        """MinerU请求复用同一个连接池会话"""
+        service = FileParserService(mineru_token='test-token')
+        assert service._get_session() is service._get_session()
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+class _FakeSession:
+    """按batch返回预设状态序列的假会话"""
+
+    def __init__(self, states):
+        self._states = {url: list(seq) for url, seq in states.items()}
+        self.calls = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls.append(url)
+        seq = self._states[url]
+        state = seq.pop(0) if len(seq) > 1 else seq[0]
+        entry = {"state": state}
+        if state == "done":
+            entry["full_zip_url"] = f"{url}/result.zip"
+        return _FakeResponse({"code": 0, "data": {"extract_result": [entry]}})
+
+
+class TestAdaptivePolling:
+    """MinerU自适应轮询测试"""
+
+    def test_delay_grows_and_is_capped(self):
+        """轮询间隔指数增长且有上限"""
+        from services.file_parser_service import next_poll_delay
+
+        delays = [next_poll_delay(i, jitter=0) for i in range(20)]
+        assert delays[0] == 0.5
+        assert delays == sorted(delays)
+        assert max(delays) == 10.0
+
+    def test_jitter_within_bounds(self):
+        """抖动不超过设定比例"""
+        from services.file_parser_service import next_poll_delay
+
+        for _ in range(100):
+            assert 0.4 <= next_poll_delay(0, jitter=0.2) <= 0.6
+
+    def test_single_poller_tracks_many_batches(self, monkeypatch):
+        """一个轮询线程同时跟踪多个batch并分别返回结果"""
+        from services import file_parser_service as fps
+
+        monkeypatch.setattr(fps, 'next_poll_delay', lambda attempt: 0.01)
+        session = _FakeSession({
+            'u1': ['running', 'running', 'done'],
+            'u2': ['pending', 'failed'],
+            'u3': ['done'],
+        })
+        poller = fps.MinerUBatchPoller()
+        futures = {
+            bid: poller.track(bid, url, {}, session, max_wait_time=5)
+            for bid, url in [('b1', 'u1'), ('b2', 'u2'), ('b3', 'u3')]
+        }
+
+        r1, e1 = futures['b1'].result(timeout=5)
+        r2, e2 = futures['b2'].result(timeout=5)
+        r3, e3 = futures['b3'].result(timeout=5)
+
+        assert e1 is None and r1['full_zip_url'] == 'u1/result.zip'
+        assert r2 is None and 'failed' in e2
+        assert e3 is None
+        assert poller.pending_count() == 0
+
+    def test_timeout_reported_as_error(self, monkeypatch):
+        """超过最长等待时间返回超时错误"""
+        from services import file_parser_service as fps
+
+        monkeypatch.setattr(fps, 'next_poll_delay', lambda attempt: 0.01)
+        session = _FakeSession({'u': ['running']})
+        poller = fps.MinerUBatchPoller()
+        result, error = poller.track('b', 'u', {}, session, max_wait_time=0.05).result(timeout=5)
+
+        assert result is None
+        assert 'timeout' in error
+
+    def test_slow_status_call_does_not_block_other_batches(self, monkeypatch):
+        """某个batch的状态查询卡住时，其他batch仍按时完成"""
+        from services import file_parser_service as fps
+
+        monkeypatch.setattr(fps, 'next_poll_delay', lambda attempt: 0.01)
+        release = threading.Event()
+
+        class _SlowSession(_FakeSession):
+            def get(self, url, headers=None, timeout=None):
+                if url == 'slow':
+                    release.wait(5)
+                return super().get(url, headers=headers, timeout=timeout)
+
+        session = _SlowSession({'slow': ['done'], 'fast': ['running', 'done']})
+        poller = fps.MinerUBatchPoller()
+        slow = poller.track('b-slow', 'slow', {}, session, max_wait_time=10)
+        fast = poller.track('b-fast', 'fast', {}, session, max_wait_time=10)
+        try:
+            result, error = fast.result(timeout=2)
+            assert error is None and result['full_zip_url'] == 'fast/result.zip'
+            assert not slow.done()
+        finally:
+            release.set()
+        assert slow.result(timeout=5)[1] is None
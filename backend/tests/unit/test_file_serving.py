@@ -0,0 +1,69 @@
+"""
+文件服务单元测试 - 缓存策略、ETag 条件请求、Range 请求、X-Accel-Redirect 卸载
+"""
+
+import os
+import uuid
+
+
+def _write_upload(app, *parts, content=b'0123456789' * 100):
+    path = os.path.join(app.config['UPLOAD_FOLDER'], *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+class TestFileServing:
+    """文件服务测试"""
+
+    def test_versioned_page_is_immutable(self, client, app):
+        """带版本号的页面图片长期缓存，ETag 命中返回304"""
+        project_id = str(uuid.uuid4())
+        _write_upload(app, project_id, 'pages', 'page_v2.png')
+        url = f'/files/{project_id}/pages/page_v2.png'
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == 365 * 24 * 3600
+        etag = response.headers['ETag']
+        assert not etag.startswith('W/')
+
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    def test_export_revalidated_with_range(self, client, app):
+        """导出文件会被覆盖：要求重新验证；支持 Range 请求"""
+        project_id = str(uuid.uuid4())
+        _write_upload(app, project_id, 'exports', 'presentation.pptx')
+        url = f'/files/{project_id}/exports/presentation.pptx'
+
+        response = client.get(url, headers={'Range': 'bytes=100-199'})
+        assert response.status_code == 206
+        assert response.data == (b'0123456789' * 10)
+        assert response.headers['Content-Range'] == 'bytes 100-199/1000'
+        assert response.cache_control.no_cache and not response.cache_control.immutable
+
+        assert client.get(url, headers={'Range': 'bytes=5000-'}).status_code == 416
+
+    def test_missing_and_traversal(self, client, app):
+        """不存在的文件和越界路径返回404"""
+        _write_upload(app, 'secret.txt')
+        assert client.get(f'/files/{uuid.uuid4()}/pages/none.png').status_code == 404
+        assert client.get('/files/../pages/secret.txt').status_code == 404
+        assert client.get('/files/user-templates/../secret.txt').status_code == 404
+
+    def test_x_accel_redirect_offload(self, client, app):
+        """FILE_SERVE_OFFLOAD=x-accel-redirect 时只返回内部重定向头，由 nginx 发送文件"""
+        project_id = str(uuid.uuid4())
+        _write_upload(app, project_id, 'pages', 'page_v1.png')
+        app.config['FILE_SERVE_OFFLOAD'] = 'x-accel-redirect'
+        try:
+            response = client.get(f'/files/{project_id}/pages/page_v1.png')
+        finally:
+            app.config['FILE_SERVE_OFFLOAD'] = ''
+
+        assert response.headers['X-Accel-Redirect'] == f'/protected-uploads/{project_id}/pages/page_v1.png'
+        assert response.data == b''
+        assert response.mimetype == 'image/png'
+        assert response.cache_control.immutable
@@ -0,0 +1,70 @@
+"""
+对冲请求单元测试
+"""
+
+import threading
+import time
+
+import pytest
+
+from services.hedging import RequestHedger
+
+
+class TestRequestHedger:
+    """慢请求对冲与额外开销上限测试"""
+
+    def _warm_up(self, hedger, count=3):
+        for _ in range(count):
+            hedger.call(lambda: 'fast')
+
+    def test_slow_request_is_hedged(self):
+        """超过 pNN 耗时的请求发起对冲，取先完成的结果"""
+        calls = []
+        lock = threading.Lock()
+
+        def request():
+            with lock:
+                calls.append(None)
+                attempt = len(calls)
+            time.sleep(0.5 if attempt == 1 else 0.01)
+            return f'attempt-{attempt}'
+
+        with RequestHedger(max_workers=2, max_extra_requests=1, poll_interval=0.02) as hedger:
+            self._warm_up(hedger)
+            assert hedger.call(request) == 'attempt-2'
+            time.sleep(0.6)  # 等待主请求完成，记录节省时间
+            stats = hedger.stats()
+
+        assert stats['hedges_launched'] == 1
+        assert stats['hedge_wins'] == 1
+        assert stats['saved_seconds'] > 0
+        assert stats['extra_cost_ratio'] == pytest.approx(1 / 4, abs=1e-3)
+
+    def test_extra_requests_capped(self):
+        """达到额外请求上限后不再对冲"""
+        def slow():
+            time.sleep(0.1)
+            return 'slow'
+
+        with RequestHedger(max_workers=2, max_extra_requests=1, poll_interval=0.01) as hedger:
+            self._warm_up(hedger)
+            for _ in range(3):
+                assert hedger.call(slow) == 'slow'
+
+        assert hedger.hedges_launched == 1
+
+    def test_failure_waits_for_hedge(self):
+        """先完成的请求失败时等待另一个请求"""
+        calls = []
+
+        def flaky():
+            calls.append(None)
+            if len(calls) == 1:
+                time.sleep(0.2)
+                raise RuntimeError('upstream error')
+            time.sleep(0.4)
+            return 'ok'
+
+        with RequestHedger(max_workers=1, max_extra_requests=1, poll_interval=0.01) as hedger:
+            self._warm_up(hedger)
+            assert hedger.call(flaky) == 'ok'
@@ -0,0 +1,475 @@
+"""
+图片可编辑化服务单元测试
+
+使用假的解析服务/Provider验证本地逻辑，不访问外部API
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from services.image_editability.extractors import MinerUElementExtractor
+
+
+def _text_block(x0, y0, x1, y1, text):
+    return {
+        'type': 'text',
+        'bbox': [x0, y0, x1, y1],
+        'lines': [{'spans': [{'type': 'text', 'content': text}]}],
+    }
+
+
+class _FakeParserService:
+    """模拟MinerU：每次parse_file写出一个多页layout.json"""
+
+    def __init__(self, upload_folder: Path, pages: int):
+        self._upload_folder = upload_folder
+        self.pages = pages
+        self.calls = []
+
+    def parse_file(self, pdf_path, filename):
+        extract_id = f"ext{len(self.calls)}"
+        self.calls.append(filename)
+        result_dir = self._upload_folder / 'mineru_files' / extract_id
+        result_dir.mkdir(parents=True)
+        pdf_info = [
+            {
+                'page_idx': i,
+                'page_size': [100, 50],
+                'para_blocks': [_text_block(10, 10, 50, 20, f"page-{i}")],
+                'discarded_blocks': [],
+            }
+            for i in range(self.pages)
+        ]
+        (result_dir / 'layout.json').write_text(json.dumps({'pdf_info': pdf_info}))
+        (result_dir / 'x_content_list.json').write_text('[]')
+        return 'batch', '', extract_id, None, 0
+
+
+@pytest.fixture
+def slide_images(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"slide_{i}.png"
+        Image.new('RGB', (200, 100), (255, 255, 255)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+class TestMinerUBatch:
+    """MinerU多页批量解析测试"""
+
+    def test_prefetch_uses_single_job_and_splits_pages(self, tmp_path, slide_images):
+        """多张图片只提交一次MinerU任务，并按页拆分结果"""
+        parser = _FakeParserService(tmp_path, pages=len(slide_images))
+        extractor = MinerUElementExtractor(parser, tmp_path)
+
+        extractor.prefetch(slide_images)
+        results = [extractor.extract(path) for path in slide_images]
+
+        assert len(parser.calls) == 1
+        for i, result in enumerate(results):
+            assert [e['content'] for e in result.elements] == [f"page-{i}"]
+            assert result.context.metadata['page_index'] == i
+            # page_size 100x50 -> 图片 200x100，bbox放大两倍
+            assert result.elements[0]['bbox'] == [20, 20, 100, 40]
+
+    def test_extract_without_prefetch_parses_single_image(self, tmp_path, slide_images):
+        """未预解析的图片回退到单张解析"""
+        parser = _FakeParserService(tmp_path, pages=1)
+        extractor = MinerUElementExtractor(parser, tmp_path)
+
+        result = extractor.extract(slide_images[0])
+
+        assert len(parser.calls) == 1
+        assert [e['content'] for e in result.elements] == ["page-0"]
+
+
+class _CountingOCRProvider:
+    """记录调用次数的假高精度OCR Provider"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def recognize(self, image_path, **kwargs):
+        self.calls += 1
+        return {
+            'text_lines': [{'text': '页脚', 'bbox': [1, 2, 30, 12], 'probability': {'average': 0.99}}],
+            'image_size': (200, 100),
+            'direction': None,
+        }
+
+
+class TestOCRResultCache:
+    """OCR结果缓存测试"""
+
+    def test_identical_images_hit_cache(self, tmp_path, slide_images):
+        """相同内容的图片只调用一次远程OCR"""
+        from services.image_editability import BaiduAccurateOCRElementExtractor, OCRResultCache
+
+        provider = _CountingOCRProvider()
+        extractor = BaiduAccurateOCRElementExtractor(provider, OCRResultCache(tmp_path / 'ocr_cache'))
+
+        first = extractor.extract(slide_images[0])
+        second = extractor.extract(slide_images[1])
+
+        assert provider.calls == 1
+        assert [e['content'] for e in second.elements] == [e['content'] for e in first.elements]
+        assert second.context.metadata['image_size'] == (200, 100)
+
+    def test_options_are_part_of_key(self, tmp_path, slide_images):
+        """识别参数不同时不复用缓存"""
+        from services.image_editability import BaiduAccurateOCRElementExtractor, OCRResultCache
+
+        provider = _CountingOCRProvider()
+        extractor = BaiduAccurateOCRElementExtractor(provider, OCRResultCache(tmp_path / 'ocr_cache'))
+
+        extractor.extract(slide_images[0], language_type='CHN_ENG')
+        extractor.extract(slide_images[0], language_type='ENG')
+
+        assert provider.calls == 2
+
+    def test_persistent_and_lru_capped(self, tmp_path, slide_images):
+        """磁盘缓存跨实例保留，超过上限时淘汰旧条目"""
+        from services.image_editability import OCRResultCache
+
+        cache_dir = tmp_path / 'ocr_cache'
+        cache = OCRResultCache(cache_dir, max_entries=10)
+        for i in range(15):
+            cache.put(f"{i:064x}", {'text_lines': [], 'n': i})
+
+        assert len(list(cache_dir.glob('*/*.json'))) <= 10
+        reopened = OCRResultCache(cache_dir, max_entries=10)
+        assert reopened.get(f"{14:064x}")['n'] == 14
+
+
+class TestElementDedup:
+    """跨页元素去重测试"""
+
+    def test_identical_crops_share_signature(self, tmp_path, slide_images):
+        """内容相同的裁剪图签名相同，不同内容签名不同"""
+        from services.image_editability.data_models import BBox, EditableElement
+        from services.image_editability.element_dedup import ElementDeduplicator
+
+        other = tmp_path / 'other.png'
+        img = Image.new('RGB', (200, 100), 'white')
+        img.paste((0, 0, 0), (0, 0, 100, 100))
+        img.save(other)
+
+        def make(path):
+            return EditableElement(
+                element_id='x', element_type='image',
+                bbox=BBox(0, 0, 200, 100), bbox_global=BBox(0, 0, 200, 100),
+                image_path=str(path)
+            )
+
+        sig_a = ElementDeduplicator.signature(make(slide_images[0]), depth=1)
+        sig_b = ElementDeduplicator.signature(make(slide_images[1]), depth=1)
+        sig_c = ElementDeduplicator.signature(make(other), depth=1)
+        assert sig_a == sig_b
+        assert sig_a != sig_c
+
+    def test_run_once_and_clone_remaps_global_bbox(self):
+        """同组只计算一次，复用结果重新分配ID并映射全局坐标"""
+        from services.image_editability.data_models import BBox, EditableElement
+        from services.image_editability.element_dedup import ElementDeduplicator, clone_elements_to
+
+        dedup = ElementDeduplicator()
+        calls = []
+        for _ in range(3):
+            dedup.run_once('logo', lambda: calls.append(1) or 'result')
+        assert len(calls) == 1
+        assert dedup.stats() == {'groups': 1, 'computed': 1, 'reused': 2}
+
+        child = EditableElement(
+            element_id='a_0', element_type='text',
+            bbox=BBox(10, 10, 20, 20), bbox_global=BBox(110, 210, 120, 220)
+        )
+        cloned = clone_elements_to([child], BBox(100, 200, 200, 300), BBox(500, 0, 700, 200))
+        assert cloned[0].element_id != child.element_id
+        assert cloned[0].bbox == child.bbox
+        assert cloned[0].bbox_global.to_tuple() == (520, 20, 540, 40)
+
+
+class _FakeVisionService:
+    """模拟视觉模型：拼图只返回第0块的结果，逐个识别返回黑色"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_json_with_image(self, prompt, image_path, thinking_budget=0):
+        self.prompts.append(prompt)
+        if '纵向拼接' in prompt:
+            return [{'id': 0, 'colored_segments': [{'text': '标题', 'color': '#FF0000'}]}]
+        if 'element_id' in prompt:
+            return []
+        return {'colored_segments': [{'text': '正文', 'color': '#000000'}]}
+
+
+class TestContactSheetColorExtraction:
+    """拼图批量文字颜色识别测试"""
+
+    def test_batch_with_fallback(self, slide_images):
+        """拼图一次识别多个元素，缺失的元素回退到逐个识别"""
+        from services.export_service import ExportService
+        from services.image_editability.data_models import BBox, EditableElement, EditableImage
+        from services.image_editability.text_attribute_extractors import CaptionModelTextAttributeExtractor
+
+        elements = [
+            EditableElement(
+                element_id=f'p_{i}', element_type='text',
+                bbox=BBox(0, 0, 200, 100), bbox_global=BBox(0, 0, 200, 100),
+                content=text, image_path=slide_images[i]
+            )
+            for i, text in enumerate(['标题', '正文', '页脚'])
+        ]
+        page = EditableImage(image_id='p', image_path=slide_images[0], width=200, height=100, elements=elements)
+        service = _FakeVisionService()
+        extractor = CaptionModelTextAttributeExtractor(service)
+
+        results, failed = ExportService._batch_extract_text_styles_hybrid(
+            [page], extractor, max_workers=2, color_batch_size=8
+        )
+
+        assert failed == []
+        assert results['p_0'].font_color_rgb == (255, 0, 0)
+        assert results['p_0'].metadata['source'] == 'caption_model_contact_sheet'
+        assert results['p_1'].font_color_rgb == (0, 0, 0)
+        # 1次全图 + 1次拼图 + 2次回退
+        assert len(service.prompts) == 4
+
+    def test_contact_sheet_closes_crop_files(self, slide_images, monkeypatch):
+        """按路径传入的裁剪图读入后立即关闭，不累积文件句柄"""
+        from services.image_editability import text_attribute_extractors as module
+
+        opened = []
+        original_open = module.Image.open
+
+        def tracking_open(*args, **kwargs):
+            image = original_open(*args, **kwargs)
+            opened.append(image)
+            return image
+
+        build_contact_sheet = module.CaptionModelTextAttributeExtractor._build_contact_sheet.__func__
+        open_at_build = []
+
+        def checking_build(cls, images):
+            open_at_build.extend(image for image in opened if image.fp is not None)
+            return build_contact_sheet(cls, images)
+
+        monkeypatch.setattr(module.Image, 'open', tracking_open)
+        monkeypatch.setattr(module.CaptionModelTextAttributeExtractor, '_build_contact_sheet', classmethod(checking_build))
+        extractor = module.CaptionModelTextAttributeExtractor(_FakeVisionService())
+        results = extractor.extract_batch_contact_sheet(
+            [(f'p_{i}', path, '标题') for i, path in enumerate(slide_images[:2])]
+        )
+
+        assert 'p_0' in results
+        assert len(opened) == 2 and not open_at_build
+
+
+class _RecordingExtractor:
+    """记录调用次数的回退提取器"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def extract(self, image, text_content=None, **kwargs):
+        from services.image_editability.text_attribute_extractors import TextStyleResult
+        self.calls += 1
+        return TextStyleResult(font_color_rgb=(1, 2, 3), metadata={'source': 'fallback'})
+
+
+def _text_like_image(colors):
+    """白底，按颜色依次画若干“笔画”"""
+    from PIL import ImageDraw
+    img = Image.new('RGB', (240, 60), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for i in range(12):
+        color = colors[i * len(colors) // 12]
+        draw.rectangle([10 + i * 18, 15, 18 + i * 18, 45], fill=color)
+    return img
+
+
+class TestLocalColorExtractor:
+    """本地像素颜色估计测试"""
+
+    def test_single_color_resolved_locally(self):
+        """单色文字本地估计，不调用模型"""
+        from services.image_editability.text_attribute_extractors import LocalColorTextAttributeExtractor
+
+        fallback = _RecordingExtractor()
+        extractor = LocalColorTextAttributeExtractor(fallback_extractor=fallback)
+        result = extractor.extract(_text_like_image([(200, 30, 30)]), '标题')
+
+        assert fallback.calls == 0
+        assert result.metadata['source'] == 'local_color'
+        assert all(abs(a - b) <= 8 for a, b in zip(result.font_color_rgb, (200, 30, 30)))
+        assert result.confidence >= 0.75
+
+    def test_multi_color_escalates_to_model(self):
+        """检测到多种前景色时交给模型"""
+        from services.image_editability.text_attribute_extractors import LocalColorTextAttributeExtractor
+
+        fallback = _RecordingExtractor()
+        extractor = LocalColorTextAttributeExtractor(fallback_extractor=fallback)
+        result = extractor.extract(_text_like_image([(0, 0, 0), (30, 60, 220)]), '普通强调')
+
+        assert fallback.calls == 1
+        assert result.metadata['source'] == 'fallback'
+
+    def test_stats_consistent_under_concurrency(self):
+        """多个线程同时提取时统计计数不丢失"""
+        from concurrent.futures import ThreadPoolExecutor
+        from services.image_editability.text_attribute_extractors import LocalColorTextAttributeExtractor
+
+        extractor = LocalColorTextAttributeExtractor(fallback_extractor=_RecordingExtractor())
+        single = _text_like_image([(200, 30, 30)])
+        multi = _text_like_image([(0, 0, 0), (30, 60, 220)])
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda i: extractor.extract(single if i % 2 else multi, '文字'), range(200)))
+
+        assert extractor.stats() == {'local': 100, 'escalated': 100}
+
+
+class TestBatchTokenBudget:
+    """全图批量识别按 token 预算分块测试"""
+
+    def test_dense_page_split_and_merged(self, slide_images):
+        """元素过多时分块请求，合并后覆盖全部元素"""
+        import threading
+        from services.image_editability.text_attribute_extractors import CaptionModelTextAttributeExtractor
+
+        class _EchoService:
+            def __init__(self):
+                self.calls = 0
+                self.lock = threading.Lock()
+
+            def generate_json_with_image(self, prompt, image_path, thinking_budget=0):
+                with self.lock:
+                    self.calls += 1
+                start = prompt.index('```json') + len('```json')
+                elements = json.loads(prompt[start:prompt.index('```', start)])
+                return [{'element_id': e['element_id'], 'is_bold': True} for e in elements]
+
+        service = _EchoService()
+        extractor = CaptionModelTextAttributeExtractor(service)
+        elements = [
+            {'element_id': f'e{i}', 'bbox': [0, i, 10, i + 1], 'content': '段落文字' * 20}
+            for i in range(30)
+        ]
+
+        results = extractor.extract_batch_with_full_image(slide_images[0], elements, token_budget=1000)
+
+        assert service.calls > 1
+        assert set(results) == {e['element_id'] for e in elements}
+        assert all(r.is_bold for r in results.values())
+
+
+class _StubInpaint:
+    """记录调用的假重绘Provider"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def inpaint_regions(self, image, bboxes, types=None, **kwargs):
+        self.calls += 1
+        return image
+
+
+class TestTaskDeadline:
+    """任务时间预算与降级策略测试"""
+
+    def test_budget_propagates_to_worker_threads(self):
+        """绑定的时间预算传递到子线程，请求超时随剩余预算缩短"""
+        from services.cancellation import (
+            CancellationToken, bind_cancel_token, budget_timeout, cancellable_executor
+        )
+
+        token = CancellationToken('t1')
+        token.start_budget(30)
+        with bind_cancel_token(token), cancellable_executor(2) as executor:
+            timeout = executor.submit(budget_timeout, 300).result()
+
+        assert 25 < timeout <= 30
+        assert budget_timeout(300) == 300  # 未绑定时不受限制
+
+    def test_budget_reaches_nested_export_workers(self):
+        """导出中嵌套线程池（文字样式批量提取）的子线程也能看到任务截止时间"""
+        from services.cancellation import (
+            CancellationToken, bind_cancel_token, cancellable_executor, remaining_time
+        )
+        from services.export_service import ExportService
+
+        class _BudgetProbe:
+            def extract(self, image, text_content=None, **kwargs):
+                return remaining_time()
+
+        token = CancellationToken('t4')
+        token.start_budget(30)
+        items = [(f'e{i}', 'unused.png', 'text') for i in range(3)]
+        with bind_cancel_token(token), cancellable_executor(1) as executor:
+            results = executor.submit(
+                ExportService._batch_extract_text_styles, items, _BudgetProbe(), 2
+            ).result()
+
+        assert len(results) == 3 and all(25 < remaining <= 30 for remaining in results.values())
+
+    def test_budget_applies_to_async_openai_calls(self):
+        """OpenAI 异步文本/图片请求的超时同样按剩余预算缩短"""
+        import asyncio
+        from types import SimpleNamespace
+        from services.ai_providers.image.openai_provider import OpenAIImageProvider
+        from services.ai_providers.text.openai_provider import OpenAITextProvider
+        from services.cancellation import CancellationToken, bind_cancel_token
+
+        timeouts = []
+
+        async def create(**kwargs):
+            timeouts.append(kwargs.get('timeout'))
+            if kwargs['messages'][-1]['content'] == 'text':
+                return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='ok'))])
+            raise RuntimeError('no image')
+
+        fake_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        text_provider = OpenAITextProvider('key')
+        image_provider = OpenAIImageProvider('key')
+        text_provider._async_client = image_provider._async_client = fake_client
+
+        token = CancellationToken('t5')
+        token.start_budget(30)
+        with bind_cancel_token(token):
+            assert asyncio.run(text_provider.agenerate_text('text')) == 'ok'
+            with pytest.raises(Exception, match='no image'):
+                asyncio.run(image_provider.agenerate_image('image'))
+
+        assert len(timeouts) == 2 and all(timeout is not None and 25 < timeout <= 30 for timeout in timeouts)
+
+    def test_expired_budget_stops_new_requests(self):
+        """预算用完后不再发起新请求"""
+        from services.cancellation import (
+            CancellationToken, DeadlineExceededError, bind_cancel_token, budget_timeout
+        )
+
+        token = CancellationToken('t2', deadline=0)
+        with bind_cancel_token(token), pytest.raises(DeadlineExceededError):
+            budget_timeout(300)
+
+    def test_hybrid_inpaint_skips_enhancement_when_time_short(self):
+        """剩余时间不足时混合重绘只做百度修复"""
+        from services.cancellation import CancellationToken, bind_cancel_token
+        from services.image_editability.inpaint_providers import HybridInpaintProvider
+
+        baidu, generative = _StubInpaint(), _StubInpaint()
+        provider = HybridInpaintProvider(baidu, generative)
+        provider._enhance_image_quality = lambda image, **kwargs: pytest.fail('不应调用画质提升')
+        token = CancellationToken('t3')
+        token.start_budget(5)
+
+        with bind_cancel_token(token):
+            result = provider.inpaint_regions(Image.new('RGB', (32, 32)), [(0, 0, 8, 8)])
+
+        assert result is not None
+        assert baidu.calls == 1
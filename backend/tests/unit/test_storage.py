@@ -0,0 +1,180 @@
+"""
+存储后端单元测试 - 本地磁盘、S3 兼容对象存储（内存中的 MinIO 式替身客户端）、FileService 发布/拉取
+"""
+
+import hashlib
+import io
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from services.storage import LocalStorage, S3Storage, Storage
+
+
+class _NotFound(Exception):
+    """与 botocore ClientError 相同的 response 结构"""
+
+    def __init__(self):
+        super().__init__('Not Found')
+        self.response = {'Error': {'Code': '404'}}
+
+
+class FakeS3Client:
+    """只实现 S3Storage 用到的 S3 API 的内存客户端"""
+
+    def __init__(self):
+        self.objects = {}
+
+    def _get(self, bucket, key):
+        if (bucket, key) not in self.objects:
+            raise _NotFound()
+        return self.objects[(bucket, key)]
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[(Bucket, Key)] = Body if isinstance(Body, bytes) else Body.read()
+
+    def upload_file(self, filename, bucket, key, ExtraArgs=None):
+        self.objects[(bucket, key)] = Path(filename).read_bytes()
+
+    def get_object(self, Bucket, Key):
+        return {'Body': io.BytesIO(self._get(Bucket, Key))}
+
+    def download_file(self, bucket, key, filename):
+        Path(filename).write_bytes(self._get(bucket, key))
+
+    def head_object(self, Bucket, Key):
+        body = self._get(Bucket, Key)
+        return {'ContentLength': len(body), 'ETag': '"%s"' % hashlib.md5(body).hexdigest()}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete['Objects']:
+            self.objects.pop((Bucket, item['Key']), None)
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None, MaxKeys=2):
+        keys = sorted(k for b, k in self.objects if b == Bucket and k.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + MaxKeys]
+        response = {'Contents': [{'Key': k} for k in page], 'IsTruncated': start + MaxKeys < len(keys)}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = str(start + MaxKeys)
+        return response
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://minio.local/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+
+@pytest.fixture
+def s3_storage():
+    return S3Storage('slides', prefix='test', client=FakeS3Client())
+
+
+class TestStorage:
+    """存储后端测试"""
+
+    @pytest.mark.parametrize('backend', ['local', 's3'])
+    def test_storage_interface(self, backend, tmp_path, s3_storage):
+        """本地与 S3 后端的 put/get/stream/exists/list/delete 行为一致"""
+        storage = LocalStorage(tmp_path / 'root') if backend == 'local' else s3_storage
+
+        storage.put('p1/pages/a_v1.png', b'abc')
+        source = tmp_path / 'source.pptx'
+        source.write_bytes(b'0123456789')
+        storage.put_file('p1/exports/x.pptx', source)
+        storage.put('p2/pages/b_v1.png', b'other')
+
+        assert storage.get('p1/pages/a_v1.png') == b'abc'
+        assert b''.join(storage.stream('p1/exports/x.pptx', chunk_size=3)) == b'0123456789'
+        assert storage.exists('p1/exports/x.pptx') and not storage.exists('p1/none.png')
+        assert storage.list('p1/') == ['p1/exports/x.pptx', 'p1/pages/a_v1.png']
+        with pytest.raises(FileNotFoundError):
+            storage.get('p1/none.png')
+
+        target = tmp_path / 'copy' / 'a.png'
+        assert storage.download('p1/pages/a_v1.png', target) and target.read_bytes() == b'abc'
+        assert not storage.download('p1/none.png', tmp_path / 'none.png')
+
+        assert storage.delete_prefix('p1/') == 2
+        assert storage.list('p') == ['p2/pages/b_v1.png']
+
+    def test_storage_is_abstract(self):
+        """存储接口是抽象基类，未实现全部方法的后端不能实例化"""
+        with pytest.raises(TypeError):
+            Storage()
+
+    def test_overwritten_file_revalidated_on_other_replica(self, client, app, tmp_path, s3_storage):
+        """固定文件名的文件被一个副本覆盖后，另一个副本不再使用本地旧副本"""
+        from services.file_service import FileService
+
+        project_id = str(uuid.uuid4())
+        writer = FileService(str(tmp_path / 'replica-a'), storage=s3_storage)
+        reader = FileService(str(tmp_path / 'replica-b'), storage=s3_storage)
+        key = f'{project_id}/exports/presentation.pptx'
+
+        def publish(content):
+            path = tmp_path / 'replica-a' / key
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content)
+            writer.publish_file(path)
+
+        publish(b'old-deck')
+        assert Path(reader.get_absolute_path(key)).read_bytes() == b'old-deck'
+        publish(b'new-deck')
+
+        # 本地副本过期时 /files 从对象存储提供最新内容，FileService 重新下载
+        app.config['STORAGE_BACKEND'] = 's3'
+        app.config['STORAGE_PRESIGN_REDIRECT'] = False
+        app.config['UPLOAD_FOLDER'], upload_folder = str(tmp_path / 'replica-b'), app.config['UPLOAD_FOLDER']
+        app.extensions['storage'] = s3_storage
+        try:
+            response = client.get(f'/files/{key}')
+            assert response.status_code == 200 and response.data == b'new-deck'
+            assert Path(reader.get_absolute_path(key)).read_bytes() == b'new-deck'
+        finally:
+            app.config['STORAGE_BACKEND'] = 'local'
+            app.config['STORAGE_PRESIGN_REDIRECT'] = True
+            app.config['UPLOAD_FOLDER'] = upload_folder
+            app.extensions.pop('storage', None)
+
+    def test_file_service_publishes_and_fetches(self, app, tmp_path, s3_storage):
+        """远程存储时写入的文件会上传；另一个副本（空的本地目录）按需下载"""
+        from services.file_service import FileService
+
+        project_id, page_id = str(uuid.uuid4()), str(uuid.uuid4())
+        writer = FileService(str(tmp_path / 'replica-a'), storage=s3_storage)
+        relative_path = writer.save_generated_image(Image.new('RGB', (32, 18)), project_id, page_id, version_number=1)
+        assert s3_storage.exists(relative_path)
+
+        reader = FileService(str(tmp_path / 'replica-b'), storage=s3_storage)
+        assert reader.file_exists(relative_path)
+        local_path = reader.get_absolute_path(relative_path)
+        assert os.path.isfile(local_path) and Image.open(local_path).size == (32, 18)
+
+        reader.delete_project_files(project_id)
+        assert not s3_storage.list(f'{project_id}/')
+
+    def test_files_route_falls_back_to_remote(self, client, app, s3_storage):
+        """/files 请求本地不存在的文件时重定向到预签名 URL，或由后端转发"""
+        project_id = str(uuid.uuid4())
+        s3_storage.put(f'{project_id}/exports/deck.pptx', b'pptx-bytes')
+        app.config['STORAGE_BACKEND'] = 's3'
+        app.extensions['storage'] = s3_storage
+        try:
+            response = client.get(f'/files/{project_id}/exports/deck.pptx')
+            assert response.status_code == 302
+            assert response.headers['Location'].startswith(f'https://minio.local/slides/test/{project_id}/')
+            assert response.cache_control.no_store
+
+            app.config['STORAGE_PRESIGN_REDIRECT'] = False
+            response = client.get(f'/files/{project_id}/exports/deck.pptx')
+            assert response.status_code == 200 and response.data == b'pptx-bytes'
+            assert client.get(f'/files/{project_id}/exports/none.pptx').status_code == 404
+        finally:
+            app.config['STORAGE_BACKEND'] = 'local'
+            app.config['STORAGE_PRESIGN_REDIRECT'] = True
+            app.extensions.pop('storage', None)
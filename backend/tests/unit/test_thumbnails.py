@@ -0,0 +1,64 @@
+"""
+缩略图单元测试 - 档位选择、保存时预生成、?w= 按需生成与缓存头
+"""
+
+import io
+import os
+import uuid
+from pathlib import Path
+
+from PIL import Image
+
+from services.thumbnails import select_width, thumbnail_path
+
+
+def _save_page_image(app, width=2000, height=1125):
+    from services.file_service import FileService
+
+    project_id, page_id = str(uuid.uuid4()), str(uuid.uuid4())
+    image = Image.new('RGB', (width, height), (200, 120, 40))
+    relative_path = FileService(app.config['UPLOAD_FOLDER']).save_generated_image(
+        image, project_id, page_id, version_number=1
+    )
+    return Path(app.config['UPLOAD_FOLDER']) / relative_path
+
+
+class TestThumbnails:
+    """缩略图测试"""
+
+    def test_select_width_rounds_up(self):
+        """请求宽度向上取整到档位，超过最大档位时使用最大档位"""
+        widths = [320, 640, 1280]
+        assert select_width(100, widths) == 320
+        assert select_width(640, widths) == 640
+        assert select_width(641, widths) == 1280
+        assert select_width(5000, widths) == 1280
+
+    def test_pregenerated_on_save(self, client, app):
+        """保存生成的页面图片时预生成所有档位的 WebP 缩略图"""
+        source = _save_page_image(app)
+
+        for width in app.config['THUMBNAIL_WIDTHS']:
+            with Image.open(thumbnail_path(source, width, 'webp')) as thumb:
+                assert thumb.width == width
+
+    def test_serve_thumbnail(self, client, app):
+        """?w= 返回缩略图（按 Accept 协商格式），版本化文件名使用 immutable 缓存"""
+        source = _save_page_image(app)
+        url = f'/files/{source.parent.parent.name}/pages/{source.name}'
+
+        response = client.get(f'{url}?w=600', headers={'Accept': 'image/webp,*/*'})
+        assert response.status_code == 200
+        assert response.mimetype == 'image/webp'
+        assert 'Accept' in response.vary
+        assert response.cache_control.immutable and response.cache_control.max_age > 0
+        assert Image.open(io.BytesIO(response.data)).width == 640
+
+        # 不支持 WebP 时按需生成 JPEG
+        response = client.get(f'{url}?w=300', headers={'Accept': 'image/png'})
+        assert response.mimetype == 'image/jpeg'
+        assert os.path.exists(thumbnail_path(source, 320, 'jpeg'))
+
+        assert client.get(f'{url}?w=abc').status_code == 400
+        # 不带 w 时返回原图
+        assert Image.open(io.BytesIO(client.get(url).data)).width == 2000
@@ -0,0 +1,124 @@
+"""
+上传目录垃圾回收单元测试 - 引用追踪、保留期限、历史版本裁剪、配额淘汰、dry-run 报告
+"""
+
+import os
+import time
+import uuid
+
+import pytest
+from PIL import Image
+
+from conftest import assert_success_response
+from services.upload_gc import GCPolicy, UploadGarbageCollector
+
+
+def _write(path, size=10, age_days=0.0):
+    """写入指定大小的文件，并把修改时间设为 age_days 天前"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size)
+    mtime = time.time() - age_days * 86400
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+class TestUploadGC:
+    """上传目录垃圾回收测试"""
+
+    def test_collect_references_and_retention(self, client, app, sample_project, tmp_path):
+        """只回收未引用/过期的文件；dry-run 不删除，执行后删除文件和超出保留数量的历史版本"""
+        from models import db, Project, PageImageVersion
+        from services.file_service import FileService
+        from services.task_manager import save_image_with_version
+
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        page_id = assert_success_response(client.post(
+            f'/api/projects/{project_id}/pages/batch', json={'pages': [{'outline_content': {'title': 'A'}}]}
+        ), 201)['data']['pages'][0]['page_id']
+
+        file_service = FileService(str(tmp_path))
+        image = Image.new('RGB', (16, 9))
+        for _ in range(3):
+            save_image_with_version(image, project_id, page_id, file_service)
+        project = Project.query.get(project_id)
+        project.idea_prompt = '参考 ![图](/files/mineru/kept/images/a.png)'
+        db.session.commit()
+
+        _write(tmp_path / project_id / 'pages' / 'orphan.png')
+        _write(tmp_path / project_id / 'pages' / 'thumbs' / 'gone.png_w320.webp')
+        _write(tmp_path / project_id / 'exports' / 'old.pptx', age_days=10)
+        _write(tmp_path / project_id / 'exports' / 'new.pptx', age_days=1)
+        deleted_project_id = str(uuid.uuid4())
+        _write(tmp_path / deleted_project_id / 'pages' / 'x.png')
+        _write(tmp_path / 'editable_images' / 'img1' / 'elements' / 'e.png', age_days=5)
+        _write(tmp_path / 'mineru_files' / 'stale' / 'images' / 'a.png', age_days=5)
+        _write(tmp_path / 'mineru_files' / 'kept' / 'images' / 'a.png', age_days=5)
+        _write(tmp_path / 'tmpabc123' / 'upload.png', age_days=2)
+        _write(tmp_path / 'ocr_cache' / 'ab' / 'entry.json', age_days=30)
+
+        # 2 小时后回收：新写入的页面图片也超过了最短保留时间
+        policy = GCPolicy(keep_page_versions=1)
+        now = time.time() + 2 * 3600
+        report = UploadGarbageCollector(str(tmp_path), policy, now=now).run(dry_run=True)
+        selected = {(item.path, item.reason) for item in report.items}
+        old_thumbnails = {
+            (path.relative_to(tmp_path).as_posix(), 'orphan')
+            for path in (tmp_path / project_id / 'pages' / 'thumbs').glob(f'{page_id}_v1.png_w*')
+        }
+        assert selected == old_thumbnails | {
+            (f'{project_id}/pages/{page_id}_v1.png', 'old_version'),
+            (f'{project_id}/pages/orphan.png', 'orphan'),
+            (f'{project_id}/pages/thumbs/gone.png_w320.webp', 'orphan'),
+            (f'{project_id}/exports/old.pptx', 'expired'),
+            (deleted_project_id, 'deleted_project'),
+            ('editable_images/img1', 'expired'),
+            ('mineru_files/stale', 'unreferenced'),
+            ('tmpabc123', 'expired'),
+        }
+        data = report.to_dict()
+        assert data['dry_run'] and data['deleted_versions'] == 1 and data['freed_bytes'] == report.freed_bytes > 0
+        assert (tmp_path / project_id / 'pages' / f'{page_id}_v1.png').exists()
+        assert PageImageVersion.query.filter_by(page_id=page_id).count() == 3
+
+        report = UploadGarbageCollector(str(tmp_path), policy, now=now).run(dry_run=False)
+        assert not report.errors
+        for path, _ in selected:
+            assert not (tmp_path / path).exists()
+        versions = PageImageVersion.query.filter_by(page_id=page_id).order_by(PageImageVersion.version_number).all()
+        assert [v.version_number for v in versions] == [2, 3]
+        assert all((tmp_path / v.image_path).exists() for v in versions)
+        assert (tmp_path / project_id / 'exports' / 'new.pptx').exists()
+        assert (tmp_path / 'mineru_files' / 'kept' / 'images' / 'a.png').exists()
+        assert (tmp_path / 'ocr_cache' / 'ab' / 'entry.json').exists()
+
+    def test_quota_evicts_oldest_first(self, client, sample_project, tmp_path):
+        """超出配额时按修改时间从旧到新淘汰导出文件和缓存，直到低于配额"""
+        if not sample_project:
+            pytest.skip("项目创建失败")
+        project_id = sample_project['project_id']
+        mb = 1024 * 1024
+        _write(tmp_path / project_id / 'exports' / 'a.pptx', size=mb, age_days=3)
+        _write(tmp_path / 'editable_images' / 'img1' / 'bg.png', size=mb, age_days=2)
+        _write(tmp_path / project_id / 'exports' / 'b.pptx', size=mb, age_days=1)
+        _write(tmp_path / project_id / 'template' / 'template.png', size=mb, age_days=30)
+
+        policy = GCPolicy(export_retention_days=30, cache_retention_days=30, quota_mb=2.5)
+        report = UploadGarbageCollector(str(tmp_path), policy).run(dry_run=True)
+        assert [(item.path, item.reason) for item in report.items] == [
+            (f'{project_id}/exports/a.pptx', 'quota'),
+            ('editable_images/img1', 'quota'),
+        ]
+        assert not report.over_quota and report.remaining_bytes == 2 * mb
+
+    def test_single_collector_per_upload_folder(self, client, app, tmp_path, monkeypatch):
+        """另一个进程持有回收锁时不会同时回收，锁释放后可以正常执行"""
+        from services.upload_gc import UploadGCInProgressError, _exclusive_lock, collect_upload_garbage
+
+        monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+        with _exclusive_lock(tmp_path):
+            with pytest.raises(UploadGCInProgressError):
+                collect_upload_garbage(dry_run=True)
+
+        assert collect_upload_garbage(dry_run=True).dry_run
@@ -11,7 +11,11 @@ from .response import (
 from .validators import validate_project_status, validate_page_status, allowed_file
 from .path_utils import convert_mineru_path_to_local, find_mineru_file_with_prefix, find_file_with_prefix
 from .pptx_builder import PPTXBuilder
-from .page_utils import parse_page_ids_from_query, parse_page_ids_from_body, get_filtered_pages
+from .page_utils import (
+    parse_page_ids_from_query, parse_page_ids_from_body, get_filtered_pages, get_page_summaries,
+    PAGE_BULK_FIELDS, delete_project_pages, bulk_insert_pages, bulk_update_pages, replace_project_pages,
+    allocate_image_version, switch_current_image_version
+)
 
 __all__ = [
     'success_response',
@@ -30,6 +34,14 @@ __all__ = [
     'PPTXBuilder',
     'parse_page_ids_from_query',
     'parse_page_ids_from_body',
-    'get_filtered_pages'
+    'get_filtered_pages',
+    'get_page_summaries',
+    'PAGE_BULK_FIELDS',
+    'delete_project_pages',
+    'bulk_insert_pages',
+    'bulk_update_pages',
+    'replace_project_pages',
+    'allocate_image_version',
+    'switch_current_image_version'
 ]
 
@@ -1,7 +1,9 @@
 """
 Page utilities - shared helpers for parsing page_ids and fetching pages
 """
-from typing import List, Optional, Union
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Union
 from flask import Request
 
 
@@ -58,3 +60,207 @@ def get_filtered_pages(project_id: str, page_ids: Optional[List[str]] = None):
     else:
         return Page.query.filter_by(project_id=project_id).order_by(Page.order_index).all()
 
+
+
+# Page columns accepted by the bulk helpers (besides id / project_id)
+PAGE_BULK_FIELDS = ('order_index', 'part', 'outline_content', 'description_content', 'status')
+
+
+def delete_project_pages(project_id: str) -> None:
+    """
+    Delete all pages of a project and their image versions with two DELETE
+    statements (ORM cascade would load every page's version collection first).
+    Does not commit; image files are left in place like the ORM cascade did.
+    """
+    from models import db, Page, PageImageVersion
+    
+    page_ids = db.select(Page.id).where(Page.project_id == project_id)
+    db.session.execute(
+        db.delete(PageImageVersion).where(PageImageVersion.page_id.in_(page_ids)),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.execute(
+        db.delete(Page).where(Page.project_id == project_id),
+        execution_options={'synchronize_session': False}
+    )
+
+
+def bulk_insert_pages(project_id: str, pages_data: List[dict], start_index: int = 0) -> List[str]:
+    """
+    Insert pages in a single executemany (bulk_insert_mappings). Does not commit.
+    
+    Args:
+        project_id: Project ID
+        pages_data: Dicts with any of PAGE_BULK_FIELDS; order_index defaults to
+                    start_index + position, status to 'DRAFT'
+        start_index: First order_index for pages without one
+        
+    Returns:
+        New page IDs, in input order
+    """
+    from models import db, Page
+    
+    now = datetime.utcnow()
+    mappings = []
+    for position, page_data in enumerate(pages_data):
+        mappings.append({
+            'id': str(uuid.uuid4()),
+            'project_id': project_id,
+            'order_index': page_data.get('order_index', start_index + position),
+            'part': page_data.get('part'),
+            'outline_content': page_data.get('outline_content') or None,
+            'description_content': page_data.get('description_content') or None,
+            'status': page_data.get('status') or 'DRAFT',
+            'created_at': now,
+            'updated_at': now,
+        })
+    db.session.bulk_insert_mappings(Page, mappings)
+    return [mapping['id'] for mapping in mappings]
+
+
+def bulk_update_pages(updates: List[dict]) -> None:
+    """
+    Update pages by primary key with one core UPDATE executemany per set of changed fields.
+    Ids of pages deleted in the meantime are skipped (no rowcount check, unlike
+    bulk_update_mappings which raises StaleDataError). Does not commit; loaded Page
+    objects are not refreshed until the commit expires them.
+    
+    Args:
+        updates: Dicts with 'id' plus the PAGE_BULK_FIELDS to change
+    """
+    from sqlalchemy import bindparam
+    from models import db, Page
+    
+    if not updates:
+        return
+    now = datetime.utcnow()
+    groups: Dict[tuple, List[dict]] = {}
+    for update in updates:
+        fields = tuple(sorted(key for key in update if key != 'id'))
+        groups.setdefault(fields, []).append(
+            {'_id': update['id'], **{key: update[key] for key in fields}}
+        )
+    
+    table = Page.__table__
+    for fields, params in groups.items():
+        statement = table.update().where(table.c.id == bindparam('_id')).values(
+            updated_at=now, **{key: bindparam(key) for key in fields}
+        )
+        db.session.execute(statement, params)
+
+
+def replace_project_pages(project_id: str, pages_data: List[dict]) -> List[str]:
+    """
+    Replace all pages of a project (delete + bulk insert, one transaction). Does not commit.
+    
+    Returns:
+        New page IDs, in order
+    """
+    delete_project_pages(project_id)
+    return bulk_insert_pages(project_id, pages_data)
+
+
+def allocate_image_version(page_id: str) -> Optional[int]:
+    """
+    Allocate the next image version number of a page with one atomic
+    UPDATE ... RETURNING on pages.image_version_counter.
+    
+    Concurrent callers for the same page are serialized by the row lock
+    (the write lock on SQLite), so numbers are never handed out twice.
+    Numbers of versions that are never saved or later deleted are not reused.
+    Does not commit.
+    
+    Returns:
+        The new version number, or None if the page does not exist
+    """
+    from models import db, Page
+    
+    return db.session.execute(
+        db.update(Page)
+        .where(Page.id == page_id)
+        .values(image_version_counter=Page.image_version_counter + 1)
+        .returning(Page.image_version_counter),
+        execution_options={'synchronize_session': False}
+    ).scalar()
+
+
+def switch_current_image_version(page_id: str, version_id: str) -> None:
+    """
+    Make version_id the only current image version of a page in one UPDATE
+    (is_current = (id = version_id), touching only the old and new current rows).
+    Does not commit; loaded PageImageVersion objects are refreshed on commit.
+    """
+    from models import db, PageImageVersion
+    
+    db.session.execute(
+        db.update(PageImageVersion)
+        .where(
+            PageImageVersion.page_id == page_id,
+            db.or_(PageImageVersion.is_current, PageImageVersion.id == version_id)
+        )
+        .values(is_current=(PageImageVersion.id == version_id)),
+        execution_options={'synchronize_session': False}
+    )
+
+
+def get_page_summaries(project_ids: List[str]) -> Dict[str, dict]:
+    """
+    Compute per-project page summaries in SQL (for project lists).
+    
+    Only the first page's outline and the first generated image are read;
+    descriptions and the other pages' outlines are never loaded or decoded.
+    
+    Args:
+        project_ids: Project IDs
+        
+    Returns:
+        project_id -> {page_count, pages_with_images, pages_with_descriptions,
+                       first_page_title, first_page_image_url, first_page_image_updated_at}
+        (projects without pages are absent)
+    """
+    from sqlalchemy import func
+    from models import db, Page
+    
+    if not project_ids:
+        return {}
+    
+    partition = {'partition_by': Page.project_id}
+    ranked = db.session.query(
+        Page.project_id,
+        Page.outline_content,
+        func.row_number().over(order_by=Page.order_index, **partition).label('position'),
+        func.count(Page.id).over(**partition).label('page_count'),
+        func.count(Page.generated_image_path).over(**partition).label('pages_with_images'),
+        func.count(Page.description_content).over(**partition).label('pages_with_descriptions'),
+    ).filter(Page.project_id.in_(project_ids)).subquery()
+    
+    summaries = {}
+    for row in db.session.query(ranked).filter(ranked.c.position == 1):
+        outline = row.outline_content
+        title = outline.get('title') if isinstance(outline, dict) else None
+        summaries[row.project_id] = {
+            'page_count': row.page_count,
+            'pages_with_images': row.pages_with_images,
+            'pages_with_descriptions': row.pages_with_descriptions,
+            'first_page_title': title,
+            'first_page_image_url': None,
+            'first_page_image_updated_at': None,
+        }
+    
+    ranked_images = db.session.query(
+        Page.project_id,
+        Page.generated_image_path,
+        Page.updated_at,
+        func.row_number().over(order_by=Page.order_index, **partition).label('position'),
+    ).filter(
+        Page.project_id.in_(project_ids),
+        Page.generated_image_path.isnot(None)
+    ).subquery()
+    
+    for row in db.session.query(ranked_images).filter(ranked_images.c.position == 1):
+        summary = summaries.get(row.project_id)
+        if summary is not None:
+            summary['first_page_image_url'] = f'/files/{row.project_id}/pages/{row.generated_image_path.split("/")[-1]}'
+            summary['first_page_image_updated_at'] = row.updated_at.isoformat() if row.updated_at else None
+    
+    return summaries
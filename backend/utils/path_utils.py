@@ -9,6 +9,19 @@ from typing import Optional
 logger = logging.getLogger(__name__)
 
 
+def _get_uploads_dir(project_root: Optional[Path] = None) -> Path:
+    """
+    上传目录：指定 project_root 时为 {project_root}/uploads，否则使用配置的 UPLOAD_FOLDER
+    """
+    if project_root is not None:
+        return Path(project_root) / 'uploads'
+    from flask import current_app, has_app_context
+    if has_app_context():
+        return Path(current_app.config['UPLOAD_FOLDER'])
+    from config import Config
+    return Path(Config.UPLOAD_FOLDER)
+
+
 def convert_mineru_path_to_local(mineru_path: str, project_root: Optional[Path] = None) -> Optional[Path]:
     """
     将 /files/mineru/{extract_id}/{rel_path} 格式的路径转换为本地文件系统路径
@@ -27,15 +40,8 @@ def convert_mineru_path_to_local(mineru_path: str, project_root: Optional[Path]
         # Remove '/files/mineru/' prefix
         rel_path = mineru_path.replace('/files/mineru/', '')
         
-        # Get project root if not provided
-        if project_root is None:
-            # Navigate to project root (assuming this file is in backend/utils/)
-            current_file = Path(__file__).resolve()
-            backend_dir = current_file.parent.parent
-            project_root = backend_dir.parent
-        
-        # Construct full path: {project_root}/uploads/mineru_files/{rel_path}
-        local_path = project_root / 'uploads' / 'mineru_files' / rel_path
+        # Construct full path: {upload_folder}/mineru_files/{rel_path}
+        local_path = _get_uploads_dir(project_root) / 'mineru_files' / rel_path
         
         return local_path
     except Exception as e:
@@ -69,7 +75,16 @@ def find_mineru_file_with_prefix(mineru_path: str, project_root: Optional[Path]
         return local_path
     
     # Try prefix match using the generic function
-    return find_file_with_prefix(local_path)
+    matched_path = find_file_with_prefix(local_path)
+    if matched_path is not None or project_root is not None:
+        return matched_path
+    
+    # 本地没有时从远程存储下载该次解析的文件（其他副本解析的结果）后重试
+    from services.file_service import FileService
+    extract_id = mineru_path.replace('/files/mineru/', '').split('/', 1)[0]
+    if extract_id and FileService(str(_get_uploads_dir())).fetch_dir(f"mineru_files/{extract_id}"):
+        return find_file_with_prefix(local_path)
+    return None
 
 
 def find_file_with_prefix(file_path: Path) -> Optional[Path]:
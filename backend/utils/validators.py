@@ -26,7 +26,8 @@ TASK_STATUSES = {
     'PENDING',
     'PROCESSING',
     'COMPLETED',
-    'FAILED'
+    'FAILED',
+    'CANCELLED'
 }
 
 # Task types
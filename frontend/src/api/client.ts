@@ -55,7 +55,7 @@ apiClient.interceptors.response.use(
 
 // 图片URL处理工具
 // 使用相对路径，通过代理转发到后端
-export const getImageUrl = (path?: string, timestamp?: string | number): string => {
+export const getImageUrl = (path?: string, timestamp?: string | number, width?: number): string => {
   if (!path) return '';
   // 如果已经是完整URL，直接返回
   if (path.startsWith('http://') || path.startsWith('https://')) {
@@ -63,17 +63,29 @@ export const getImageUrl = (path?: string, timestamp?: string | number): string
   }
   // 使用相对路径（确保以 / 开头）
   let url = path.startsWith('/') ? path : '/' + path;
+  const params = new URLSearchParams();
 
   // 添加时间戳参数避免浏览器缓存（仅在提供时间戳时添加）
   if (timestamp) {
     const ts = typeof timestamp === 'string'
       ? new Date(timestamp).getTime()
       : timestamp;
-    url += `?v=${ts}`;
+    params.set('v', String(ts));
+  }
+  // 缩略图宽度（后端按档位生成 WebP/JPEG 缩略图，预览列表无需加载 2K/4K 原图）
+  if (width) {
+    params.set('w', String(width));
   }
 
+  const query = params.toString();
+  if (query) {
+    url += (url.includes('?') ? '&' : '?') + query;
+  }
   return url;
 };
 
+/** 卡片/侧边栏预览使用的缩略图宽度（按 2 倍像素密度估算） */
+export const THUMBNAIL_WIDTH = 640;
+
 export default apiClient;
 
@@ -45,15 +45,23 @@ export const uploadTemplate = async (
 
 /**
  * 获取项目列表（历史项目）
- */
-export const listProjects = async (limit?: number, offset?: number): Promise<ApiResponse<{ projects: Project[]; total: number }>> => {
+ * 默认只返回摘要（页数、首页标题和图片）；fields 可选 'details'（完整项目字段）、'pages'（包含所有页面）
+ * 翻页时传入上一页返回的 next_cursor
+ */
+export const listProjects = async (
+  limit?: number,
+  offset?: number,
+  options?: { cursor?: string; fields?: Array<'details' | 'pages'> }
+): Promise<ApiResponse<{ projects: Project[]; has_more: boolean; next_cursor: string | null }>> => {
   const params = new URLSearchParams();
   if (limit !== undefined) params.append('limit', limit.toString());
   if (offset !== undefined) params.append('offset', offset.toString());
+  if (options?.cursor) params.append('cursor', options.cursor);
+  if (options?.fields?.length) params.append('fields', options.fields.join(','));
 
   const queryString = params.toString();
   const url = `/api/projects${queryString ? `?${queryString}` : ''}`;
-  const response = await apiClient.get<ApiResponse<{ projects: Project[]; total: number }>>(url);
+  const response = await apiClient.get<ApiResponse<{ projects: Project[]; has_more: boolean; next_cursor: string | null }>>(url);
   return response.data;
 };
 
@@ -405,6 +413,14 @@ export const getTaskStatus = async (projectId: string, taskId: string): Promise<
   return response.data;
 };
 
+/**
+ * 取消任务（运行中的任务在下一个检查点停止，之后状态变为 CANCELLED）
+ */
+export const cancelTask = async (projectId: string, taskId: string): Promise<ApiResponse<Task>> => {
+  const response = await apiClient.post<ApiResponse<Task>>(`/api/projects/${projectId}/tasks/${taskId}/cancel`);
+  return response.data;
+};
+
 // ===== 导出 =====
 
 /**
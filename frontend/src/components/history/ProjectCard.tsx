@@ -52,7 +52,7 @@ export const ProjectCard: React.FC<ProjectCardProps> = ({
   if (!projectId) return null;
 
   const title = getProjectTitle(project);
-  const pageCount = project.pages?.length || 0;
+  const pageCount = project.pages?.length || project.page_count || 0;
   const statusText = getStatusText(project);
   const statusColor = getStatusColor(project);
   
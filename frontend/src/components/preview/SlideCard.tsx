@@ -1,7 +1,7 @@
 import React from 'react';
 import { Edit2, Trash2 } from 'lucide-react';
 import { StatusBadge, Skeleton, useConfirm } from '@/components/shared';
-import { getImageUrl } from '@/api/client';
+import { getImageUrl, THUMBNAIL_WIDTH } from '@/api/client';
 import type { Page } from '@/types';
 
 interface SlideCardProps {
@@ -25,7 +25,7 @@ export const SlideCard: React.FC<SlideCardProps> = ({
 }) => {
   const { confirm, ConfirmDialog } = useConfirm();
   const imageUrl = page.generated_image_path
-    ? getImageUrl(page.generated_image_path, page.updated_at)
+    ? getImageUrl(page.generated_image_path, page.updated_at, THUMBNAIL_WIDTH)
     : '';
   
   const generating = isGenerating || page.status === 'GENERATING';
@@ -31,7 +31,7 @@ import type { Material } from '@/api/endpoints';
 import { SlideCard } from '@/components/preview/SlideCard';
 import { useProjectStore } from '@/store/useProjectStore';
 import { useExportTasksStore, type ExportTaskType } from '@/store/useExportTasksStore';
-import { getImageUrl } from '@/api/client';
+import { getImageUrl, THUMBNAIL_WIDTH } from '@/api/client';
 import { getPageImageVersions, setCurrentImageVersion, updateProject, uploadTemplate, exportPPTX as apiExportPPTX, exportPDF as apiExportPDF, exportEditablePPTX as apiExportEditablePPTX, exportEditablePPTXImg2Slides as apiExportEditablePPTXVision } from '@/api/endpoints';
 import type { ImageVersion, DescriptionContent, ExportExtractorMethod, ExportInpaintMethod } from '@/types';
 import { normalizeErrorMessage } from '@/utils';
@@ -1122,7 +1122,7 @@ export const SlidePreview: React.FC = () => {
                     >
                       {page.generated_image_path ? (
                         <img
-                          src={getImageUrl(page.generated_image_path, page.updated_at)}
+                          src={getImageUrl(page.generated_image_path, page.updated_at, THUMBNAIL_WIDTH)}
                           alt={`Slide ${index + 1}`}
                           className="w-full h-full object-cover rounded"
                         />
@@ -75,10 +75,17 @@ export interface Project {
   pages: Page[];
   created_at: string;
   updated_at: string;
+  // 项目列表摘要（GET /api/projects 默认只返回摘要，不包含 pages）
+  page_count?: number;
+  pages_with_images?: number;
+  pages_with_descriptions?: number;
+  first_page_title?: string | null;
+  first_page_image_url?: string | null;
+  first_page_image_updated_at?: string | null;
 }
 
 // 任务状态
-export type TaskStatus = 'PENDING' | 'RUNNING' | 'COMPLETED' | 'FAILED';
+export type TaskStatus = 'PENDING' | 'RUNNING' | 'COMPLETED' | 'FAILED' | 'CANCELLED';
 
 // 任务信息
 export interface Task {
@@ -1,4 +1,4 @@
-import { getImageUrl } from '@/api/client';
+import { getImageUrl, THUMBNAIL_WIDTH } from '@/api/client';
 import type { Project } from '@/types';
 
 /**
@@ -24,6 +24,11 @@ export const getProjectTitle = (project: Project): string => {
     }
   }
   
+  // 项目列表摘要中的首页标题
+  if (project.first_page_title) {
+    return project.first_page_title;
+  }
+  
   // 默认返回未命名项目
   return '未命名项目';
 };
@@ -33,13 +38,17 @@ export const getProjectTitle = (project: Project): string => {
  */
 export const getFirstPageImage = (project: Project): string | null => {
   if (!project.pages || project.pages.length === 0) {
+    // 项目列表摘要
+    if (project.first_page_image_url) {
+      return getImageUrl(project.first_page_image_url, project.first_page_image_updated_at || undefined, THUMBNAIL_WIDTH);
+    }
     return null;
   }
   
   // 找到第一页有图片的页面
   const firstPageWithImage = project.pages.find(p => p.generated_image_path);
   if (firstPageWithImage?.generated_image_path) {
-    return getImageUrl(firstPageWithImage.generated_image_path, firstPageWithImage.updated_at);
+    return getImageUrl(firstPageWithImage.generated_image_path, firstPageWithImage.updated_at, THUMBNAIL_WIDTH);
   }
   
   return null;
@@ -59,18 +68,35 @@ export const formatDate = (dateString: string): string => {
   });
 };
 
+/**
+ * 获取页面进度（完整项目使用 pages，项目列表摘要使用统计字段）
+ */
+const getPageProgress = (project: Project) => {
+  if (project.pages && project.pages.length > 0) {
+    return {
+      pageCount: project.pages.length,
+      hasImages: project.pages.some(p => p.generated_image_path),
+      hasDescriptions: project.pages.some(p => p.description_content),
+    };
+  }
+  return {
+    pageCount: project.page_count || 0,
+    hasImages: (project.pages_with_images || 0) > 0,
+    hasDescriptions: (project.pages_with_descriptions || 0) > 0,
+  };
+};
+
 /**
  * 获取项目状态文本
  */
 export const getStatusText = (project: Project): string => {
-  if (!project.pages || project.pages.length === 0) {
+  const { pageCount, hasImages, hasDescriptions } = getPageProgress(project);
+  if (pageCount === 0) {
     return '未开始';
   }
-  const hasImages = project.pages.some(p => p.generated_image_path);
   if (hasImages) {
     return '已完成';
   }
-  const hasDescriptions = project.pages.some(p => p.description_content);
   if (hasDescriptions) {
     return '待生成图片';
   }
@@ -95,12 +121,11 @@ export const getProjectRoute = (project: Project): string => {
   const projectId = project.id || project.project_id;
   if (!projectId) return '/';
   
-  if (project.pages && project.pages.length > 0) {
-    const hasImages = project.pages.some(p => p.generated_image_path);
+  const { pageCount, hasImages, hasDescriptions } = getPageProgress(project);
+  if (pageCount > 0) {
     if (hasImages) {
       return `/project/${projectId}/preview`;
     }
-    const hasDescriptions = project.pages.some(p => p.description_content);
     if (hasDescriptions) {
       return `/project/${projectId}/detail`;
     }